@@ -0,0 +1,14 @@
+-- Embedding namespaces: which model/dimension namespace each client's vectors are read from
+-- active_namespace '' is the vector index's default namespace (legacy text-embedding-ada-002@1536)
+CREATE TABLE IF NOT EXISTS embedding_namespaces (
+	client_id VARCHAR(100) PRIMARY KEY,
+	active_namespace VARCHAR(200) NOT NULL DEFAULT '',
+	target_namespace VARCHAR(200),
+	status VARCHAR(20) NOT NULL DEFAULT 'active' CHECK (status IN ('active','migrating','paused','failed')),
+	migrated_count INTEGER NOT NULL DEFAULT 0,
+	total_count INTEGER NOT NULL DEFAULT 0,
+	error_count INTEGER NOT NULL DEFAULT 0,
+	started_at TIMESTAMPTZ,
+	completed_at TIMESTAMPTZ,
+	updated_at TIMESTAMPTZ DEFAULT NOW()
+);
@@ -0,0 +1,4 @@
+-- Stage 2 pre-score cascade: which tier decided each label (stage1_filter, heuristic or llm),
+-- so cascade savings and agreement can be measured later (quote_prescore.py).
+
+ALTER TABLE stage2_response_labeling ADD COLUMN IF NOT EXISTS decided_by TEXT;
@@ -0,0 +1,6 @@
+-- Stage 2 input hashes: each label records the quote text, rubric and prompt it was computed
+-- from, so incremental runs re-score only quotes whose inputs changed (stage2_input_hashes.py).
+
+ALTER TABLE stage2_response_labeling ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE stage2_response_labeling ADD COLUMN IF NOT EXISTS criteria_hash TEXT;
+ALTER TABLE stage2_response_labeling ADD COLUMN IF NOT EXISTS prompt_hash TEXT;
@@ -0,0 +1,102 @@
+-- Server-side aggregates for dashboard summaries: each function returns a handful of summary
+-- rows instead of the client downloading whole tables. Called via RPC from
+-- SupabaseDatabase.aggregate(); summary_aggregates.py holds the SQLite equivalents.
+-- stage3_findings columns differ between deployments, so its fields are read through to_jsonb.
+
+CREATE OR REPLACE FUNCTION voc_stage1_summary(p_client_id TEXT)
+RETURNS TABLE (dimension TEXT, value TEXT, row_count BIGINT)
+LANGUAGE sql STABLE AS $$
+	SELECT 'total'::TEXT, NULL::TEXT, COUNT(*)
+	FROM stage1_data_responses WHERE client_id = p_client_id
+	UNION ALL
+	SELECT 'deal_status', deal_status::TEXT, COUNT(*)
+	FROM stage1_data_responses WHERE client_id = p_client_id AND deal_status IS NOT NULL
+	GROUP BY deal_status
+	UNION ALL
+	SELECT 'company', company::TEXT, COUNT(*)
+	FROM stage1_data_responses WHERE client_id = p_client_id AND company IS NOT NULL
+	GROUP BY company
+$$;
+
+CREATE OR REPLACE FUNCTION voc_stage2_criteria_summary(p_client_id TEXT)
+RETURNS TABLE (
+	level TEXT, criterion TEXT, deal_status TEXT, mention_count BIGINT, quote_count BIGINT,
+	company_count BIGINT, critical_mentions BIGINT, avg_score DOUBLE PRECISION,
+	min_score DOUBLE PRECISION, max_score DOUBLE PRECISION
+)
+LANGUAGE sql STABLE AS $$
+	WITH labeled AS (
+		SELECT l.quote_id, l.criterion::TEXT AS criterion, l.relevance_score::DOUBLE PRECISION AS score,
+			r.company, r.deal_status::TEXT AS deal_status
+		FROM stage2_response_labeling l
+		LEFT JOIN stage1_data_responses r ON r.response_id = l.quote_id AND r.client_id = p_client_id
+		WHERE l.client_id = p_client_id
+	)
+	SELECT 'total'::TEXT, NULL::TEXT, NULL::TEXT, COUNT(*), COUNT(DISTINCT quote_id), COUNT(DISTINCT company),
+		COUNT(*) FILTER (WHERE score >= 4), AVG(score), MIN(score), MAX(score)
+	FROM labeled
+	UNION ALL
+	SELECT 'criterion', criterion, NULL, COUNT(*), COUNT(DISTINCT quote_id), COUNT(DISTINCT company),
+		COUNT(*) FILTER (WHERE score >= 4), AVG(score), MIN(score), MAX(score)
+	FROM labeled GROUP BY criterion
+	UNION ALL
+	SELECT 'criterion_deal', criterion, deal_status, COUNT(*), NULL, NULL, NULL, NULL, NULL, NULL
+	FROM labeled WHERE deal_status IS NOT NULL GROUP BY criterion, deal_status
+$$;
+
+CREATE OR REPLACE FUNCTION voc_stage2_sample_explanations(p_client_id TEXT, p_per_criterion INTEGER DEFAULT 3)
+RETURNS TABLE (criterion TEXT, relevance_explanation TEXT)
+LANGUAGE sql STABLE AS $$
+	SELECT criterion, relevance_explanation FROM (
+		SELECT criterion::TEXT AS criterion, relevance_explanation,
+			ROW_NUMBER() OVER (PARTITION BY criterion ORDER BY id) AS rn
+		FROM stage2_response_labeling WHERE client_id = p_client_id
+	) ranked
+	WHERE rn <= p_per_criterion
+	ORDER BY criterion, rn
+$$;
+
+CREATE OR REPLACE FUNCTION voc_stage3_findings_summary(p_client_id TEXT)
+RETURNS TABLE (
+	dimension TEXT, value TEXT, row_count BIGINT, priority_count BIGINT,
+	avg_confidence DOUBLE PRECISION, avg_criteria_met DOUBLE PRECISION
+)
+LANGUAGE sql STABLE AS $$
+	WITH f AS (
+		SELECT j->>'criterion' AS criterion, j->>'finding_type' AS finding_type, j->>'priority_level' AS priority_level,
+			CASE WHEN jsonb_typeof(j->'enhanced_confidence') = 'number' THEN (j->>'enhanced_confidence')::DOUBLE PRECISION END AS confidence,
+			CASE WHEN jsonb_typeof(j->'criteria_met') = 'number' THEN (j->>'criteria_met')::DOUBLE PRECISION END AS criteria_met,
+			CASE WHEN lower(coalesce(j->>'priority_level', '')) LIKE '%priority%' THEN 'priority'
+				WHEN lower(coalesce(j->>'priority_level', '')) LIKE '%standard%' THEN 'standard'
+				ELSE 'low' END AS tier
+		FROM (SELECT to_jsonb(s) AS j FROM stage3_findings s WHERE s.client_id = p_client_id) found
+	)
+	SELECT 'total'::TEXT, NULL::TEXT, COUNT(*), COUNT(*) FILTER (WHERE tier = 'priority'), AVG(confidence), AVG(criteria_met)
+	FROM f
+	UNION ALL
+	SELECT 'tier', tier, COUNT(*), NULL, NULL, NULL FROM f GROUP BY tier
+	UNION ALL
+	SELECT 'finding_type', finding_type, COUNT(*), NULL, NULL, NULL
+	FROM f WHERE finding_type IS NOT NULL GROUP BY finding_type
+	UNION ALL
+	SELECT 'priority_level', priority_level, COUNT(*), NULL, NULL, NULL
+	FROM f WHERE priority_level IS NOT NULL GROUP BY priority_level
+	UNION ALL
+	SELECT 'criterion', criterion, COUNT(*), COUNT(*) FILTER (WHERE tier = 'priority'), AVG(confidence), NULL
+	FROM f WHERE criterion IS NOT NULL GROUP BY criterion
+$$;
+
+CREATE OR REPLACE FUNCTION voc_client_counts()
+RETURNS TABLE (client_id TEXT, row_count BIGINT)
+LANGUAGE sql STABLE AS $$
+	SELECT client_id::TEXT, COUNT(*) FROM stage1_data_responses
+	WHERE client_id IS NOT NULL GROUP BY client_id
+$$;
+
+GRANT EXECUTE ON FUNCTION voc_stage1_summary(TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION voc_stage2_criteria_summary(TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION voc_stage2_sample_explanations(TEXT, INTEGER) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION voc_stage3_findings_summary(TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION voc_client_counts() TO anon, authenticated;
+
+CREATE INDEX IF NOT EXISTS idx_stage2_client_criterion ON stage2_response_labeling(client_id, criterion);
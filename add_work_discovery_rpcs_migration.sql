@@ -0,0 +1,25 @@
+-- Work discovery for incremental runs: the function anti-joins a stage against the next one
+-- and returns one page of the ids still waiting to be processed, ordered by id. Pass the last
+-- id of a page as p_after_id to fetch the next. Called via SupabaseDatabase.pending_ids();
+-- summary_aggregates.py holds the SQLite equivalent. Only Stage 2 discovers its work this way;
+-- Stages 3 and 4 re-read the whole client.
+
+-- Stage 2: responses with no stage2_response_labeling rows yet
+CREATE OR REPLACE FUNCTION voc_stage2_pending(p_client_id TEXT, p_after_id BIGINT DEFAULT 0, p_limit INTEGER DEFAULT 1000)
+RETURNS TABLE (id BIGINT, response_id TEXT)
+LANGUAGE sql STABLE AS $$
+	SELECT r.id::BIGINT, r.response_id::TEXT
+	FROM stage1_data_responses r
+	WHERE r.client_id = p_client_id AND r.id > p_after_id
+		AND NOT EXISTS (
+			SELECT 1 FROM stage2_response_labeling l
+			WHERE l.client_id = p_client_id AND l.quote_id = r.response_id
+		)
+	ORDER BY r.id
+	LIMIT p_limit
+$$;
+
+GRANT EXECUTE ON FUNCTION voc_stage2_pending(TEXT, BIGINT, INTEGER) TO anon, authenticated;
+
+CREATE INDEX IF NOT EXISTS idx_stage1_client_id_id ON stage1_data_responses(client_id, id);
+CREATE INDEX IF NOT EXISTS idx_stage2_client_quote ON stage2_response_labeling(client_id, quote_id);
@@ -1,8 +1,16 @@
 import os
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import openai
-import pinecone
 import pandas as pd
 from supabase_database import SupabaseDatabase
+from embedding_utils import (
+    EMBEDDING_DIMENSION, LEGACY_MODEL, LEGACY_NAMESPACE, NamespaceRegistry,
+    check_namespace_vector, embedding_request_kwargs, parse_embedding_namespace,
+)
 from dotenv import load_dotenv
 
 # Load environment variables and Streamlit secrets
@@ -15,23 +23,37 @@ PINECONE_ENV = os.getenv("PINECONE_ENV", "us-west1-gcp")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX", "client-voc-embeddings")
 PINECONE_REGION = os.getenv("PINECONE_REGION", "us-west-2")
 
+# Batch sizes: one embeddings request per EMBED_BATCH_SIZE texts, one upsert per UPSERT_BATCH_SIZE vectors
+EMBED_BATCH_SIZE = 256
+UPSERT_BATCH_SIZE = 100
+FETCH_BATCH_SIZE = 200
+UPSERT_RETRIES = 3
+# --prune refuses to delete more than this share of a client's stored vectors without --force-prune
+PRUNE_MAX_FRACTION = float(os.getenv("EMBED_PRUNE_MAX_FRACTION", "0.5"))
+
 openai.api_key = OPENAI_API_KEY
 
-# Use new Pinecone client
-from pinecone import Pinecone, ServerlessSpec
+_index = None
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
 
-# Ensure index exists
-if PINECONE_INDEX not in pc.list_indexes().names():
-    pc.create_index(
-        name=PINECONE_INDEX,
-        dimension=3072,  # text-embedding-3-large is 3072 dims
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region=PINECONE_REGION)
-    )
+def get_index():
+    """Connect to (and create if missing) the Pinecone index on first use"""
+    global _index
+    if _index is None:
+        # Use new Pinecone client
+        from pinecone import Pinecone, ServerlessSpec
+        pc = Pinecone(api_key=PINECONE_API_KEY)
+        # Ensure index exists
+        if PINECONE_INDEX not in pc.list_indexes().names():
+            pc.create_index(
+                name=PINECONE_INDEX,
+                dimension=EMBEDDING_DIMENSION,
+                metric='cosine',
+                spec=ServerlessSpec(cloud='aws', region=PINECONE_REGION)
+            )
+        _index = pc.Index(PINECONE_INDEX)
+    return _index
 
-index = pc.Index(PINECONE_INDEX)
 
 def get_text_for_embedding(record, record_type):
     if record_type == "response":
@@ -42,8 +64,19 @@ def get_text_for_embedding(record, record_type):
         return record.get("theme_statement") or ""
     return ""
 
-def upsert_records(records, record_type, client_id):
-    batch = []
+
+def content_hash(text, model=LEGACY_MODEL):
+    """Hash of the embedded text and model; stored in vector metadata to detect unchanged records"""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def vector_id_prefix(client_id, record_type):
+    return f"{client_id}:{record_type}:"
+
+
+def prepare_records(records, record_type, client_id, model=LEGACY_MODEL, namespace=LEGACY_NAMESPACE):
+    """Build {vector_id: item} for records that have an id and text; last occurrence of an id wins"""
+    prepared = {}
     for record in records:
         record_id = record.get("id") or record.get("response_id") or record.get("finding_id") or record.get("theme_id")
         if not record_id:
@@ -51,50 +84,222 @@ def upsert_records(records, record_type, client_id):
         text = get_text_for_embedding(record, record_type)
         if not text:
             continue
-        # Generate embedding (openai>=1.0.0)
+        vector_id = f"{vector_id_prefix(client_id, record_type)}{record_id}"
+        digest = content_hash(text, model)
+        prepared[vector_id] = {
+            "text": text,
+            "metadata": {
+                "client_id": client_id,
+                "type": record_type,
+                "record_id": record_id,
+                "content_hash": digest,
+                "embedding_model": model,
+                "embedding_namespace": namespace,
+            },
+        }
+    return prepared
+
+
+def _field(obj, name, default=None):
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def fetch_existing_hashes(index, vector_ids, namespace=LEGACY_NAMESPACE):
+    """Map vector_id -> stored content_hash (None if stored before hashes were recorded)"""
+    existing = {}
+    vector_ids = list(vector_ids)
+    for i in range(0, len(vector_ids), FETCH_BATCH_SIZE):
+        resp = index.fetch(ids=vector_ids[i:i + FETCH_BATCH_SIZE], namespace=namespace)
+        for vid, vec in (_field(resp, "vectors") or {}).items():
+            existing[vid] = (_field(vec, "metadata") or {}).get("content_hash")
+    return existing
+
+
+def list_existing_ids(index, client_id, record_type, namespace=LEGACY_NAMESPACE):
+    """All vector ids stored for this client and record type (empty if the index cannot list)"""
+    try:
+        ids = set()
+        for page in index.list(prefix=vector_id_prefix(client_id, record_type), namespace=namespace):
+            ids.update(page)
+        return ids
+    except Exception as e:
+        print(f"⚠️ Could not list existing vectors for {client_id}/{record_type}: {e}")
+        return set()
+
+
+def plan_sync(prepared, existing_hashes, existing_ids):
+    """Split prepared vectors into add / update / unchanged, plus stored ids to remove"""
+    plan = {"add": [], "update": [], "unchanged": [], "remove": []}
+    for vector_id, item in prepared.items():
+        if vector_id not in existing_hashes:
+            plan["add"].append(vector_id)
+        elif existing_hashes[vector_id] != item["metadata"]["content_hash"]:
+            plan["update"].append(vector_id)
+        else:
+            plan["unchanged"].append(vector_id)
+    plan["remove"] = sorted(set(existing_ids) - set(prepared))
+    return plan
+
+
+def embed_texts(texts, namespace=LEGACY_NAMESPACE):
+    """One embeddings request for a list of texts (openai>=1.0.0), with the namespace's model and dimension"""
+    model, dimension = parse_embedding_namespace(namespace)
+    response = openai.embeddings.create(input=texts, model=model, **embedding_request_kwargs(model, dimension))
+    embeddings = [item.embedding for item in response.data]
+    for emb in embeddings:
+        check_namespace_vector(namespace, emb)
+    return embeddings
+
+
+def _upsert_with_retry(index, vectors, namespace=LEGACY_NAMESPACE):
+    for attempt in range(UPSERT_RETRIES):
+        try:
+            index.upsert(vectors=vectors, namespace=namespace)
+            return len(vectors)
+        except Exception as e:
+            if attempt == UPSERT_RETRIES - 1:
+                print(f"❌ Upsert of {len(vectors)} vectors failed: {e}")
+                return 0
+            time.sleep(2 ** attempt)
+
+
+def prune_blocked_reason(records, plan, existing_ids, max_fraction=PRUNE_MAX_FRACTION, force=False):
+    """Why pruning must not run for this sync, or None when it is safe"""
+    if records is None:
+        return "source fetch failed"
+    if not records:
+        return "source returned no records"
+    if not force and existing_ids and len(plan["remove"]) > max_fraction * len(existing_ids):
+        return (f"{len(plan['remove'])} of {len(existing_ids)} stored vectors would be removed "
+                f"(more than {max_fraction:.0%}; use --force-prune)")
+    return None
+
+
+def upsert_records(records, record_type, client_id, dry_run=False, prune=False, workers=4, index=None, embed_fn=None,
+                   namespace=LEGACY_NAMESPACE, force_prune=False, prune_max_fraction=PRUNE_MAX_FRACTION):
+    """
+    Change-aware sync of one record type for a client into one embedding namespace of the vector store.
+    The namespace fixes the embedding model and dimension (see embedding_utils.embedding_namespace).
+    Only new or changed records (by content hash) are embedded, in EMBED_BATCH_SIZE requests;
+    upserts run on a bounded thread pool while the next batch is embedded.
+    With prune=True, stored vectors whose records no longer exist are deleted, unless records is
+    None (the source fetch failed) or empty, or more than prune_max_fraction of the stored vectors
+    would go and force_prune is not set; stats['prune_blocked'] then says why.
+    Returns the plan counts plus how many vectors were upserted/removed.
+    """
+    fetched = records
+    records = records or []
+    index = index or get_index()
+    model, _ = parse_embedding_namespace(namespace)
+    embed_fn = embed_fn or (lambda texts: embed_texts(texts, namespace))
+    prepared = prepare_records(records, record_type, client_id, model, namespace)
+    existing_hashes = fetch_existing_hashes(index, prepared.keys(), namespace)
+    # Listing the whole prefix is only needed to find stale vectors
+    existing_ids = list_existing_ids(index, client_id, record_type, namespace) if (prune or dry_run) else set()
+    plan = plan_sync(prepared, existing_hashes, existing_ids)
+    stats = {k: len(v) for k, v in plan.items()}
+    stats.update({"upserted": 0, "removed": 0, "embed_errors": 0, "prune_blocked": None})
+    if prune and plan["remove"]:
+        stats["prune_blocked"] = prune_blocked_reason(fetched, plan, existing_ids, prune_max_fraction, force_prune)
+    if dry_run:
+        return stats
+
+    to_write = plan["add"] + plan["update"]
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit(batch):
+            in_flight.acquire()
+            fut = pool.submit(_upsert_with_retry, index, batch, namespace)
+            fut.add_done_callback(lambda _: in_flight.release())
+            futures.append(fut)
+
+        pending = []
+        for i in range(0, len(to_write), EMBED_BATCH_SIZE):
+            ids = to_write[i:i + EMBED_BATCH_SIZE]
+            try:
+                embeddings = embed_fn([prepared[vid]["text"] for vid in ids])
+            except Exception as e:
+                print(f"❌ Error embedding {len(ids)} {record_type} records: {e}")
+                stats["embed_errors"] += len(ids)
+                continue
+            for vid, emb in zip(ids, embeddings):
+                pending.append((vid, emb, prepared[vid]["metadata"]))
+                if len(pending) >= UPSERT_BATCH_SIZE:
+                    submit(pending)
+                    pending = []
+        if pending:
+            submit(pending)
+    stats["upserted"] = sum(f.result() for f in futures)
+
+    if prune and plan["remove"] and not stats["prune_blocked"]:
+        for i in range(0, len(plan["remove"]), 1000):
+            index.delete(ids=plan["remove"][i:i + 1000], namespace=namespace)
+        stats["removed"] = len(plan["remove"])
+    return stats
+
+
+def load_client_records(db, client_id):
+    """[(record_type, records)] for everything that is embedded for a client; records is None when the fetch failed"""
+    sources = [
+        ("response", lambda: db.get_stage1_data_responses(client_id=client_id, columns='text')),
+        ("finding", lambda: db.get_stage3_findings(client_id, columns='text')),
+        ("theme", lambda: db.get_themes(client_id, columns='text')),
+    ]
+    loaded = []
+    for record_type, fetch in sources:
         try:
-            response = openai.embeddings.create(input=text, model="text-embedding-ada-002")
-            embedding = response.data[0].embedding
+            frame = fetch()
         except Exception as e:
-            print(f"❌ Error embedding {record_type} {record_id}: {e}")
+            print(f"❌ Could not load {record_type} records for {client_id}: {e}")
+            loaded.append((record_type, None))
             continue
-        # Prepare Pinecone upsert
-        vector_id = f"{client_id}:{record_type}:{record_id}"
-        metadata = {"client_id": client_id, "type": record_type, "record_id": record_id}
-        batch.append((vector_id, embedding, metadata))
-        if len(batch) >= 50:
-            index.upsert(vectors=batch)
-            batch = []
-    if batch:
-        index.upsert(vectors=batch)
+        loaded.append((record_type, frame.to_dict('records') if not frame.empty else []))
+    return loaded
+
+
+def _report(record_type, stats, dry_run):
+    verb = "would be" if dry_run else "were"
+    print(f"  {record_type}: {stats['add']} added, {stats['update']} updated, "
+          f"{stats['unchanged']} unchanged, {stats['remove']} stale ({verb} processed)")
+    if not dry_run:
+        print(f"    upserted={stats['upserted']} removed={stats['removed']} embed_errors={stats['embed_errors']}")
+    if stats.get('prune_blocked'):
+        print(f"    ⚠️ Prune skipped: {stats['prune_blocked']}")
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Embed and upsert responses, findings and themes to Pinecone")
+    parser.add_argument("--client", help="Only sync this client_id (default: all clients)")
+    parser.add_argument("--dry-run", action="store_true", help="Report how many vectors would be added, updated or removed")
+    parser.add_argument("--prune", action="store_true", help="Delete vectors whose source records no longer exist")
+    parser.add_argument("--force-prune", action="store_true",
+                        help=f"Allow --prune to remove more than {PRUNE_MAX_FRACTION:.0%} of a client's stored vectors")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent upsert requests (default: 4)")
+    args = parser.parse_args()
+
     db = SupabaseDatabase()
     # Get all unique client_ids
-    client_ids = set()
-    for table in ["stage1_data_responses", "stage3_findings", "stage4_themes"]:
-        df = db.supabase.table(table).select("client_id").execute()
-        if hasattr(df, 'data') and df.data:
-            client_ids.update([row['client_id'] for row in df.data if row.get('client_id')])
+    client_ids = {args.client} if args.client else set()
+    if not client_ids:
+        for table in ["stage1_data_responses", "stage3_findings", "stage4_themes"]:
+            df = db.supabase.table(table).select("client_id").execute()
+            if hasattr(df, 'data') and df.data:
+                client_ids.update([row['client_id'] for row in df.data if row.get('client_id')])
     print(f"Found client_ids: {client_ids}")
+    registry = NamespaceRegistry(db)
     for client_id in client_ids:
-        print(f"\nProcessing client: {client_id}")
-        # Responses
-        responses = db.get_stage1_data_responses(client_id)
-        if not responses.empty:
-            print(f"  Upserting {len(responses)} responses...")
-            upsert_records(responses.to_dict('records'), "response", client_id)
-        # Findings
-        findings = db.get_stage3_findings(client_id)
-        if not findings.empty:
-            print(f"  Upserting {len(findings)} findings...")
-            upsert_records(findings.to_dict('records'), "finding", client_id)
-        # Themes
-        themes = db.get_themes(client_id)
-        if not themes.empty:
-            print(f"  Upserting {len(themes)} themes...")
-            upsert_records(themes.to_dict('records'), "theme", client_id)
-    print("\n✅ Batch embedding and upsert complete.")
+        # Writes go to the namespace reads use; a running migration picks changes up by content hash
+        namespace = registry.resolve(client_id)["namespace"]
+        print(f"\nProcessing client: {client_id} (namespace: {namespace or 'default'})")
+        for record_type, records in load_client_records(db, client_id):
+            stats = upsert_records(records, record_type, client_id, dry_run=args.dry_run,
+                                   prune=args.prune, workers=args.workers, namespace=namespace,
+                                   force_prune=args.force_prune)
+            _report(record_type, stats, args.dry_run)
+    print("\n✅ Batch embedding and upsert complete." if not args.dry_run else "\n✅ Dry run complete.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
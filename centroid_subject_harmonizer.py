@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+"""
+Embedding-Centroid Subject Harmonizer for VOC Pipeline
+
+Middle tier between keyword matching and the LLM: each category's description and examples
+are embedded once and averaged into a centroid, and a subject is assigned to its nearest
+centroid when it is both similar enough and clearly closer than the runner-up (margin).
+Low-margin subjects are left for the LLM. Used by LLMSemanticHarmonizer.batch_harmonize().
+"""
+
+import os
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HARMONIZE_CENTROID_MIN_SIMILARITY = float(os.getenv("HARMONIZE_CENTROID_MIN_SIMILARITY", "0.5"))
+HARMONIZE_CENTROID_MIN_MARGIN = float(os.getenv("HARMONIZE_CENTROID_MIN_MARGIN", "0.05"))
+
+# texts -> L2-normalized matrix, one row per text (zero rows for texts that could not be embedded)
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+
+def openai_embedder() -> Embedder:
+    """Embed with EmbeddingManager (configured model; local vector cache when EMBEDDING_CACHE_DIR is set)"""
+    from embedding_utils import EmbeddingManager
+    manager = EmbeddingManager()
+
+    def embed(texts: Sequence[str]) -> np.ndarray:
+        matrix, index = manager.get_embedding_matrix(list(texts))
+        return matrix[[index[str(t)] for t in texts]]
+    embed.namespace = manager.namespace
+    return embed
+
+
+class CentroidHarmonizer:
+    """Nearest-centroid assignment of subjects to categories with a confidence margin"""
+
+    def __init__(self, categories: Dict[str, Dict], embed: Embedder,
+                 min_similarity: float = HARMONIZE_CENTROID_MIN_SIMILARITY,
+                 min_margin: float = HARMONIZE_CENTROID_MIN_MARGIN):
+        self.category_names = list(categories)
+        self.embed = embed
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        texts, owners = [], []
+        for i, (name, info) in enumerate(categories.items()):
+            for text in [f"{name}: {info.get('description', '')}"] + list(info.get('examples', [])):
+                texts.append(text)
+                owners.append(i)
+        vectors = embed(texts)
+        owners = np.array(owners)
+        centroids = np.stack([vectors[owners == i].mean(axis=0) for i in range(len(self.category_names))])
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = np.divide(centroids, norms, out=np.zeros_like(centroids), where=norms > 0)
+        logger.info(f"🧭 Built {len(self.category_names)} category centroids from {len(texts)} texts")
+
+    @property
+    def settings(self) -> Dict[str, object]:
+        """What an assignment depends on besides the categories: embedding namespace and thresholds"""
+        return {'embedding': getattr(self.embed, 'namespace', None), 'min_similarity': self.min_similarity,
+                'min_margin': self.min_margin}
+
+    def assign(self, subjects: Sequence[str]) -> List[Tuple[Optional[str], float, float]]:
+        """
+        (category or None, similarity, margin) per subject. category is None when the nearest
+        centroid is below min_similarity or within min_margin of the second nearest.
+        """
+        if not len(subjects):
+            return []
+        sims = self.embed(subjects) @ self.centroids.T
+        order = np.argsort(-sims, axis=1)
+        rows = np.arange(len(subjects))
+        best = sims[rows, order[:, 0]]
+        margin = best - sims[rows, order[:, 1]] if sims.shape[1] > 1 else best
+        confident = (best >= self.min_similarity) & (margin >= self.min_margin)
+        return [(self.category_names[order[i, 0]] if confident[i] else None, float(best[i]), float(margin[i]))
+                for i in range(len(subjects))]
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""
+Portable Client Bundles for VOC Pipeline
+
+Exports one client's pipeline state (Stage 1-4 tables with their harmonized subjects and
+embedding columns, the client's embedding_namespaces row, and a copy of the subject
+harmonization config for reference) to a directory of zstd-compressed Parquet files plus a
+manifest.json recording the bundle format version, row counts, columns and a SHA-256 per
+file. Importing verifies the checksums and bulk-inserts the rows into any SupabaseDatabase,
+including the local backend, so heavy clients can be benchmarked and debugged without
+touching production:
+
+    python client_bundle.py export --client acme --out bundles/acme
+    VOC_DB_BACKEND=local python client_bundle.py import bundles/acme --replace
+
+Pinecone vectors are not part of a bundle; re-embed from the imported rows if needed.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 (pandas' Parquet engine)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+from supabase_database import SupabaseDatabase
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_TABLES = ('stage1_data_responses', 'stage2_response_labeling', 'stage3_findings', 'stage4_themes',
+                 'embedding_namespaces')
+BUNDLE_FILES = ('config/subject_harmonization.yaml',)
+BUNDLE_COMPRESSION = os.getenv("VOC_BUNDLE_COMPRESSION", "zstd")
+IMPORT_CHUNK_SIZE = int(os.getenv("VOC_BUNDLE_IMPORT_CHUNK_SIZE", "500"))
+
+
+def _require_parquet():
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet bundles need pyarrow. Install with: pip install pyarrow")
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _json_columns(df: pd.DataFrame) -> List[str]:
+    """
+    Object columns Parquet cannot store as-is, kept as JSON text: lists/dicts (embeddings,
+    JSON fields) and columns mixing value types (e.g. criteria_met as 3 and as "3")
+    """
+    columns = []
+    for column in df.columns:
+        if df[column].dtype != object:
+            continue
+        types = {type(v) for v in df[column] if v is not None and not (isinstance(v, float) and pd.isna(v))}
+        if len(types) > 1 or types & {list, dict}:
+            columns.append(column)
+    return columns
+
+
+def export_bundle(db: SupabaseDatabase, client_id: str, out_dir: str,
+                  tables=BUNDLE_TABLES, files=BUNDLE_FILES) -> Dict[str, Any]:
+    """Write client_id's tables and files to out_dir; returns the manifest"""
+    _require_parquet()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest: Dict[str, Any] = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'client_id': client_id,
+        'created_at': datetime.now().isoformat(),
+        'compression': BUNDLE_COMPRESSION,
+        'tables': {},
+        'files': {},
+    }
+    for table in tables:
+        try:
+            df = db.read_table(table, '*', {'client_id': client_id}, order_by=[('id', False)])
+        except Exception as e:
+            logger.warning(f"⚠️ Skipping {table}: {e}")
+            continue
+        json_columns = _json_columns(df)
+        for column in json_columns:
+            df[column] = df[column].map(lambda v: None if v is None or (isinstance(v, float) and pd.isna(v))
+                                        else json.dumps(v, default=str))
+        name = f"{table}.parquet"
+        df.to_parquet(os.path.join(out_dir, name), compression=BUNDLE_COMPRESSION, index=False)
+        manifest['tables'][table] = {
+            'file': name,
+            'rows': len(df),
+            'columns': list(df.columns),
+            'json_columns': json_columns,
+            'sha256': _sha256(os.path.join(out_dir, name)),
+        }
+        logger.info(f"📦 Exported {len(df)} {table} rows for {client_id}")
+    for path in files:
+        if not os.path.exists(path):
+            continue
+        name = os.path.join('files', path)
+        os.makedirs(os.path.dirname(os.path.join(out_dir, name)), exist_ok=True)
+        shutil.copyfile(path, os.path.join(out_dir, name))
+        manifest['files'][path] = {'file': name, 'sha256': _sha256(os.path.join(out_dir, name))}
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(bundle_dir: str, verify: bool = True) -> Dict[str, Any]:
+    """Load manifest.json, checking the format version and (optionally) every file's checksum"""
+    with open(os.path.join(bundle_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format {manifest.get('format_version')} "
+                         f"(expected {BUNDLE_FORMAT_VERSION})")
+    if verify:
+        for entry in list(manifest['tables'].values()) + list(manifest['files'].values()):
+            if _sha256(os.path.join(bundle_dir, entry['file'])) != entry['sha256']:
+                raise ValueError(f"Checksum mismatch for {entry['file']} in {bundle_dir}")
+    return manifest
+
+
+def load_table(bundle_dir: str, manifest: Dict[str, Any], table: str) -> List[Dict[str, Any]]:
+    """Rows of one bundled table, with JSON columns decoded and nulls turned back into None"""
+    entry = manifest['tables'][table]
+    # Nullable dtypes keep integer columns with gaps as ints rather than floats
+    df = pd.read_parquet(os.path.join(bundle_dir, entry['file']), dtype_backend='numpy_nullable')
+    df = df.astype(object).where(df.notna(), None)
+    rows = df.to_dict('records')
+    for row in rows:
+        for column in entry['json_columns']:
+            if isinstance(row.get(column), str):
+                row[column] = json.loads(row[column])
+    return rows
+
+
+def import_bundle(db: SupabaseDatabase, bundle_dir: str, client_id: Optional[str] = None,
+                  replace: bool = False, keep_ids: bool = False, chunk_size: int = IMPORT_CHUNK_SIZE,
+                  tables: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Bulk-insert a bundle's rows; returns rows written per table.
+    client_id loads the data under a different client; replace deletes that client's existing
+    rows first; keep_ids preserves the exported primary keys (safe on an empty local backend).
+    """
+    _require_parquet()
+    manifest = read_manifest(bundle_dir)
+    client_id = client_id or manifest['client_id']
+    written = {}
+    for table in tables or list(manifest['tables']):
+        rows = load_table(bundle_dir, manifest, table)
+        for row in rows:
+            row['client_id'] = client_id
+            if not keep_ids:
+                row.pop('id', None)
+        if replace:
+            db.supabase.table(table).delete().eq('client_id', client_id).execute()
+        for i in range(0, len(rows), chunk_size):
+            db.supabase.table(table).insert(rows[i:i + chunk_size]).execute()
+        db._snapshot_written(table, client_id, deleted=replace)
+        written[table] = len(rows)
+        logger.info(f"📥 Imported {len(rows)} {table} rows for {client_id}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a client's pipeline state as a Parquet bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Write a client's tables to a bundle directory")
+    export.add_argument("--client", required=True, help="client_id to export")
+    export.add_argument("--out", required=True, help="Bundle directory to create")
+    load = sub.add_parser("import", help="Load a bundle into the configured database (see VOC_DB_BACKEND)")
+    load.add_argument("bundle", help="Bundle directory")
+    load.add_argument("--client", help="Import under this client_id instead of the exported one")
+    load.add_argument("--replace", action="store_true", help="Delete the client's existing rows first")
+    load.add_argument("--keep-ids", action="store_true", help="Keep exported primary keys")
+    load.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows per insert request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SupabaseDatabase()
+    if args.command == "export":
+        manifest = export_bundle(db, args.client, args.out)
+        total = sum(t['rows'] for t in manifest['tables'].values())
+        print(f"✅ Exported {total} rows for {args.client} to {args.out}")
+    else:
+        written = import_bundle(db, args.bundle, client_id=args.client, replace=args.replace,
+                                keep_ids=args.keep_ids, chunk_size=args.chunk_size)
+        print(f"✅ Imported {sum(written.values())} rows from {args.bundle}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,7 +12,7 @@ load_dotenv()
 
 # Import RAG search utilities
 try:
-    from rag_search import pinecone_rag_search, build_rag_context
+    from rag_search import hybrid_rag_search, build_rag_context
     RAG_AVAILABLE = True
 except ImportError:
     RAG_AVAILABLE = False
@@ -376,8 +376,8 @@ def process_research_query(user_message: str, client_data: Dict[str, Any], clien
     rag_context = ""
     if RAG_AVAILABLE and client_id:
         try:
-            # Get relevant context from Pinecone
-            relevant_records = pinecone_rag_search(user_message, client_id, top_k=5)
+            # Get relevant context: BM25 over response text fused with Pinecone similarity
+            relevant_records = hybrid_rag_search(user_message, client_id, top_k=5)
             if relevant_records:
                 rag_context = build_rag_context(relevant_records)
                 st.sidebar.success(f"🔍 RAG: Found {len(relevant_records)} relevant records")
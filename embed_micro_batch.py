@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+"""
+Micro-Batching Embed Queue for the Realtime Webhook
+
+realtime_embed_webhook.py acknowledges each Supabase event at once and leaves embedding to
+MicroBatchQueue: a worker thread collects events and embeds and upserts them in batches. The
+embed, upsert and namespace callables are passed in, so the queue holds no API clients.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from embedding_utils import LEGACY_NAMESPACE
+
+# Micro-batching: flush when this many distinct records are pending or the oldest has waited this long
+EMBED_FLUSH_SIZE = int(os.getenv("EMBED_FLUSH_SIZE", "96"))
+EMBED_FLUSH_WINDOW_SECONDS = float(os.getenv("EMBED_FLUSH_WINDOW_SECONDS", "0.5"))
+EMBED_MAX_QUEUE = int(os.getenv("EMBED_MAX_QUEUE", "10000"))
+EMBED_FLUSH_RETRIES = 3
+
+
+# Utility: Build the Pinecone vector for a record
+def build_vector(record, embedding, record_type="finding"):
+    metadata = {
+        "type": record_type,
+        "client_id": record.get("client_id"),
+        "id": record.get("id"),
+        "finding_statement": record.get("finding_statement", ""),
+        "verbatim_response": record.get("verbatim_response", ""),
+        "theme_statement": record.get("theme_statement", "")
+    }
+    return {
+        "id": f"{record_type}-{record.get('id')}",
+        "values": embedding,
+        "metadata": metadata
+    }
+
+
+class MicroBatchQueue:
+    """
+    In-process queue of pending embed/upsert events, drained by one worker thread.
+    Events are keyed by vector id, so repeated changes to a record before a flush
+    collapse into its latest version. Each flush makes one embeddings request and
+    one vector upsert per embedding namespace in the batch (usually one), retried up
+    to max_retries times with backoff. embed_fn(texts, namespace) returns one vector
+    per text; upsert_fn(vectors, namespace) writes them. namespace_fn(client_id) is retried
+    the same way; events whose namespace cannot be resolved fail rather than being written to
+    a guessed namespace.
+    """
+
+    def __init__(self, embed_fn, upsert_fn, flush_size=EMBED_FLUSH_SIZE,
+                 flush_window=EMBED_FLUSH_WINDOW_SECONDS, max_queue=EMBED_MAX_QUEUE,
+                 max_retries=EMBED_FLUSH_RETRIES, namespace_fn=None, retry_backoff=1.0):
+        self.embed_fn = embed_fn
+        self.upsert_fn = upsert_fn
+        self.namespace_fn = namespace_fn or (lambda client_id: LEGACY_NAMESPACE)
+        self.flush_size = flush_size
+        self.flush_window = flush_window
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._pending = OrderedDict()  # vector_id -> (record, record_type, text, enqueued_at)
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._stats = {
+            "events_received": 0, "events_deduplicated": 0, "events_rejected": 0,
+            "flushes": 0, "flush_failures": 0, "vectors_upserted": 0, "vectors_failed": 0,
+            "last_flush_size": 0, "last_flush_latency_ms": 0.0, "max_flush_latency_ms": 0.0,
+            "total_flush_latency_ms": 0.0, "last_queue_wait_ms": 0.0,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="embed-micro-batch", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=30.0):
+        """Stop the worker after flushing everything still pending"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def put(self, record, record_type, text):
+        """Queue an event; returns False when the queue is full"""
+        vector_id = f"{record_type}-{record.get('id')}"
+        with self._cond:
+            self._stats["events_received"] += 1
+            if vector_id in self._pending:
+                # Keep the original enqueue time so a hot record cannot starve the window
+                enqueued_at = self._pending[vector_id][3]
+                self._pending[vector_id] = (record, record_type, text, enqueued_at)
+                self._stats["events_deduplicated"] += 1
+                return True
+            if len(self._pending) >= self.max_queue:
+                self._stats["events_rejected"] += 1
+                return False
+            self._pending[vector_id] = (record, record_type, text, time.monotonic())
+            # Wake the worker to start the window (first event) or flush early (batch full)
+            if len(self._pending) == 1 or len(self._pending) >= self.flush_size:
+                self._cond.notify_all()
+            return True
+
+    def _take_batch(self):
+        """Block until a batch is due (size, window or shutdown); None when stopped and drained"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    oldest = next(iter(self._pending.values()))[3]
+                    remaining = self.flush_window - (time.monotonic() - oldest)
+                    if self._stopping or len(self._pending) >= self.flush_size or remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                elif self._stopping:
+                    return None
+                else:
+                    self._cond.wait()
+            batch = []
+            while self._pending and len(batch) < self.flush_size:
+                batch.append(self._pending.popitem(last=False)[1])
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self.flush(batch)
+
+    def _flush_group(self, namespace, items):
+        for attempt in range(self.max_retries):
+            try:
+                embeddings = self.embed_fn([text for _, _, text, _ in items], namespace)
+                vectors = [build_vector(record, emb, record_type)
+                           for (record, record_type, _, _), emb in zip(items, embeddings)]
+                self.upsert_fn(vectors, namespace)
+                return True
+            except Exception as e:
+                logging.warning(f"Flush of {len(items)} events failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                if attempt < self.max_retries - 1:
+                    time.sleep(min(self.retry_backoff * 2 ** attempt, 10))
+        return False
+
+    def _namespace(self, client_id):
+        """client_id's embedding namespace, or None when the lookup keeps failing"""
+        for attempt in range(self.max_retries):
+            try:
+                return self.namespace_fn(client_id)
+            except Exception as e:
+                logging.warning(f"Namespace lookup for {client_id} failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                if attempt < self.max_retries - 1:
+                    time.sleep(min(self.retry_backoff * 2 ** attempt, 10))
+        return None
+
+    def flush(self, batch):
+        started = time.monotonic()
+        queue_wait_ms = max(started - item[3] for item in batch) * 1000.0
+        namespaces, groups, unresolved = {}, OrderedDict(), 0
+        for item in batch:
+            client_id = item[0].get("client_id")
+            if client_id not in namespaces:
+                namespaces[client_id] = self._namespace(client_id)
+            if namespaces[client_id] is None:
+                unresolved += 1
+                continue
+            groups.setdefault(namespaces[client_id], []).append(item)
+        failed = unresolved + sum(len(items) for namespace, items in groups.items()
+                                  if not self._flush_group(namespace, items))
+        ok = failed == 0
+        latency_ms = (time.monotonic() - started) * 1000.0
+        with self._cond:
+            s = self._stats
+            s["flushes"] += 1
+            s["last_flush_size"] = len(batch)
+            s["last_flush_latency_ms"] = latency_ms
+            s["max_flush_latency_ms"] = max(s["max_flush_latency_ms"], latency_ms)
+            s["total_flush_latency_ms"] += latency_ms
+            s["last_queue_wait_ms"] = queue_wait_ms
+            s["vectors_upserted"] += len(batch) - failed
+            if not ok:
+                s["flush_failures"] += 1
+                s["vectors_failed"] += failed
+        if ok:
+            logging.info(f"Upserted {len(batch)} vectors in {latency_ms:.0f} ms (waited {queue_wait_ms:.0f} ms).")
+        else:
+            logging.error(f"Dropping {failed} events after {self.max_retries} failed flush attempts.")
+        return ok
+
+    def metrics(self):
+        with self._cond:
+            m = dict(self._stats)
+            m["queue_depth"] = len(self._pending)
+            m["oldest_pending_ms"] = ((time.monotonic() - next(iter(self._pending.values()))[3]) * 1000.0
+                                      if self._pending else 0.0)
+        m["avg_flush_latency_ms"] = m.pop("total_flush_latency_ms") / m["flushes"] if m["flushes"] else 0.0
+        return m
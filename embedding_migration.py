@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+"""
+Embedding Namespace Migration for VOC Pipeline
+
+Re-embeds a client's corpus into a new model/dimension namespace without blocking the
+pipeline. A ReembedWorker walks the client's records in chunks under a token budget,
+skipping anything already present in the target namespace (so it can be paused and
+resumed), reports progress to the embedding_namespaces table, and switches the client's
+reads to the new namespace in one row update once a final catch-up pass finds nothing
+left to embed. The old namespace is left in place for rollback.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import batch_embed_and_upsert as beu
+from embedding_utils import (
+    NATIVE_DIMENSIONS, NamespaceRegistry, EmbeddingNamespaceMismatch,
+    embedding_namespace, parse_embedding_namespace,
+)
+
+logger = logging.getLogger(__name__)
+
+REEMBED_TOKENS_PER_MINUTE = int(os.getenv("REEMBED_TOKENS_PER_MINUTE", "300000"))
+REEMBED_CHUNK_SIZE = int(os.getenv("REEMBED_CHUNK_SIZE", "500"))
+REEMBED_CATCHUP_PASSES = 3
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    """Rough token count (~4 characters per token) used for rate budgeting"""
+    return sum(max(1, len(t) // 4) for t in texts)
+
+
+class RateBudget:
+    """Token bucket allowing tokens_per_minute on average, with bursts up to one minute's budget"""
+
+    def __init__(self, tokens_per_minute: int, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = float(tokens_per_minute)
+        self.available = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """Block until `tokens` fit in the budget; returns seconds waited"""
+        tokens = min(float(tokens), self.capacity)
+        waited = 0.0
+        with self._lock:
+            while True:
+                now = self._clock()
+                self.available = min(self.capacity, self.available + (now - self._last) * self.rate)
+                self._last = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return waited
+                delay = (tokens - self.available) / self.rate
+                self._sleep(delay)
+                waited += delay
+
+
+class ReembedWorker:
+    """
+    Background re-embedding of one client's vectors into target_namespace.
+
+    load_records(client_id) -> [(record_type, records)]; defaults to the Supabase sources
+    used by batch_embed_and_upsert. embed_fn(texts) defaults to the target namespace's model.
+    """
+
+    def __init__(self, client_id: str, target_namespace: str, registry: Optional[NamespaceRegistry] = None,
+                 index=None, load_records: Optional[Callable] = None, embed_fn: Optional[Callable] = None,
+                 tokens_per_minute: int = REEMBED_TOKENS_PER_MINUTE, chunk_size: int = REEMBED_CHUNK_SIZE,
+                 workers: int = 2):
+        parse_embedding_namespace(target_namespace)
+        self.client_id = client_id
+        self.target_namespace = target_namespace
+        self.registry = registry or NamespaceRegistry()
+        self._index = index
+        self._load_records = load_records or (lambda cid: beu.load_client_records(self.registry.db, cid))
+        self._embed_fn = embed_fn or (lambda texts: beu.embed_texts(texts, target_namespace))
+        self.budget = RateBudget(tokens_per_minute)
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self._counts = {"migrated": 0, "total": 0, "errors": 0}
+        self.status = "idle"
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = beu.get_index()
+        return self._index
+
+    def _embed(self, texts):
+        self.budget.acquire(estimate_tokens(texts))
+        return self._embed_fn(texts)
+
+    def _check_target(self):
+        state = self.registry.state(self.client_id, refresh=True)
+        if state["active_namespace"] == self.target_namespace:
+            raise ValueError(f"{self.client_id} already reads from {self.target_namespace!r}")
+        other = state["target_namespace"]
+        if state["status"] == "migrating" and other and other != self.target_namespace:
+            raise EmbeddingNamespaceMismatch(
+                f"{self.client_id} is already migrating to {other!r}; finish or reset it first")
+        _, dimension = parse_embedding_namespace(self.target_namespace)
+        try:
+            index_dimension = beu._field(self.index.describe_index_stats(), "dimension")
+        except Exception:
+            index_dimension = None
+        if index_dimension and int(index_dimension) != dimension:
+            raise EmbeddingNamespaceMismatch(
+                f"Index holds {index_dimension}-dimensional vectors; {self.target_namespace!r} needs {dimension}")
+
+    def _load_sources(self):
+        """[(record_type, records)]; a failed fetch (records None) stops the migration before reads switch"""
+        sources = self._load_records(self.client_id)
+        failed = [record_type for record_type, records in sources if records is None]
+        if failed:
+            raise RuntimeError(f"could not load {', '.join(failed)} records for {self.client_id}")
+        return sources
+
+    def _sync(self, sources, dry_run: bool = False) -> Dict[str, int]:
+        """Upsert (or plan) every chunk into the target namespace; returns summed stats"""
+        totals = {"add": 0, "update": 0, "unchanged": 0, "upserted": 0, "embed_errors": 0}
+        for record_type, records in sources:
+            for i in range(0, len(records), self.chunk_size):
+                if self._stop.is_set():
+                    return totals
+                stats = beu.upsert_records(records[i:i + self.chunk_size], record_type, self.client_id,
+                                           dry_run=dry_run, workers=self.workers, index=self.index,
+                                           embed_fn=self._embed, namespace=self.target_namespace)
+                for key in totals:
+                    totals[key] += stats.get(key, 0)
+                if not dry_run:
+                    self._counts["migrated"] += stats["unchanged"] + stats["upserted"]
+                    self._counts["errors"] += stats["add"] + stats["update"] - stats["upserted"]
+                    self.registry.update(self.client_id, migrated_count=self._counts["migrated"],
+                                         error_count=self._counts["errors"])
+        return totals
+
+    def run(self) -> str:
+        """Migrate, catch up on records changed meanwhile, then switch reads; returns the final status"""
+        self._check_target()
+        self._started = time.monotonic()
+        self.status = "migrating"
+        sources = self._load_sources()
+        self._counts = {"migrated": 0, "errors": 0,
+                        "total": sum(len(beu.prepare_records(r, t, self.client_id)) for t, r in sources)}
+        self.registry.update(self.client_id, target_namespace=self.target_namespace, status="migrating",
+                             migrated_count=0, total_count=self._counts["total"], error_count=0,
+                             started_at=datetime.now().isoformat(), completed_at=None)
+        logger.info(f"🔄 Re-embedding {self._counts['total']} records for {self.client_id} into {self.target_namespace}")
+
+        for _ in range(REEMBED_CATCHUP_PASSES):
+            self._sync(sources)
+            if self._stop.is_set():
+                return self._finish("paused")
+            if self._counts["errors"]:
+                return self._finish("failed")
+            # Records written since the pass started are caught by their content hash
+            sources = self._load_sources()
+            pending = self._sync(sources, dry_run=True)
+            if pending["add"] + pending["update"] == 0:
+                self.registry.update(self.client_id, active_namespace=self.target_namespace,
+                                     target_namespace=None, status="active",
+                                     completed_at=datetime.now().isoformat())
+                self.status = "active"
+                logger.info(f"✅ {self.client_id} now reads from {self.target_namespace}")
+                return self.status
+            self._counts = {"migrated": 0, "errors": 0, "total": pending["add"] + pending["update"] + pending["unchanged"]}
+        return self._finish("failed")
+
+    def _finish(self, status: str) -> str:
+        self.status = status
+        self.registry.update(self.client_id, status=status)
+        logger.warning(f"⚠️ Re-embedding {self.client_id} into {self.target_namespace} {status}")
+        return status
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run_logged, name=f"reembed-{self.client_id}", daemon=True)
+            self._thread.start()
+
+    def _run_logged(self):
+        try:
+            self.run()
+        except Exception as e:
+            logger.error(f"❌ Re-embedding {self.client_id} failed: {e}")
+            self._finish("failed")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Pause after the current chunk; a later run resumes by skipping already-migrated records"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def progress(self) -> Dict:
+        migrated, total = self._counts["migrated"], self._counts["total"]
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        rate = migrated / elapsed if elapsed > 0 else 0.0
+        return {
+            "client_id": self.client_id,
+            "target_namespace": self.target_namespace,
+            "status": self.status,
+            "migrated": migrated,
+            "total": total,
+            "errors": self._counts["errors"],
+            "percent": round(100.0 * migrated / total, 1) if total else 100.0,
+            "eta_seconds": round((total - migrated) / rate) if rate > 0 else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed a client's vectors into a new model/dimension namespace")
+    parser.add_argument("--client", required=True, help="client_id to migrate")
+    parser.add_argument("--model", help="Target embedding model (e.g. text-embedding-3-small)")
+    parser.add_argument("--dimension", type=int, help="Target dimension (default: the model's native size)")
+    parser.add_argument("--tokens-per-minute", type=int, default=REEMBED_TOKENS_PER_MINUTE,
+                        help=f"Embedding token budget (default: {REEMBED_TOKENS_PER_MINUTE})")
+    parser.add_argument("--status", action="store_true", help="Show the client's namespace state and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    registry = NamespaceRegistry()
+    if args.status or not args.model:
+        state = registry.state(args.client, refresh=True)
+        print(f"📊 {args.client}: reads from {state['active_namespace'] or 'default (legacy)'}")
+        if state["target_namespace"]:
+            print(f"   {state['status']} → {state['target_namespace']}: "
+                  f"{state['migrated_count']}/{state['total_count']} migrated, {state['error_count']} errors")
+        return 0
+
+    dimension = args.dimension or NATIVE_DIMENSIONS.get(args.model)
+    if not dimension:
+        parser.error(f"--dimension is required for {args.model}")
+    worker = ReembedWorker(args.client, embedding_namespace(args.model, dimension), registry=registry,
+                           tokens_per_minute=args.tokens_per_minute)
+    worker.start()
+    try:
+        while worker.is_alive():
+            time.sleep(10)
+            p = worker.progress()
+            eta = f", ~{p['eta_seconds']}s left" if p["eta_seconds"] is not None else ""
+            print(f"  {p['migrated']}/{p['total']} ({p['percent']}%){eta}")
+    except KeyboardInterrupt:
+        print("\n⏸️ Pausing after the current chunk (re-run to resume)...")
+        worker.stop()
+    print(f"Final status: {worker.status}")
+    return 0 if worker.status == "active" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
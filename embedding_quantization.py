@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+"""
+Embedding Quantization for VOC Pipeline
+
+Compact in-memory / on-disk representations of embedding matrices:
+- float16: half the bytes of float32, near-lossless for cosine ranking
+- int8: per-vector scaled codes, a quarter of the bytes
+- optional PCA reduction before quantization (e.g. 1536 -> 256 dims)
+
+Approximate scores are used to shortlist candidates; search() can exact-rerank
+the shortlist against full-precision vectors.
+"""
+
+import os
+import hashlib
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ('float32', 'float16', 'int8')
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+class QuantizedMatrix:
+    """Row-normalized embedding matrix stored as float32, float16 or per-vector-scaled int8"""
+
+    def __init__(self, codes: np.ndarray, mode: str, scales: Optional[np.ndarray] = None,
+                 pca_mean: Optional[np.ndarray] = None, pca_components: Optional[np.ndarray] = None):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode '{mode}', expected one of {QUANTIZATION_MODES}")
+        self.codes = codes
+        self.mode = mode
+        self.scales = scales
+        self.pca_mean = pca_mean
+        self.pca_components = pca_components
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray, mode: str = 'float16', pca_dim: Optional[int] = None,
+                    pca_sample: int = 20000, seed: int = 0) -> 'QuantizedMatrix':
+        """Normalize, optionally PCA-reduce (fitted on up to pca_sample rows), then quantize"""
+        unit = _normalize_rows(matrix)
+        pca_mean = pca_components = None
+        if pca_dim and unit.shape[0] and pca_dim < unit.shape[1]:
+            rng = np.random.default_rng(seed)
+            sample = unit if unit.shape[0] <= pca_sample else unit[rng.choice(unit.shape[0], pca_sample, replace=False)]
+            pca_mean = sample.mean(axis=0)
+            _, _, vt = np.linalg.svd(sample - pca_mean, full_matrices=False)
+            pca_components = vt[:pca_dim].astype(np.float32)
+            unit = _normalize_rows((unit - pca_mean) @ pca_components.T)
+        codes, scales = cls._encode(unit, mode)
+        return cls(codes, mode, scales, pca_mean, pca_components)
+
+    @classmethod
+    def from_embeddings(cls, embeddings: List[Optional[List[float]]], mode: str = 'float16',
+                        pca_dim: Optional[int] = None) -> 'QuantizedMatrix':
+        """Build from a list of embeddings; None entries become zero rows (score 0)"""
+        from embedding_utils import embeddings_to_matrix
+        return cls.from_matrix(embeddings_to_matrix(embeddings), mode=mode, pca_dim=pca_dim)
+
+    @classmethod
+    def from_embedding_batches(cls, batches: Iterable[List[Optional[List[float]]]], dimension: int,
+                               mode: str = 'float16') -> 'QuantizedMatrix':
+        """
+        Build from embeddings arriving in batches, quantizing each batch as it comes so only one
+        batch is ever held at full precision. None entries become zero rows; no PCA.
+        """
+        from embedding_utils import embeddings_to_matrix
+        parts = [cls._encode(embeddings_to_matrix(batch, dimension), mode) for batch in batches]
+        parts = parts or [cls._encode(np.zeros((0, dimension), dtype=np.float32), mode)]
+        scales = np.concatenate([s for _, s in parts]) if mode == 'int8' else None
+        return cls(np.concatenate([c for c, _ in parts]), mode, scales)
+
+    @staticmethod
+    def _encode(unit: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if mode == 'float32':
+            return unit.astype(np.float32), None
+        if mode == 'float16':
+            return unit.astype(np.float16), None
+        scales = np.abs(unit).max(axis=1) / 127.0
+        safe = np.where(scales > 0, scales, 1.0)
+        codes = np.clip(np.rint(unit / safe[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        total = self.codes.nbytes
+        for extra in (self.scales, self.pca_mean, self.pca_components):
+            if extra is not None:
+                total += extra.nbytes
+        return total
+
+    def project_query(self, query: Union[List[float], np.ndarray]) -> np.ndarray:
+        """Normalize a query (or a batch of queries) into this matrix's space"""
+        q = _normalize_rows(np.atleast_2d(np.asarray(query, dtype=np.float32)))
+        if self.pca_components is not None:
+            q = _normalize_rows((q - self.pca_mean) @ self.pca_components.T)
+        return q
+
+    def decode(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Float32 reconstruction of the stored (possibly PCA-reduced) rows, or of just `rows`"""
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.mode == 'int8':
+            scales = self.scales if rows is None else self.scales[rows]
+            return codes.astype(np.float32) * scales[:, None]
+        return codes.astype(np.float32)
+
+    def scores(self, query: Union[List[float], np.ndarray], block_size: int = 8192) -> np.ndarray:
+        """Approximate cosine of every row against one query (1-D) or a batch of queries (2-D)"""
+        q = np.atleast_2d(np.asarray(query, dtype=np.float32))
+        if self.codes.shape[1] == 0:
+            # No stored vectors had embeddings (all rows zero)
+            out = np.zeros((q.shape[0], len(self)), dtype=np.float32)
+            return out[0] if np.ndim(query) == 1 else out
+        q = self.project_query(q)
+        out = np.empty((q.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), block_size):
+            block = self.codes[start:start + block_size].astype(np.float32)
+            sims = q @ block.T
+            if self.mode == 'int8':
+                sims *= self.scales[start:start + block_size]
+            out[:, start:start + block_size] = sims
+        return out[0] if np.ndim(query) == 1 else out
+
+    def search(self, query: Union[List[float], np.ndarray], top_k: int = 10, rerank: int = 4,
+               exact: Optional[Union[np.ndarray, Callable[[np.ndarray], np.ndarray]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (indices, scores) for one query. The top rerank*top_k approximate candidates
+        are re-scored exactly when `exact` is given: either the full-precision matrix or a
+        callable mapping candidate indices to their full-precision vectors.
+        """
+        approx = self.scores(np.asarray(query, dtype=np.float32).ravel())
+        n_cand = min(len(approx), max(top_k, top_k * rerank if exact is not None else top_k))
+        if n_cand == 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=np.float32)
+        cand = np.argpartition(-approx, n_cand - 1)[:n_cand]
+        cand_scores = approx[cand]
+        if exact is not None:
+            vecs = exact(cand) if callable(exact) else np.asarray(exact)[cand]
+            cand_scores = _normalize_rows(vecs) @ _normalize_rows(np.atleast_2d(query))[0]
+        order = np.argsort(-cand_scores, kind='stable')[:top_k]
+        return cand[order], cand_scores[order]
+
+    def save(self, path: str, **extra_arrays):
+        arrays = {'codes': self.codes, 'mode': np.array(self.mode)}
+        for name in ('scales', 'pca_mean', 'pca_components'):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        arrays.update(extra_arrays)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple['QuantizedMatrix', Dict[str, np.ndarray]]:
+        """Load a saved matrix; returns (matrix, any extra arrays saved alongside it)"""
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files}
+        qm = cls(arrays.pop('codes'), str(arrays.pop('mode')), arrays.pop('scales', None),
+                 arrays.pop('pca_mean', None), arrays.pop('pca_components', None))
+        return qm, arrays
+
+
+class EmbeddingCache:
+    """
+    Local on-disk embedding cache keyed by (model, text), stored quantized in a single .npz.
+    PCA is not applied here: cached vectors must stay comparable across runs.
+    """
+
+    def __init__(self, cache_dir: str, model: str, mode: str = 'float16'):
+        self.mode = mode if mode in ('float16', 'int8') else 'float16'
+        self.path = os.path.join(cache_dir, f"{model}.{self.mode}.npz")
+        self.model = model
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._dirty = False
+        if os.path.exists(self.path):
+            try:
+                qm, extra = QuantizedMatrix.load(self.path)
+                decoded = qm.decode()
+                self._vectors = {str(k): decoded[i] for i, k in enumerate(extra.get('keys', []))}
+            except Exception as e:
+                logger.warning(f"⚠️ Ignoring unreadable embedding cache {self.path}: {e}")
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model}\x00{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        return [self._vectors.get(self.key(t)) for t in texts]
+
+    def put_many(self, texts: List[str], embeddings: List[Optional[List[float]]]):
+        for t, e in zip(texts, embeddings):
+            if e is not None:
+                self._vectors[self.key(t)] = _normalize_rows(np.atleast_2d(e))[0]
+                self._dirty = True
+
+    def save(self):
+        if not self._dirty or not self._vectors:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        keys = list(self._vectors.keys())
+        qm = QuantizedMatrix.from_matrix(np.stack([self._vectors[k] for k in keys]), mode=self.mode)
+        qm.save(self.path, keys=np.array(keys))
+        self._dirty = False
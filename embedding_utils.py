@@ -8,9 +8,11 @@ functions for all stages of the VOC pipeline.
 """
 
 import os
+import time
 import logging
+import threading
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 import openai
 from supabase_database import SupabaseDatabase
 import pandas as pd
@@ -22,17 +24,129 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Embedding model/dimension for new vectors. Stored vectors are namespaced by both, so a
+# model change is a migration (see embedding_migration.py), not an in-place overwrite.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+NATIVE_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", NATIVE_DIMENSIONS.get(EMBEDDING_MODEL, 1536)))
+
+# Vectors written before namespacing live in the index's default namespace
+LEGACY_NAMESPACE = ""
+LEGACY_MODEL = "text-embedding-ada-002"
+LEGACY_DIMENSION = 1536
+EMBEDDING_NAMESPACE_TTL_SECONDS = float(os.getenv("EMBEDDING_NAMESPACE_TTL_SECONDS", "30"))
+
+
+class EmbeddingNamespaceMismatch(ValueError):
+    """Raised when a vector or query would mix embeddings from different model/dimension namespaces"""
+
+
+def embedding_namespace(model: str, dimension: int) -> str:
+    """Vector-store namespace for a model/dimension pair, e.g. 'text-embedding-3-large@1536'"""
+    return f"{model}@{int(dimension)}"
+
+
+def parse_embedding_namespace(namespace: str) -> Tuple[str, int]:
+    if namespace == LEGACY_NAMESPACE:
+        return LEGACY_MODEL, LEGACY_DIMENSION
+    model, _, dimension = namespace.rpartition("@")
+    if not model or not dimension.isdigit():
+        raise ValueError(f"Not an embedding namespace: {namespace!r}")
+    return model, int(dimension)
+
+
+def embedding_request_kwargs(model: str, dimension: int) -> Dict:
+    """Extra embeddings.create kwargs; text-embedding-3 models can be shortened to `dimension`"""
+    if model.startswith("text-embedding-3") and dimension != NATIVE_DIMENSIONS.get(model):
+        return {"dimensions": int(dimension)}
+    if dimension != NATIVE_DIMENSIONS.get(model, dimension):
+        raise ValueError(f"{model} only produces {NATIVE_DIMENSIONS[model]}-dimensional embeddings")
+    return {}
+
+
+def check_namespace_vector(namespace: str, vector) -> None:
+    """Mixed-namespace guard: a vector must have its namespace's dimension"""
+    _, dimension = parse_embedding_namespace(namespace)
+    if vector is not None and len(vector) != dimension:
+        raise EmbeddingNamespaceMismatch(
+            f"{len(vector)}-dimensional vector cannot be used with namespace {namespace!r} ({dimension} dims)")
+
+
+class NamespaceRegistry:
+    """
+    Which embedding namespace each client reads from, stored in the embedding_namespaces table.
+    A row holds the active namespace plus an optional in-progress migration target; switching
+    reads is a single row update, and resolve() always returns a consistent
+    (namespace, model, dimension) triple. Lookups are cached for EMBEDDING_NAMESPACE_TTL_SECONDS;
+    a failed lookup raises and is not cached.
+    """
+
+    def __init__(self, db=None, ttl_seconds: float = EMBEDDING_NAMESPACE_TTL_SECONDS):
+        self._db = db
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[str, Tuple[float, Dict]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = SupabaseDatabase()
+        return self._db
+
+    def state(self, client_id: str, refresh: bool = False) -> Dict:
+        with self._lock:
+            cached = self._cache.get(client_id)
+            if cached and not refresh and time.monotonic() - cached[0] < self.ttl_seconds:
+                return dict(cached[1])
+        # Raises on lookup failure, before anything is cached; only a missing row means the legacy namespace
+        row = self.db.get_embedding_namespace(client_id) or {}
+        state = {
+            "client_id": client_id,
+            "active_namespace": row.get("active_namespace") or LEGACY_NAMESPACE,
+            "target_namespace": row.get("target_namespace"),
+            "status": row.get("status") or "active",
+            "migrated_count": row.get("migrated_count") or 0,
+            "total_count": row.get("total_count") or 0,
+            "error_count": row.get("error_count") or 0,
+            "started_at": row.get("started_at"),
+            "completed_at": row.get("completed_at"),
+        }
+        with self._lock:
+            self._cache[client_id] = (time.monotonic(), state)
+        return dict(state)
+
+    def resolve(self, client_id: str) -> Dict:
+        """Namespace, model and dimension that reads and writes for this client must use"""
+        namespace = self.state(client_id)["active_namespace"]
+        model, dimension = parse_embedding_namespace(namespace)
+        return {"namespace": namespace, "model": model, "dimension": dimension}
+
+    def update(self, client_id: str, **fields) -> bool:
+        row = {"client_id": client_id, **fields}
+        ok = self.db.upsert_embedding_namespace(row)
+        with self._lock:
+            self._cache.pop(client_id, None)
+        return ok
+
+
 class EmbeddingManager:
     """Manages embedding generation and vector operations for the VOC pipeline"""
     
-    def __init__(self):
+    def __init__(self, model: Optional[str] = None, dimension: Optional[int] = None):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise RuntimeError("OPENAI_API_KEY not set in environment")
         
         self.db = SupabaseDatabase()
-        self.model = "text-embedding-ada-002"
-        self.dimension = 1536
+        self.model = model or EMBEDDING_MODEL
+        self.dimension = int(dimension or (EMBEDDING_DIMENSION if self.model == EMBEDDING_MODEL
+                                           else NATIVE_DIMENSIONS.get(self.model, EMBEDDING_DIMENSION)))
+        self.namespace = embedding_namespace(self.model, self.dimension)
+        self._request_kwargs = embedding_request_kwargs(self.model, self.dimension)
         
     def get_embedding(self, text: str) -> List[float]:
         """Get OpenAI embedding for a given text"""
@@ -43,7 +157,8 @@ class EmbeddingManager:
             client = openai.OpenAI(api_key=self.api_key)
             response = client.embeddings.create(
                 input=text.strip(),
-                model=self.model
+                model=self.model,
+                **self._request_kwargs
             )
             return response.data[0].embedding
         except Exception as e:
@@ -53,24 +168,28 @@ class EmbeddingManager:
     def get_embeddings_batch(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
         """Get embeddings for a batch of texts"""
         embeddings = []
-        
+        for batch_embeddings in self.iter_embedding_batches(texts, batch_size):
+            embeddings.extend(batch_embeddings)
+        return embeddings
+
+    def iter_embedding_batches(self, texts: List[str], batch_size: int = 100) -> Iterator[List[List[float]]]:
+        """Yield the embeddings of each batch_size slice of texts as it is fetched (None for a failed batch)"""
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i + batch_size]
             try:
                 client = openai.OpenAI(api_key=self.api_key)
                 response = client.embeddings.create(
                     input=batch,
-                    model=self.model
+                    model=self.model,
+                    **self._request_kwargs
                 )
                 batch_embeddings = [item.embedding for item in response.data]
-                embeddings.extend(batch_embeddings)
                 logger.info(f"Generated embeddings for batch {i//batch_size + 1}")
             except Exception as e:
                 logger.error(f"Failed to generate embeddings for batch {i//batch_size + 1}: {e}")
                 # Add None for failed embeddings
-                embeddings.extend([None] * len(batch))
-        
-        return embeddings
+                batch_embeddings = [None] * len(batch)
+            yield batch_embeddings
     
     def calculate_cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors"""
@@ -104,12 +223,50 @@ class EmbeddingManager:
                 similar_indices.append(i)
         
         return similar_indices
-    
+
+    def get_embedding_matrix(self, texts: List[str], batch_size: int = 100) -> Tuple[np.ndarray, Dict[str, int]]:
+        """
+        Embed each distinct text once and return a row-normalized matrix plus a text -> row index map.
+        When EMBEDDING_CACHE_DIR is set, vectors are read from / written to a local quantized cache
+        (EMBEDDING_CACHE_DTYPE: float16 or int8) so repeated runs only embed new texts.
+        """
+        unique_texts = list(dict.fromkeys(str(t) for t in texts))
+        cache = None
+        cache_dir = os.getenv("EMBEDDING_CACHE_DIR")
+        if cache_dir:
+            from embedding_quantization import EmbeddingCache
+            cache = EmbeddingCache(cache_dir, self.namespace, mode=os.getenv("EMBEDDING_CACHE_DTYPE", "float16"))
+        embeddings = cache.get_many(unique_texts) if cache else [None] * len(unique_texts)
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            fresh = self.get_embeddings_batch([unique_texts[i] for i in missing], batch_size=batch_size)
+            for i, emb in zip(missing, fresh):
+                embeddings[i] = emb
+            if cache:
+                cache.put_many([unique_texts[i] for i in missing], fresh)
+                cache.save()
+        matrix = embeddings_to_matrix(embeddings, dimension=self.dimension)
+        return matrix, {text: idx for idx, text in enumerate(unique_texts)}
+
+    def _column_namespace_error(self) -> Optional[Dict]:
+        """Supabase `embedding` columns hold legacy-namespace vectors only; refuse to mix others in"""
+        legacy = embedding_namespace(LEGACY_MODEL, LEGACY_DIMENSION)
+        if self.namespace == legacy:
+            return None
+        message = (f"embedding columns are {legacy}; {self.namespace} vectors go to the vector store "
+                   f"via embedding_migration")
+        logger.error(f"❌ {message}")
+        return {"status": "error", "message": message, "updated": 0, "errors": 0}
+
     def update_core_response_embeddings(self, client_id: str = 'default', 
                                        batch_size: int = 50) -> Dict:
         """Update embeddings for all stage1_data_responses for a client"""
         logger.info(f"🔄 Updating core response embeddings for client {client_id}")
         
+        mismatch = self._column_namespace_error()
+        if mismatch:
+            return mismatch
+        
         try:
             # Get all core responses without embeddings
             response = self.db.supabase.table('stage1_data_responses').select(
@@ -176,6 +333,10 @@ class EmbeddingManager:
         """Update embeddings for stage2_response_labeling relevance_explanation field"""
         logger.info(f"🔄 Updating quote analysis embeddings for client {client_id}")
         
+        mismatch = self._column_namespace_error()
+        if mismatch:
+            return mismatch
+        
         try:
             # Get all quote analysis without embeddings
             response = self.db.supabase.table('stage2_response_labeling').select(
@@ -242,6 +403,10 @@ class EmbeddingManager:
         """Update embeddings for scorecard themes"""
         logger.info(f"🔄 Updating scorecard theme embeddings for client {client_id}")
         
+        mismatch = self._column_namespace_error()
+        if mismatch:
+            return mismatch
+        
         try:
             # Get all scorecard themes without embeddings
             response = self.db.supabase.table('scorecard_themes').select(
@@ -330,6 +495,49 @@ class EmbeddingManager:
             "total_errors": total_errors
         }
 
+def embeddings_to_matrix(embeddings: List[Optional[List[float]]], dimension: Optional[int] = None) -> np.ndarray:
+    """Stack embeddings into an L2-normalized float32 matrix; missing vectors become zero rows (similarity 0)"""
+    if dimension is None:
+        dimension = next((len(e) for e in embeddings if e is not None), 0)
+    matrix = np.zeros((len(embeddings), dimension), dtype=np.float32)
+    for i, emb in enumerate(embeddings):
+        if emb is not None and len(emb) == dimension:
+            matrix[i] = emb
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+def iter_similarity_pairs_above(matrix: np.ndarray, threshold: float, block_size: int = 2048,
+                                pair_mask=None):
+    """
+    Yield (i, j, score) arrays, one row block at a time, for every upper-triangle
+    pair (i < j) of a normalized matrix whose cosine similarity is >= threshold.
+
+    Only a block_size x n slice of the similarity matrix is materialized at once,
+    and every pair anchored on row i is contained in the block holding row i.
+    pair_mask(rows, cols) may return an extra boolean mask for the block
+    (e.g. "different subject"). Pairs come back in row-major order.
+    """
+    n = matrix.shape[0]
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        sims = matrix[start:stop] @ matrix[start:].T
+        rows = np.arange(start, stop)
+        cols = np.arange(start, n)
+        mask = (cols[None, :] > rows[:, None]) & (sims >= threshold)
+        if pair_mask is not None:
+            mask &= pair_mask(rows, cols)
+        bi, bj = np.nonzero(mask)
+        yield rows[bi], cols[bj], sims[bi, bj]
+
+def similarity_pairs_above(matrix: np.ndarray, threshold: float, block_size: int = 2048,
+                           pair_mask=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Collect iter_similarity_pairs_above into flat (i, j, score) arrays"""
+    blocks = list(iter_similarity_pairs_above(matrix, threshold, block_size=block_size, pair_mask=pair_mask))
+    if not blocks:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0, dtype=np.float32)
+    return tuple(np.concatenate(parts) for parts in zip(*blocks))
+
 def run_embedding_backfill(client_id: str = 'default'):
     """Run complete embedding backfill for a client"""
     manager = EmbeddingManager()
@@ -15,12 +15,143 @@ from typing import List, Dict, Any, Optional
 import time
 import threading
 
+from stage2_batch_planner import BatchPlanner, count_tokens, llm_request_slots
+from stage2_input_hashes import HASH_COLUMNS, content_hash, criteria_hash, plan_rescore, prompt_hash
+from quote_prescore import STAGE2_PRESCORE_CASCADE, TIER_LLM, TIER_STAGE1_FILTER, PreScoreCascade
+
 load_dotenv()
 
 # Thread-safe progress tracking for Stage 2
 stage2_progress_lock = threading.Lock()
 stage2_progress_data = {"completed_batches": 0, "total_batches": 0, "results": [], "errors": []}
 
+# Batched Stage 2 prompt (SupabaseStage2Analyzer): system instructions and the user-message header
+STAGE2_BATCH_SYSTEM_PROMPT = """You are an expert competitive intelligence analyst specializing in B2B SaaS customer feedback analysis. Your task is to analyze customer quotes and map them to executive criteria with precise sentiment analysis.
+
+CRITICAL INSTRUCTIONS:
+- Respond with ONLY valid JSON array. No additional text, explanations, or markdown.
+- Each quote must be analyzed against ALL 10 criteria, not just top 1-3.
+- Provide detailed sentiment analysis for each criterion mentioned.
+- Use specific sentiment indicators to determine positive/negative/neutral/mixed.
+
+SENTIMENT ANALYSIS FRAMEWORK:
+POSITIVE INDICATORS: love, excellent, amazing, solved, improved, saved, great, perfect, outstanding, exceeded, delighted, satisfied, works perfectly, highly recommend, game-changer, efficient, fast, reliable, user-friendly, intuitive
+
+NEGATIVE INDICATORS: hate, terrible, broken, failed, frustrated, problem, awful, disappointing, waste, slow, unreliable, difficult, confusing, expensive, overpriced, buggy, crashes, doesn't work, poor quality, terrible support
+
+MIXED INDICATORS: but, however, although, despite, even though, on the other hand, while, yet, nevertheless, still, though
+
+NEUTRAL INDICATORS: factual statements, descriptions, process explanations, feature lists, technical specifications
+
+RELEVANCE SCORING (0-5):
+- 0: Not mentioned at all
+- 1: Slight mention, passing reference
+- 2: Clear mention, some detail
+- 3: Strong emphasis, detailed discussion
+- 4: Critical feedback, major focus
+- 5: Exceptional emphasis, central to the conversation
+
+CRITERIA IDENTIFICATION EXAMPLES:
+- "accuracy", "quality", "features", "functionality" → product_capability
+- "setup", "implementation", "onboarding", "deployment" → implementation_onboarding
+- "integration", "API", "technical", "compatibility" → integration_technical_fit
+- "support", "help", "service", "response" → support_service_quality
+- "security", "compliance", "data protection" → security_compliance
+- "reputation", "brand", "trust", "references" → market_position_reputation
+- "stability", "vendor", "company", "long-term" → vendor_stability
+- "sales", "buying", "relationship", "partnership" → sales_experience_partnership
+- "price", "cost", "pricing", "ROI", "expensive" → commercial_terms
+- "speed", "fast", "quick", "time", "efficiency" → speed_responsiveness
+
+SENTIMENT ASSIGNMENT RULES:
+- Analyze each criterion independently for sentiment
+- Look for specific sentiment words and phrases
+- Consider context and tone of the feedback
+- A high relevance score (4-5) with positive sentiment = strong positive feedback
+- A high relevance score (4-5) with negative sentiment = strong negative feedback
+- Mixed sentiment when quote contains both positive and negative elements about the same criterion
+
+THE 10 EXECUTIVE CRITERIA:
+1. product_capability: Functionality, features, performance, core solution fit, accuracy, quality
+2. implementation_onboarding: Deployment ease, time-to-value, setup complexity, training
+3. integration_technical_fit: APIs, data compatibility, technical architecture, integration
+4. support_service_quality: Post-sale support, responsiveness, expertise, SLAs, customer service
+5. security_compliance: Data protection, certifications, governance, risk management, security
+6. market_position_reputation: Brand trust, references, analyst recognition, reputation
+7. vendor_stability: Financial health, roadmap clarity, long-term viability, company stability
+8. sales_experience_partnership: Buying process quality, relationship building
+9. commercial_terms: Price, contract flexibility, ROI, total cost of ownership, pricing
+10. speed_responsiveness: Implementation timeline, decision-making speed, agility, efficiency
+
+OUTPUT FORMAT (JSON array only):
+[
+  {{
+    "quote_id": "string",
+    "relevance_scores": {{
+      "product_capability": 0-5,
+      "implementation_onboarding": 0-5,
+      "integration_technical_fit": 0-5,
+      "support_service_quality": 0-5,
+      "security_compliance": 0-5,
+      "market_position_reputation": 0-5,
+      "vendor_stability": 0-5,
+      "sales_experience_partnership": 0-5,
+      "commercial_terms": 0-5,
+      "speed_responsiveness": 0-5
+    }},
+    "criterion_sentiments": {{
+      "product_capability": "positive|negative|neutral|mixed",
+      "implementation_onboarding": "positive|negative|neutral|mixed",
+      "integration_technical_fit": "positive|negative|neutral|mixed",
+      "support_service_quality": "positive|negative|neutral|mixed",
+      "security_compliance": "positive|negative|neutral|mixed",
+      "market_position_reputation": "positive|negative|neutral|mixed",
+      "vendor_stability": "positive|negative|neutral|mixed",
+      "sales_experience_partnership": "positive|negative|neutral|mixed",
+      "commercial_terms": "positive|negative|neutral|mixed",
+      "speed_responsiveness": "positive|negative|neutral|mixed"
+    }},
+    "overall_sentiment": "positive|negative|neutral|mixed",
+    "primary_criterion": "criterion_name",
+    "secondary_criterion": "criterion_name|null",
+    "tertiary_criterion": "criterion_name|null",
+    "priority": "critical|high|medium|low",
+    "confidence": "high|medium|low",
+    "explanation": "brief explanation of analysis"
+  }}
+]
+
+IMPORTANT: Only include criteria with relevance scores > 0 in criterion_sentiments. For criteria with relevance score 0, omit from criterion_sentiments."""
+
+STAGE2_BATCH_MODEL = "gpt-4o-mini"
+
+STAGE2_BATCH_HEADER = """Analyze the following customer quotes for relevance to 10 executive criteria. For each quote, provide a JSON response with:
+
+1. Relevance scores (0-5) for each criterion where 0=not mentioned, 1=slight mention, 2=clear mention, 3=strong emphasis, 4=critical feedback, 5=exceptional praise
+2. Sentiment (positive/negative/neutral/mixed)
+3. Priority level (critical/high/medium/low)
+4. Confidence level (high/medium/low)
+5. Brief explanation of relevance
+
+The 10 executive criteria are:
+1. product_capability: Functionality, features, performance, core solution fit
+2. implementation_onboarding: Deployment ease, time-to-value, setup complexity
+3. integration_technical_fit: APIs, data compatibility, technical architecture
+4. support_service_quality: Post-sale support, responsiveness, expertise, SLAs
+5. security_compliance: Data protection, certifications, governance, risk management
+6. market_position_reputation: Brand trust, references, analyst recognition
+7. vendor_stability: Financial health, roadmap clarity, long-term viability
+8. sales_experience_partnership: Buying process quality, relationship building
+9. commercial_terms: Price, contract flexibility, ROI, total cost of ownership
+10. speed_responsiveness: Implementation timeline, decision-making speed, agility
+
+Respond with a JSON array where each element has: quote_id, relevance_scores (object with criterion names as keys), sentiment, priority, confidence, explanation.
+
+Quotes:\n"""
+
+# Recorded on every label; changing the prompt or model marks existing labels for re-scoring
+STAGE2_PROMPT_HASH = prompt_hash(STAGE2_BATCH_SYSTEM_PROMPT, STAGE2_BATCH_HEADER, STAGE2_BATCH_MODEL)
+
 class EnhancedTraceableStage2Analyzer:
     def __init__(self):
         self.llm = OpenAI(
@@ -1017,77 +1148,119 @@ if __name__ == "__main__":
 class SupabaseStage2Analyzer:
     """Supabase-integrated Stage 2 analyzer with parallel batched processing"""
     
-    def __init__(self, batch_size=50, max_workers=4):  # Optimized parallel processing
+    def __init__(self, batch_size=50, max_workers=4, prescore_cascade=None):  # Optimized parallel processing
         self.batch_size = batch_size
         self.max_workers = max_workers  # Increased from 2 to 4 for better performance
         self.supabase = None
+        # Cheap tiers that label low-value quotes without the LLM (off unless STAGE2_PRESCORE_CASCADE=true)
+        self.prescore_cascade = prescore_cascade or (PreScoreCascade() if STAGE2_PRESCORE_CASCADE else None)
+        self._record_decided_by = False
+        # Input hashes of the current run (None when the hash columns are not deployed)
+        self.input_hashes = None
+        self._content_hashes = {}
+        self._relabel_ids = set()
         try:
             from supabase_database import SupabaseDatabase
             self.supabase = SupabaseDatabase()
         except ImportError:
             print("Warning: Supabase database not available")
     
-    def process_incremental(self, client_id="default"):
-        """Process quotes from database for Stage 2 analysis with parallel batch processing"""
+    def process_incremental(self, client_id="default", dry_run=False, rescore_unhashed=False):
+        """
+        Process quotes from database for Stage 2 analysis with parallel batch processing.
+        Only quotes that are new, or whose text, criteria config or prompt changed since they
+        were labelled, are scored; dry_run reports that delta without calling the LLM.
+        rescore_unhashed also re-scores labels written before input hashes were recorded.
+        With a pre-score cascade, low-value quotes are labelled irrelevant without the LLM.
+        """
         if not self.supabase:
             raise Exception("Supabase database not available")
         
         # Get quotes from database
-        quotes_df = self.supabase.get_stage1_data_responses(client_id=client_id)
+        quotes_df = self.supabase.get_stage1_data_responses(client_id=client_id, columns='text')
         if quotes_df.empty:
             print("No quotes found for analysis")
             return {"success": False, "message": "No quotes found"}
         
-        print(f"Processing {len(quotes_df)} quotes in batches of {self.batch_size} with {self.max_workers} workers...")
+        quotes_df, delta = self._plan_quotes_to_score(quotes_df, client_id, rescore_unhashed)
+        if delta is not None:
+            print(f"🧮 Stage 2 delta for {client_id}: {len(quotes_df)} to score — "
+                  + ", ".join(f"{count} {reason.replace('_', ' ')}" for reason, count in delta.items()))
+        
+        prescored = quotes_df.iloc[0:0]
+        if self.prescore_cascade is not None and not quotes_df.empty:
+            quotes_df, prescored = self.prescore_cascade.split(quotes_df)
+            by_filter = int((prescored['prescore_tier'] == TIER_STAGE1_FILTER).sum())
+            print(f"🪜 Pre-score cascade: {len(prescored)} low-value quotes decided without the LLM "
+                  f"({by_filter} by the Stage 1 filter, {len(prescored) - by_filter} by heuristic score), "
+                  f"{len(quotes_df)} sent to the LLM")
+        if dry_run:
+            return {"success": True, "dry_run": True, "quotes_to_score": len(quotes_df),
+                    "prescored_quotes": len(prescored), "delta": delta}
+        if self.prescore_cascade is not None:
+            self._record_decided_by = self.supabase.has_columns('stage2_response_labeling', ['decided_by'])
+        unsaved = 0
+        if not prescored.empty:
+            with self.supabase.buffered_writes() as buffer:
+                self._save_batch_results_to_database(
+                    [self._create_prescore_result(row) for row in prescored.to_dict('records')], client_id)
+            unsaved += self._report_unsaved(buffer)
+        if quotes_df.empty:
+            print("All quotes are up to date; nothing to score")
+            return {"success": unsaved == 0, "processed_quotes": 0, "analyzed_quotes": 0, "success_rate": 0,
+                    "prescored_quotes": len(prescored), "unsaved_quotes": unsaved, "delta": delta}
+        
+        # Pack quotes into token-budgeted batches; batch_size caps quotes per request
+        quotes_df = quotes_df.reset_index(drop=True)
+        planner = BatchPlanner(self._prompt_overhead_tokens(), max_quotes=self.batch_size)
+        planner.add((idx, count_tokens(self._format_quote_for_llm(idx, row))) for idx, row in quotes_df.iterrows())
+        
+        print(f"Processing {len(quotes_df)} quotes in ~{planner.plan_size()} token-budgeted batches "
+              f"(up to {planner.max_quotes} quotes each) with {self.max_workers} workers...")
         
         # Reset progress data
         global stage2_progress_data
         with stage2_progress_lock:
             stage2_progress_data = {
                 "completed_batches": 0,
-                "total_batches": (len(quotes_df) + self.batch_size - 1) // self.batch_size,
+                "total_batches": planner.plan_size(),
                 "results": [],
                 "errors": []
             }
         
-        # Create batches
-        batches = []
-        for i in range(0, len(quotes_df), self.batch_size):
-            batch = quotes_df.iloc[i:i + self.batch_size]
-            batch_num = i // self.batch_size + 1
-            batches.append((batch_num, batch, client_id))
-        
-        # Process batches in parallel
-        total_processed = 0
-        total_analyzed = 0
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all batch processing tasks
-            future_to_batch = {
-                executor.submit(self._process_batch_parallel, batch_info): batch_info 
-                for batch_info in batches
-            }
-            
-            # Monitor progress and collect results
-            for future in concurrent.futures.as_completed(future_to_batch):
-                batch_info = future_to_batch[future]
-                batch_num = batch_info[0]
-                
+        # Workers pull batches until the planner runs dry (failed batches come back smaller)
+        totals = {"processed": 0, "analyzed": 0, "batches": 0}
+        totals_lock = threading.Lock()
+        
+        def worker():
+            while True:
+                batch_index = planner.next_batch()
+                if not batch_index:
+                    return
+                with totals_lock:
+                    totals["batches"] += 1
+                    batch_num = totals["batches"]
                 try:
-                    batch_result = future.result()
-                    total_processed += batch_result.get('batch_size', 0)
-                    total_analyzed += batch_result.get('analyzed_count', 0)
-                    
-                    print(f"✅ Batch {batch_num} completed: {batch_result.get('analyzed_count', 0)}/{batch_result.get('batch_size', 0)} quotes analyzed")
-                    
-                except Exception as e:
-                    print(f"❌ Error processing batch {batch_num}: {e}")
-                    with stage2_progress_lock:
-                        stage2_progress_data["errors"].append({
-                            'batch_num': batch_num,
-                            'error': str(e)
-                        })
+                    batch_result = self._process_batch_parallel((batch_num, quotes_df.loc[batch_index], client_id),
+                                                                planner=planner)
+                finally:
+                    planner.done()
+                if batch_result.get('requeued'):
+                    print(f"↩️ Batch {batch_num} ({len(batch_index)} quotes) could not be parsed; "
+                          f"retrying with at most {planner.quote_cap} quotes per batch")
                     continue
+                with totals_lock:
+                    totals["processed"] += batch_result.get('batch_size', 0)
+                    totals["analyzed"] += batch_result.get('analyzed_count', 0)
+                print(f"✅ Batch {batch_num} completed: {batch_result.get('analyzed_count', 0)}/{batch_result.get('batch_size', 0)} quotes analyzed")
+        
+        # Labels are written behind in bulk; the buffer's final flush runs as the block exits
+        with self.supabase.buffered_writes() as buffer:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for future in [executor.submit(worker) for _ in range(self.max_workers)]:
+                    future.result()
+        unsaved += self._report_unsaved(buffer)
+        total_processed, total_analyzed = totals["processed"], totals["analyzed"]
         
         print(f"\n🎉 Stage 2 analysis completed!")
         print(f"📊 Total quotes processed: {total_processed}")
@@ -1098,25 +1271,65 @@ class SupabaseStage2Analyzer:
             print(f"📈 Success rate: 0.0% (no quotes processed)")
         
         return {
-            "success": True,
+            "success": unsaved == 0,
             "processed_quotes": total_processed,
             "analyzed_quotes": total_analyzed,
-            "success_rate": total_analyzed/total_processed if total_processed > 0 else 0
+            "success_rate": total_analyzed/total_processed if total_processed > 0 else 0,
+            "prescored_quotes": len(prescored),
+            "unsaved_quotes": unsaved,
+            "delta": delta
         }
 
-    def _process_batch_parallel(self, batch_info: tuple) -> Dict:
-        """Process a batch of quotes through the LLM (thread-safe version)"""
+    def _report_unsaved(self, buffer):
+        """Labels the write-behind buffer could not write, once its final flush has run"""
+        if not buffer.failed:
+            return 0
+        quote_ids = sorted({str(row.get('quote_id')) for _, row, _ in buffer.failed})
+        print(f"❌ {len(buffer.failed)} Stage 2 labels were not saved ({len(quote_ids)} quotes, re-scored on the "
+              f"next run): {', '.join(quote_ids[:10])}{' ...' if len(quote_ids) > 10 else ''}")
+        print(f"   Last error: {buffer.failed[-1][2]}")
+        return len(buffer.failed)
+
+    def _plan_quotes_to_score(self, quotes_df, client_id, rescore_unhashed=False):
+        """Quotes whose Stage 2 inputs changed, and the delta summary (None without hash columns)"""
+        self.input_hashes, self._content_hashes, self._relabel_ids = None, {}, set()
+        if not self.supabase.has_columns('stage2_response_labeling', list(HASH_COLUMNS)):
+            print("⚠️ Stage 2 input hash columns missing (run add_stage2_input_hashes_migration.sql); scoring all quotes")
+            return quotes_df, None
+        
+        labels_df = self.supabase.get_stage2_response_labeling(client_id, columns=['quote_id', *HASH_COLUMNS])
+        self.input_hashes = {'criteria_hash': criteria_hash(), 'prompt_hash': STAGE2_PROMPT_HASH}
+        rescore, delta = plan_rescore(quotes_df, labels_df, self.input_hashes['criteria_hash'],
+                                      self.input_hashes['prompt_hash'], rescore_unhashed=rescore_unhashed)
+        quotes_df = quotes_df[quotes_df['response_id'].isin(rescore)]
+        self._content_hashes = {r: content_hash(t) for r, t in zip(quotes_df['response_id'], quotes_df['verbatim_response'])}
+        labelled = set(labels_df['quote_id']) if not labels_df.empty else set()
+        self._relabel_ids = {r for r in rescore if r in labelled}
+        return quotes_df, delta
+
+    def _process_batch_parallel(self, batch_info: tuple, planner: Optional[BatchPlanner] = None) -> Dict:
+        """
+        Process a batch of quotes through the LLM (thread-safe version). With a planner, a
+        response that cannot be parsed is reported back and the batch requeued, unless it is
+        a single quote, which gets the default result as before.
+        """
         batch_num, batch_df, client_id = batch_info
         
         try:
-            # Reduced delay to speed up processing
-            time.sleep(0.1)  # Reduced from 0.5 to 0.1 seconds
-            
             # Prepare batch data for LLM
             batch_text = self._prepare_batch_for_llm(batch_df)
 
-            # Call LLM with batch
-            llm_response = self._call_llm_batch(batch_text)
+            # Call LLM with batch, within the shared request budget
+            max_tokens = planner.output_budget(len(batch_df)) if planner else 3000
+            with llm_request_slots:
+                llm_response = self._call_llm_batch(batch_text, max_tokens=max_tokens)
+
+            if planner is not None:
+                parsed_ok = self._batch_response_complete(llm_response, batch_df)
+                planner.record(len(batch_df), parsed_ok)
+                if not parsed_ok and len(batch_df) > 1:
+                    planner.requeue(list(batch_df.index))
+                    return {"analyzed_count": 0, "batch_size": len(batch_df), "requeued": True}
             results = self._parse_llm_batch_response(llm_response, batch_df)
 
             # Save results to database
@@ -1170,162 +1383,61 @@ class SupabaseStage2Analyzer:
 
     def _prepare_batch_for_llm(self, batch_df):
         """Helper to prepare batch text for LLM, including headers and criteria"""
-        batch_text = """Analyze the following customer quotes for relevance to 10 executive criteria. For each quote, provide a JSON response with:
-
-1. Relevance scores (0-5) for each criterion where 0=not mentioned, 1=slight mention, 2=clear mention, 3=strong emphasis, 4=critical feedback, 5=exceptional praise
-2. Sentiment (positive/negative/neutral/mixed)
-3. Priority level (critical/high/medium/low)
-4. Confidence level (high/medium/low)
-5. Brief explanation of relevance
-
-The 10 executive criteria are:
-1. product_capability: Functionality, features, performance, core solution fit
-2. implementation_onboarding: Deployment ease, time-to-value, setup complexity
-3. integration_technical_fit: APIs, data compatibility, technical architecture
-4. support_service_quality: Post-sale support, responsiveness, expertise, SLAs
-5. security_compliance: Data protection, certifications, governance, risk management
-6. market_position_reputation: Brand trust, references, analyst recognition
-7. vendor_stability: Financial health, roadmap clarity, long-term viability
-8. sales_experience_partnership: Buying process quality, relationship building
-9. commercial_terms: Price, contract flexibility, ROI, total cost of ownership
-10. speed_responsiveness: Implementation timeline, decision-making speed, agility
-
-Respond with a JSON array where each element has: quote_id, relevance_scores (object with criterion names as keys), sentiment, priority, confidence, explanation.
-
-Quotes:\n"""
+        batch_text = STAGE2_BATCH_HEADER
         
         for idx, row in batch_df.iterrows():
-            quote_id = row['response_id'] if 'response_id' in row else f'quote_{idx}'
-            quote_text = row['verbatim_response'] if 'verbatim_response' in row else ''
-            customer_name = row['interviewee_name'] if 'interviewee_name' in row else 'Unknown'
-            deal_status = row['deal_status'] if 'deal_status' in row else 'Unknown'
-            
-            # Truncate long quotes to improve processing speed
-            if len(quote_text) > 1000:
-                quote_text = quote_text[:1000] + "... [truncated]"
-            
-            batch_text += f"Quote ID: {quote_id}\n"
-            batch_text += f"Customer: {customer_name}\n"
-            batch_text += f"Deal Status: {deal_status}\n"
-            batch_text += f"Text: {quote_text}\n\n"
+            # Quotes are sent whole; the batch planner keeps long ones within the token budget
+            batch_text += self._format_quote_for_llm(idx, row)
         
         return batch_text
     
-    def _call_llm_batch(self, batch_text):
+    def _format_quote_for_llm(self, idx, row):
+        """One quote's block in the batch prompt"""
+        quote_id = row['response_id'] if 'response_id' in row else f'quote_{idx}'
+        quote_text = row['verbatim_response'] if 'verbatim_response' in row else ''
+        customer_name = row['interviewee_name'] if 'interviewee_name' in row else 'Unknown'
+        deal_status = row['deal_status'] if 'deal_status' in row else 'Unknown'
+        return (f"Quote ID: {quote_id}\n"
+                f"Customer: {customer_name}\n"
+                f"Deal Status: {deal_status}\n"
+                f"Text: {quote_text}\n\n")
+    
+    def _prompt_overhead_tokens(self):
+        """Tokens every batch request spends before its quotes"""
+        return count_tokens(STAGE2_BATCH_SYSTEM_PROMPT) + count_tokens(STAGE2_BATCH_HEADER)
+    
+    def _call_llm_batch(self, batch_text, max_tokens=3000):
         """Call LLM with batched quotes - Enhanced version with better parsing and sentiment analysis"""
         from langchain_openai import ChatOpenAI
         from langchain.prompts import ChatPromptTemplate
         
         llm = ChatOpenAI(
-            model_name="gpt-4o-mini",
+            model_name=STAGE2_BATCH_MODEL,
             openai_api_key=os.getenv("OPENAI_API_KEY"),
-            max_tokens=3000,  # Increased for better response quality
+            max_tokens=max_tokens,
             temperature=0.1
         )
         
         prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert competitive intelligence analyst specializing in B2B SaaS customer feedback analysis. Your task is to analyze customer quotes and map them to executive criteria with precise sentiment analysis.
-
-CRITICAL INSTRUCTIONS:
-- Respond with ONLY valid JSON array. No additional text, explanations, or markdown.
-- Each quote must be analyzed against ALL 10 criteria, not just top 1-3.
-- Provide detailed sentiment analysis for each criterion mentioned.
-- Use specific sentiment indicators to determine positive/negative/neutral/mixed.
-
-SENTIMENT ANALYSIS FRAMEWORK:
-POSITIVE INDICATORS: love, excellent, amazing, solved, improved, saved, great, perfect, outstanding, exceeded, delighted, satisfied, works perfectly, highly recommend, game-changer, efficient, fast, reliable, user-friendly, intuitive
-
-NEGATIVE INDICATORS: hate, terrible, broken, failed, frustrated, problem, awful, disappointing, waste, slow, unreliable, difficult, confusing, expensive, overpriced, buggy, crashes, doesn't work, poor quality, terrible support
-
-MIXED INDICATORS: but, however, although, despite, even though, on the other hand, while, yet, nevertheless, still, though
-
-NEUTRAL INDICATORS: factual statements, descriptions, process explanations, feature lists, technical specifications
-
-RELEVANCE SCORING (0-5):
-- 0: Not mentioned at all
-- 1: Slight mention, passing reference
-- 2: Clear mention, some detail
-- 3: Strong emphasis, detailed discussion
-- 4: Critical feedback, major focus
-- 5: Exceptional emphasis, central to the conversation
-
-CRITERIA IDENTIFICATION EXAMPLES:
-- "accuracy", "quality", "features", "functionality" → product_capability
-- "setup", "implementation", "onboarding", "deployment" → implementation_onboarding
-- "integration", "API", "technical", "compatibility" → integration_technical_fit
-- "support", "help", "service", "response" → support_service_quality
-- "security", "compliance", "data protection" → security_compliance
-- "reputation", "brand", "trust", "references" → market_position_reputation
-- "stability", "vendor", "company", "long-term" → vendor_stability
-- "sales", "buying", "relationship", "partnership" → sales_experience_partnership
-- "price", "cost", "pricing", "ROI", "expensive" → commercial_terms
-- "speed", "fast", "quick", "time", "efficiency" → speed_responsiveness
-
-SENTIMENT ASSIGNMENT RULES:
-- Analyze each criterion independently for sentiment
-- Look for specific sentiment words and phrases
-- Consider context and tone of the feedback
-- A high relevance score (4-5) with positive sentiment = strong positive feedback
-- A high relevance score (4-5) with negative sentiment = strong negative feedback
-- Mixed sentiment when quote contains both positive and negative elements about the same criterion
-
-THE 10 EXECUTIVE CRITERIA:
-1. product_capability: Functionality, features, performance, core solution fit, accuracy, quality
-2. implementation_onboarding: Deployment ease, time-to-value, setup complexity, training
-3. integration_technical_fit: APIs, data compatibility, technical architecture, integration
-4. support_service_quality: Post-sale support, responsiveness, expertise, SLAs, customer service
-5. security_compliance: Data protection, certifications, governance, risk management, security
-6. market_position_reputation: Brand trust, references, analyst recognition, reputation
-7. vendor_stability: Financial health, roadmap clarity, long-term viability, company stability
-8. sales_experience_partnership: Buying process quality, relationship building
-9. commercial_terms: Price, contract flexibility, ROI, total cost of ownership, pricing
-10. speed_responsiveness: Implementation timeline, decision-making speed, agility, efficiency
-
-OUTPUT FORMAT (JSON array only):
-[
-  {{
-    "quote_id": "string",
-    "relevance_scores": {{
-      "product_capability": 0-5,
-      "implementation_onboarding": 0-5,
-      "integration_technical_fit": 0-5,
-      "support_service_quality": 0-5,
-      "security_compliance": 0-5,
-      "market_position_reputation": 0-5,
-      "vendor_stability": 0-5,
-      "sales_experience_partnership": 0-5,
-      "commercial_terms": 0-5,
-      "speed_responsiveness": 0-5
-    }},
-    "criterion_sentiments": {{
-      "product_capability": "positive|negative|neutral|mixed",
-      "implementation_onboarding": "positive|negative|neutral|mixed",
-      "integration_technical_fit": "positive|negative|neutral|mixed",
-      "support_service_quality": "positive|negative|neutral|mixed",
-      "security_compliance": "positive|negative|neutral|mixed",
-      "market_position_reputation": "positive|negative|neutral|mixed",
-      "vendor_stability": "positive|negative|neutral|mixed",
-      "sales_experience_partnership": "positive|negative|neutral|mixed",
-      "commercial_terms": "positive|negative|neutral|mixed",
-      "speed_responsiveness": "positive|negative|neutral|mixed"
-    }},
-    "overall_sentiment": "positive|negative|neutral|mixed",
-    "primary_criterion": "criterion_name",
-    "secondary_criterion": "criterion_name|null",
-    "tertiary_criterion": "criterion_name|null",
-    "priority": "critical|high|medium|low",
-    "confidence": "high|medium|low",
-    "explanation": "brief explanation of analysis"
-  }}
-]
-
-IMPORTANT: Only include criteria with relevance scores > 0 in criterion_sentiments. For criteria with relevance score 0, omit from criterion_sentiments."""),
-            ("user", batch_text)
+            ("system", STAGE2_BATCH_SYSTEM_PROMPT),
+            ("user", "{batch_text}")
         ])
         
-        response = llm.invoke(prompt.format_messages())
+        response = llm.invoke(prompt.format_messages(batch_text=batch_text))
         return response.content
     
+    def _batch_response_complete(self, llm_response, batch_df):
+        """True when the response parses as JSON and covers every quote in the batch"""
+        try:
+            parsed = json.loads(self._clean_llm_response(llm_response))
+        except (json.JSONDecodeError, TypeError):
+            return False
+        parsed = parsed if isinstance(parsed, list) else [parsed]
+        returned = {str(r.get('quote_id')) for r in parsed if isinstance(r, dict)}
+        expected = {str(row['response_id']) if 'response_id' in row else f'quote_{idx}'
+                    for idx, row in batch_df.iterrows()}
+        return expected <= returned
+    
     def _parse_llm_batch_response(self, llm_response, batch_df):
         """Parse LLM response for batch of quotes - Enhanced version with multi-criteria support"""
         results = []
@@ -1537,6 +1649,16 @@ IMPORTANT: Only include criteria with relevance scores > 0 in criterion_sentimen
             'explanation': explanation
         }
     
+    def _create_prescore_result(self, row):
+        """Zero-relevance result for a quote the pre-score cascade decided without the LLM"""
+        result = self._create_enhanced_default_result(
+            row['response_id'], f"Pre-score cascade ({row['prescore_tier']}): low-value quote, "
+                                f"heuristic score {row['prescore']:g}")
+        result['relevance_scores'] = {criterion: 0 for criterion in result['relevance_scores']}
+        result['criterion_sentiments'] = {}
+        result.update(priority='low', confidence='high', decided_by=row['prescore_tier'], prescore=row['prescore'])
+        return result
+    
     def _save_batch_results_to_database(self, results, client_id):
         """Save batch results to database - Enhanced version with multi-criteria support"""
         if not self.supabase:
@@ -1544,6 +1666,11 @@ IMPORTANT: Only include criteria with relevance scores > 0 in criterion_sentimen
         
         print(f"[DEBUG] Saving enhanced batch results: {len(results)} records")
         
+        # Re-scored quotes replace their previous labels
+        stale = [r.get('quote_id') for r in results if isinstance(r, dict) and r.get('quote_id') in self._relabel_ids]
+        if stale:
+            self.supabase.delete_stage2_response_labeling(client_id, stale)
+        
         for idx, result in enumerate(results):
             if not isinstance(result, dict):
                 print(f"[ERROR] Skipping non-dict result: {result}")
@@ -1566,6 +1693,8 @@ IMPORTANT: Only include criteria with relevance scores > 0 in criterion_sentimen
                 'explanation': result.get('explanation', ''),
                 'priority': result.get('priority', 'medium'),
                 'confidence': result.get('confidence', 'medium'),
+                'decided_by': result.get('decided_by', TIER_LLM),
+                'prescore': result.get('prescore'),
                 'analysis_version': 'enhanced_multi_criteria_v2'
             }
             
@@ -1598,6 +1727,10 @@ IMPORTANT: Only include criteria with relevance scores > 0 in criterion_sentimen
                 'client_id': client_id,
                 'analysis_timestamp': datetime.now().isoformat()
             }
+            if self.input_hashes is not None:
+                db_record.update(self.input_hashes, content_hash=self._content_hashes.get(quote_id))
+            if self._record_decided_by:
+                db_record['decided_by'] = result.get('decided_by', TIER_LLM)
             
             try:
                 self.supabase.save_stage2_response_labeling(db_record)
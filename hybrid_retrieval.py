@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+"""
+Hybrid Retrieval for VOC Pipeline
+
+Local BM25 inverted index over response text, fused with vector-search scores.
+Exact product, competitor and SKU-like terms are matched lexically by BM25 while
+the vector side keeps semantic recall; the two rankings are combined with
+reciprocal-rank fusion (default) or weighted min-max score fusion.
+"""
+
+import re
+import math
+import time
+import logging
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'did', 'do', 'does', 'for', 'from', 'had', 'has',
+    'have', 'how', 'i', 'in', 'is', 'it', 'its', 'of', 'on', 'or', 'our', 'so', 'that', 'the', 'their', 'them',
+    'they', 'this', 'to', 'was', 'we', 'were', 'what', 'when', 'which', 'who', 'why', 'with', 'you', 'your'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; compound terms like 'xps-200' or 'v2.1' are kept whole and also split"""
+    tokens = []
+    for tok in _TOKEN_RE.findall(str(text or '').lower()):
+        if tok in _STOPWORDS:
+            continue
+        tokens.append(tok)
+        if not tok.isalnum():
+            tokens.extend(p for p in re.split(r"[-_./]", tok) if p and p not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory corpus with per-document metadata for filtering"""
+
+    def __init__(self, doc_ids: Sequence, texts: Sequence[str], metadata: Optional[pd.DataFrame] = None,
+                 k1: float = 1.2, b: float = 0.75):
+        self.doc_ids = list(doc_ids)
+        self.k1 = k1
+        self.b = b
+        self.metadata = metadata.reset_index(drop=True) if metadata is not None else pd.DataFrame(index=range(len(self.doc_ids)))
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for i, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                postings[term].append((i, tf))
+        self.doc_lengths = lengths
+        self.avg_len = float(lengths.mean()) if len(lengths) else 0.0
+        n = len(self.doc_ids)
+        self._postings = {}
+        for term, plist in postings.items():
+            docs = np.fromiter((d for d, _ in plist), dtype=np.int64, count=len(plist))
+            tfs = np.fromiter((t for _, t in plist), dtype=np.float32, count=len(plist))
+            idf = math.log(1.0 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            self._postings[term] = (docs, tfs, idf)
+        self._position = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def filter_mask(self, filters: Optional[Dict] = None) -> Optional[np.ndarray]:
+        """Boolean mask of documents whose metadata matches every filter (scalar equality or list membership)"""
+        if not filters:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for column, wanted in filters.items():
+            if column not in self.metadata.columns:
+                return np.zeros(len(self), dtype=bool)
+            values = self.metadata[column]
+            if isinstance(wanted, (list, tuple, set)):
+                mask &= values.isin(list(wanted)).to_numpy()
+            else:
+                mask &= (values == wanted).to_numpy()
+        return mask
+
+    def scores(self, query: str, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        if not len(self):
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_len, 1e-9))
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            docs, tfs, idf = self._postings[term]
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+        if mask is not None:
+            scores[~mask] = 0.0
+        return scores
+
+    def search(self, query: str, top_k: int = 50, filters: Optional[Dict] = None) -> List[Tuple[object, float]]:
+        """[(doc_id, bm25 score)] best first; documents with no query term are not returned"""
+        s = self.scores(query, self.filter_mask(filters))
+        hits = np.flatnonzero(s > 0)
+        if hits.size == 0:
+            return []
+        top = hits[np.argsort(-s[hits], kind='stable')[:top_k]]
+        return [(self.doc_ids[i], float(s[i])) for i in top]
+
+    def position(self, doc_id) -> Optional[int]:
+        return self._position.get(doc_id)
+
+    def document_metadata(self, doc_id) -> Dict:
+        pos = self._position.get(doc_id)
+        return {} if pos is None else self.metadata.iloc[pos].to_dict()
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[Tuple[object, float]]], k: int = 60,
+                           weights: Optional[Dict[str, float]] = None) -> List[Tuple[object, float]]:
+    """Fuse ranked lists by sum(weight / (k + rank)); ties keep first-seen order"""
+    fused: Dict[object, float] = {}
+    for name, ranked in rankings.items():
+        w = (weights or {}).get(name, 1.0)
+        for rank, (doc_id, _) in enumerate(ranked, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + w / (k + rank)
+    return sorted(fused.items(), key=lambda kv: -kv[1])
+
+
+def weighted_score_fusion(rankings: Dict[str, List[Tuple[object, float]]],
+                          weights: Optional[Dict[str, float]] = None) -> List[Tuple[object, float]]:
+    """Fuse by weighted sum of per-list min-max normalized scores (missing = 0)"""
+    fused: Dict[object, float] = {}
+    for name, ranked in rankings.items():
+        if not ranked:
+            continue
+        w = (weights or {}).get(name, 1.0)
+        vals = np.array([s for _, s in ranked], dtype=np.float64)
+        lo, hi = vals.min(), vals.max()
+        span = hi - lo
+        for (doc_id, _), v in zip(ranked, vals):
+            norm = (v - lo) / span if span > 0 else 1.0
+            fused[doc_id] = fused.get(doc_id, 0.0) + w * norm
+    return sorted(fused.items(), key=lambda kv: -kv[1])
+
+
+def doc_key(record_type, record_id) -> str:
+    """
+    Canonical '<type>:<id>' key shared by BM25 documents and vector hits. record_id is the
+    stage table's id column, which is what the embedders store as vector metadata; Pinecone
+    returns numeric metadata as floats, so 123.0 and 123 give the same key.
+    """
+    if isinstance(record_id, float) and record_id.is_integer():
+        record_id = int(record_id)
+    return f"{record_type}:{record_id}"
+
+
+def _metadata_matches(meta: Dict, filters: Dict) -> bool:
+    for column, wanted in filters.items():
+        if column not in meta:
+            return False
+        if isinstance(wanted, (list, tuple, set)):
+            if meta[column] not in wanted:
+                return False
+        elif meta[column] != wanted:
+            return False
+    return True
+
+
+def rank_vector_matches(matches: Sequence[Dict], bm25: BM25Index, filters: Optional[Dict] = None,
+                        vector_meta: Optional[Dict] = None) -> List[Tuple[str, float]]:
+    """
+    Pinecone-style matches -> [(doc_key, score)] keyed like the BM25 index. Metadata filters are
+    checked against the BM25 document when the hit is indexed there, else against the match's
+    own metadata. vector_meta collects each kept hit's metadata by key.
+    """
+    allowed = bm25.filter_mask(filters) if filters else None
+    ranked = []
+    for match in matches:
+        meta = match["metadata"] or {}
+        key = doc_key(meta.get("type", "response"), meta.get("record_id", meta.get("id")))
+        if filters:
+            pos = bm25.position(key)
+            if not (allowed[pos] if pos is not None else _metadata_matches(meta, filters)):
+                continue
+        if vector_meta is not None:
+            vector_meta.setdefault(key, meta)
+        ranked.append((key, float(match["score"])))
+    return ranked
+
+
+class HybridRetriever:
+    """
+    BM25 + vector retrieval with fusion.
+
+    vector_search_fn(query, top_k, filters) must return [(doc_id, similarity)] best first;
+    doc ids must match the BM25 index ids. Each side contributes candidate_k candidates.
+    """
+
+    def __init__(self, bm25: BM25Index, vector_search_fn: Optional[Callable] = None,
+                 fusion: str = 'rrf', weights: Optional[Dict[str, float]] = None,
+                 candidate_k: int = 50, rrf_k: int = 60):
+        if fusion not in ('rrf', 'weighted'):
+            raise ValueError("fusion must be 'rrf' or 'weighted'")
+        self.bm25 = bm25
+        self.vector_search_fn = vector_search_fn
+        self.fusion = fusion
+        self.weights = weights or {'bm25': 1.0, 'vector': 1.0}
+        self.candidate_k = candidate_k
+        self.rrf_k = rrf_k
+        self.last_timings: Dict[str, float] = {}
+
+    def search(self, query: str, top_k: int = 5, filters: Optional[Dict] = None) -> List[Tuple[object, float]]:
+        t0 = time.perf_counter()
+        rankings = {'bm25': self.bm25.search(query, top_k=self.candidate_k, filters=filters)}
+        t1 = time.perf_counter()
+        if self.vector_search_fn is not None:
+            try:
+                rankings['vector'] = list(self.vector_search_fn(query, self.candidate_k, filters))
+            except Exception as e:
+                logger.warning(f"⚠️ Vector search failed, using BM25 only: {e}")
+        t2 = time.perf_counter()
+        if self.fusion == 'rrf':
+            fused = reciprocal_rank_fusion(rankings, k=self.rrf_k, weights=self.weights)
+        else:
+            fused = weighted_score_fusion(rankings, weights=self.weights)
+        self.last_timings = {'bm25_ms': 1000 * (t1 - t0), 'vector_ms': 1000 * (t2 - t1),
+                             'fusion_ms': 1000 * (time.perf_counter() - t2)}
+        return fused[:top_k]
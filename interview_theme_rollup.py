@@ -3,6 +3,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import List, Dict, Any, Tuple
+import numpy as np
 import pandas as pd
 import re
 
@@ -71,36 +72,95 @@ def _jaccard(a: set, b: set) -> float:
 	return inter / union if union else 0.0
 
 
-def _cluster_by_threshold(embeddings: List[List[float]], tokens: List[set], threshold: float, min_token_overlap: float) -> List[int]:
+class CentroidClusterer:
+	"""Greedy threshold clustering over a NumPy centroid matrix.
+
+	Each item is scored against every centroid with one matrix product; the best
+	centroid clearing both the cosine threshold and the token-overlap gate wins,
+	otherwise the item opens a new cluster. Centroids are updated in place with
+	the same pairwise average the original list-based loop used, so assignments
+	are unchanged. With batch_size > 1, a block of items is scored against the
+	centroid snapshot at once and only centroids touched inside the block are
+	re-scored per item, which keeps the result identical to batch_size=1.
+	"""
+
+	def __init__(self, threshold: float, min_token_overlap: float, dimension: int, batch_size: int = 256, capacity: int = 64):
+		self.threshold = threshold
+		self.min_token_overlap = min_token_overlap
+		self.batch_size = max(1, batch_size)
+		self._raw = np.zeros((capacity, dimension), dtype=np.float64)
+		self._unit = np.zeros((capacity, dimension), dtype=np.float64)
+		self._tokens: List[set] = []
+		self.size = 0
+
+	@property
+	def centroids(self) -> np.ndarray:
+		return self._raw[:self.size]
+
+	def _set_centroid(self, idx: int, vec: np.ndarray):
+		self._raw[idx] = vec
+		norm = np.linalg.norm(vec)
+		self._unit[idx] = vec / norm if norm > 0 else 0.0
+
+	def _add_centroid(self, vec: np.ndarray, tokens: set) -> int:
+		if self.size == self._raw.shape[0]:
+			self._raw = np.concatenate([self._raw, np.zeros_like(self._raw)])
+			self._unit = np.concatenate([self._unit, np.zeros_like(self._unit)])
+		self._set_centroid(self.size, vec)
+		self._tokens.append(set(tokens))
+		self.size += 1
+		return self.size - 1
+
+	def _pick(self, sims: np.ndarray, tokens: set) -> int:
+		# Highest cosine first; stable sort keeps the lowest index on ties like the original strict '>'
+		candidates = np.flatnonzero(sims >= self.threshold)
+		if candidates.size == 0:
+			return -1
+		for c_idx in candidates[np.argsort(-sims[candidates], kind='stable')]:
+			if _jaccard(tokens, self._tokens[c_idx]) >= self.min_token_overlap:
+				return int(c_idx)
+		return -1
+
+	def fit(self, embeddings: List[List[float]], tokens: List[set]) -> List[int]:
+		n = len(embeddings)
+		assignments: List[int] = [-1] * n
+		valid = [i for i, e in enumerate(embeddings) if e is not None]
+		if not valid:
+			return assignments
+		items = np.asarray([embeddings[i] for i in valid], dtype=np.float64)
+		norms = np.linalg.norm(items, axis=1, keepdims=True)
+		unit_items = np.divide(items, norms, out=np.zeros_like(items), where=norms > 0)
+		for start in range(0, len(valid), self.batch_size):
+			stop = min(start + self.batch_size, len(valid))
+			snapshot = self.size
+			block_sims = unit_items[start:stop] @ self._unit[:snapshot].T
+			touched: List[int] = []
+			touched_set = set()
+			for offset in range(stop - start):
+				pos = start + offset
+				sims = np.empty(self.size, dtype=np.float64)
+				sims[:snapshot] = block_sims[offset]
+				if touched:
+					sims[touched] = self._unit[touched] @ unit_items[pos]
+				i = valid[pos]
+				best_idx = self._pick(sims, tokens[i])
+				if best_idx >= 0:
+					self._set_centroid(best_idx, (self._raw[best_idx] + items[pos]) / 2.0)
+					self._tokens[best_idx] |= tokens[i]
+				else:
+					best_idx = self._add_centroid(items[pos], tokens[i])
+				if best_idx not in touched_set:
+					touched_set.add(best_idx)
+					touched.append(best_idx)
+				assignments[i] = best_idx
+		return assignments
+
+
+def _cluster_by_threshold(embeddings: List[List[float]], tokens: List[set], threshold: float, min_token_overlap: float, batch_size: int = 256) -> List[int]:
 	"""Greedy clustering with token-overlap gate to avoid over-merging."""
-	assignments: List[int] = [-1] * len(embeddings)
-	centroids: List[List[float]] = []
-	centroid_tokens: List[set] = []
-	mgr = EmbeddingManager()
-	for i, emb in enumerate(embeddings):
-		if emb is None:
-			assignments[i] = -1
-			continue
-		best_idx = -1
-		best_sim = -1.0
-		for c_idx, c in enumerate(centroids):
-			cos = mgr.calculate_cosine_similarity(emb, c)
-			jac = _jaccard(tokens[i], centroid_tokens[c_idx])
-			if cos >= threshold and jac >= min_token_overlap and cos > best_sim:
-				best_sim = cos
-				best_idx = c_idx
-		if best_idx >= 0:
-			assignments[i] = best_idx
-			# Update centroid (simple average) and centroid tokens (union)
-			c = centroids[best_idx]
-			centroids[best_idx] = [(a + b) / 2.0 for a, b in zip(c, emb)]
-			centroid_tokens[best_idx] = centroid_tokens[best_idx] | tokens[i]
-		else:
-			# New cluster
-			centroids.append(emb)
-			centroid_tokens.append(set(tokens[i]))
-			assignments[i] = len(centroids) - 1
-	return assignments
+	dimension = next((len(e) for e in embeddings if e is not None), 0)
+	clusterer = CentroidClusterer(threshold, min_token_overlap, dimension, batch_size=batch_size)
+	return clusterer.fit(embeddings, tokens)
 
 
 def rollup_interview_themes(db: SupabaseDatabase, client_id: str, threshold: float = 0.85, min_cluster_size: int = 2, normalize: bool = True, min_token_overlap: float = 0.08, min_interviews_covered: int = 3, max_clusters: int = 15) -> RollupResult:
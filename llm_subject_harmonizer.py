@@ -3,27 +3,53 @@
 LLM-Based Semantic Subject Harmonizer
 Uses GPT to intelligently map natural customer language subjects to standardized 
 win-loss analysis categories with context understanding and semantic intelligence.
+
+batch_harmonize() normalizes and deduplicates subjects, answers repeats from a persistent
+SubjectMappingStore, optionally assigns confident never-seen subjects by nearest category
+centroid (centroid_subject_harmonizer.py; HARMONIZE_CENTROID_TIER=true), and sends the rest
+to the LLM, many per JSON-mode prompt, with prompts running concurrently.
 """
 
 import os
 import json
+import math
 import logging
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+from subject_mapping_store import SUBJECT_MAPPING_STORE_PATH, SubjectMappingStore, mapping_scheme, normalize_subject
+from centroid_subject_harmonizer import CentroidHarmonizer, openai_embedder
+
 logger = logging.getLogger(__name__)
 
+HARMONIZE_SUBJECTS_PER_PROMPT = int(os.getenv("HARMONIZE_SUBJECTS_PER_PROMPT", "25"))
+HARMONIZE_MAX_CONCURRENT_PROMPTS = int(os.getenv("HARMONIZE_MAX_CONCURRENT_PROMPTS", "4"))
+# Bump when the batch prompt changes meaning, so stored mappings are not reused across it
+HARMONIZE_BATCH_PROMPT_VERSION = "batch-v1"
+# Off until its thresholds are tuned against last_run_report's centroid_precision
+HARMONIZE_CENTROID_TIER = os.getenv("HARMONIZE_CENTROID_TIER", "false").lower() == "true"
+# Stored LLM mappings re-assigned by the centroid tier each run to measure its precision
+HARMONIZE_CENTROID_EVAL_SAMPLE = int(os.getenv("HARMONIZE_CENTROID_EVAL_SAMPLE", "200"))
+
 class LLMSemanticHarmonizer:
     """LLM-based semantic harmonizer for intelligent subject mapping"""
     
-    def __init__(self, model_name: str = "gpt-4o-mini"):
+    def __init__(self, model_name: str = "gpt-4o-mini", store_path: str = SUBJECT_MAPPING_STORE_PATH,
+                 centroid_harmonizer: Optional[CentroidHarmonizer] = None,
+                 use_centroid_tier: bool = HARMONIZE_CENTROID_TIER):
         self.model_name = model_name
+        self.store_path = store_path
+        self._mapping_store = None
+        self._centroid_store = None
+        self._centroid_harmonizer = centroid_harmonizer
+        self.use_centroid_tier = use_centroid_tier
         
         # Win-loss categories with detailed descriptions for LLM
         self.categories = {
@@ -88,6 +114,8 @@ class LLMSemanticHarmonizer:
         self.mapping_stats = defaultdict(int)
         self.confidence_scores = []
         self.suggested_categories = set()
+        self.batch_stats = defaultdict(int)
+        self.last_run_report = {}
         
         logger.info(f"🤖 Loaded LLM Semantic Harmonizer with {len(self.categories)} categories")
     
@@ -123,6 +151,74 @@ class LLMSemanticHarmonizer:
             logger.error(f"❌ LLM harmonization failed for '{natural_subject}': {e}")
             return self._create_result(natural_subject, None, 0.0, "error", f"Analysis failed: {str(e)}")
     
+    def _category_descriptions(self) -> str:
+        """Category list for prompts"""
+        category_descriptions = ""
+        for cat_name, cat_info in self.categories.items():
+            category_descriptions += f"\n**{cat_name}**: {cat_info['description']}\n"
+            category_descriptions += f"  Examples: {', '.join(cat_info['examples'])}\n"
+        return category_descriptions
+    
+    @property
+    def mapping_store(self) -> SubjectMappingStore:
+        """Persistent mappings for the current categories and model (opened on first use)"""
+        if self._mapping_store is None:
+            scheme = mapping_scheme(self.categories, self.model_name, HARMONIZE_BATCH_PROMPT_VERSION)
+            self._mapping_store = SubjectMappingStore(scheme, self.store_path)
+        return self._mapping_store
+    
+    @property
+    def centroid_store(self) -> Optional[SubjectMappingStore]:
+        """
+        Centroid-tier mappings, kept apart from the LLM ones under a scheme of the categories,
+        embedding namespace and thresholds, so retuning the tier never reuses its old assignments
+        and turning it off never serves them. None when the tier is off.
+        """
+        centroid = self._centroid_tier()
+        if centroid is None:
+            return None
+        if self._centroid_store is None:
+            scheme = mapping_scheme(self.categories, "embedding_centroid", centroid.settings)
+            self._centroid_store = SubjectMappingStore(scheme, self.store_path)
+        return self._centroid_store
+    
+    def _centroid_tier(self) -> Optional[CentroidHarmonizer]:
+        """Category centroids (built on first use), or None when the tier is off or embeddings are unavailable"""
+        if self.use_centroid_tier and self._centroid_harmonizer is None:
+            try:
+                self._centroid_harmonizer = CentroidHarmonizer(self.categories, openai_embedder())
+            except Exception as e:
+                logger.warning(f"⚠️ Centroid tier disabled, all unseen subjects go to the LLM: {e}")
+                self.use_centroid_tier = False
+        return self._centroid_harmonizer if self.use_centroid_tier else None
+    
+    def _assign_by_centroid(self, unseen: Dict[str, Tuple[str, str, str]],
+                            reference: Dict[str, Tuple[str, str]]) -> Tuple[Dict[str, Dict], int, int]:
+        """
+        Centroid mappings for the confident unseen subjects, plus how many reference subjects
+        (stored LLM mappings: key -> (subject, category)) the tier assigned and how many of
+        those agree with the LLM.
+        """
+        centroid = self._centroid_tier()
+        if centroid is None or not unseen:
+            return {}, 0, 0
+        keys, ref_keys = list(unseen), list(reference)
+        try:
+            assignments = centroid.assign([unseen[k][0] for k in keys] + [reference[k][0] for k in ref_keys])
+        except Exception as e:
+            logger.warning(f"⚠️ Centroid assignment failed, sending subjects to the LLM: {e}")
+            return {}, 0, 0
+        
+        mapped = {}
+        for key, (category, similarity, margin) in zip(keys, assignments):
+            if category:
+                mapped[key] = self._create_result(
+                    unseen[key][0], category, similarity, "embedding_centroid",
+                    f"Nearest category centroid (similarity {similarity:.3f}, margin {margin:.3f})")
+        checked = [(category, reference[k][1]) for k, (category, _, _) in zip(ref_keys, assignments[len(keys):])
+                   if category]
+        return mapped, len(checked), sum(1 for category, expected in checked if category == expected)
+    
     def _call_llm_for_mapping(self, natural_subject: str, verbatim_response: str, 
                              interview_context: str) -> Dict:
         """Call LLM to analyze and map the subject"""
@@ -136,11 +232,7 @@ class LLMSemanticHarmonizer:
             max_tokens=300
         )
         
-        # Build category descriptions for prompt
-        category_descriptions = ""
-        for cat_name, cat_info in self.categories.items():
-            category_descriptions += f"\n**{cat_name}**: {cat_info['description']}\n"
-            category_descriptions += f"  Examples: {', '.join(cat_info['examples'])}\n"
+        category_descriptions = self._category_descriptions()
         
         prompt = ChatPromptTemplate.from_messages([
             ("system", f"""You are an expert at analyzing customer feedback for win-loss analysis. Your task is to intelligently map natural customer language subjects to standardized business categories.
@@ -322,21 +414,179 @@ Return valid JSON only:""")
         logger.debug(f"🎯 LLM mapped '{result['natural_subject']}' → '{harmonized}' "
                     f"(confidence: {confidence:.3f})")
     
-    def batch_harmonize(self, subjects_data: List[Dict]) -> List[Dict]:
-        """Harmonize multiple subjects using LLM semantic analysis"""
-        results = []
+    def _call_llm_for_mappings(self, subjects: List[Tuple[str, str, str]]) -> Dict[int, Dict]:
+        """
+        Map several (subject, verbatim_response, interview_context) in one JSON-mode request.
+        Returns the parsed mapping per 1-based subject index; subjects missing from the
+        response are absent.
+        """
+        from langchain_openai import ChatOpenAI
+        from langchain.prompts import ChatPromptTemplate
+        
+        llm = ChatOpenAI(
+            model_name=self.model_name,
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            temperature=0.0,
+            max_tokens=min(16000, 150 * len(subjects) + 200),
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
         
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", f"""You are an expert at analyzing customer feedback for win-loss analysis. Your task is to intelligently map natural customer language subjects to standardized business categories.
+
+**AVAILABLE CATEGORIES:**{self._category_descriptions()}
+
+**RESPONSE FORMAT - Return one JSON object with one entry per numbered subject:**
+{{{{
+  "mappings": [
+    {{{{
+      "index": 1,
+      "mapped_category": "exact category name from list above or null",
+      "confidence": 0.85,
+      "reasoning": "one sentence explanation",
+      "new_category_suggestion": null,
+      "context_clues": ["key", "phrases"],
+      "mapping_quality": "high"
+    }}}}
+  ]
+}}}}
+
+**MAPPING RULES:**
+1. Use the example response to understand context
+2. Map "Pain Points" based on what the pain is about (pricing→Pricing and Commercial, support→Support and Service)
+3. Suggest "Market Discovery" for Industry Events/Vendor Discovery patterns
+4. Only use exact category names from the list above
+5. Be honest about confidence (0.0 to 1.0)"""),
+            ("user", "{subjects}")
+        ])
+        
+        lines = []
+        for i, (subject, verbatim_response, interview_context) in enumerate(subjects, 1):
+            response_text = verbatim_response[:300] if verbatim_response else 'No context'
+            lines.append(f'{i}. Subject: "{subject}"\n'
+                         f'   Response: "{response_text}"\n'
+                         f'   Context: "{interview_context or "Unknown"}"')
+        
+        response = llm.invoke(prompt.format_messages(subjects="\n".join(lines)))
+        parsed = json.loads(response.content)
+        mappings = {}
+        for entry in parsed.get('mappings', []):
+            try:
+                index = int(entry.get('index'))
+            except (TypeError, ValueError):
+                continue
+            if 1 <= index <= len(subjects):
+                mappings[index] = entry
+        return mappings
+    
+    def _map_unseen_subjects(self, unseen: Dict[str, Tuple[str, str, str]], subjects_per_prompt: int,
+                             max_workers: int) -> Dict[str, Dict]:
+        """LLM mappings for normalized subjects not in the store, several prompts in flight at once"""
+        keys = list(unseen)
+        chunks = [keys[i:i + subjects_per_prompt] for i in range(0, len(keys), subjects_per_prompt)]
+        
+        def run(chunk):
+            try:
+                return chunk, self._call_llm_for_mappings([unseen[k] for k in chunk]), None
+            except Exception as e:
+                return chunk, {}, e
+        
+        mapped = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for done, (chunk, mappings, error) in enumerate(executor.map(run, chunks), 1):
+                self.batch_stats['llm_calls'] += 1
+                if error:
+                    logger.error(f"❌ LLM batch mapping failed for {len(chunk)} subjects: {error}")
+                for i, key in enumerate(chunk, 1):
+                    if i not in mappings:
+                        continue
+                    try:
+                        mapped[key] = self._process_llm_response(unseen[key][0], mappings[i])
+                    except Exception as e:
+                        # A malformed entry (e.g. non-numeric confidence) fails only its own subject
+                        logger.error(f"❌ Invalid LLM mapping for '{unseen[key][0]}': {e}")
+                logger.info(f"  Progress: {done}/{len(chunks)} mapping prompts complete")
+        return mapped
+    
+    def batch_harmonize(self, subjects_data: List[Dict],
+                        subjects_per_prompt: int = HARMONIZE_SUBJECTS_PER_PROMPT,
+                        max_workers: int = HARMONIZE_MAX_CONCURRENT_PROMPTS,
+                        use_store: bool = True) -> List[Dict]:
+        """
+        Harmonize multiple subjects using LLM semantic analysis.
+        Subjects are normalized and deduplicated; the first item carrying each subject supplies
+        the example response. Mappings already in the store are reused (mapping_source 'store');
+        never-seen subjects go to the centroid tier ('centroid') and only its low-margin ones
+        reach the LLM ('llm'). New mappings are stored for later runs. Subjects the LLM left
+        unanswered get an 'error' result and are retried next run. last_run_report holds the
+        run's centroid coverage, precision against stored LLM mappings and LLM calls saved.
+        """
         logger.info(f"🤖 Starting LLM batch harmonization of {len(subjects_data)} subjects")
         
-        for i, item in enumerate(subjects_data):
+        unique: Dict[str, Tuple[str, str, str]] = {}
+        for item in subjects_data:
+            key = normalize_subject(item.get('subject', ''))
+            if key and key not in unique:
+                interview_context = f"Company: {item.get('company', 'Unknown')}, " \
+                                  f"Deal Status: {item.get('deal_status', 'Unknown')}"
+                unique[key] = (item.get('subject', ''), item.get('verbatim_response', ''), interview_context)
+        
+        stored = self.mapping_store.get_many(unique) if use_store else {}
+        centroid_store = self.centroid_store if use_store else None
+        if centroid_store is not None:
+            stored.update(centroid_store.get_many([k for k in unique if k not in stored]))
+        unseen = {k: v for k, v in unique.items() if k not in stored}
+        
+        # Middle tier: confident nearest-centroid assignments never reach the LLM
+        reference = {k: (unique[k][0], r['harmonized_subject']) for k, r in stored.items()
+                     if str(r.get('mapping_method', '')).startswith('llm_') and r.get('harmonized_subject')}
+        reference = dict(list(reference.items())[:HARMONIZE_CENTROID_EVAL_SAMPLE])
+        centroid_mapped, checked, agreed = self._assign_by_centroid(unseen, reference)
+        escalated = {k: v for k, v in unseen.items() if k not in centroid_mapped}
+        
+        subjects_per_prompt = max(1, subjects_per_prompt)
+        llm_mapped = self._map_unseen_subjects(escalated, subjects_per_prompt, max_workers) if escalated else {}
+        mapped = {**centroid_mapped, **llm_mapped}
+        if use_store and llm_mapped:
+            self.mapping_store.put_many(llm_mapped)
+        if centroid_store is not None and centroid_mapped:
+            centroid_store.put_many(centroid_mapped)
+        
+        llm_calls = math.ceil(len(escalated) / subjects_per_prompt)
+        self.last_run_report = {
+            'subjects': len(unique),
+            'store_hits': len(stored),
+            'centroid_candidates': len(unseen) if self.use_centroid_tier else 0,
+            'centroid_assigned': len(centroid_mapped),
+            'centroid_coverage': round(len(centroid_mapped) / len(unseen), 3) if unseen else None,
+            'centroid_checked': checked,
+            'centroid_precision': round(agreed / checked, 3) if checked else None,
+            'llm_subjects': len(escalated),
+            'llm_calls': llm_calls,
+            'llm_calls_saved': math.ceil(len(unseen) / subjects_per_prompt) - llm_calls,
+        }
+        
+        self.batch_stats['items'] += len(subjects_data)
+        self.batch_stats['unique_subjects'] += len(unique)
+        self.batch_stats['store_hits'] += len(stored)
+        self.batch_stats['centroid_assigned'] += len(centroid_mapped)
+        self.batch_stats['llm_subjects'] += len(escalated)
+        self.batch_stats['llm_calls_saved'] += self.last_run_report['llm_calls_saved']
+        
+        results = []
+        for item in subjects_data:
             natural_subject = item.get('subject', '')
-            verbatim_response = item.get('verbatim_response', '')
-            
-            # Build interview context
-            interview_context = f"Company: {item.get('company', 'Unknown')}, " \
-                              f"Deal Status: {item.get('deal_status', 'Unknown')}"
-            
-            result = self.harmonize_subject(natural_subject, verbatim_response, interview_context)
+            key = normalize_subject(natural_subject)
+            if not key:
+                result = self._create_result(natural_subject, None, 0.0, "empty_subject", "No subject provided")
+            elif key in stored or key in mapped:
+                result = dict(stored[key] if key in stored else mapped[key])
+                result['natural_subject'] = natural_subject
+                result['mapping_source'] = 'store' if key in stored else 'centroid' if key in centroid_mapped else 'llm'
+            else:
+                result = self._create_result(natural_subject, None, 0.0, "error",
+                                             "Analysis failed: no mapping returned by LLM")
+            self._track_mapping(result)
             
             # Add original data to result
             result.update({
@@ -344,14 +594,16 @@ Return valid JSON only:""")
                 'interview_id': item.get('interview_id'),
                 'client_id': item.get('client_id')
             })
-            
             results.append(result)
-            
-            # Progress logging
-            if (i + 1) % 5 == 0:
-                logger.info(f"  Progress: {i + 1}/{len(subjects_data)} subjects processed")
         
-        logger.info(f"✅ LLM batch harmonization complete: {len(results)} subjects processed")
+        report = self.last_run_report
+        logger.info(f"✅ LLM batch harmonization complete: {len(results)} subjects processed "
+                    f"({len(unique)} unique, {len(stored)} from store, {len(centroid_mapped)} by centroid, "
+                    f"{len(escalated)} sent to LLM)")
+        if report['centroid_candidates']:
+            precision = f"{report['centroid_precision']:.1%} of {checked}" if checked else "n/a"
+            logger.info(f"🧭 Centroid tier: coverage {report['centroid_coverage']:.1%}, precision vs LLM {precision}, "
+                        f"{report['llm_calls_saved']} LLM calls saved")
         return results
     
     def get_harmonization_stats(self) -> Dict:
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+
+"""
+Embedded Local Backend for VOC Pipeline
+
+A SQLite-file stand-in for the Supabase client. SupabaseDatabase (and the scripts that reach
+through db.supabase directly) only ever use the PostgREST query-builder surface:
+table().select/insert/upsert/update/delete, the eq/neq/gt/gte/lt/lte/in_/is_/like/ilike
+filters (optionally negated with not_), order/limit/range, execute() and rpc(). LocalBackendClient
+implements that surface over one SQLite file, so every processor, exporter and UI runs
+unchanged against local data:
+
+    VOC_DB_BACKEND=local VOC_LOCAL_DB_PATH=acme.sqlite streamlit run app.py
+
+Rows are stored as JSON documents in the same snapshot_rows layout LocalSnapshot uses, which
+lets the summary and work-discovery RPCs run as the SQLite queries in summary_aggregates.py.
+Tables need no schema; ids and created_at are filled in on insert like the Postgres defaults.
+Unique constraints other than upsert's on_conflict target are not enforced.
+
+Each on_conflict target a table is upserted with is kept as an indexed key in local_row_keys,
+so an upsert resolves its conflict with one index lookup instead of scanning the table. eq/in_
+filters (and client_id) are pushed into the WHERE clause, so only candidate rows are decoded.
+"""
+
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from summary_aggregates import SQLITE_AGGREGATES
+
+logger = logging.getLogger(__name__)
+
+LOCAL_DB_PATH = os.getenv("VOC_LOCAL_DB_PATH", "voc_local.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_rows (
+	tbl TEXT NOT NULL,
+	client_id TEXT NOT NULL,
+	row_key TEXT NOT NULL,
+	data TEXT NOT NULL,
+	PRIMARY KEY (tbl, client_id, row_key)
+);
+CREATE TABLE IF NOT EXISTS local_sequences (
+	tbl TEXT PRIMARY KEY,
+	last_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS local_row_keys (
+	tbl TEXT NOT NULL,
+	columns TEXT NOT NULL,
+	key TEXT NOT NULL,
+	client_id TEXT NOT NULL,
+	row_key TEXT NOT NULL,
+	PRIMARY KEY (tbl, columns, key)
+);
+CREATE INDEX IF NOT EXISTS local_row_keys_row ON local_row_keys (tbl, client_id, row_key);
+CREATE TABLE IF NOT EXISTS local_key_columns (
+	tbl TEXT NOT NULL,
+	columns TEXT NOT NULL,
+	PRIMARY KEY (tbl, columns)
+);
+"""
+
+# Above this many in_ values the filter stays in Python rather than becoming SQL parameters
+_MAX_PUSHED_VALUES = 500
+
+
+def _like(pattern: str, case_sensitive: bool) -> Callable[[Any], bool]:
+    regex = re.compile('^' + '.*'.join(re.escape(part).replace('_', '.') for part in pattern.split('%')) + '$',
+                       0 if case_sensitive else re.IGNORECASE | re.DOTALL)
+    return lambda value: isinstance(value, str) and regex.match(value) is not None
+
+
+def _comparable(value: Any, arg: Any) -> Any:
+    """Coerce a filter argument to the stored value's type (PostgREST sends everything as text)"""
+    if isinstance(value, bool) or isinstance(arg, bool):
+        return str(arg).lower() == 'true' if not isinstance(arg, bool) else arg
+    if isinstance(value, (int, float)) and isinstance(arg, str):
+        try:
+            return float(arg)
+        except ValueError:
+            return arg
+    if isinstance(value, str) and not isinstance(arg, str):
+        return str(arg)
+    return arg
+
+
+def _compare(op: str) -> Callable[[Any, Any], bool]:
+    def check(value: Any, arg: Any) -> bool:
+        if value is None:
+            return False
+        arg = _comparable(value, arg)
+        try:
+            return {'eq': value == arg, 'neq': value != arg, 'gt': value > arg, 'gte': value >= arg,
+                    'lt': value < arg, 'lte': value <= arg}[op]
+        except TypeError:
+            return False
+    return check
+
+
+def _sql_candidates(arg: Any) -> List[Any]:
+    """SQL values json_extract may return for a stored value _compare('eq') would match to arg.
+
+    A superset: the Python predicate still decides, this only narrows what gets decoded.
+    """
+    if isinstance(arg, bool):
+        return [int(arg), str(arg)]
+    if isinstance(arg, int) and not -2 ** 63 <= arg < 2 ** 63:
+        return []
+    if isinstance(arg, (int, float)):
+        return [arg, str(arg)]
+    if isinstance(arg, str):
+        candidates = [arg]
+        if arg.lower() in ('true', 'false'):
+            candidates.append(int(arg.lower() == 'true'))
+        try:
+            candidates.append(float(arg))
+        except ValueError:
+            pass
+        return candidates
+    return []
+
+
+def _row_key(row: Dict[str, Any], keys: List[str]) -> Optional[str]:
+    """local_row_keys key of a row's on_conflict values (None when one is missing, like NULL)"""
+    values = [row.get(k) for k in keys]
+    if any(v is None for v in values):
+        return None
+    # 5 == 5.0 for the conflict check, as it was for the Python comparison
+    return json.dumps([int(v) if isinstance(v, float) and v.is_integer() else v for v in values], default=str)
+
+
+class _LocalQuery:
+    """One PostgREST-style request against a LocalBackendClient table"""
+
+    def __init__(self, client: 'LocalBackendClient', table: str):
+        self.client, self.table = client, table
+        self.action, self.payload, self.options = 'select', None, {}
+        self.columns, self.count = '*', None
+        self.preds: List[Callable[[Dict[str, Any]], bool]] = []
+        self.client_id: Optional[str] = None
+        self.sql_filters: List[tuple] = []
+        self.order_by: List[tuple] = []
+        self.lim, self.offset = None, 0
+        self._negate = False
+
+    # Actions
+    def select(self, columns: str = '*', count: Optional[str] = None):
+        self.columns, self.count = columns, count
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None, ignore_duplicates: bool = False, **kwargs):
+        self.action, self.payload = 'upsert', rows
+        self.options = {'on_conflict': on_conflict, 'ignore_duplicates': ignore_duplicates}
+        return self
+
+    def update(self, data: Dict[str, Any], **kwargs):
+        self.action, self.payload = 'update', data
+        return self
+
+    def delete(self, **kwargs):
+        self.action = 'delete'
+        return self
+
+    # Filters
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def _where(self, column: str, test: Callable[[Any], bool]):
+        negate, self._negate = self._negate, False
+        self.preds.append((lambda r: not test(r.get(column))) if negate else (lambda r: test(r.get(column))))
+        return self
+
+    def _push(self, column: str, values: List[Any]):
+        """Narrow the SQL scan to rows whose column may equal one of values"""
+        candidates = [c for v in values for c in _sql_candidates(v)]
+        # None never matches; any other value without SQL candidates keeps the scan unfiltered
+        if any(v is not None and not _sql_candidates(v) for v in values):
+            return
+        if self._negate or not candidates or len(candidates) > _MAX_PUSHED_VALUES or not re.fullmatch(r'\w+', column):
+            return
+        self.sql_filters.append((f"json_extract(data, '$.{column}') IN ({', '.join('?' * len(candidates))})",
+                                 candidates))
+
+    def eq(self, column, value):
+        if column == 'client_id' and not self._negate:
+            self.client_id = str(value)
+        else:
+            self._push(column, [value])
+        return self._where(column, lambda v: _compare('eq')(v, value))
+
+    def neq(self, column, value): return self._where(column, lambda v: _compare('neq')(v, value))
+    def gt(self, column, value): return self._where(column, lambda v: _compare('gt')(v, value))
+    def gte(self, column, value): return self._where(column, lambda v: _compare('gte')(v, value))
+    def lt(self, column, value): return self._where(column, lambda v: _compare('lt')(v, value))
+    def lte(self, column, value): return self._where(column, lambda v: _compare('lte')(v, value))
+    def like(self, column, pattern): return self._where(column, _like(pattern, True))
+    def ilike(self, column, pattern): return self._where(column, _like(pattern, False))
+
+    def in_(self, column, values):
+        values = list(values)
+        self._push(column, values)
+        return self._where(column, lambda v: v is not None and any(_compare('eq')(v, x) for x in values))
+
+    def is_(self, column, value):
+        if value in (None, 'null'):
+            return self._where(column, lambda v: v is None)
+        return self._where(column, lambda v: v is (str(value).lower() == 'true'))
+
+    def match(self, query: Dict[str, Any]):
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, n: int, **kwargs):
+        self.lim = n
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset, self.lim = start, end - start + 1
+        return self
+
+    def single(self):
+        self.options['single'] = True
+        return self
+
+    maybe_single = single
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        rows = self.client._rows(self.table, self.client_id, self.sql_filters)
+        return [r for r in rows if all(p(r) for p in self.preds)]
+
+    def _project(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        columns = [c.strip() for c in (self.columns or '*').split(',') if c.strip()]
+        if '*' in columns:
+            return rows
+        return [{c: r.get(c) for c in columns} for r in rows]
+
+    def execute(self) -> SimpleNamespace:
+        with self.client._lock:
+            if self.action == 'select':
+                rows = self._matching()
+                total = len(rows)
+                if self.columns.strip() == 'count':
+                    return SimpleNamespace(data=[{'count': total}], count=total)
+                for column, desc in reversed(self.order_by):
+                    # Postgres puts NULLs last ascending and first descending
+                    rows.sort(key=lambda r: (r.get(column) is None, r.get(column) if r.get(column) is not None else 0),
+                              reverse=desc)
+                rows = rows[self.offset:self.offset + self.lim if self.lim is not None else None]
+                data = self._project(rows)
+                if self.options.get('single'):
+                    data = data[0] if data else None
+                return SimpleNamespace(data=data, count=total if self.count else None)
+            # One transaction per request, so bulk writes commit once
+            try:
+                with self.client._conn:
+                    if self.action == 'insert':
+                        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                        data = [self.client._write(self.table, dict(r), None) for r in rows]
+                        return SimpleNamespace(data=data, count=None)
+                    if self.action == 'upsert':
+                        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                        written = [self.client._upsert(self.table, dict(r), self.options['on_conflict'],
+                                                       self.options['ignore_duplicates']) for r in rows]
+                        return SimpleNamespace(data=[r for r in written if r is not None], count=None)
+                    if self.action == 'update':
+                        data = [self.client._write(self.table, {**r, **self.payload}, r) for r in self._matching()]
+                        return SimpleNamespace(data=data, count=None)
+                    rows = self._matching()
+                    self.client._delete(self.table, rows)
+                    return SimpleNamespace(data=rows, count=None)
+            except Exception:
+                # A rolled-back request may have registered on_conflict keys it never indexed
+                self.client._load_key_columns()
+                raise
+
+
+class _LocalRpc:
+    def __init__(self, client: 'LocalBackendClient', name: str, params: Dict[str, Any]):
+        self.client, self.name, self.params = client, name, params or {}
+
+    def execute(self) -> SimpleNamespace:
+        if self.name not in SQLITE_AGGREGATES:
+            raise Exception(f"PGRST202: Could not find the function public.{self.name} in the local backend")
+        params = {k[2:] if k.startswith('p_') else k: v for k, v in self.params.items()}
+        with self.client._lock:
+            cur = self.client._conn.execute(SQLITE_AGGREGATES[self.name], params)
+            columns = [d[0] for d in cur.description]
+            return SimpleNamespace(data=[dict(zip(columns, row)) for row in cur.fetchall()])
+
+
+class LocalBackendClient:
+    """Supabase client look-alike over a SQLite file (see module docstring)"""
+
+    def __init__(self, path: str = LOCAL_DB_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._load_key_columns()
+
+    def table(self, name: str) -> _LocalQuery:
+        return _LocalQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _LocalRpc:
+        return _LocalRpc(self, name, params)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def tables(self) -> Dict[str, int]:
+        """Row count per stored table"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT tbl, COUNT(*) FROM snapshot_rows GROUP BY tbl ORDER BY tbl"))
+
+    def _rows(self, table: str, client_id: Optional[str] = None,
+              filters: Optional[List[tuple]] = None) -> List[Dict[str, Any]]:
+        sql, params = "SELECT data FROM snapshot_rows WHERE tbl = ?", [table]
+        if client_id is not None:
+            sql += " AND client_id = ?"
+            params.append(client_id)
+        for clause, values in filters or []:
+            sql += f" AND {clause}"
+            params.extend(values)
+        # Key order, like a heap scan of a freshly loaded table
+        sql += " ORDER BY CAST(row_key AS INTEGER), row_key"
+        return [json.loads(d) for (d,) in self._conn.execute(sql, params)]
+
+    def _next_id(self, table: str) -> int:
+        row = self._conn.execute("SELECT last_id FROM local_sequences WHERE tbl = ?", (table,)).fetchone()
+        next_id = (row[0] if row else 0) + 1
+        self._conn.execute("INSERT OR REPLACE INTO local_sequences (tbl, last_id) VALUES (?, ?)", (table, next_id))
+        return next_id
+
+    def _write(self, table: str, row: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Insert (previous is None) or replace one row, keeping ids and timestamps like Postgres defaults would"""
+        now = datetime.now().isoformat()
+        if previous is None:
+            if row.get('id') is None:
+                row['id'] = self._next_id(table)
+            elif isinstance(row['id'], int):
+                self._conn.execute("INSERT INTO local_sequences (tbl, last_id) VALUES (?, ?) ON CONFLICT(tbl) "
+                                   "DO UPDATE SET last_id = MAX(last_id, excluded.last_id)", (table, row['id']))
+            row.setdefault('created_at', now)
+        else:
+            self._delete(table, [previous])
+            if 'updated_at' in previous and row.get('updated_at') == previous.get('updated_at'):
+                row['updated_at'] = now
+        client_id, row_key = str(row.get('client_id') or ''), str(row['id'])
+        self._conn.execute(
+            "INSERT INTO snapshot_rows (tbl, client_id, row_key, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(tbl, client_id, row_key) DO UPDATE SET data = excluded.data",
+            (table, client_id, row_key, json.dumps(row, default=str)))
+        self._index_keys(table, [row])
+        return row
+
+    def _index_keys(self, table: str, rows: List[Dict[str, Any]], columns: Optional[List[List[str]]] = None):
+        """Record rows under each on_conflict key kept for the table"""
+        self._conn.executemany(
+            "INSERT INTO local_row_keys (tbl, columns, key, client_id, row_key) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(tbl, columns, key) DO NOTHING",
+            [(table, json.dumps(keys), key, str(r.get('client_id') or ''), str(r['id']))
+             for keys in (columns or self._key_columns.get(table, [])) for r in rows
+             for key in [_row_key(r, keys)] if key is not None])
+
+    def _load_key_columns(self):
+        # table -> on_conflict column lists kept in local_row_keys
+        self._key_columns: Dict[str, List[List[str]]] = {}
+        for table, columns in self._conn.execute("SELECT tbl, columns FROM local_key_columns"):
+            self._key_columns.setdefault(table, []).append(json.loads(columns))
+
+    def _conflict_keys(self, table: str, keys: List[str]) -> str:
+        """local_row_keys columns value for an on_conflict target, indexing the table's rows on first use"""
+        if keys not in self._key_columns.get(table, []):
+            self._conn.execute("INSERT INTO local_key_columns (tbl, columns) VALUES (?, ?)", (table, json.dumps(keys)))
+            self._index_keys(table, self._rows(table), [keys])
+            self._key_columns.setdefault(table, []).append(keys)
+        return json.dumps(keys)
+
+    def _upsert(self, table: str, row: Dict[str, Any], on_conflict: Optional[str],
+                ignore_duplicates: bool) -> Optional[Dict[str, Any]]:
+        keys = [k.strip() for k in (on_conflict or 'id').split(',')]
+        existing = None
+        key = _row_key(row, keys)
+        if key is not None:
+            found = self._conn.execute(
+                "SELECT s.data FROM local_row_keys k JOIN snapshot_rows s ON s.tbl = k.tbl "
+                "AND s.client_id = k.client_id AND s.row_key = k.row_key "
+                "WHERE k.tbl = ? AND k.columns = ? AND k.key = ?",
+                (table, self._conflict_keys(table, keys), key)).fetchone()
+            existing = json.loads(found[0]) if found else None
+        if existing is None:
+            return self._write(table, row, None)
+        if ignore_duplicates:
+            return None
+        return self._write(table, {**existing, **row, 'id': existing['id']}, existing)
+
+    def _delete(self, table: str, rows: List[Dict[str, Any]]):
+        keys = [(table, str(r.get('client_id') or ''), str(r['id'])) for r in rows]
+        self._conn.executemany("DELETE FROM snapshot_rows WHERE tbl = ? AND client_id = ? AND row_key = ?", keys)
+        self._conn.executemany("DELETE FROM local_row_keys WHERE tbl = ? AND client_id = ? AND row_key = ?", keys)
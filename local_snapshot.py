@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+"""
+Local Snapshot of Client Tables for VOC Pipeline
+
+Mirrors a client's Stage 1-4 tables into a local SQLite file so that Streamlit reruns,
+workbook builds and analyst scripts stop re-downloading the same rows from Supabase.
+Each (table, client) pair is synced incrementally from a high-water mark on updated_at, and
+every incremental sync also reads the table's keys alone to drop rows deleted elsewhere.
+Tables with only created_at cannot see updates incrementally, so they are fully refreshed
+once their last full sync is older than max_age_seconds. Reads are served locally while
+the last sync is younger than max_age_seconds.
+
+Attach to a SupabaseDatabase with db.use_snapshot() (or set SUPABASE_SNAPSHOT_PATH) and
+its getters read through the snapshot without any caller changes.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from supabase_database import SupabaseDatabase, TABLE_KEYS
+from summary_aggregates import AGGREGATE_TABLES, SQLITE_AGGREGATES
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = os.getenv("SUPABASE_SNAPSHOT_PATH", "voc_snapshot.sqlite")
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SUPABASE_SNAPSHOT_MAX_AGE_SECONDS", "300"))
+SNAPSHOT_FULL_REFRESH_SECONDS = float(os.getenv("SUPABASE_SNAPSHOT_FULL_REFRESH_SECONDS", "86400"))
+SNAPSHOT_TABLES = ('stage1_data_responses', 'stage2_response_labeling', 'stage3_findings', 'stage4_themes')
+WATERMARK_COLUMNS = ('updated_at', 'created_at')
+
+_COMPARISONS = {
+    'eq': lambda s, v: s == v,
+    'neq': lambda s, v: s != v,
+    'gt': lambda s, v: s > v,
+    'gte': lambda s, v: s >= v,
+    'lt': lambda s, v: s < v,
+    'lte': lambda s, v: s <= v,
+    'in_': lambda s, v: s.isin(list(v)),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_rows (
+	tbl TEXT NOT NULL,
+	client_id TEXT NOT NULL,
+	row_key TEXT NOT NULL,
+	data TEXT NOT NULL,
+	PRIMARY KEY (tbl, client_id, row_key)
+);
+CREATE TABLE IF NOT EXISTS snapshot_state (
+	tbl TEXT NOT NULL,
+	client_id TEXT NOT NULL,
+	watermark_column TEXT,
+	high_water TEXT,
+	row_count INTEGER DEFAULT 0,
+	synced_at REAL DEFAULT 0,
+	full_synced_at REAL DEFAULT 0,
+	needs_full INTEGER DEFAULT 0,
+	PRIMARY KEY (tbl, client_id)
+);
+"""
+
+
+def _filter_supported(value: Any) -> bool:
+    ops = value if isinstance(value, list) and value and all(isinstance(v, tuple) for v in value) else [value]
+    return all(op[0] in _COMPARISONS or op[0] == 'is_' for op in ops
+               if isinstance(op, tuple) and len(op) == 2 and isinstance(op[0], str))
+
+
+def apply_filters(df: pd.DataFrame, filters: Optional[Dict[str, Any]]) -> pd.DataFrame:
+    """Local equivalent of SupabaseDatabase._filtered_query for the operators in _COMPARISONS plus is_"""
+    mask = pd.Series(True, index=df.index)
+    for column, value in (filters or {}).items():
+        series = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], str):
+            ops = [value]
+        elif isinstance(value, list) and value and all(isinstance(v, tuple) for v in value):
+            ops = value
+        elif isinstance(value, (list, set, frozenset)):
+            ops = [('in_', value)]
+        elif value is None:
+            ops = [('is_', 'null')]
+        else:
+            ops = [('eq', value)]
+        for op, arg in ops:
+            if op == 'is_':
+                mask &= series.isna() if arg in (None, 'null') else series.notna()
+            else:
+                # Postgres comparisons never match NULL
+                mask &= series.notna() & _COMPARISONS[op](series, arg).fillna(False).astype(bool)
+    return df[mask]
+
+
+class LocalSnapshot:
+    """
+    SQLite mirror of selected tables, partitioned by client_id.
+    db is the SupabaseDatabase used to fetch rows (via its paged iter_table).
+    """
+
+    def __init__(self, db, path: str = SNAPSHOT_PATH, max_age_seconds: float = SNAPSHOT_MAX_AGE_SECONDS,
+                 full_refresh_seconds: float = SNAPSHOT_FULL_REFRESH_SECONDS, tables=SNAPSHOT_TABLES,
+                 clock: Callable[[], float] = time.time):
+        self.db = db
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.tables = tuple(tables)
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def covers(self, table: str, filters: Optional[Dict[str, Any]]) -> bool:
+        """True when a read can be answered locally: a snapshotted table scoped to one client"""
+        filters = filters or {}
+        return (table in self.tables and isinstance(filters.get('client_id'), str)
+                and all(_filter_supported(v) for v in filters.values()))
+
+    def _state(self, table: str, client_id: str) -> Optional[Dict[str, Any]]:
+        cur = self._conn.execute(
+            "SELECT watermark_column, high_water, row_count, synced_at, full_synced_at, needs_full "
+            "FROM snapshot_state WHERE tbl = ? AND client_id = ?", (table, client_id))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        keys = ('watermark_column', 'high_water', 'row_count', 'synced_at', 'full_synced_at', 'needs_full')
+        return dict(zip(keys, row))
+
+    def sync_table(self, table: str, client_id: str, full: bool = False) -> int:
+        """
+        Fetch rows changed since the table's high-water mark (or all rows); returns rows fetched.
+        An incremental sync then lists the client's live keys and drops local rows missing from it.
+        """
+        with self._lock:
+            state = self._state(table, client_id)
+        now = self._clock()
+        full = (full or state is None or bool(state['needs_full']) or not state['watermark_column']
+                or not state['high_water'] or now - state['full_synced_at'] >= self.full_refresh_seconds
+                # Updates behind a created_at watermark are invisible, so bound their age by a full refresh
+                or (state['watermark_column'] != 'updated_at'
+                    and now - state['full_synced_at'] >= self.max_age_seconds))
+        filters: Dict[str, Any] = {'client_id': client_id}
+        if not full:
+            # gte rather than gt: rows sharing the boundary timestamp are re-read, never skipped
+            filters[state['watermark_column']] = ('gte', state['high_water'])
+        rows = list(self.db.iter_table(table, '*', filters))
+
+        key = TABLE_KEYS.get(table, 'id')
+        # Listed after the rows, so a key missing here was deleted after (or before) its row was read
+        live = None if full else {str(r.get(key)) for r in self.db.iter_table(table, key, {'client_id': client_id})}
+        watermark = state['watermark_column'] if state and not full else None
+        if watermark is None:
+            watermark = next((c for c in WATERMARK_COLUMNS if any(r.get(c) for r in rows)), None)
+        marks = [str(r[watermark]) for r in rows if watermark and r.get(watermark)]
+        high_water = max(marks + ([state['high_water']] if state and not full and state['high_water'] else []),
+                         default=None)
+
+        with self._lock, self._conn:
+            if full:
+                self._conn.execute("DELETE FROM snapshot_rows WHERE tbl = ? AND client_id = ?", (table, client_id))
+            else:
+                held = self._conn.execute("SELECT row_key FROM snapshot_rows WHERE tbl = ? AND client_id = ?",
+                                          (table, client_id)).fetchall()
+                self._conn.executemany(
+                    "DELETE FROM snapshot_rows WHERE tbl = ? AND client_id = ? AND row_key = ?",
+                    [(table, client_id, row_key) for (row_key,) in held if row_key not in live])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO snapshot_rows (tbl, client_id, row_key, data) VALUES (?, ?, ?, ?)",
+                [(table, client_id, str(r.get(key)), json.dumps(r, default=str)) for r in rows
+                 if live is None or str(r.get(key)) in live])
+            count = self._conn.execute("SELECT COUNT(*) FROM snapshot_rows WHERE tbl = ? AND client_id = ?",
+                                       (table, client_id)).fetchone()[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshot_state (tbl, client_id, watermark_column, high_water, row_count, "
+                "synced_at, full_synced_at, needs_full) VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (table, client_id, watermark, high_water, count, now,
+                 now if full else state['full_synced_at']))
+        logger.info(f"🔄 Snapshot {table}/{client_id}: {'full' if full else 'incremental'} sync, "
+                    f"{len(rows)} rows fetched, {count} held")
+        return len(rows)
+
+    def sync(self, client_id: str, tables: Optional[List[str]] = None, full: bool = False) -> Dict[str, int]:
+        return {table: self.sync_table(table, client_id, full=full) for table in (tables or self.tables)}
+
+    def ensure_fresh(self, table: str, client_id: str) -> bool:
+        """Sync if the last sync is older than max_age_seconds or a local write made it stale; True if synced"""
+        with self._lock:
+            state = self._state(table, client_id)
+        if state and not state['needs_full'] and self._clock() - state['synced_at'] < self.max_age_seconds:
+            return False
+        self.sync_table(table, client_id)
+        return True
+
+    def mark_dirty(self, table: str, client_id: Optional[str] = None, deleted: bool = False):
+        """
+        Force the next read of table to sync. Deletes, and updates on tables watermarked by
+        created_at, schedule a full resync so this process's own write is seen at once.
+        """
+        if table not in self.tables:
+            return
+        sql = ("UPDATE snapshot_state SET synced_at = 0, "
+               "needs_full = CASE WHEN ? OR watermark_column IS NOT 'updated_at' THEN 1 ELSE needs_full END "
+               "WHERE tbl = ?")
+        params: list = [int(deleted), table]
+        if client_id is not None:
+            sql += " AND client_id = ?"
+            params.append(client_id)
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    def read(self, table: str, filters: Dict[str, Any]) -> pd.DataFrame:
+        """Rows matching filters (which must include client_id), syncing first when stale"""
+        client_id = filters['client_id']
+        self.ensure_fresh(table, client_id)
+        with self._lock:
+            data = self._conn.execute("SELECT data FROM snapshot_rows WHERE tbl = ? AND client_id = ?",
+                                      (table, client_id)).fetchall()
+        df = pd.DataFrame([json.loads(d) for (d,) in data])
+        if df.empty:
+            return df
+        return apply_filters(df, filters).reset_index(drop=True)
+
+    def covers_aggregate(self, name: str) -> bool:
+        return name in SQLITE_AGGREGATES and all(t in self.tables for t in AGGREGATE_TABLES[name])
+
+    def aggregate(self, name: str, client_id: str, **params) -> List[Dict[str, Any]]:
+        """Summary rows from the SQLite version of a summary RPC (see summary_aggregates.py)"""
+        for table in AGGREGATE_TABLES[name]:
+            self.ensure_fresh(table, client_id)
+        with self._lock:
+            cur = self._conn.execute(SQLITE_AGGREGATES[name], {'client_id': client_id, **params})
+            columns = [d[0] for d in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def status(self, client_id: Optional[str] = None) -> pd.DataFrame:
+        sql = "SELECT * FROM snapshot_state" + (" WHERE client_id = ?" if client_id else "")
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=(client_id,) if client_id else ())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync a client's Stage 1-4 tables into the local snapshot")
+    parser.add_argument("--client", required=True, help="client_id to sync")
+    parser.add_argument("--path", default=SNAPSHOT_PATH, help=f"Snapshot file (default: {SNAPSHOT_PATH})")
+    parser.add_argument("--full", action="store_true", help="Re-download everything instead of syncing changes")
+    parser.add_argument("--status", action="store_true", help="Show snapshot state and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    snapshot = LocalSnapshot(SupabaseDatabase(), path=args.path)
+    if not args.status:
+        fetched = snapshot.sync(args.client, full=args.full)
+        print(f"✅ Synced {sum(fetched.values())} rows for {args.client} into {args.path}")
+    print(snapshot.status(args.client).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
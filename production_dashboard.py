@@ -93,7 +93,7 @@ def show_production_dashboard():
                 # Get findings count - need to get client_id from session state
                 client_id = st.session_state.get('client_id', '')
                 if client_id:
-                    findings_df = db.get_stage3_findings(client_id=client_id)
+                    findings_df = db.get_stage3_findings(client_id=client_id, columns='ids')
                     st.metric("Total Findings", len(findings_df))
                 else:
                     st.metric("Total Findings", "Set Client ID")
@@ -102,7 +102,7 @@ def show_production_dashboard():
                 # Get themes count - need to get client_id from session state
                 client_id = st.session_state.get('client_id', '')
                 if client_id:
-                    themes_df = db.get_themes(client_id=client_id)
+                    themes_df = db.get_themes(client_id=client_id, columns='ids')
                     st.metric("Total Themes", len(themes_df))
                 else:
                     st.metric("Total Themes", "Set Client ID")
@@ -116,8 +116,8 @@ def show_production_dashboard():
                         client_data.append({
                             'Client ID': client_id,
                             'Responses': count,
-                            'Findings': len(db.get_stage3_findings(client_id=client_id)),
-                            'Themes': len(db.get_themes(client_id=client_id))
+                            'Findings': len(db.get_stage3_findings(client_id=client_id, columns='ids')),
+                            'Themes': len(db.get_themes(client_id=client_id, columns='ids'))
                         })
                 
                 if client_data:
@@ -170,7 +170,7 @@ def show_production_dashboard():
             # Get recent findings - need to get client_id from session state
             client_id = st.session_state.get('client_id', '')
             if client_id:
-                recent_findings = db.get_stage3_findings(client_id=client_id)
+                recent_findings = db.get_stage3_findings(client_id=client_id, columns='text')
                 if not recent_findings.empty and 'created_at' in recent_findings.columns:
                     recent_findings['created_at'] = pd.to_datetime(recent_findings['created_at'])
                     recent_findings = recent_findings.sort_values('created_at', ascending=False).head(5)
@@ -4,7 +4,8 @@ Generates detailed insights and analysis from core verbatim responses.
 This stage adds value through AI-generated insights without affecting the source of truth.
 """
 
-ANALYSIS_ENRICHMENT_PROMPT = """
+# Shared by the single-response and batch prompts
+ANALYSIS_ENRICHMENT_INSTRUCTIONS = """
 CRITICAL INSTRUCTIONS FOR ANALYSIS ENRICHMENT:
 - Analyze the provided verbatim response to generate comprehensive insights
 - Focus on extracting actionable intelligence and strategic value
@@ -61,7 +62,9 @@ Guidelines:
 - Provide detailed, comprehensive insights across all dimensions
 - Connect insights to broader business context and implications
 
-Verbatim response to analyze:
+"""
+
+ANALYSIS_ENRICHMENT_PROMPT = ANALYSIS_ENRICHMENT_INSTRUCTIONS + """Verbatim response to analyze:
 {verbatim_response}
 
 Subject: {subject}
@@ -69,6 +72,13 @@ Company: {company}
 Interviewee: {interviewee_name}
 """
 
+# Several responses per request; {responses} holds one block per response (see ModularProcessor)
+ANALYSIS_ENRICHMENT_BATCH_PROMPT = ANALYSIS_ENRICHMENT_INSTRUCTIONS + """BATCH MODE: several verbatim responses follow, each introduced by its response_id. Return ONLY a JSON array holding one analysis object in the format above per response, in the same order, each with that response's response_id.
+
+Verbatim responses to analyze:
+{responses}
+"""
+
 def get_analysis_enrichment_prompt(response_id: str, verbatim_response: str, subject: str, 
                                  company: str, interviewee_name: str) -> str:
     """Generate the analysis enrichment prompt with the provided parameters."""
@@ -4,7 +4,8 @@ Adds structured labels and classifications to responses for better organization
 This stage provides categorization without affecting the core data or analysis.
 """
 
-LABELING_PROMPT = """
+# Shared by the single-response and batch prompts
+LABELING_INSTRUCTIONS = """
 CRITICAL INSTRUCTIONS FOR RESPONSE LABELING:
 - Add structured labels to categorize and classify the response
 - Focus on objective, consistent labeling across multiple dimensions
@@ -93,7 +94,9 @@ Guidelines:
 - Focus on the primary topic and sentiment
 - Assess quality based on detail, specificity, and usefulness
 
-Response to label:
+"""
+
+LABELING_PROMPT = LABELING_INSTRUCTIONS + """Response to label:
 {verbatim_response}
 
 Subject: {subject}
@@ -101,6 +104,13 @@ Company: {company}
 Interviewee: {interviewee_name}
 """
 
+# Several responses per request; {responses} holds one block per response (see ModularProcessor)
+LABELING_BATCH_PROMPT = LABELING_INSTRUCTIONS + """BATCH MODE: several responses follow, each introduced by its response_id. Return ONLY a JSON array holding one labels object in the format above per response, in the same order, each with that response's response_id.
+
+Responses to label:
+{responses}
+"""
+
 def get_labeling_prompt(response_id: str, verbatim_response: str, subject: str, 
                        company: str, interviewee_name: str) -> str:
     """Generate the labeling prompt with the provided parameters."""
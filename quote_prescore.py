@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""
+Pre-score Cascade for Stage 2 Labeling
+
+Decides cheaply, before any LLM call, which quotes are not worth scoring:
+  1. stage1_filter - the Stage 1 low-value response filter (acknowledgements, filler, too short)
+  2. heuristic     - EnhancedQuoteScoring priority score below STAGE2_PRESCORE_SKIP_BELOW
+  3. llm           - everything else, i.e. quotes whose heuristic score is not clearly low
+Quotes stopped by tiers 1-2 get a zero-relevance label recording the deciding tier, and so
+never reach Stage 3 either (it only works on quotes with relevance_score > 0). A stable
+STAGE2_PRESCORE_AUDIT_RATE share of would-be-skipped quotes is still sent to the LLM, so
+evaluate_cascade() can keep measuring savings and agreement on quotes the LLM labelled:
+
+    python quote_prescore.py --client acme --sample 500
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from enhanced_stage1_processor import is_low_value_response
+from official_scripts.enhanced_quote_scoring import EnhancedQuoteScoring
+
+STAGE2_PRESCORE_CASCADE = os.getenv("STAGE2_PRESCORE_CASCADE", "false").lower() == "true"
+STAGE2_PRESCORE_SKIP_BELOW = float(os.getenv("STAGE2_PRESCORE_SKIP_BELOW", "2"))
+STAGE2_PRESCORE_AUDIT_RATE = float(os.getenv("STAGE2_PRESCORE_AUDIT_RATE", "0.05"))
+
+TIER_STAGE1_FILTER = 'stage1_filter'
+TIER_HEURISTIC = 'heuristic'
+TIER_LLM = 'llm'
+# An LLM label at or above this relevance is a costly miss if the cascade had skipped it
+HIGH_RELEVANCE = 3
+
+
+class PreScoreCascade:
+    """Deterministic tiers in front of the Stage 2 LLM; decide() is stable across runs"""
+
+    def __init__(self, skip_below: float = STAGE2_PRESCORE_SKIP_BELOW,
+                 audit_rate: float = STAGE2_PRESCORE_AUDIT_RATE):
+        self.skip_below = skip_below
+        self.audit_rate = audit_rate
+        self.scorer = EnhancedQuoteScoring()
+
+    def prescore(self, text: str) -> float:
+        """Heuristic priority score (0-13) of a quote's text"""
+        return float(self.scorer.calculate_quote_priority_score({'quote': text or ''})['total_score'])
+
+    def _audited(self, response_id: Any) -> bool:
+        digest = hashlib.sha256(str(response_id).encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') / 2 ** 32 < self.audit_rate
+
+    def decide(self, response_id: Any, text: str, audit: bool = True) -> Tuple[str, float]:
+        """(deciding tier, heuristic score); audited quotes go to the LLM whatever their score"""
+        score = self.prescore(text)
+        if is_low_value_response(text or ''):
+            tier = TIER_STAGE1_FILTER
+        elif score < self.skip_below:
+            tier = TIER_HEURISTIC
+        else:
+            tier = TIER_LLM
+        if tier != TIER_LLM and audit and self._audited(response_id):
+            tier = TIER_LLM
+        return tier, score
+
+    def split(self, quotes_df: pd.DataFrame, text_column: str = 'verbatim_response',
+              audit: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(quotes for the LLM, skipped quotes) with prescore_tier and prescore columns added"""
+        decisions = [self.decide(r, t, audit=audit) for r, t in zip(quotes_df['response_id'], quotes_df[text_column])]
+        quotes_df = quotes_df.assign(prescore_tier=[d[0] for d in decisions], prescore=[d[1] for d in decisions])
+        to_llm = quotes_df['prescore_tier'] == TIER_LLM
+        return quotes_df[to_llm], quotes_df[~to_llm]
+
+
+def llm_relevance(label: Dict[str, Any]) -> Optional[int]:
+    """Highest criterion relevance in a Stage 2 label (from relevance_explanation, else relevance_score)"""
+    try:
+        scores = json.loads(label.get('relevance_explanation') or '{}').get('all_relevance_scores') or {}
+        if scores:
+            return max(int(v or 0) for v in scores.values())
+    except (TypeError, ValueError, AttributeError):
+        pass
+    value = label.get('relevance_score')
+    return None if value is None or pd.isna(value) else int(value)
+
+
+def evaluate_cascade(quotes_df: pd.DataFrame, labels_df: pd.DataFrame, cascade: PreScoreCascade,
+                     sample_size: Optional[int] = None, seed: int = 0,
+                     text_column: str = 'verbatim_response') -> Dict[str, Any]:
+    """
+    Replay the cascade on quotes the LLM already labelled (optionally a random held-out sample).
+    savings: share the cascade would have decided without the LLM; agreement: share of those
+    the LLM also scored irrelevant (relevance 0); missed_high_relevance: skipped quotes the LLM
+    scored HIGH_RELEVANCE or more.
+    """
+    llm_labels = {}
+    for label in labels_df.to_dict('records'):
+        decided_by = label.get('decided_by')
+        if isinstance(decided_by, str) and decided_by != TIER_LLM:
+            continue
+        relevance = llm_relevance(label)
+        if relevance is not None:
+            quote_id = str(label.get('quote_id'))
+            llm_labels[quote_id] = max(relevance, llm_labels.get(quote_id, relevance))
+    held_out = quotes_df[quotes_df['response_id'].astype(str).isin(llm_labels)]
+    if sample_size and len(held_out) > sample_size:
+        held_out = held_out.sample(n=sample_size, random_state=seed)
+
+    by_tier = {TIER_STAGE1_FILTER: 0, TIER_HEURISTIC: 0, TIER_LLM: 0}
+    skipped = agreed = missed_high = 0
+    for response_id, text in zip(held_out['response_id'], held_out[text_column]):
+        tier, _ = cascade.decide(response_id, text, audit=False)
+        by_tier[tier] += 1
+        if tier == TIER_LLM:
+            continue
+        skipped += 1
+        relevance = llm_labels[str(response_id)]
+        agreed += relevance == 0
+        missed_high += relevance >= HIGH_RELEVANCE
+    return {
+        'sample': len(held_out),
+        'decided_by': by_tier,
+        'savings': round(skipped / len(held_out), 3) if len(held_out) else None,
+        'agreement': round(agreed / skipped, 3) if skipped else None,
+        'missed_high_relevance': missed_high,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the Stage 2 pre-score cascade against existing LLM labels")
+    parser.add_argument("--client", required=True, help="client_id to evaluate")
+    parser.add_argument("--sample", type=int, help="Random held-out sample size (default: every LLM-labelled quote)")
+    parser.add_argument("--skip-below", type=float, default=STAGE2_PRESCORE_SKIP_BELOW,
+                        help="Heuristic score below which quotes skip the LLM")
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed")
+    args = parser.parse_args()
+
+    from supabase_database import SupabaseDatabase
+    db = SupabaseDatabase()
+    quotes_df = db.get_stage1_data_responses(client_id=args.client, columns='text')
+    columns = ['quote_id', 'relevance_score', 'relevance_explanation']
+    if db.has_columns('stage2_response_labeling', ['decided_by']):
+        columns.append('decided_by')
+    labels_df = db.get_stage2_response_labeling(args.client, columns=columns)
+    report = evaluate_cascade(quotes_df, labels_df, PreScoreCascade(skip_below=args.skip_below),
+                              sample_size=args.sample, seed=args.seed)
+    print(f"🧪 Pre-score cascade on {report['sample']} LLM-labelled quotes for {args.client} "
+          f"(skip below {args.skip_below:g})")
+    for tier, count in report['decided_by'].items():
+        print(f"  {tier}: {count}")
+    if report['savings'] is not None:
+        print(f"💰 LLM calls saved: {report['savings']:.1%}")
+    if report['agreement'] is not None:
+        print(f"🤝 Agreement with LLM on skipped quotes: {report['agreement']:.1%} "
+              f"({report['missed_high_relevance']} skipped quotes the LLM rated {HIGH_RELEVANCE}+)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,14 @@
 import os
+import time
 import openai
 from pinecone import Pinecone
 import streamlit as st
+import pandas as pd
+from hybrid_retrieval import BM25Index, HybridRetriever, doc_key, rank_vector_matches
+from embedding_utils import (
+    LEGACY_NAMESPACE, NamespaceRegistry, check_namespace_vector,
+    embedding_request_kwargs, parse_embedding_namespace,
+)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or st.secrets["OPENAI_API_KEY"]
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY") or st.secrets["PINECONE_API_KEY"]
@@ -12,17 +19,28 @@ openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
 pc = Pinecone(api_key=PINECONE_API_KEY)
 index = pc.Index(PINECONE_INDEX)
+namespace_registry = NamespaceRegistry()
 
-def get_query_embedding(query):
-    response = openai_client.embeddings.create(input=query, model="text-embedding-ada-002")
-    return response.data[0].embedding
+def get_query_embedding(query, namespace=LEGACY_NAMESPACE):
+    # The query must be embedded with the same model/dimension as the namespace it searches
+    model, dimension = parse_embedding_namespace(namespace)
+    response = openai_client.embeddings.create(input=query, model=model, **embedding_request_kwargs(model, dimension))
+    embedding = response.data[0].embedding
+    check_namespace_vector(namespace, embedding)
+    return embedding
 
 def pinecone_rag_search(query, client_id, top_k=8):
-    query_emb = get_query_embedding(query)
+    return pinecone_rag_search_filtered(query, {"client_id": client_id}, top_k)
+
+def pinecone_rag_search_filtered(query, pc_filter, top_k):
+    # One registry lookup per query: embedding model and namespace always come from the same state
+    namespace = namespace_registry.resolve(pc_filter["client_id"])["namespace"]
+    query_emb = get_query_embedding(query, namespace)
     results = index.query(
         vector=query_emb,
         top_k=top_k,
-        filter={"client_id": client_id},
+        filter=pc_filter,
+        namespace=namespace,
         include_metadata=True
     )
     return results["matches"]
@@ -37,4 +55,64 @@ def build_rag_context(matches):
             context += f"Finding: {meta.get('finding_statement', '')}\n"
         elif meta["type"] == "theme":
             context += f"Theme: {meta.get('theme_statement', '')}\n"
-    return context 
\ No newline at end of file
+    return context 
+
+# ---------------------------------------------------------------------------
+# Hybrid BM25 + vector retrieval
+# ---------------------------------------------------------------------------
+
+RESPONSE_METADATA_COLUMNS = [
+    "id", "response_id", "client_id", "company", "interviewee_name", "deal_status", "sentiment",
+    "harmonized_subject", "question", "interview_id"
+]
+BM25_INDEX_TTL_SECONDS = int(os.getenv("BM25_INDEX_TTL_SECONDS", "600"))
+_bm25_cache = {}
+
+
+def get_bm25_index(client_id, refresh=False):
+    """
+    Per-client BM25 index over Stage 1 response text, rebuilt after BM25_INDEX_TTL_SECONDS.
+    Documents are keyed by the stage1 id, the record_id the embedders store on each vector.
+    """
+    cached = _bm25_cache.get(client_id)
+    if cached and not refresh and time.time() - cached[0] < BM25_INDEX_TTL_SECONDS:
+        return cached[1]
+    from supabase_database import SupabaseDatabase
+    df = SupabaseDatabase().get_stage1_data_responses(client_id=client_id, columns='text')
+    if df.empty or "verbatim_response" not in df.columns:
+        df = pd.DataFrame(columns=RESPONSE_METADATA_COLUMNS + ["verbatim_response"])
+    meta = df.reindex(columns=RESPONSE_METADATA_COLUMNS + ["verbatim_response"])
+    meta["type"] = "response"
+    doc_ids = [doc_key("response", rid) for rid in meta["id"]]
+    index_ = BM25Index(doc_ids, meta["verbatim_response"].fillna("").astype(str).tolist(), metadata=meta)
+    _bm25_cache[client_id] = (time.time(), index_)
+    return index_
+
+
+def _pinecone_vector_search(client_id, bm25, vector_meta):
+    """Adapter: Pinecone matches -> [(doc_key, score)], applying local metadata filters"""
+    def search(query, top_k, filters):
+        pc_filter = {"client_id": client_id}
+        if filters and "type" in filters:
+            pc_filter["type"] = filters["type"] if not isinstance(filters["type"], (list, tuple, set)) else {"$in": list(filters["type"])}
+        local = {k: v for k, v in (filters or {}).items() if k != "type"}
+        return rank_vector_matches(pinecone_rag_search_filtered(query, pc_filter, top_k), bm25, local, vector_meta)
+    return search
+
+
+def hybrid_rag_search(query, client_id, top_k=5, filters=None, fusion="rrf", weights=None, candidate_k=50):
+    """
+    Hybrid retrieval: BM25 over the client's response text fused with Pinecone similarity.
+    filters: metadata equality/membership, e.g. {"deal_status": "lost", "company": ["Acme", "Beta"]}.
+    Returns Pinecone-style matches ({id, score, metadata}) so build_rag_context works unchanged.
+    """
+    bm25 = get_bm25_index(client_id)
+    vector_meta = {}
+    retriever = HybridRetriever(bm25, _pinecone_vector_search(client_id, bm25, vector_meta),
+                                fusion=fusion, weights=weights, candidate_k=candidate_k)
+    matches = []
+    for key, score in retriever.search(query, top_k=top_k, filters=filters):
+        meta = bm25.document_metadata(key) or dict(vector_meta.get(key, {}))
+        meta = {k: (None if isinstance(v, float) and pd.isna(v) else v) for k, v in meta.items()}
+        matches.append({"id": key, "score": score, "metadata": meta})
+    return matches
@@ -1,48 +1,76 @@
-from fastapi import FastAPI, Request, BackgroundTasks
+from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 import os
 import openai
-from pinecone import Pinecone
 import uvicorn
 import logging
+from embedding_utils import (
+    LEGACY_NAMESPACE, NamespaceRegistry, check_namespace_vector,
+    embedding_request_kwargs, parse_embedding_namespace,
+)
+from embed_micro_batch import MicroBatchQueue
 
 # Load environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX", "client-voc-embeddings")
 
-# Initialize OpenAI and Pinecone
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX)
-
-app = FastAPI()
+# OpenAI and Pinecone clients, created by the worker's first flush rather than at import
+_openai_client = None
+_index = None
 
 logging.basicConfig(level=logging.INFO)
 
-# Utility: Generate embedding
-def get_embedding(text):
-    response = openai_client.embeddings.create(input=text, model="text-embedding-ada-002")
-    return response.data[0].embedding
-
-# Utility: Upsert to Pinecone
-def upsert_to_pinecone(record, embedding, record_type="finding"):
-    metadata = {
-        "type": record_type,
-        "client_id": record.get("client_id"),
-        "id": record.get("id"),
-        "finding_statement": record.get("finding_statement", ""),
-        "verbatim_response": record.get("verbatim_response", ""),
-        "theme_statement": record.get("theme_statement", "")
-    }
-    index.upsert(vectors=[{
-        "id": f"{record_type}-{record.get('id')}",
-        "values": embedding,
-        "metadata": metadata
-    }])
+namespace_registry = NamespaceRegistry()
+
+# Utility: Clients, created on first use
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+def get_index():
+    global _index
+    if _index is None:
+        from pinecone import Pinecone
+        _index = Pinecone(api_key=PINECONE_API_KEY).Index(PINECONE_INDEX)
+    return _index
+
+# Utility: Generate embeddings for many texts in one request, with the namespace's model
+def get_embeddings(texts, namespace=LEGACY_NAMESPACE):
+    model, dimension = parse_embedding_namespace(namespace)
+    response = get_openai_client().embeddings.create(input=texts, model=model,
+                                                     **embedding_request_kwargs(model, dimension))
+    embeddings = [item.embedding for item in response.data]
+    for emb in embeddings:
+        check_namespace_vector(namespace, emb)
+    return embeddings
+
+# Utility: Namespace a client's vectors are read from (and so must be written to)
+def resolve_namespace(client_id):
+    if not client_id:
+        return LEGACY_NAMESPACE
+    return namespace_registry.resolve(client_id)["namespace"]
+
+# Utility: Upsert a batch of vectors to Pinecone
+def upsert_to_pinecone(vectors, namespace=LEGACY_NAMESPACE):
+    get_index().upsert(vectors=vectors, namespace=namespace)
+
+embed_queue = MicroBatchQueue(get_embeddings, upsert_to_pinecone, namespace_fn=resolve_namespace)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    embed_queue.start()
+    yield
+    embed_queue.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/webhook")
-async def supabase_webhook(request: Request, background_tasks: BackgroundTasks):
+async def supabase_webhook(request: Request):
     payload = await request.json()
     logging.info(f"Received webhook payload: {payload}")
     # Supabase sends {record: {...}} for new/updated rows
@@ -55,16 +83,14 @@ async def supabase_webhook(request: Request, background_tasks: BackgroundTasks):
     text = record.get("finding_statement") or record.get("verbatim_response") or record.get("theme_statement")
     if not text:
         return JSONResponse({"error": "No text to embed in record"}, status_code=400)
-    # Process embedding and upsert in background
-    def embed_and_upsert():
-        try:
-            embedding = get_embedding(text)
-            upsert_to_pinecone(record, embedding, record_type)
-            logging.info(f"Upserted {record_type} {record.get('id')} to Pinecone.")
-        except Exception as e:
-            logging.error(f"Embedding/upsert failed: {e}")
-    background_tasks.add_task(embed_and_upsert)
-    return {"status": "ok", "message": f"Embedding/upsert for {record_type} {record.get('id')} scheduled."}
+    # Acknowledge immediately; the micro-batch worker embeds and upserts
+    if not embed_queue.put(record, record_type, text):
+        return JSONResponse({"error": "Embedding queue is full, retry later"}, status_code=503)
+    return {"status": "ok", "message": f"Embedding/upsert for {record_type} {record.get('id')} queued."}
+
+@app.get("/metrics")
+async def queue_metrics():
+    return embed_queue.metrics()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8080) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: quantized embedding storage
+Reports memory, query speed and recall@k of float16 / int8 / PCA-reduced variants
+against float32 brute-force search, with and without exact rerank.
+Uses synthetic topic-clustered vectors, or a client's stored stage1 embeddings with --client.
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from embedding_quantization import QuantizedMatrix
+
+
+def synthetic_corpus(n: int, dim: int, topics: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim))
+    labels = rng.integers(0, topics, size=n)
+    return (centers[labels] + rng.normal(scale=1.2, size=(n, dim))).astype(np.float32)
+
+
+def client_corpus(client_id: str) -> np.ndarray:
+    from supabase_database import SupabaseDatabase
+    db = SupabaseDatabase()
+    res = db.supabase.table('stage1_data_responses').select('embedding').eq('client_id', client_id).execute()
+    vecs = []
+    for row in res.data or []:
+        emb = row.get('embedding')
+        if isinstance(emb, str):
+            emb = json.loads(emb)
+        if emb:
+            vecs.append(emb)
+    return np.asarray(vecs, dtype=np.float32)
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    return float(np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)]))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark quantized embedding storage')
+    ap.add_argument('--client', help='Use this client\'s stage1 embeddings instead of synthetic vectors')
+    ap.add_argument('--n', type=int, default=50000)
+    ap.add_argument('--dim', type=int, default=1536)
+    ap.add_argument('--topics', type=int, default=200)
+    ap.add_argument('--queries', type=int, default=200)
+    ap.add_argument('--k', type=int, default=10)
+    ap.add_argument('--pca-dim', type=int, default=256)
+    args = ap.parse_args()
+
+    corpus = client_corpus(args.client) if args.client else synthetic_corpus(args.n, args.dim, args.topics)
+    if len(corpus) <= args.k:
+        print('Corpus too small to benchmark')
+        return 0
+    rng = np.random.default_rng(1)
+    queries = corpus[rng.choice(len(corpus), min(args.queries, len(corpus)), replace=False)]
+    queries = queries + rng.normal(scale=0.3, size=queries.shape).astype(np.float32)
+
+    base = QuantizedMatrix.from_matrix(corpus, mode='float32')
+    t0 = time.perf_counter()
+    truth = np.array([base.search(q, top_k=args.k)[0] for q in queries])
+    base_t = time.perf_counter() - t0
+
+    variants = [
+        ('float16', dict(mode='float16')),
+        ('int8', dict(mode='int8')),
+        (f'pca{args.pca_dim}+float16', dict(mode='float16', pca_dim=args.pca_dim)),
+        (f'pca{args.pca_dim}+int8', dict(mode='int8', pca_dim=args.pca_dim)),
+    ]
+    print(f"Corpus: {corpus.shape[0]} x {corpus.shape[1]} | queries={len(queries)} | k={args.k}")
+    print(f"{'variant':<20}{'MB':>9}{'saved':>8}{'ms/query':>10}{'recall@k':>10}{'rerank recall':>15}")
+    print(f"{'float32':<20}{base.nbytes / 1e6:>9.1f}{'0%':>8}{1000 * base_t / len(queries):>10.2f}{1.0:>10.3f}{'-':>15}")
+    for name, kwargs in variants:
+        qm = QuantizedMatrix.from_matrix(corpus, **kwargs)
+        t0 = time.perf_counter()
+        found = np.array([qm.search(q, top_k=args.k)[0] for q in queries])
+        elapsed = time.perf_counter() - t0
+        reranked = np.array([qm.search(q, top_k=args.k, rerank=4, exact=corpus)[0] for q in queries])
+        saved = 1 - qm.nbytes / base.nbytes
+        print(f"{name:<20}{qm.nbytes / 1e6:>9.1f}{saved:>7.0%}{1000 * elapsed / len(queries):>10.2f}"
+              f"{recall_at_k(truth, found):>10.3f}{recall_at_k(truth, reranked):>15.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
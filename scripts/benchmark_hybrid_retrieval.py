@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hybrid BM25 + vector retrieval
+Offline relevance (recall@k, MRR, precision@k) and latency for BM25-only, vector-only,
+RRF fusion and weighted fusion.
+
+Default corpus is synthetic interview responses where questions name exact products,
+competitors or SKU-like codes. A labelled set can be supplied instead:
+  --corpus-csv  columns: doc_id, text, embedding (JSON list)
+  --qrels-csv   columns: query, query_embedding (JSON list), relevant_ids (pipe-separated)
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from hybrid_retrieval import BM25Index, HybridRetriever
+
+TOPICS = {
+    'pricing': ['price', 'fees', 'cost', 'invoice', 'surcharge', 'discount', 'budget'],
+    'integration': ['api', 'webhook', 'sync', 'mapping', 'connector', 'endpoint', 'schema'],
+    'support': ['support', 'onboarding', 'ticket', 'response', 'training', 'documentation', 'manager'],
+    'reliability': ['outage', 'latency', 'uptime', 'timeout', 'errors', 'downtime', 'retries'],
+}
+ENTITIES = ['ShipStation', 'EasyPost', 'Shippo', 'Stamps.com', 'XPS-200', 'LBL-4410', 'Endicia', 'PB-Pro', 'Sendle', 'Veeqo']
+FILLER = ['really', 'honestly', 'team', 'month', 'customers', 'process', 'experience', 'overall', 'workflow', 'week']
+
+
+def synthetic_benchmark(n_docs: int, n_queries: int, dim: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    topic_names = list(TOPICS)
+    centers = {t: rng.normal(size=dim) for t in topic_names}
+    docs, embs, meta = [], [], []
+    for i in range(n_docs):
+        topic = topic_names[rng.integers(len(topic_names))]
+        entity = ENTITIES[rng.integers(len(ENTITIES))] if rng.random() < 0.6 else None
+        words = list(rng.choice(TOPICS[topic], size=4)) + list(rng.choice(FILLER, size=6))
+        if entity:
+            words.insert(int(rng.integers(len(words))), entity)
+        docs.append(' '.join(words))
+        # Embeddings carry the topic strongly and the entity only weakly, like real sentence embeddings
+        emb = centers[topic] + rng.normal(scale=0.9, size=dim)
+        embs.append(emb)
+        meta.append({'doc_id': f'response:{i}', 'topic': topic, 'entity': entity,
+                     'deal_status': 'lost' if rng.random() < 0.4 else 'won'})
+    meta = pd.DataFrame(meta)
+    queries = []
+    for _ in range(n_queries):
+        topic = topic_names[rng.integers(len(topic_names))]
+        entity = ENTITIES[rng.integers(len(ENTITIES))]
+        text = f"what did customers say about {entity} {rng.choice(TOPICS[topic])}"
+        relevant = set(meta.loc[(meta['entity'] == entity) & (meta['topic'] == topic), 'doc_id'])
+        if relevant:
+            queries.append((text, centers[topic] + rng.normal(scale=0.5, size=dim), relevant))
+    return meta['doc_id'].tolist(), docs, np.asarray(embs), meta, queries
+
+
+def labelled_benchmark(corpus_csv: str, qrels_csv: str):
+    corpus = pd.read_csv(corpus_csv)
+    qrels = pd.read_csv(qrels_csv)
+    embs = np.asarray([json.loads(e) for e in corpus['embedding']], dtype=np.float32)
+    queries = [(r['query'], np.asarray(json.loads(r['query_embedding'])), set(str(r['relevant_ids']).split('|')))
+               for _, r in qrels.iterrows()]
+    ids = corpus['doc_id'].astype(str).tolist()
+    return ids, corpus['text'].astype(str).tolist(), embs, corpus.drop(columns=['embedding']), queries
+
+
+def make_vector_search(doc_ids, embs, query_vectors):
+    unit = embs / np.maximum(np.linalg.norm(embs, axis=1, keepdims=True), 1e-9)
+
+    def search(query, top_k, filters):
+        q = query_vectors[query]
+        sims = unit @ (q / max(np.linalg.norm(q), 1e-9))
+        top = np.argsort(-sims)[:top_k]
+        return [(doc_ids[i], float(sims[i])) for i in top]
+    return search
+
+
+def evaluate(name, search_fn, queries, k):
+    recalls, mrrs, precs, lat = [], [], [], []
+    for text, _, relevant in queries:
+        t0 = time.perf_counter()
+        ranked = [d for d, _ in search_fn(text)][:k]
+        lat.append(1000 * (time.perf_counter() - t0))
+        hits = [d in relevant for d in ranked]
+        recalls.append(sum(hits) / min(len(relevant), k))
+        precs.append(sum(hits) / k)
+        mrrs.append(next((1.0 / (i + 1) for i, h in enumerate(hits) if h), 0.0))
+    print(f"{name:<18}{np.mean(recalls):>10.3f}{np.mean(mrrs):>8.3f}{np.mean(precs):>10.3f}"
+          f"{np.mean(lat):>10.2f}{np.percentile(lat, 95):>10.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark hybrid BM25 + vector retrieval')
+    ap.add_argument('--docs', type=int, default=20000)
+    ap.add_argument('--queries', type=int, default=300)
+    ap.add_argument('--dim', type=int, default=256)
+    ap.add_argument('--k', type=int, default=5)
+    ap.add_argument('--candidate-k', type=int, default=50)
+    ap.add_argument('--corpus-csv')
+    ap.add_argument('--qrels-csv')
+    args = ap.parse_args()
+
+    if args.corpus_csv and args.qrels_csv:
+        doc_ids, texts, embs, meta, queries = labelled_benchmark(args.corpus_csv, args.qrels_csv)
+    else:
+        doc_ids, texts, embs, meta, queries = synthetic_benchmark(args.docs, args.queries, args.dim)
+
+    t0 = time.perf_counter()
+    bm25 = BM25Index(doc_ids, texts, metadata=meta)
+    print(f"Corpus: {len(doc_ids)} docs | queries: {len(queries)} | BM25 build: {time.perf_counter() - t0:.2f}s")
+    vector_search = make_vector_search(doc_ids, embs, {q: v for q, v, _ in queries})
+    rrf = HybridRetriever(bm25, vector_search, fusion='rrf', candidate_k=args.candidate_k)
+    weighted = HybridRetriever(bm25, vector_search, fusion='weighted', candidate_k=args.candidate_k,
+                               weights={'bm25': 0.5, 'vector': 0.5})
+
+    print(f"{'retriever':<18}{'recall@k':>10}{'MRR':>8}{'prec@k':>10}{'ms avg':>10}{'ms p95':>10}")
+    evaluate('bm25', lambda q: bm25.search(q, top_k=args.k), queries, args.k)
+    evaluate('vector', lambda q: vector_search(q, args.k, None), queries, args.k)
+    evaluate('hybrid-rrf', lambda q: rrf.search(q, top_k=args.k), queries, args.k)
+    evaluate('hybrid-weighted', lambda q: weighted.search(q, top_k=args.k), queries, args.k)
+    # Over-fetching baseline: what analysts did before (large vector top_k)
+    evaluate('vector@4k', lambda q: vector_search(q, args.k * 4, None), queries, args.k * 4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
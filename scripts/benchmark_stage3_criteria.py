@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Stage 3 criteria scoring
+Scores synthetic interview quotes (default 5k and 50k) two ways and checks they agree:
+  per-quote - the previous approach: iterrows, then both scorers and the quality filter
+              wording checks for each quote in turn
+  columnar  - stage3_criteria_engine.criteria_matrix() over the whole column
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from stage3_criteria_engine import (
+    EVALUATION_ENGINE, BURIED_WINS_ENGINE, EVALUATION_RULES, BURIED_WINS_RULES, GENERIC_TERMS,
+    SPECIFIC_INDICATORS, PYARROW_AVAILABLE, criteria_matrix
+)
+
+FILLER = ('the we it was really just like you know so that our team this they had were '
+          'for with about then there thing lot some kind think going one also').split()
+METRICS = ['30%', '12 percent', '$500', '40 dollars', '3 hours', '2 days', '6 months', '2 years']
+
+
+def synthetic_quotes(n: int, seed: int = 11) -> pd.DataFrame:
+    """n quotes of 5-150 words, mostly filler with criteria terms and metrics mixed in"""
+    rng = np.random.default_rng(seed)
+    terms = [t for rules in (EVALUATION_RULES, BURIED_WINS_RULES) for tiers in rules.values()
+             for _, m in tiers if isinstance(m, list) for t in m] + GENERIC_TERMS + METRICS
+    vocabulary = np.array(FILLER * 8 + terms)
+    quotes = [' '.join(rng.choice(vocabulary, size=int(rng.integers(5, 150)))).capitalize() for _ in range(n)]
+    return pd.DataFrame({'response_id': [f"R{i}" for i in range(n)], 'verbatim_response': quotes})
+
+
+def per_quote(df: pd.DataFrame) -> pd.DataFrame:
+    rows = []
+    for _, row in df.iterrows():
+        text = row['verbatim_response'].lower()
+        evaluation = EVALUATION_ENGINE.score_text(text)
+        buried_wins = BURIED_WINS_ENGINE.score_text(text)
+        rows.append({**evaluation, **{f"buried_wins_{k}": v for k, v in buried_wins.items()},
+                     'criteria_met': sum(1 for v in evaluation.values() if v > 0),
+                     'buried_wins_total': sum(buried_wins.values()),
+                     'word_count': len(text.split()),
+                     'generic_term': any(t in text for t in GENERIC_TERMS),
+                     'specific_indicator': any(t in text for t in SPECIFIC_INDICATORS)})
+    return pd.DataFrame(rows, index=df.index)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Stage 3 criteria scoring")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[5_000, 50_000], help="Quote counts to score")
+    args = parser.parse_args()
+
+    print(f"🧪 String kernels: {'pyarrow' if PYARROW_AVAILABLE else 'python (pyarrow not installed)'}")
+    print(f"\n{'quotes':>8}{'per-quote s':>14}{'columnar s':>13}{'speedup':>10}  agree")
+    all_agree = True
+    for size in args.sizes:
+        df = synthetic_quotes(size)
+        reference, reference_s = timed(lambda: per_quote(df))
+        matrix, matrix_s = timed(lambda: criteria_matrix(df['verbatim_response']))
+        agree = bool((matrix[reference.columns].to_numpy() == reference.to_numpy()).all())
+        all_agree &= agree
+        print(f"{size:>8,}{reference_s:>14.3f}{matrix_s:>13.3f}{reference_s / matrix_s:>9.1f}x  {'✅' if agree else '❌'}")
+    return 0 if all_agree else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SubjectHarmonizer keyword matching
+Harmonizes a synthetic set of Stage 1 subjects (default 100k rows, drawn with the heavy
+repetition real interview subjects show) three ways and checks they agree:
+  per-category  - the previous approach: every category's keywords checked for every row
+  automaton     - harmonize_subject() row by row (one automaton scan per row)
+  series        - harmonize_series() over the whole column (each distinct subject scored once)
+"""
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from subject_harmonizer import SubjectHarmonizer
+
+MODIFIERS = ['', 'overall', 'our', 'the', 'ongoing', 'early', 'key', 'team', 'vendor', 'new']
+SUFFIXES = ['', 'issues', 'concerns', 'experience', 'feedback', 'gaps', 'questions', 'process']
+UNMATCHED = ['Weather', 'Office Move', 'Holiday Schedule', 'Hiring Plans', 'Board Meeting', 'Lunch']
+
+
+def synthetic_subjects(harmonizer: SubjectHarmonizer, n: int, vocabulary: int, seed: int = 7) -> pd.Series:
+    """n subjects drawn Zipf-style from a vocabulary built around the configured keywords"""
+    rng = np.random.default_rng(seed)
+    keywords = [k for p in harmonizer.patterns.values() for k in p.get('keywords', [])]
+    pool = set()
+    while len(pool) < vocabulary:
+        if rng.random() < 0.1:
+            base = str(rng.choice(UNMATCHED))
+        else:
+            base = ' '.join(str(k) for k in rng.choice(keywords, size=int(rng.integers(1, 3))))
+        words = [str(rng.choice(MODIFIERS)), base, str(rng.choice(SUFFIXES))]
+        subject = ' '.join(w for w in words if w)
+        pool.add(subject.title() if rng.random() < 0.5 else subject)
+    pool = sorted(pool)
+    weights = 1.0 / np.arange(1, len(pool) + 1)
+    return pd.Series(rng.choice(pool, size=n, p=weights / weights.sum()), name='subject')
+
+
+def per_category_match(harmonizer: SubjectHarmonizer, subject: str):
+    """The pre-automaton harmonize_subject decision, without tracking"""
+    cleaned = harmonizer._clean_subject(subject)
+    matches = [(c, harmonizer._calculate_pattern_match(cleaned, p)) for c, p in harmonizer.patterns.items()]
+    matches = sorted((m for m in matches if m[1] > 0), key=lambda m: m[1], reverse=True)
+    if matches and matches[0][1] >= harmonizer.harmonization_config.get('min_confidence_threshold', 0.6):
+        return matches[0][0]
+    return harmonizer.harmonization_config.get('default_category', 'Product Capabilities')
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SubjectHarmonizer matching strategies")
+    parser.add_argument("--subjects", type=int, default=100_000, help="Rows to harmonize")
+    parser.add_argument("--vocabulary", type=int, default=3_000, help="Distinct subjects in the synthetic set")
+    parser.add_argument("--config", default="config/subject_harmonization.yaml", help="Harmonization config")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    harmonizer = SubjectHarmonizer(args.config)
+    subjects = synthetic_subjects(harmonizer, args.subjects, args.vocabulary)
+    print(f"🧪 {len(subjects):,} subjects, {subjects.nunique():,} distinct, {len(harmonizer.patterns)} categories")
+
+    legacy, legacy_s = timed(lambda: [per_category_match(harmonizer, s) for s in subjects])
+    automaton, automaton_s = timed(lambda: [harmonizer.harmonize_subject(s)['harmonized_subject'] for s in subjects])
+    series, series_s = timed(lambda: harmonizer.harmonize_series(subjects)['harmonized_subject'].tolist())
+
+    print(f"\n{'strategy':<14}{'seconds':>10}{'rows/s':>14}{'speedup':>10}")
+    for name, seconds in [('per-category', legacy_s), ('automaton', automaton_s), ('series', series_s)]:
+        print(f"{name:<14}{seconds:>10.3f}{len(subjects) / seconds:>14,.0f}{legacy_s / seconds:>9.1f}x")
+
+    agree = legacy == automaton == series
+    print(f"\n{'✅' if agree else '❌'} Strategies {'agree on every row' if agree else 'DISAGREE'}")
+    return 0 if agree else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
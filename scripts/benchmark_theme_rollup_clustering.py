@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: interview theme rollup clustering
+Compares the NumPy CentroidClusterer against the original list-based greedy loop.
+- Verifies identical cluster assignments (synthetic themes, or a client's real rollup inputs with --client)
+- Reports wall time for the engine at 10k themes
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from interview_theme_rollup import _cluster_by_threshold, _jaccard, _normalize_text, _tokens
+
+
+def reference_cluster_by_threshold(embeddings: List[List[float]], tokens: List[set], threshold: float, min_token_overlap: float) -> List[int]:
+    """Original pure-Python greedy clustering (list centroids, per-centroid cosine)"""
+    def cosine(a, b):
+        a = np.array(a)
+        b = np.array(b)
+        na, nb = np.linalg.norm(a), np.linalg.norm(b)
+        if na == 0 or nb == 0:
+            return 0.0
+        return np.dot(a, b) / (na * nb)
+
+    assignments = [-1] * len(embeddings)
+    centroids = []
+    centroid_tokens = []
+    for i, emb in enumerate(embeddings):
+        if emb is None:
+            continue
+        best_idx, best_sim = -1, -1.0
+        for c_idx, c in enumerate(centroids):
+            cos = cosine(emb, c)
+            jac = _jaccard(tokens[i], centroid_tokens[c_idx])
+            if cos >= threshold and jac >= min_token_overlap and cos > best_sim:
+                best_sim, best_idx = cos, c_idx
+        if best_idx >= 0:
+            assignments[i] = best_idx
+            c = centroids[best_idx]
+            centroids[best_idx] = [(a + b) / 2.0 for a, b in zip(c, emb)]
+            centroid_tokens[best_idx] = centroid_tokens[best_idx] | tokens[i]
+        else:
+            centroids.append(emb)
+            centroid_tokens.append(set(tokens[i]))
+            assignments[i] = len(centroids) - 1
+    return assignments
+
+
+def synthetic_themes(n: int, dim: int, topics: int, seed: int = 42):
+    """Topic-clustered embeddings with matching token sets"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim))
+    vocab = [f"term{k}" for k in range(topics * 6)]
+    labels = rng.integers(0, topics, size=n)
+    embs = centers[labels] + rng.normal(scale=0.35, size=(n, dim))
+    toks = []
+    for lbl in labels:
+        base = vocab[lbl * 6:(lbl + 1) * 6]
+        extra = rng.choice(vocab, size=2, replace=False).tolist()
+        toks.append(set(rng.choice(base, size=4, replace=False).tolist()) | set(extra))
+    return embs.tolist(), toks
+
+
+def client_themes(client_id: str):
+    """Embeddings and tokens exactly as rollup_interview_themes builds them"""
+    from supabase_database import SupabaseDatabase
+    from embedding_utils import EmbeddingManager
+    db = SupabaseDatabase()
+    res = db.supabase.table('interview_level_themes').select('theme_statement').eq('client_id', client_id).execute()
+    texts = [_normalize_text(r.get('theme_statement') or '') for r in (res.data or [])]
+    embs = EmbeddingManager().get_embeddings_batch(texts, batch_size=50)
+    return embs, [_tokens(t) for t in texts]
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark interview theme rollup clustering')
+    ap.add_argument('--client', help='Also verify parity on this client\'s interview_level_themes')
+    ap.add_argument('--n', type=int, default=10000, help='Synthetic themes for the speed run (default: 10000)')
+    ap.add_argument('--dim', type=int, default=1536)
+    ap.add_argument('--topics', type=int, default=400)
+    ap.add_argument('--reference-n', type=int, default=1000, help='Themes to run through the slow reference loop')
+    ap.add_argument('--threshold', type=float, default=0.85)
+    ap.add_argument('--min-token-overlap', type=float, default=0.08)
+    ap.add_argument('--batch-size', type=int, default=256)
+    args = ap.parse_args()
+
+    embs, toks = synthetic_themes(args.n, args.dim, args.topics)
+
+    # Parity on a prefix the reference loop can finish in reasonable time
+    ref_n = min(args.reference_n, args.n)
+    ref, ref_t = timed(reference_cluster_by_threshold, embs[:ref_n], toks[:ref_n], args.threshold, args.min_token_overlap)
+    new, new_t = timed(_cluster_by_threshold, embs[:ref_n], toks[:ref_n], args.threshold, args.min_token_overlap, batch_size=args.batch_size)
+    print(f"Parity (synthetic, n={ref_n}): {'IDENTICAL' if ref == new else 'MISMATCH'} | clusters={max(new) + 1}")
+    print(f"  reference: {ref_t:.2f}s | numpy: {new_t:.3f}s | speedup: {ref_t / max(new_t, 1e-9):.0f}x")
+
+    if args.client:
+        c_embs, c_toks = client_themes(args.client)
+        c_ref = reference_cluster_by_threshold(c_embs, c_toks, args.threshold, args.min_token_overlap)
+        c_new = _cluster_by_threshold(c_embs, c_toks, args.threshold, args.min_token_overlap, batch_size=args.batch_size)
+        print(f"Parity ({args.client}, n={len(c_embs)}): {'IDENTICAL' if c_ref == c_new else 'MISMATCH'}")
+
+    for bs in (1, args.batch_size):
+        out, t = timed(_cluster_by_threshold, embs, toks, args.threshold, args.min_token_overlap, batch_size=bs)
+        print(f"NumPy engine n={args.n} batch_size={bs}: {t:.2f}s | clusters={max(out) + 1}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
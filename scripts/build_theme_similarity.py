@@ -7,7 +7,7 @@ import numpy as np
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from supabase_database import SupabaseDatabase
-from embedding_utils import EmbeddingManager
+from embedding_utils import EmbeddingManager, iter_similarity_pairs_above
 
 GENERIC = {
     'need','needs','fast','quick','easy','good','great','nice','help','use','work','really','very','best','better','more','less','much','many'
@@ -80,74 +80,92 @@ def assign_primary_facet(text: str) -> str:
     return sorted(facets).pop()
 
 
-def build_pairs(df: pd.DataFrame) -> pd.DataFrame:
-    # Produce cross product by subject and facet; avoid self-pairs
-    groups = []
-    for (subj, facet), g in df.groupby(['subject','facet']):
+def iter_scored_pairs(df: pd.DataFrame, matrix: np.ndarray, row_index: dict, min_cos: float = 0.85,
+                      min_jacc: float = 0.35, top_k: int = 5, block_size: int = 1024):
+    """
+    Yield scored candidate pairs (as DataFrames, one per similarity block) within each subject+facet group.
+
+    Each theme is embedded once (matrix rows); similarities are computed block-wise on
+    the upper triangle, so theme_id_a is always the earlier theme of a pair. Only pairs
+    clearing the cosine gate get token features. All pairs anchored on a theme fall in
+    the same block, so the per-anchor top-k cap can be applied before yielding.
+    """
+    tokens = [content_tokens(t) for t in df['theme_statement'].astype(str)]
+    ids = df['theme_id'].to_numpy()
+    for (subj, facet), g in df.groupby(['subject','facet'], sort=True):
         if len(g) < 2:
             continue
-        g = g.reset_index(drop=True)
-        left = g.assign(_key=1)
-        right = g.assign(_key=1)
-        pairs = left.merge(right, on=['_key','subject','facet'], suffixes=('_a','_b'))
-        pairs = pairs[pairs['theme_id_a'] != pairs['theme_id_b']]
-        groups.append(pairs.drop(columns=['_key']))
-    if not groups:
-        return pd.DataFrame()
-    out = pd.concat(groups, ignore_index=True)
-    # Dedupe unordered pairs early
-    out['pair_key'] = out.apply(lambda r: tuple(sorted([r['theme_id_a'], r['theme_id_b']])), axis=1)
-    out = out.drop_duplicates(subset=['pair_key'])
-    return out.drop(columns=['pair_key'])
-
-
-def score_pairs(pairs: pd.DataFrame, mgr: EmbeddingManager, min_cos: float = 0.85, min_jacc: float = 0.35) -> pd.DataFrame:
-    if pairs.empty:
-        return pairs
-    texts_a = pairs['theme_statement_a'].astype(str).tolist()
-    texts_b = pairs['theme_statement_b'].astype(str).tolist()
-    embs_a = mgr.get_embeddings_batch(texts_a, batch_size=100)
-    embs_b = mgr.get_embeddings_batch(texts_b, batch_size=100)
-    cos = []
-    for ea, eb in zip(embs_a, embs_b):
-        if ea is None or eb is None:
-            cos.append(0.0)
-        else:
-            cos.append(mgr.calculate_cosine_similarity(ea, eb))
-    pairs['cosine'] = cos
-    # token jaccard
-    tok_a = [content_tokens(t) for t in texts_a]
-    tok_b = [content_tokens(t) for t in texts_b]
-    jacc = []
-    domain_overlap = []
-    for ta, tb in zip(tok_a, tok_b):
-        if not ta or not tb:
-            jacc.append(0.0)
-            domain_overlap.append(0)
-            continue
-        inter = len(ta & tb)
-        union = len(ta | tb)
-        jacc.append((inter/union) if union else 0.0)
-        domain_overlap.append(len((ta & tb) & FACET_VOCAB))
-    pairs['jaccard'] = jacc
-    pairs['domain_overlap'] = domain_overlap
-    # Hard precision gates
-    gated = pairs[(pairs['cosine'] >= min_cos) & (pairs['jaccard'] >= min_jacc) & (pairs['domain_overlap'] >= 2)]
-    if gated.empty:
-        return gated
-    # Composite
-    gated['score'] = 0.6 * gated['cosine'] + 0.25 * gated['jaccard'] + 0.15 * (gated['domain_overlap'] > 0).astype(float)
-    # Keep top-k per anchor to avoid over-linking
-    gated = gated.sort_values(['theme_id_a','score'], ascending=[True, False])
-    gated['rank'] = gated.groupby('theme_id_a').cumcount() + 1
-    gated = gated[gated['rank'] <= 5].drop(columns=['rank'])
-    return gated
+        pos = g.index.to_numpy()
+        sub = matrix[[row_index[str(t)] for t in g['theme_statement']]]
+        for ii, jj, cos in iter_similarity_pairs_above(sub, min_cos, block_size=block_size):
+            if len(ii) == 0:
+                continue
+            a, b = pos[ii], pos[jj]
+            jacc = np.zeros(len(a))
+            domain = np.zeros(len(a), dtype=int)
+            for k, (x, y) in enumerate(zip(a, b)):
+                ta, tb = tokens[x], tokens[y]
+                if not ta or not tb:
+                    continue
+                inter = ta & tb
+                union = len(ta | tb)
+                jacc[k] = len(inter) / union if union else 0.0
+                domain[k] = len(inter & FACET_VOCAB)
+            # Hard precision gates (and no self-pairs on repeated theme ids)
+            keep = (jacc >= min_jacc) & (domain >= 2) & (ids[a] != ids[b])
+            if not keep.any():
+                continue
+            a, b = a[keep], b[keep]
+            out = pd.DataFrame({
+                'theme_id_a': ids[a],
+                'theme_id_b': ids[b],
+                'subject': subj,
+                'facet': facet,
+                'cosine': cos[keep].astype(float),
+                'jaccard': jacc[keep],
+                'domain_overlap': domain[keep],
+            })
+            # Composite
+            out['score'] = 0.6 * out['cosine'] + 0.25 * out['jaccard'] + 0.15 * (out['domain_overlap'] > 0).astype(float)
+            # Keep top-k per anchor to avoid over-linking
+            out = out.sort_values(['theme_id_a','score'], ascending=[True, False], kind='stable')
+            out = out[out.groupby('theme_id_a').cumcount() < top_k]
+            yield out
+
+
+def stream_similarity_rows(db: SupabaseDatabase, client_id: str, scored_blocks, min_score: float, chunk: int = 500) -> int:
+    """Upsert pairs above min_score into theme_similarity in bulk chunks as blocks arrive"""
+    buffer = []
+    written = 0
+    for block in scored_blocks:
+        block = block[block['score'] >= min_score]
+        for row in block.itertuples(index=False):
+            buffer.append({
+                'client_id': client_id,
+                'theme_id': row.theme_id_a,
+                'other_theme_id': row.theme_id_b,
+                'subject': row.subject,
+                'score': float(row.score),
+                'features_json': {
+                    'cosine': float(row.cosine),
+                    'jaccard': float(row.jaccard),
+                    'facet': row.facet,
+                    'domain_overlap': int(row.domain_overlap)
+                }
+            })
+        while len(buffer) >= chunk:
+            written += db.upsert_theme_similarity(buffer[:chunk])
+            buffer = buffer[chunk:]
+    if buffer:
+        written += db.upsert_theme_similarity(buffer)
+    return written
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument('--client', required=True)
     ap.add_argument('--min-score', type=float, default=0.82)
+    ap.add_argument('--block-size', type=int, default=1024, help='Rows per similarity block')
     args = ap.parse_args()
 
     db = SupabaseDatabase()
@@ -174,36 +192,16 @@ def main():
 
     # Assign facets
     all_df['facet'] = all_df['theme_statement'].astype(str).apply(assign_primary_facet)
+    all_df = all_df.reset_index(drop=True)
 
-    pairs = build_pairs(all_df)
-    if pairs.empty:
-        print('No pairs to score')
-        return 0
+    # One batched embedding pass per distinct theme statement
+    matrix, row_index = mgr.get_embedding_matrix(all_df['theme_statement'].astype(str).tolist(), batch_size=100)
 
-    pairs = score_pairs(pairs, mgr, min_cos=0.85, min_jacc=0.35)
-    # If nothing passed the gates, exit early
-    if pairs.empty or 'score' not in pairs.columns:
+    scored = iter_scored_pairs(all_df, matrix, row_index, min_cos=0.85, min_jacc=0.35, block_size=args.block_size)
+    count = stream_similarity_rows(db, args.client, scored, min_score=args.min_score)
+    if count == 0:
         print('No candidate pairs after precision gates')
         return 0
-    # Final score threshold
-    pairs = pairs[pairs['score'] >= args.min_score]
-
-    rows = []
-    for _, row in pairs.iterrows():
-        rows.append({
-            'client_id': args.client,
-            'theme_id': row['theme_id_a'],
-            'other_theme_id': row['theme_id_b'],
-            'subject': row['subject'],
-            'score': float(row['score']),
-            'features_json': {
-                'cosine': float(row['cosine']),
-                'jaccard': float(row['jaccard']),
-                'facet': row.get('facet'),
-                'domain_overlap': int(row.get('domain_overlap', 0))
-            }
-        })
-    count = db.upsert_theme_similarity(rows)
     print(f"Upserted {count} similarity rows for {args.client}")
     return 0
 
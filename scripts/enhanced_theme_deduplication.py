@@ -19,7 +19,7 @@ from dataclasses import dataclass
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from supabase_database import SupabaseDatabase
-from embedding_utils import EmbeddingManager
+from embedding_utils import EmbeddingManager, similarity_pairs_above
 
 @dataclass
 class MergeSuggestion:
@@ -192,6 +192,9 @@ class EnhancedThemeDeduplicator:
         if mergeable_df.empty:
             return []
         
+        # Embed every mergeable statement once; pair gates below read from this matrix
+        self._build_embedding_matrix(mergeable_df['theme_statement'].astype(str).tolist())
+        
         suggestions = []
         
         # First: within-subject merges (same subject + facet) - BALANCED GATES
@@ -199,39 +202,33 @@ class EnhancedThemeDeduplicator:
             if len(group) < 2:
                 continue
             
-            # Generate all pairs within this subject+facet group
-            for i in range(len(group)):
-                for j in range(i + 1, len(group)):
-                    theme_a = group.iloc[i]
-                    theme_b = group.iloc[j]
-                    
-                    # Within-subject: use passed min_cosine + noun-phrase Jaccard ≥0.15 (relaxed to catch real duplicates)
-                    suggestion = self._create_merge_suggestion(theme_a, theme_b, subject, facet, 
-                                                           min_cosine=min_cosine, min_jaccard=0.15)
-                    if suggestion:  # Temporarily disable hard conflict rules for debugging
-                        suggestions.append(suggestion)
+            # Only pairs that already clear the cosine gate reach the multi-signal scoring
+            for i, j in self._candidate_pairs(group, min_cosine):
+                theme_a = group.iloc[i]
+                theme_b = group.iloc[j]
+                
+                # Within-subject: use passed min_cosine + noun-phrase Jaccard ≥0.15 (relaxed to catch real duplicates)
+                suggestion = self._create_merge_suggestion(theme_a, theme_b, subject, facet, 
+                                                       min_cosine=min_cosine, min_jaccard=0.15)
+                if suggestion:  # Temporarily disable hard conflict rules for debugging
+                    suggestions.append(suggestion)
         
         # Second: cross-subject merges (same facet, different subjects) - BALANCED GATES
         for facet, group in mergeable_df.groupby('primary_facet'):
             if len(group) < 2:
                 continue
             
-            # Only consider cross-subject merges for high-similarity pairs
-            for i in range(len(group)):
-                for j in range(i + 1, len(group)):
-                    theme_a = group.iloc[i]
-                    theme_b = group.iloc[j]
-                    
-                    # Skip if same subject (already handled above)
-                    if theme_a['subject'] == theme_b['subject']:
-                        continue
-                    
-                    # Cross-subject: ≥0.72 cosine + entity overlap ≥0.20 (relaxed to catch semantic duplicates)
-                    suggestion = self._create_merge_suggestion(theme_a, theme_b, 
-                                                           f"Cross-subject: {theme_a['subject']} + {theme_b['subject']}", 
-                                                           facet, min_cosine=0.72, min_entity_overlap=0.20)
-                    if suggestion:  # Temporarily disable hard conflict rules for debugging
-                        suggestions.append(suggestion)
+            # Only consider cross-subject merges for high-similarity pairs (same-subject pairs handled above)
+            for i, j in self._candidate_pairs(group, 0.72, cross_subject=True):
+                theme_a = group.iloc[i]
+                theme_b = group.iloc[j]
+                
+                # Cross-subject: ≥0.72 cosine + entity overlap ≥0.20 (relaxed to catch semantic duplicates)
+                suggestion = self._create_merge_suggestion(theme_a, theme_b, 
+                                                       f"Cross-subject: {theme_a['subject']} + {theme_b['subject']}", 
+                                                       facet, min_cosine=0.72, min_entity_overlap=0.20)
+                if suggestion:  # Temporarily disable hard conflict rules for debugging
+                    suggestions.append(suggestion)
         
         # Apply mutual nearest neighbors (MNN) + top-K filtering
         suggestions = self._apply_mnn_filtering(suggestions, k=2)
@@ -247,11 +244,30 @@ class EnhancedThemeDeduplicator:
         
         return suggestions
 
+    def _build_embedding_matrix(self, statements: List[str], batch_size: int = 100):
+        """Embed each distinct theme statement once (batched) into a normalized matrix"""
+        self._embedding_matrix, self._statement_index = self.mgr.get_embedding_matrix(statements, batch_size=batch_size)
+
+    def _candidate_pairs(self, group: pd.DataFrame, min_cosine: float, cross_subject: bool = False,
+                         block_size: int = 2048) -> List[Tuple[int, int]]:
+        """Positional (i, j) pairs within a group whose cosine clears min_cosine, via blocked matrix products"""
+        rows = np.array([self._statement_index[str(t)] for t in group['theme_statement']])
+        subjects = group['subject'].to_numpy()
+        pair_mask = None
+        if cross_subject:
+            pair_mask = lambda r, c: subjects[r][:, None] != subjects[c][None, :]
+        ii, jj, _ = similarity_pairs_above(self._embedding_matrix[rows], min_cosine,
+                                           block_size=block_size, pair_mask=pair_mask)
+        return list(zip(ii.tolist(), jj.tolist()))
+
     def _calculate_cosine_similarity(self, text_a: str, text_b: str) -> float:
         """Calculate cosine similarity between two theme statements"""
+        index = getattr(self, '_statement_index', {})
+        if str(text_a) in index and str(text_b) in index:
+            matrix = self._embedding_matrix
+            return float(matrix[index[str(text_a)]] @ matrix[index[str(text_b)]])
         try:
-            emb_a = self.mgr.get_embeddings_batch([text_a], batch_size=1)[0]
-            emb_b = self.mgr.get_embeddings_batch([text_b], batch_size=1)[0]
+            emb_a, emb_b = self.mgr.get_embeddings_batch([text_a, text_b], batch_size=2)
             
             if emb_a is None or emb_b is None:
                 return 0.0
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+"""
+Token-budgeted Batch Planning for Stage 2
+
+Packs quotes into LLM requests by estimated tokens instead of a fixed count. Each batch
+stays under the request's input budget, and under the output budget at an expected number
+of response tokens per quote, so short quotes share a request while long quotes are sent
+whole rather than truncated. The per-batch quote cap adapts to parse failures: a failed
+batch halves the cap and is requeued, so it is retried in smaller pieces, and a run of clean
+batches grows the cap back. All analyzers share llm_request_slots, so concurrent batches never exceed
+STAGE2_MAX_CONCURRENT_REQUESTS in-flight requests per process.
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Iterable, List, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+STAGE2_MAX_INPUT_TOKENS = int(os.getenv("STAGE2_MAX_INPUT_TOKENS", "12000"))
+STAGE2_MAX_OUTPUT_TOKENS = int(os.getenv("STAGE2_MAX_OUTPUT_TOKENS", "12000"))
+STAGE2_OUTPUT_TOKENS_PER_QUOTE = int(os.getenv("STAGE2_OUTPUT_TOKENS_PER_QUOTE", "450"))
+STAGE2_MAX_CONCURRENT_REQUESTS = int(os.getenv("STAGE2_MAX_CONCURRENT_REQUESTS", "4"))
+# Consecutive clean batches before the quote cap grows again
+STAGE2_GROW_AFTER = 3
+
+llm_request_slots = threading.BoundedSemaphore(STAGE2_MAX_CONCURRENT_REQUESTS)
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, else ~4 characters per token"""
+    global _encoding, TIKTOKEN_AVAILABLE
+    if TIKTOKEN_AVAILABLE and _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # Encoding files are fetched on first use; offline, fall back to the estimate
+            TIKTOKEN_AVAILABLE = False
+    if _encoding is not None:
+        return len(_encoding.encode(text or "", disallowed_special=()))
+    return max(1, len(text or "") // 4)
+
+
+class BatchPlanner:
+    """
+    Thread-safe queue of (item, input_tokens) handing out token-budgeted batches.
+    Workers loop on next_batch() until it returns [], calling record() and done() after each
+    batch, and requeue() first for a batch whose response could not be parsed.
+    """
+
+    def __init__(self, overhead_tokens: int, max_quotes: int = 50,
+                 max_input_tokens: int = STAGE2_MAX_INPUT_TOKENS,
+                 max_output_tokens: int = STAGE2_MAX_OUTPUT_TOKENS,
+                 output_tokens_per_quote: int = STAGE2_OUTPUT_TOKENS_PER_QUOTE):
+        self.overhead_tokens = overhead_tokens
+        self.max_quotes = max(1, min(max_quotes, max_output_tokens // output_tokens_per_quote))
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.output_tokens_per_quote = output_tokens_per_quote
+        self.quote_cap = self.max_quotes
+        self.failures = 0
+        self._clean = 0
+        self._queue: Deque[Tuple[Any, int]] = deque()
+        self._tokens = {}
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def add(self, items: Iterable[Tuple[Any, int]]):
+        with self._cond:
+            for item, tokens in items:
+                self._tokens[item] = tokens
+                self._queue.append((item, tokens))
+            self._cond.notify_all()
+
+    def plan_size(self) -> int:
+        """Batches the queued items would take at the current cap (for progress reporting)"""
+        with self._cond:
+            batches, size, tokens = 0, 0, 0
+            for _, t in self._queue:
+                if size and (size >= self.quote_cap or self.overhead_tokens + tokens + t > self.max_input_tokens):
+                    batches, size, tokens = batches + 1, 0, 0
+                size, tokens = size + 1, tokens + t
+            return batches + (1 if size else 0)
+
+    def next_batch(self) -> List[Any]:
+        """
+        Next batch in queue order: at least one item, then as many as fit the input budget and
+        the quote cap. Blocks while other workers' batches may still be requeued; [] when done.
+        """
+        with self._cond:
+            while not self._queue and self._in_flight:
+                self._cond.wait()
+            batch, tokens = [], self.overhead_tokens
+            while self._queue and len(batch) < self.quote_cap:
+                item, item_tokens = self._queue[0]
+                if batch and tokens + item_tokens > self.max_input_tokens:
+                    break
+                self._queue.popleft()
+                batch.append(item)
+                tokens += item_tokens
+            if batch:
+                self._in_flight += 1
+            return batch
+
+    def output_budget(self, size: int) -> int:
+        """max_tokens for a request of size quotes"""
+        return min(self.max_output_tokens, self.output_tokens_per_quote * size + 500)
+
+    def requeue(self, items: List[Any]):
+        """Put items back at the front of the queue (call before done() for their batch)"""
+        with self._cond:
+            for item in reversed(items):
+                self._queue.appendleft((item, self._tokens[item]))
+            self._cond.notify_all()
+
+    def record(self, size: int, ok: bool):
+        """Adapt the quote cap to a batch outcome: halve below a failed size, grow after clean runs"""
+        with self._cond:
+            if not ok:
+                self.failures += 1
+                self._clean = 0
+                self.quote_cap = max(1, min(self.quote_cap, size // 2))
+                return
+            self._clean += 1
+            if self._clean >= STAGE2_GROW_AFTER and self.quote_cap < self.max_quotes:
+                self.quote_cap = min(self.max_quotes, self.quote_cap + max(1, self.quote_cap // 4))
+                self._clean = 0
+
+    def done(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+"""
+Stage 2 Input Hashes for VOC Pipeline
+
+Every Stage 2 label records what it was computed from: content_hash (the quote text),
+criteria_hash (the rubric in config/analysis_config.yaml, ignoring operational settings
+such as worker counts) and prompt_hash (the prompt template and model). plan_rescore()
+compares those with the current inputs, so a run re-scores exactly the quotes whose inputs
+changed and can report the size of the delta before any tokens are spent.
+Columns: add_stage2_input_hashes_migration.sql.
+"""
+
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Resolved from this module, not the working directory: a job started elsewhere must hash the same rubric
+ANALYSIS_CONFIG_PATH = str(Path(__file__).resolve().parent / "config" / "analysis_config.yaml")
+# Config sections that change how Stage 2 runs, not what a label means
+OPERATIONAL_CONFIG_KEYS = ('processing', 'quality_tracking')
+HASH_COLUMNS = ('content_hash', 'criteria_hash', 'prompt_hash')
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def content_hash(text: Any) -> str:
+    """Hash of a quote's text (surrounding whitespace ignored)"""
+    return _digest(str(text or '').strip())
+
+
+def criteria_hash(config_path: str = ANALYSIS_CONFIG_PATH) -> str:
+    """
+    Hash of the rubric sections of the analysis config, independent of YAML formatting and comments.
+    Raises FileNotFoundError when the config is missing: hashing a stand-in would mark every
+    existing label criteria_changed and re-score the whole client.
+    """
+    try:
+        with open(config_path) as f:
+            raw = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Stage 2 rubric config not found at {config_path}; "
+                                f"cannot plan re-scoring by criteria hash") from None
+    if not YAML_AVAILABLE:
+        return _digest(raw)
+    config = yaml.safe_load(raw) or {}
+    rubric = {k: v for k, v in config.items() if k not in OPERATIONAL_CONFIG_KEYS}
+    return _digest(json.dumps(rubric, sort_keys=True, default=str))
+
+
+def prompt_hash(*parts: str) -> str:
+    """Hash of a prompt template's parts (system prompt, headers, model name, ...)"""
+    return _digest('\x1f'.join(parts))
+
+
+def plan_rescore(quotes_df: pd.DataFrame, labels_df: pd.DataFrame, criteria: str, prompt: str,
+                 text_column: str = 'verbatim_response',
+                 rescore_unhashed: bool = False) -> Tuple[List[Any], Dict[str, int]]:
+    """
+    response_ids to (re-)score and a summary of why. Each quote falls in one bucket, in
+    order: new (no labels), text_changed, criteria_changed, prompt_changed, unhashed
+    (labelled before hashes were recorded; re-scored only with rescore_unhashed) or unchanged.
+    """
+    summary = {'new': 0, 'text_changed': 0, 'criteria_changed': 0, 'prompt_changed': 0,
+               'unhashed': 0, 'unchanged': 0}
+    recorded: Dict[str, Dict[str, Optional[str]]] = {}
+    if not labels_df.empty:
+        for row in labels_df.to_dict('records'):
+            # A quote's labels share one set of hashes; keep the first seen
+            recorded.setdefault(str(row.get('quote_id')), {c: row.get(c) for c in HASH_COLUMNS})
+    rescore = []
+    for row in quotes_df.to_dict('records'):
+        response_id = row['response_id']
+        seen = recorded.get(str(response_id))
+        if seen is None:
+            reason = 'new'
+        elif not any(isinstance(seen[c], str) for c in HASH_COLUMNS):
+            reason = 'unhashed'
+        elif seen['content_hash'] != content_hash(row.get(text_column)):
+            reason = 'text_changed'
+        elif seen['criteria_hash'] != criteria:
+            reason = 'criteria_changed'
+        elif seen['prompt_hash'] != prompt:
+            reason = 'prompt_changed'
+        else:
+            reason = 'unchanged'
+        summary[reason] += 1
+        if reason not in ('unchanged', 'unhashed') or (reason == 'unhashed' and rescore_unhashed):
+            rescore.append(response_id)
+    return rescore, summary
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+"""
+Columnar Criteria Engine for Stage 3 Findings
+
+Scores a whole client's quotes at once instead of one quote at a time. Each criterion is a
+list of (points, terms) tiers, the first matching tier winning, and every tier is compiled to a
+single regex alternation. Over a pyarrow-backed string column, Series.str.contains runs that
+regex for every quote in one vectorized call. The result is a criteria-score matrix (one row
+per quote) holding:
+  - the eight evaluation criteria (Stage3FindingsAnalyzer._evaluate_quote_against_criteria)
+  - the six Buried Wins criteria, prefixed buried_wins_ (_score_quote_buried_wins)
+  - criteria_met, buried_wins_total, word_count and the generic/specific wording flags
+    used by the Stage 3 quality filters
+score_text() applies the same rules to one text and is what the per-quote methods use, so
+both paths share one rule table. scripts/benchmark_stage3_criteria.py checks they agree.
+"""
+
+import re
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 (vectorized string kernels for Series.str)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+TEXT_DTYPE = "string[pyarrow]" if PYARROW_AVAILABLE else object
+
+# criterion -> [(points, terms or regex)]; terms match as plain substrings of the lower-cased text
+Rules = Dict[str, List[Tuple[int, object]]]
+
+EVALUATION_RULES: Rules = {
+    # New/unexpected observation that challenges assumptions
+    'novelty': [
+        (3, ['unexpected', 'surprised', 'didn\'t know', 'new', 'first time', 'never seen', 'contrary to',
+             'challenged our', 'assumption']),
+        (2, ['unusual', 'different', 'unlike', 'contrary', 'challenge']),
+    ],
+    # Clear step, fix, or action client could take
+    'actionability': [
+        (2, ['need', 'want', 'would like', 'should have', 'could improve', 'integration', 'feature', 'workflow']),
+        (1, ['problem', 'issue', 'challenge', 'difficulty', 'friction']),
+    ],
+    # Precise, detailed, not generic
+    'specificity': [
+        (2, ['transcript', 'transcription', 'accuracy', 'turnaround', 'timeline', 'integration', 'api',
+             'security', 'compliance', 'soc2', 'hipaa']),
+        (1, ['feature', 'function', 'tool', 'system', 'platform', 'software']),
+    ],
+    # Business impact affecting revenue, satisfaction, retention, competitive positioning
+    'materiality': [
+        (2, ['$', 'dollar', 'cost', 'price', 'budget', 'revenue', 'churn', 'retention', 'deal', 'win', 'loss']),
+        (1, ['attorney', 'lawyer', 'partner', 'firm', 'practice', 'client', 'case']),
+    ],
+    # Evaluated across responses in pattern analysis, never per quote
+    'recurrence': [],
+    'stakeholder_weight': [
+        (1, ['attorney', 'lawyer', 'partner', 'firm owner', 'managing partner', 'senior']),
+    ],
+    # Tension around competitors, business conditions, or tradeoffs
+    'tension_contrast': [
+        (3, ['competitor', 'turbo scribe', 'otter', 'westlaw', 'mycase', 'clio', 'dropbox', 'salesforce',
+             'zoom', 'teams']),
+        (2, ['but', 'however', 'despite', 'even though', 'trade-off', 'dilemma', 'conflict']),
+    ],
+    'metric_quantification': [
+        (1, ['%', 'percent', 'percentage', 'hours', 'days', 'weeks', 'months', 'years', 'minutes', 'seconds',
+             'number', 'amount', 'quantity', 'count', 'total', 'sum']),
+    ],
+}
+
+BURIED_WINS_RULES: Rules = {
+    'novelty': [(3, ['unexpected', 'surprising', 'contrary to', 'challenges', 'assumption', 'previously thought'])],
+    'tension_contrast': [(3, ['competitor', 'versus', 'instead of', 'chose', 'over', 'despite', 'even though',
+                              'trade-off'])],
+    'materiality': [(2, ['revenue', 'cost', 'budget', 'deal', 'churn', 'retention', 'ceo', 'vp', 'director',
+                         'executive'])],
+    'actionability': [(2, ['need', 'should', 'could', 'would', 'improve', 'fix', 'change', 'add', 'implement'])],
+    'specificity': [(2, ['specific', 'particular', 'exact', 'named', 'integration', 'feature', 'workflow'])],
+    'metric_quantification': [(1, re.compile(r'\d+%|\d+ percent|\$\d+|\d+ dollars|\d+ hours|\d+ days|\d+ months|\d+ years'))],
+}
+
+# Stage 3 quality filter wording: generic praise/complaint vs. words that signal specifics
+GENERIC_TERMS = ['good', 'bad', 'okay', 'fine', 'nice', 'great', 'terrible']
+SPECIFIC_INDICATORS = ['because', 'when', 'if', 'since', 'while', 'although', 'however', 'but', 'and', 'or']
+
+
+def _pattern(matcher) -> str:
+    """Regex source for a tier: a compiled regex as is, a term list as an escaped alternation"""
+    if isinstance(matcher, re.Pattern):
+        return matcher.pattern
+    return '|'.join(re.escape(term) for term in matcher)
+
+
+def _matches(matcher, text: str) -> bool:
+    if isinstance(matcher, re.Pattern):
+        return matcher.search(text) is not None
+    return any(term in text for term in matcher)
+
+
+class CriteriaEngine:
+    """One rule table compiled for both single texts and whole columns"""
+
+    def __init__(self, rules: Rules):
+        self.criteria = list(rules)
+        self.tiers = {criterion: [(points, _pattern(m)) for points, m in tiers] for criterion, tiers in rules.items()}
+        # Single texts: substring checks are cheaper than a regex alternation
+        self._matchers = {criterion: [(points, m if isinstance(m, re.Pattern) else tuple(m)) for points, m in tiers]
+                          for criterion, tiers in rules.items()}
+
+    def score_text(self, text: str) -> Dict[str, int]:
+        """Scores of one already lower-cased text"""
+        scores = {}
+        for criterion, tiers in self._matchers.items():
+            scores[criterion] = next((points for points, m in tiers if _matches(m, text)), 0)
+        return scores
+
+    def score(self, lowered: pd.Series) -> pd.DataFrame:
+        """Score matrix (int8, same index) of a lower-cased text column"""
+        columns = {}
+        for criterion, tiers in self.tiers.items():
+            scores = np.zeros(len(lowered), dtype=np.int8)
+            # Lowest tier first so higher tiers overwrite: same as first-match-wins
+            for points, pattern in reversed(tiers):
+                scores[contains(lowered, pattern)] = points
+            columns[criterion] = scores
+        return pd.DataFrame(columns, index=lowered.index)
+
+
+def lower_texts(texts: Sequence) -> pd.Series:
+    """Lower-cased text column in the engine's string dtype (missing texts become '')"""
+    texts = texts if isinstance(texts, pd.Series) else pd.Series(list(texts))
+    return texts.astype(object).where(texts.notna(), '').astype(str).str.lower().astype(TEXT_DTYPE)
+
+
+def contains(lowered: pd.Series, pattern: str) -> np.ndarray:
+    return lowered.str.contains(pattern, regex=True).to_numpy(dtype=bool, na_value=False)
+
+
+EVALUATION_ENGINE = CriteriaEngine(EVALUATION_RULES)
+BURIED_WINS_ENGINE = CriteriaEngine(BURIED_WINS_RULES)
+BURIED_WINS_PREFIX = 'buried_wins_'
+
+
+def criteria_matrix(texts: Sequence) -> pd.DataFrame:
+    """Every Stage 3 criteria signal for a column of quote texts (see module docstring)"""
+    lowered = lower_texts(texts)
+    evaluation = EVALUATION_ENGINE.score(lowered)
+    buried_wins = BURIED_WINS_ENGINE.score(lowered)
+    matrix = pd.concat([evaluation, buried_wins.add_prefix(BURIED_WINS_PREFIX)], axis=1)
+    matrix['criteria_met'] = (evaluation > 0).sum(axis=1).astype(np.int8)
+    matrix['buried_wins_total'] = buried_wins.sum(axis=1).astype(np.int16)
+    matrix['word_count'] = lowered.str.split().str.len().fillna(0).astype(np.int32).to_numpy()
+    matrix['generic_term'] = contains(lowered, _pattern(GENERIC_TERMS))
+    matrix['specific_indicator'] = contains(lowered, _pattern(SPECIFIC_INDICATORS))
+    return matrix
+
+
+def evaluation_scores(row: pd.Series) -> Dict[str, int]:
+    """A matrix row's evaluation criteria as a plain dict (JSON-safe ints)"""
+    return {criterion: int(row[criterion]) for criterion in EVALUATION_ENGINE.criteria}
+
+
+def buried_wins_scores(row: pd.Series) -> Dict[str, int]:
+    """A matrix row's Buried Wins criteria as a plain dict (JSON-safe ints)"""
+    return {criterion: int(row[BURIED_WINS_PREFIX + criterion]) for criterion in BURIED_WINS_ENGINE.criteria}
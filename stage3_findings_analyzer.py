@@ -2,11 +2,12 @@
 
 import os
 import json
+import math
+import time
+import threading
 import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
 import logging
 from typing import Dict, List, Optional, Tuple, Set, Any
 import yaml
@@ -14,14 +15,15 @@ from collections import defaultdict, Counter
 import re
 import pprint
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.cluster import AgglomerativeClustering
-from sklearn.metrics.pairwise import cosine_similarity
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings('ignore')
 
 # Import Supabase database manager
 from supabase_database import SupabaseDatabase
+from stage3_criteria_engine import (
+    EVALUATION_ENGINE, BURIED_WINS_ENGINE, criteria_matrix, evaluation_scores, buried_wins_scores
+)
 # from interviewee_metadata_loader import IntervieweeMetadataLoader  # Commented out - not needed for production
 
 load_dotenv()
@@ -30,22 +32,28 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Buried Wins finding generation: concurrent LLM calls, and retries per finding before the template fallback
+STAGE3_LLM_MAX_CONCURRENCY = int(os.getenv("STAGE3_LLM_MAX_CONCURRENCY", "8"))
+STAGE3_LLM_MAX_RETRIES = int(os.getenv("STAGE3_LLM_MAX_RETRIES", "2"))
+STAGE3_LLM_RETRY_BACKOFF = float(os.getenv("STAGE3_LLM_RETRY_BACKOFF", "1.0"))
+
 class Stage3FindingsAnalyzer:
     """
     Stage 3: Enhanced Findings Identification with Buried Wins Criteria v4.0
     Automated confidence scoring and executive-ready insights
     """
     
-    def __init__(self, config_path="config/analysis_config.yaml"):
+    def __init__(self, config_path="config/analysis_config.yaml", llm_max_concurrency: int = STAGE3_LLM_MAX_CONCURRENCY,
+                 llm_max_retries: int = STAGE3_LLM_MAX_RETRIES):
         self.config_path = config_path
+        self.llm_max_concurrency = max(1, llm_max_concurrency)
+        self.llm_max_retries = max(0, llm_max_retries)
+        # Shared across finding-generation threads (see _generate_findings)
+        self._openai_client = None
+        self._buried_wins_prompt = None
+        self._llm_lock = threading.Lock()
         self.config = self.load_config()
-        
-        self.llm = ChatOpenAI(
-            model_name="gpt-4o-mini",
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            max_tokens=4000,
-            temperature=0.2
-        )
+        self._llm = None
         
         # Initialize Supabase database
         self.db = SupabaseDatabase()
@@ -99,9 +107,26 @@ class Stage3FindingsAnalyzer:
             "findings_generated": 0,
             "priority_findings": 0,
             "standard_findings": 0,
-            "processing_errors": 0
+            "processing_errors": 0,
+            "llm_calls": 0,
+            "llm_retries": 0,
+            "llm_failures": 0,
+            "llm_slowest_call_seconds": 0.0
         }
     
+    @property
+    def llm(self):
+        """LangChain chat model, created on first use"""
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(
+                model_name="gpt-4o-mini",
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                max_tokens=4000,
+                temperature=0.2
+            )
+        return self._llm
+    
     def load_config(self) -> Dict:
         """Load configuration from YAML file"""
         try:
@@ -867,40 +892,46 @@ class Stage3FindingsAnalyzer:
     def save_stage3_findings_to_supabase(self, findings: List[Dict], client_id: str = 'default'):
         """Save enhanced findings to Supabase, including credibility tier"""
         logger.info("💾 Saving enhanced findings to Supabase...")
-        for finding in findings:
-            # Always use the primary_quote field from the finding dict
-            primary_quote = finding.get('primary_quote', '')
-            secondary_quote = finding.get('secondary_quote', '')  # Use secondary_quote from finding if available
-            
-            db_finding = {
-                'criterion': finding['criterion'],
-                'finding_type': finding['finding_type'],
-                'priority_level': finding['priority_level'],
-                'credibility_tier': finding.get('credibility_tier', 'Unclassified'),
-                'title': finding['title'],
-                'finding_statement': finding.get('finding_statement', finding['description']),
-                'description': finding['description'],
-                'enhanced_confidence': finding['enhanced_confidence'],
-                'criteria_scores': json.dumps(finding['criteria_scores']),
-                'criteria_met': finding['criteria_met'],
-                'impact_score': finding['impact_score'],
-                'companies_affected': json.dumps(finding.get('companies_affected', [])),
-                'quote_count': finding['quote_count'],
-                'selected_quotes': json.dumps(finding['selected_quotes']),
-                'primary_quote': primary_quote,
-                'secondary_quote': secondary_quote,
-                'themes': json.dumps(finding['themes']),
-                'deal_impacts': json.dumps(finding['deal_impacts']),
-                'generated_at': finding['generated_at'],
-                'evidence_threshold_met': finding.get('evidence_threshold_met', False),
-                'evidence_strength': finding.get('evidence_strength', 0),
-                'finding_category': finding.get('finding_category', finding['finding_type']),
-                'criteria_covered': finding.get('criteria_covered', ''),
-                'client_id': client_id
-            }
-            print("[DEBUG] db_finding to be saved:", json.dumps(db_finding, indent=2))  # <--- DEBUG PRINT
-            self.db.save_enhanced_finding(db_finding, client_id=client_id)
-        logger.info(f"✅ Saved {len(findings)} enhanced findings to Supabase for client {client_id}")
+        with self.db.buffered_writes() as buffer:
+            for finding in findings:
+                # Always use the primary_quote field from the finding dict
+                primary_quote = finding.get('primary_quote', '')
+                secondary_quote = finding.get('secondary_quote', '')  # Use secondary_quote from finding if available
+            
+                db_finding = {
+                    'criterion': finding['criterion'],
+                    'finding_type': finding['finding_type'],
+                    'priority_level': finding['priority_level'],
+                    'credibility_tier': finding.get('credibility_tier', 'Unclassified'),
+                    'title': finding['title'],
+                    'finding_statement': finding.get('finding_statement', finding['description']),
+                    'description': finding['description'],
+                    'enhanced_confidence': finding['enhanced_confidence'],
+                    'criteria_scores': json.dumps(finding['criteria_scores']),
+                    'criteria_met': finding['criteria_met'],
+                    'impact_score': finding['impact_score'],
+                    'companies_affected': json.dumps(finding.get('companies_affected', [])),
+                    'quote_count': finding['quote_count'],
+                    'selected_quotes': json.dumps(finding['selected_quotes']),
+                    'primary_quote': primary_quote,
+                    'secondary_quote': secondary_quote,
+                    'themes': json.dumps(finding['themes']),
+                    'deal_impacts': json.dumps(finding['deal_impacts']),
+                    'generated_at': finding['generated_at'],
+                    'evidence_threshold_met': finding.get('evidence_threshold_met', False),
+                    'evidence_strength': finding.get('evidence_strength', 0),
+                    'finding_category': finding.get('finding_category', finding['finding_type']),
+                    'criteria_covered': finding.get('criteria_covered', ''),
+                    'client_id': client_id
+                }
+                print("[DEBUG] db_finding to be saved:", json.dumps(db_finding, indent=2))  # <--- DEBUG PRINT
+                self.db.save_enhanced_finding(db_finding, client_id=client_id)
+        # Findings are written behind; failures are only known after the final flush
+        if buffer.failed:
+            logger.error(f"❌ {len(buffer.failed)} of {len(findings)} findings were not saved for client {client_id}: "
+                         f"{buffer.failed[-1][2]}")
+        logger.info(f"✅ Saved {len(findings) - len(buffer.failed)} enhanced findings to Supabase for client {client_id}")
+        return len(buffer.failed)
     
     def process_stage3_findings(self, client_id: str = 'default') -> Dict:
         """Main processing function for enhanced Stage 3 (per-quote findings)"""
@@ -919,14 +950,22 @@ class Stage3FindingsAnalyzer:
 
         self.processing_metrics["total_quotes_processed"] = len(stage1_data_responses_df)
 
-        # Track findings per quote to ensure diversity
-        findings_per_quote = {}
-        max_findings_per_quote = 1  # Limit to 1 finding per quote maximum (matching Gold Standard)
-        
-        findings = []  # Initialize findings list
-        debug_count = 0
-        for idx, row in stage1_data_responses_df.iterrows():
-            response = row.to_dict()
+        # Score every quote at once: criteria-score matrix with one row per quote
+        texts = stage1_data_responses_df.get('verbatim_response', pd.Series('', index=stage1_data_responses_df.index))
+        matrix = criteria_matrix(texts)
+        matrix.index = stage1_data_responses_df.index
+        for position in range(min(3, len(matrix))):
+            row = matrix.iloc[position]
+            print(f"[DEBUG] Response {position + 1}: criteria_scores = {evaluation_scores(row)}, criteria_met = {row['criteria_met']}")
+            print(f"[DEBUG] Response text: {str(texts.iloc[position])[:100]}...")
+        candidates = self._select_finding_candidates(matrix)
+        logger.info(f"🧮 {int(candidates.sum())} of {len(matrix)} quotes pass the criteria filters")
+
+        # Queue at most 1 finding per quote (matching Gold Standard)
+        queued_quotes = set()
+        finding_candidates = []
+        candidate_rows = stage1_data_responses_df[candidates.to_numpy()]
+        for idx, response in zip(candidate_rows.index, candidate_rows.to_dict('records')):
             # Convert response to quote format for processing
             quote = {
                 'response_id': response.get('response_id', ''),
@@ -943,68 +982,22 @@ class Stage3FindingsAnalyzer:
                 'company_count': 1
             }
             
-            # Check if quote already has maximum findings
             quote_id = quote.get('response_id', f'quote_{idx}')
-            if quote_id in findings_per_quote and findings_per_quote[quote_id] >= max_findings_per_quote:
-                continue  # Skip if quote already has maximum findings
-            
-            criteria_scores = self._evaluate_quote_against_criteria(quote)
-            criteria_met = sum(1 for score in criteria_scores.values() if score > 0)
-            
-            # Debug: Print first 3 responses' criteria scores
-            if debug_count < 3:
-                print(f"[DEBUG] Response {debug_count + 1}: criteria_scores = {criteria_scores}, criteria_met = {criteria_met}")
-                print(f"[DEBUG] Response text: {quote['verbatim_response'][:100]}...")
-                debug_count += 1
-            
-            # VOLUME FIX 1: More selective criteria - require higher quality for findings
-            # Require at least 1 criteria point OR any substantial content (LOWERED from 5 to 1 to match target CSV)
-            text_length = len(quote.get('verbatim_response', '').split())
-            high_actionability = criteria_scores.get('actionability', 0) >= 1
-            high_materiality = criteria_scores.get('materiality', 0) >= 1
-            high_specificity = criteria_scores.get('specificity', 0) >= 1
-            high_novelty = criteria_scores.get('novelty', 0) >= 1
-            high_tension = criteria_scores.get('tension_contrast', 0) >= 1
-            
-            # Only generate findings for high-quality quotes (LOWERED threshold to match target CSV)
-            if criteria_met < 1 and not (text_length >= 20 and (high_actionability or high_materiality or high_novelty or high_tension)):  # LOWERED from 5 to 1, 50 to 20
-                continue  # Skip low-quality quotes
-                
-            # Additional quality filters (LOWERED thresholds)
-            if text_length < 5:  # LOWERED from 10 to 5 - Skip very short quotes
-                continue
-                
-            # Skip generic feedback without specific details (RELAXED)
-            generic_terms = ['good', 'bad', 'okay', 'fine', 'nice', 'great', 'terrible']
-            if all(term not in quote.get('verbatim_response', '').lower() for term in generic_terms):
-                # Check if quote has specific details (RELAXED)
-                specific_indicators = ['because', 'when', 'if', 'since', 'while', 'although', 'however', 'but', 'and', 'or']
-                if not any(indicator in quote.get('verbatim_response', '').lower() for indicator in specific_indicators):
-                    # Allow more quotes through - only skip if completely generic
-                    if text_length < 25:  # Only skip if very short AND generic
-                        continue
+            if quote_id in queued_quotes:
+                continue  # Skip if quote already has a finding queued
             
-            confidence_score = self.calculate_enhanced_confidence_score([quote], criteria_scores)
+            scores = matrix.loc[idx]
+            confidence_score = self.calculate_enhanced_confidence_score([quote], evaluation_scores(scores))
             
             # Only generate findings with confidence ≥0.5 (LOWERED from 1.0 to 0.5)
             if confidence_score < 0.5:  # LOWERED threshold to match target CSV approach
                 continue  # Skip findings below threshold
             
-            # Use the better finding generation method that creates unique, rich findings
-            finding = self._create_finding_from_quote(quote)
-            
-            # Debug: Print finding generation details
-            if debug_count < 3:
-                print(f"[DEBUG] Response {debug_count + 1}: confidence_score = {confidence_score}")
-                print(f"[DEBUG] finding = {finding.get('description', 'No description')[:100] if finding else 'No finding generated'}")
-                debug_count += 1
-            
-            if not finding:
-                continue
-            findings.append(finding)
-            
-            # Track findings per quote
-            findings_per_quote[quote_id] = findings_per_quote.get(quote_id, 0) + 1
+            finding_candidates.append((quote, buried_wins_scores(scores)))
+            queued_quotes.add(quote_id)
+
+        # Use the better finding generation method that creates unique, rich findings
+        findings = self._generate_findings(finding_candidates)
 
         logger.info(f"BEFORE DEDUPLICATION: {len(findings)} findings generated.")
         logger.info(f"🔄 Applying semantic deduplication to {len(findings)} findings...")
@@ -1260,8 +1253,9 @@ class Stage3FindingsAnalyzer:
             if findings_data:
                 df = pd.DataFrame(findings_data)
                 # Save each finding individually to ensure proper field mapping
-                for finding_data in findings_data:
-                    self.db.save_enhanced_finding(finding_data, client_id)
+                with self.db.buffered_writes():
+                    for finding_data in findings_data:
+                        self.db.save_enhanced_finding(finding_data, client_id)
                 logger.info(f"✅ Successfully saved {len(findings_data)} findings to Supabase")
             else:
                 logger.warning("⚠️ No findings to save")
@@ -1286,6 +1280,19 @@ class Stage3FindingsAnalyzer:
             "processing_metrics": self.processing_metrics
         }
     
+    def _select_finding_candidates(self, matrix: pd.DataFrame) -> pd.Series:
+        """Quotes worth a finding, from the criteria-score matrix (the per-quote quality filters, vectorized)"""
+        word_count = matrix['word_count']
+        # VOLUME FIX 1: require at least 1 criteria point (LOWERED from 5 to 1 to match target CSV)
+        keep = matrix['criteria_met'] >= 1
+        # Skip very short quotes (LOWERED from 10 to 5 words)
+        keep &= word_count >= 5
+        # Skip generic feedback without specific details, but only when it is also short (RELAXED)
+        keep &= matrix['generic_term'] | matrix['specific_indicator'] | (word_count >= 25)
+        # Buried Wins threshold (5+ points) applied in _create_finding_from_quote, checked here before any LLM call
+        keep &= matrix['buried_wins_total'] >= 5
+        return keep
+    
     def generate_enhanced_summary_statistics(self, findings: List[Dict], patterns: Dict) -> Dict:
         """Generate enhanced summary statistics"""
         
@@ -1456,8 +1463,30 @@ class Stage3FindingsAnalyzer:
         
         return score
     
-    def _create_finding_from_quote(self, quote: Dict) -> Optional[Dict]:
-        """Create a finding using LLM-based Buried Wins approach"""
+    def _generate_findings(self, candidates: List[Tuple[Dict, Dict[str, int]]]) -> List[Dict]:
+        """
+        Findings for (quote, Buried Wins scores) candidates. LLM calls run on a pool of
+        llm_max_concurrency threads; results keep candidate order, so runs are reproducible.
+        """
+        if not candidates:
+            return []
+        self._get_buried_wins_prompt()  # load once, before the workers start
+        before = {k: self.processing_metrics[k] for k in ('llm_calls', 'llm_retries', 'llm_failures')}
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.llm_max_concurrency, thread_name_prefix="stage3-llm") as pool:
+            results = list(pool.map(lambda c: self._create_finding_from_quote(c[0], criteria_scores=c[1]), candidates))
+        findings = [finding for finding in results if finding]
+        rounds = math.ceil(len(candidates) / self.llm_max_concurrency)
+        logger.info(f"🤖 Generated {len(findings)} findings from {len(candidates)} candidates in {time.time() - start:.1f}s "
+                    f"({self.llm_max_concurrency} concurrent, {rounds} rounds, slowest call "
+                    f"{self.processing_metrics['llm_slowest_call_seconds']:.1f}s; "
+                    f"{self.processing_metrics['llm_calls'] - before['llm_calls']} calls, "
+                    f"{self.processing_metrics['llm_retries'] - before['llm_retries']} retries, "
+                    f"{self.processing_metrics['llm_failures'] - before['llm_failures']} fell back to template)")
+        return findings
+    
+    def _create_finding_from_quote(self, quote: Dict, criteria_scores: Optional[Dict[str, int]] = None) -> Optional[Dict]:
+        """Create a finding using LLM-based Buried Wins approach (criteria_scores: precomputed Buried Wins scores)"""
         try:
             # Extract quote text and metadata
             quote_text = quote.get('verbatim_response', quote.get('text', ''))
@@ -1469,7 +1498,8 @@ class Stage3FindingsAnalyzer:
                 return None
             
             # Score the quote against Buried Wins criteria
-            criteria_scores = self._score_quote_buried_wins(quote_text)
+            if criteria_scores is None:
+                criteria_scores = self._score_quote_buried_wins(quote_text)
             total_score = sum(criteria_scores.values())
             
             # Only create finding if score meets threshold (5+ points)
@@ -1529,67 +1559,10 @@ class Stage3FindingsAnalyzer:
         return clean_quote
     
     def _evaluate_quote_against_criteria(self, quote: Dict) -> Dict:
-        """Evaluate a single quote against the 8 finding criteria with Buried Wins standards"""
-        criteria_scores = {
-            'novelty': 0,
-            'actionability': 0,
-            'specificity': 0,
-            'materiality': 0,
-            'recurrence': 0,
-            'stakeholder_weight': 0,
-            'tension_contrast': 0,
-            'metric_quantification': 0
-        }
-        
+        """Evaluate a single quote against the 8 finding criteria with Buried Wins standards (see stage3_criteria_engine.EVALUATION_RULES)"""
         # Use verbatim_response for core responses, fallback to text for stage2_response_labeling
         text = quote.get('verbatim_response', quote.get('text', '')).lower()
-        
-        # NOVELTY (3 points) - New/unexpected observation that challenges assumptions
-        if any(word in text for word in ['unexpected', 'surprised', 'didn\'t know', 'new', 'first time', 'never seen', 'contrary to', 'challenged our', 'assumption']):
-            criteria_scores['novelty'] = 3
-        elif any(word in text for word in ['unusual', 'different', 'unlike', 'contrary', 'challenge']):
-            criteria_scores['novelty'] = 2
-        
-        # TENSION/CONTRAST (3 points) - Deep specific tension around competitors, business conditions, or tradeoffs
-        if any(word in text for word in ['competitor', 'turbo scribe', 'otter', 'westlaw', 'mycase', 'clio', 'dropbox', 'salesforce', 'zoom', 'teams']):
-            criteria_scores['tension_contrast'] = 3
-        elif any(word in text for word in ['but', 'however', 'despite', 'even though', 'trade-off', 'dilemma', 'conflict']):
-            criteria_scores['tension_contrast'] = 2
-        
-        # MATERIALITY (2 points) - Meaningful business impact affecting revenue, satisfaction, retention, competitive positioning
-        # High-influence sources: C-suite, VP, Director, Lead Buyer, Economic Buyer, or stakeholders controlling >$50k budget
-        if any(word in text for word in ['$', 'dollar', 'cost', 'price', 'budget', 'revenue', 'churn', 'retention', 'deal', 'win', 'loss']):
-            criteria_scores['materiality'] = 2
-        elif any(word in text for word in ['attorney', 'lawyer', 'partner', 'firm', 'practice', 'client', 'case']):
-            criteria_scores['materiality'] = 1
-        
-        # ACTIONABILITY (2 points) - Clear step, fix, or action client could take
-        if any(word in text for word in ['need', 'want', 'would like', 'should have', 'could improve', 'integration', 'feature', 'workflow']):
-            criteria_scores['actionability'] = 2
-        elif any(word in text for word in ['problem', 'issue', 'challenge', 'difficulty', 'friction']):
-            criteria_scores['actionability'] = 1
-        
-        # SPECIFICITY (2 points) - Precise, detailed, not generic. References particular feature, workflow, market condition
-        if any(word in text for word in ['transcript', 'transcription', 'accuracy', 'turnaround', 'timeline', 'integration', 'api', 'security', 'compliance', 'soc2', 'hipaa']):
-            criteria_scores['specificity'] = 2
-        elif any(word in text for word in ['feature', 'function', 'tool', 'system', 'platform', 'software']):
-            criteria_scores['specificity'] = 1
-        
-        # METRIC/QUANTIFICATION (1 point) - Tangible metric, timeframe, or quantifiable outcome
-        if any(word in text for word in ['%', 'percent', 'percentage', 'hours', 'days', 'weeks', 'months', 'years', 'minutes', 'seconds']):
-            criteria_scores['metric_quantification'] = 1
-        elif any(word in text for word in ['number', 'amount', 'quantity', 'count', 'total', 'sum']):
-            criteria_scores['metric_quantification'] = 1
-        
-        # STAKEHOLDER WEIGHT (1 point) - High-influence decision makers
-        if any(word in text for word in ['attorney', 'lawyer', 'partner', 'firm owner', 'managing partner', 'senior']):
-            criteria_scores['stakeholder_weight'] = 1
-        
-        # RECURRENCE (1 point) - Pattern across multiple responses
-        # This will be evaluated in the pattern analysis, not individual quotes
-        criteria_scores['recurrence'] = 0
-        
-        return criteria_scores
+        return EVALUATION_ENGINE.score_text(text)
     
     def _is_deal_breaker_scenario(self, quote: Dict) -> bool:
         """Check if quote represents a deal breaker scenario"""
@@ -1966,6 +1939,10 @@ class Stage3FindingsAnalyzer:
             return findings
             
         try:
+            from sentence_transformers import SentenceTransformer
+            from sklearn.cluster import AgglomerativeClustering
+            from sklearn.metrics.pairwise import cosine_similarity
+            
             # Extract finding statements for clustering
             statements = [finding.get('finding_statement', '') for finding in findings]
             
@@ -2074,50 +2051,8 @@ class Stage3FindingsAnalyzer:
         return best_finding
     
     def _score_quote_buried_wins(self, quote_text: str) -> Dict[str, int]:
-        """Score a quote against Buried Wins criteria"""
-        criteria_scores = {
-            'novelty': 0,
-            'tension_contrast': 0,
-            'materiality': 0,
-            'actionability': 0,
-            'specificity': 0,
-            'metric_quantification': 0
-        }
-        
-        text_lower = quote_text.lower()
-        
-        # Novelty (3 points) - New/unexpected insights
-        novelty_indicators = ['unexpected', 'surprising', 'contrary to', 'challenges', 'assumption', 'previously thought']
-        if any(indicator in text_lower for indicator in novelty_indicators):
-            criteria_scores['novelty'] = 3
-        
-        # Tension/Contrast (3 points) - Competitive dynamics or business friction
-        tension_indicators = ['competitor', 'versus', 'instead of', 'chose', 'over', 'despite', 'even though', 'trade-off']
-        if any(indicator in text_lower for indicator in tension_indicators):
-            criteria_scores['tension_contrast'] = 3
-        
-        # Materiality (2 points) - Business impact
-        materiality_indicators = ['revenue', 'cost', 'budget', 'deal', 'churn', 'retention', 'ceo', 'vp', 'director', 'executive']
-        if any(indicator in text_lower for indicator in materiality_indicators):
-            criteria_scores['materiality'] = 2
-        
-        # Actionability (2 points) - Clear action needed
-        actionability_indicators = ['need', 'should', 'could', 'would', 'improve', 'fix', 'change', 'add', 'implement']
-        if any(indicator in text_lower for indicator in actionability_indicators):
-            criteria_scores['actionability'] = 2
-        
-        # Specificity (2 points) - Specific details
-        specificity_indicators = ['specific', 'particular', 'exact', 'named', 'integration', 'feature', 'workflow']
-        if any(indicator in text_lower for indicator in specificity_indicators):
-            criteria_scores['specificity'] = 2
-        
-        # Metric/Quantification (1 point) - Numbers or timeframes
-        import re
-        metrics = re.findall(r'\d+%|\d+ percent|\$\d+|\d+ dollars|\d+ hours|\d+ days|\d+ months|\d+ years', text_lower)
-        if metrics:
-            criteria_scores['metric_quantification'] = 1
-        
-        return criteria_scores
+        """Score a quote against Buried Wins criteria (see stage3_criteria_engine.BURIED_WINS_RULES)"""
+        return BURIED_WINS_ENGINE.score_text(quote_text.lower())
     
     def _generate_buried_wins_finding(self, quote_text: str, company: str, interviewee_name: str, response_id: str, criteria_scores: Dict[str, int]) -> Optional[Dict]:
         """Generate a finding using LLM-based Buried Wins approach"""
@@ -2228,7 +2163,7 @@ class Stage3FindingsAnalyzer:
         """Generate a finding using LLM with Buried Wins prompt"""
         try:
             # Load the Buried Wins prompt
-            prompt_template = self._load_buried_wins_prompt()
+            prompt_template = self._get_buried_wins_prompt()
             
             # Create the specific prompt for this quote
             prompt = self._create_buried_wins_prompt(quote_text, company, interviewee_name, criteria_scores, prompt_template)
@@ -2248,6 +2183,12 @@ class Stage3FindingsAnalyzer:
             # Fallback to template-based generation
             return self._generate_buried_wins_statement(quote_text, company, interviewee_name, criteria_scores)
     
+    def _get_buried_wins_prompt(self) -> str:
+        """Buried Wins prompt template, read from disk once per analyzer"""
+        if self._buried_wins_prompt is None:
+            self._buried_wins_prompt = self._load_buried_wins_prompt()
+        return self._buried_wins_prompt
+    
     def _load_buried_wins_prompt(self) -> str:
         """Load the Buried Wins prompt template and product standard"""
         try:
@@ -2374,51 +2315,72 @@ Based on this response data, generate a finding following the Buried Wins standa
 3. Market dynamics or competitive insights
 4. Quantifiable elements if present
 
-Generate ONLY the finding in the required format (Finding Title, Score, Impact, Evidence, Context)."""
+Generate ONLY the finding in the required format (Finding Title, Score, Impact, Evidence, Context), as a JSON object with the keys "finding_title", "score", "impact", "evidence" and "context"."""
         
         return specific_prompt
     
+    def _get_openai_client(self):
+        """One OpenAI client shared by every finding call (thread-safe, pools connections)"""
+        with self._llm_lock:
+            if self._openai_client is None:
+                import openai
+                # Retries are per finding in _call_llm_api, so the client itself does not retry
+                self._openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'), timeout=30, max_retries=0)
+            return self._openai_client
+    
+    def _record_llm_metric(self, name: str, value: float = 1):
+        with self._llm_lock:
+            if name == 'llm_slowest_call_seconds':
+                self.processing_metrics[name] = max(self.processing_metrics[name], value)
+            else:
+                self.processing_metrics[name] += value
+    
     def _call_llm_api(self, prompt: str) -> Optional[str]:
-        """Call the LLM API to generate a finding"""
+        """Call the LLM API to generate a finding; retried up to llm_max_retries times with backoff"""
+        # Get API key from environment
+        if not os.getenv('OPENAI_API_KEY'):
+            logger.warning("⚠️ OPENAI_API_KEY not found in environment variables")
+            return None
         try:
-            import openai
-            import os
-            
-            # Get API key from environment
-            api_key = os.getenv('OPENAI_API_KEY')
-            if not api_key:
-                logger.warning("⚠️ OPENAI_API_KEY not found in environment variables")
-                return None
-            
-            # Initialize OpenAI client
-            client = openai.OpenAI(api_key=api_key)
-            
-            # Call the API
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # Use a cost-effective model
-                messages=[
-                    {"role": "system", "content": "You are a business analyst specializing in B2B SaaS customer research. Generate findings that are specific, actionable, and based solely on the provided response data."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3,  # Lower temperature for more consistent output
-                timeout=30
-            )
-            
-            # Extract the finding from the response
-            finding = response.choices[0].message.content.strip()
-            
-            # Parse the finding to extract just the finding statement
-            finding_statement = self._extract_finding_statement(finding)
-            
-            return finding_statement
-            
+            client = self._get_openai_client()
         except ImportError:
             logger.warning("⚠️ OpenAI library not installed. Install with: pip install openai")
             return None
-        except Exception as e:
-            logger.error(f"❌ Error calling LLM API: {e}")
-            return None
+        
+        for attempt in range(self.llm_max_retries + 1):
+            try:
+                self._record_llm_metric('llm_calls')
+                started = time.time()
+                response = client.chat.completions.create(
+                    model="gpt-4o-mini",  # Use a cost-effective model
+                    messages=[
+                        {"role": "system", "content": "You are a business analyst specializing in B2B SaaS customer research. Generate findings that are specific, actionable, and based solely on the provided response data."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=500,
+                    temperature=0.3,  # Lower temperature for more consistent output
+                    response_format={"type": "json_object"}
+                )
+                self._record_llm_metric('llm_slowest_call_seconds', time.time() - started)
+                return self._parse_structured_finding(response.choices[0].message.content or '')
+            except Exception as e:
+                if attempt == self.llm_max_retries:
+                    logger.error(f"❌ Error calling LLM API after {attempt + 1} attempts: {e}")
+                    self._record_llm_metric('llm_failures')
+                    return None
+                self._record_llm_metric('llm_retries')
+                time.sleep(STAGE3_LLM_RETRY_BACKOFF * 2 ** attempt)
+    
+    def _parse_structured_finding(self, llm_response: str) -> str:
+        """Finding statement (the Impact section) from a JSON finding, or from the text format as a fallback"""
+        try:
+            data = json.loads(llm_response)
+        except json.JSONDecodeError:
+            return self._extract_finding_statement(llm_response.strip())
+        impact = str(data.get('impact') or '').strip() if isinstance(data, dict) else ''
+        if not impact:
+            raise ValueError("structured finding has no impact statement")
+        return impact
     
     def _extract_finding_statement(self, llm_response: str) -> str:
         """Extract the finding statement from the LLM response"""
@@ -3,19 +3,79 @@
 Smart Pattern Matching Subject Harmonizer
 Maps natural customer language subjects to standardized win-loss analysis categories
 for cross-interview aggregation and reporting.
+
+All categories' keywords are compiled into one KeywordAutomaton, so a subject is scored
+against every category in a single scan; harmonize_series() harmonizes a whole pandas
+Series, scoring each distinct subject once.
 """
 
 import yaml
 import re
 import logging
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from datetime import datetime
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, deque
 import json
 
+import pandas as pd
+
 logger = logging.getLogger(__name__)
 
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a set of keywords: one left-to-right pass over a text reports
+    every occurrence of every keyword, overlapping ones included, whatever the keyword count.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for keyword in dict.fromkeys(keywords):
+            if keyword:
+                self._insert(keyword)
+        self._link()
+
+    def _insert(self, keyword: str):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append(keyword)
+
+    def _link(self):
+        """Breadth-first failure links; each state's output also gets its fallback's keywords"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """(end offset, keyword) for every occurrence in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword in out[state]:
+                yield i + 1, keyword
+
+
 class SubjectHarmonizer:
     """Smart Pattern Matching system for harmonizing subjects across interviews"""
     
@@ -28,6 +88,7 @@ class SubjectHarmonizer:
         self.harmonization_config = self.config.get('harmonization_config', {})
         self.quality_control = self.config.get('quality_control', {})
         self.reporting_config = self.config.get('reporting_config', {})
+        self._compile_patterns()
         
         # Initialize tracking
         self.mapping_stats = defaultdict(int)
@@ -54,6 +115,19 @@ class SubjectHarmonizer:
             logger.error(f"❌ Failed to load config: {e}")
             return {}
     
+    def _compile_patterns(self):
+        """Index every category's keywords in one automaton for single-scan scoring"""
+        self._keyword_owners: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._keyword_totals: Dict[str, int] = {}
+        for category, pattern_config in self.patterns.items():
+            keywords = pattern_config.get('keywords', [])
+            self._keyword_totals[category] = len(keywords)
+            for keyword in keywords:
+                # A keyword listed twice in a category counts twice, as in _calculate_pattern_match
+                self._keyword_owners[keyword.lower()][category] += 1
+        self._keyword_owners = {k: dict(v) for k, v in self._keyword_owners.items()}
+        self._automaton = KeywordAutomaton(self._keyword_owners)
+    
     def harmonize_subject(self, natural_subject: str, verbatim_response: str = "") -> Dict:
         """
         Map a natural subject to a harmonized category using pattern matching
@@ -65,41 +139,73 @@ class SubjectHarmonizer:
         Returns:
             Dict with harmonized_subject, confidence, mapping_method, etc.
         """
+        category, confidence, method = self._match(natural_subject, verbatim_response)
+        if method != 'default':
+            self._track_mapping(natural_subject, category, confidence)
+        elif natural_subject:
+            # Track unmapped subject for learning
+            self._track_unmapped(natural_subject, verbatim_response)
+        return self._create_result(natural_subject, category, confidence, method)
+    
+    def _match(self, natural_subject: str, verbatim_response: str = "") -> Tuple[str, float, str]:
+        """(category, confidence, mapping_method) for a subject, without tracking"""
+        default_category = self.harmonization_config.get('default_category', 'Product Capabilities')
         if not natural_subject:
-            return self._create_result(natural_subject, self.harmonization_config.get('default_category', 'Product Capabilities'), 0.0, 'default')
+            return default_category, 0.0, 'default'
         
         # Clean the subject for matching
         cleaned_subject = self._clean_subject(natural_subject)
+        pattern_matches = self._score_categories(cleaned_subject, verbatim_response)
         
-        # Calculate matches for each pattern
-        pattern_matches = []
-        for category, pattern_config in self.patterns.items():
-            confidence = self._calculate_pattern_match(cleaned_subject, pattern_config, verbatim_response)
-            if confidence > 0:
-                pattern_matches.append((category, confidence, 'keyword_overlap'))
-        
-        # Sort by confidence
-        pattern_matches.sort(key=lambda x: x[1], reverse=True)
-        
-        # Determine best match
+        # Determine best match (the first category wins ties)
         if pattern_matches:
-            best_category, best_confidence, method = pattern_matches[0]
+            best_category, best_confidence = max(pattern_matches, key=lambda m: m[1])
             
             # Check if confidence meets threshold
             min_confidence = self.harmonization_config.get('min_confidence_threshold', 0.6)
             if best_confidence >= min_confidence:
-                result = self._create_result(natural_subject, best_category, best_confidence, method)
-                self._track_mapping(natural_subject, best_category, best_confidence)
-                return result
+                return best_category, best_confidence, 'keyword_overlap'
         
         # No good match found - use default
-        default_category = self.harmonization_config.get('default_category', 'Product Capabilities')
-        result = self._create_result(natural_subject, default_category, 0.3, 'default')
-        
-        # Track unmapped subject for learning
-        self._track_unmapped(natural_subject, verbatim_response)
-        
-        return result
+        return default_category, 0.3, 'default'
+    
+    def _score_categories(self, cleaned_subject: str, verbatim_response: str = "") -> List[Tuple[str, float]]:
+        """
+        (category, confidence) for every category with a positive score, in config order.
+        Same scoring as _calculate_pattern_match, from one automaton scan of the subject.
+        """
+        length = len(cleaned_subject)
+        found = set()
+        for end, keyword in self._automaton.finditer(cleaned_subject):
+            if ' ' not in keyword:
+                # Single-word keywords must match a whole word
+                start = end - len(keyword)
+                if (start and cleaned_subject[start - 1] != ' ') or (end < length and cleaned_subject[end] != ' '):
+                    continue
+            found.add(keyword)
+        
+        keyword_matches: Dict[str, int] = defaultdict(int)
+        for keyword in found:
+            weight = 2 if ' ' in keyword else 1  # Multi-word matches get extra weight
+            for category, count in self._keyword_owners[keyword].items():
+                keyword_matches[category] += weight * count
+        exact = self._keyword_owners.get(cleaned_subject, {})
+        use_context = bool(verbatim_response) and self.harmonization_config.get('use_response_context', False)
+        
+        scores = []
+        for category, total in self._keyword_totals.items():
+            if not total or not (category in keyword_matches or category in exact or use_context):
+                continue
+            confidence = keyword_matches.get(category, 0) / total
+            for _ in range(exact.get(category, 0)):
+                confidence = min(1.0, confidence + 0.3)  # Exact match bonus
+            if use_context:
+                response_boost = self._calculate_response_context_boost(
+                    verbatim_response, self.patterns[category]['keywords'])
+                confidence = min(1.0, confidence + response_boost * 0.1)
+            if confidence > 0:
+                scores.append((category, confidence))
+        return scores
     
     def _clean_subject(self, subject: str) -> str:
         """Clean subject text for better matching"""
@@ -114,7 +220,7 @@ class SubjectHarmonizer:
         return subject
     
     def _calculate_pattern_match(self, cleaned_subject: str, pattern_config: Dict, verbatim_response: str = "") -> float:
-        """Calculate match confidence between subject and pattern"""
+        """Calculate match confidence between subject and one pattern (reference for _score_categories)"""
         keywords = pattern_config.get('keywords', [])
         if not keywords:
             return 0.0
@@ -190,6 +296,53 @@ class SubjectHarmonizer:
             
             logger.warning(f"⚠️ Unmapped subject: '{natural_subject}' - consider adding to patterns")
     
+    def harmonize_series(self, subjects: pd.Series, responses: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        Harmonize a whole Series of subjects at once
+        
+        Each distinct subject (subject and response when use_response_context is on) is scored
+        once and the result broadcast to every row. Stats count every row; an unmapped subject
+        is recorded once however often it repeats.
+        
+        Returns:
+            DataFrame aligned to subjects' index with the harmonize_subject() result columns
+        """
+        subject_values = subjects.fillna('').astype(str)
+        use_context = responses is not None and self.harmonization_config.get('use_response_context', False)
+        if use_context:
+            response_values = responses.reindex(subjects.index).fillna('').astype(str)
+            codes, uniques = pd.factorize(pd.Series(list(zip(subject_values, response_values)), dtype=object))
+        else:
+            codes, unique_subjects = pd.factorize(subject_values)
+            uniques = [(subject, '') for subject in unique_subjects]
+        
+        matched = [self._match(subject, response) for subject, response in uniques]
+        counts = pd.Series(codes).value_counts()
+        unmapped = []
+        for code, (category, confidence, method) in enumerate(matched):
+            subject, response = uniques[code]
+            if method != 'default':
+                if self.quality_control.get('track_mapping_stats', True):
+                    self.mapping_stats[category] += int(counts[code])
+                    self.confidence_scores.extend([confidence] * int(counts[code]))
+            elif subject:
+                unmapped.append({'subject': subject, 'response_sample': response[:200],
+                                 'timestamp': datetime.now().isoformat()})
+        if unmapped and self.quality_control.get('log_unmapped_subjects', True):
+            self.unmapped_subjects.extend(unmapped)
+            logger.warning(f"⚠️ {len(unmapped)} unmapped subjects - see get_harmonization_stats() and consider adding to patterns")
+        
+        frame = pd.DataFrame(matched, columns=['harmonized_subject', 'confidence', 'mapping_method']).iloc[codes]
+        frame.index = subjects.index
+        frame.insert(0, 'natural_subject', subjects.fillna('').values)
+        confidence = frame['confidence']
+        frame['confidence'] = confidence.round(3)
+        frame['is_high_confidence'] = confidence >= self.harmonization_config.get('min_confidence_threshold', 0.6)
+        frame['requires_review'] = confidence < self.quality_control.get('low_confidence_threshold', 0.5)
+        frame['mapped_at'] = datetime.now().isoformat()
+        logger.info(f"✅ Harmonized {len(frame)} subjects ({len(uniques)} distinct)")
+        return frame
+    
     def batch_harmonize(self, subjects_data: List[Dict]) -> List[Dict]:
         """
         Harmonize multiple subjects at once
@@ -200,22 +353,17 @@ class SubjectHarmonizer:
         Returns:
             List of harmonization results
         """
-        results = []
+        frame = self.harmonize_series(pd.Series([item.get('subject', '') for item in subjects_data], dtype=object),
+                                      pd.Series([item.get('verbatim_response', '') for item in subjects_data], dtype=object))
+        results = frame.to_dict('records')
         
-        for item in subjects_data:
-            natural_subject = item.get('subject', '')
-            verbatim_response = item.get('verbatim_response', '')
-            
-            result = self.harmonize_subject(natural_subject, verbatim_response)
-            
+        for item, result in zip(subjects_data, results):
             # Add original data to result
             result.update({
                 'response_id': item.get('response_id'),
                 'interview_id': item.get('interview_id'),
                 'client_id': item.get('client_id')
             })
-            
-            results.append(result)
         
         logger.info(f"✅ Batch harmonized {len(subjects_data)} subjects")
         return results
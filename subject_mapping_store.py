@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+"""
+Persistent Subject Mapping Store for VOC Pipeline
+
+Local SQLite cache of subject → category mappings, so a subject harmonized once is never
+sent to the LLM again. Subjects are keyed by their normalized form (case-folded, whitespace
+collapsed, surrounding punctuation stripped) under a scheme: a hash of the category set,
+model and prompt that produced the mapping. Changing any of those starts a fresh scheme
+rather than reusing mappings made against different categories.
+"""
+
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+SUBJECT_MAPPING_STORE_PATH = os.getenv("SUBJECT_MAPPING_STORE_PATH", "voc_subject_mappings.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subject_mappings (
+    scheme TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    harmonized_subject TEXT,
+    confidence REAL,
+    result TEXT NOT NULL,
+    mapped_at TEXT NOT NULL,
+    PRIMARY KEY (scheme, subject)
+);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_subject(subject: Any) -> str:
+    """Key under which equivalent subjects share one mapping ('  Pricing  and COST.' → 'pricing and cost')"""
+    return _WHITESPACE.sub(' ', str(subject or '')).strip(' \t.,;:!?"\'').casefold()
+
+
+def mapping_scheme(*parts: Any) -> str:
+    """Hash identifying what a mapping was made against (categories, model, prompt version, ...)"""
+    text = '\x1f'.join(json.dumps(p, sort_keys=True, default=str) for p in parts)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class SubjectMappingStore:
+    """Thread-safe subject → mapping cache; get_many/put_many take normalized subjects"""
+
+    def __init__(self, scheme: str, path: str = SUBJECT_MAPPING_STORE_PATH):
+        self.scheme = scheme
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_many(self, subjects: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored mappings for the subjects that have one"""
+        subjects = list(dict.fromkeys(subjects))
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(subjects), 500):
+                chunk = subjects[i:i + 500]
+                cur = self._conn.execute(
+                    f"SELECT subject, result FROM subject_mappings WHERE scheme = ? "
+                    f"AND subject IN ({','.join('?' * len(chunk))})", [self.scheme] + chunk)
+                found.update((subject, json.loads(result)) for subject, result in cur.fetchall())
+        return found
+
+    def put_many(self, mappings: Dict[str, Dict[str, Any]]):
+        now = datetime.now().isoformat()
+        rows = [(self.scheme, subject, m.get('harmonized_subject'), m.get('confidence'),
+                 json.dumps(m, default=str), now) for subject, m in mappings.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO subject_mappings "
+                "(scheme, subject, harmonized_subject, confidence, result, mapped_at) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def get(self, subject: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([subject]).get(subject)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM subject_mappings WHERE scheme = ?",
+                                      (self.scheme,)).fetchone()[0]
+
+    def clear(self):
+        """Forget this scheme's mappings"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM subject_mappings WHERE scheme = ?", (self.scheme,))
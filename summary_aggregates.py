@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+"""
+Summary Aggregates for VOC Pipeline
+
+Dashboard summaries (response counts, criteria performance, findings breakdowns, scorecard
+inputs) computed by the database rather than in pandas over whole tables. The Postgres
+functions live in add_summary_aggregate_rpcs_migration.sql and are called through
+SupabaseDatabase.aggregate(); SQLITE_AGGREGATES are the same functions over a LocalSnapshot,
+so summaries work offline and can be tested without Supabase. The build_* helpers turn the
+returned summary rows into the dicts the SupabaseDatabase summary methods have always returned.
+
+The voc_stage2_pending work-discovery query (add_work_discovery_rpcs_migration.sql) rides the
+same mechanism: SupabaseDatabase.pending_ids() pages through it by id.
+"""
+
+from typing import Any, Dict, List, Optional
+
+# SQLite equivalents of the RPCs, over LocalSnapshot's snapshot_rows (one JSON document per row)
+_ROWS = "SELECT data FROM snapshot_rows WHERE tbl = '{table}' AND client_id = :client_id"
+
+SQLITE_AGGREGATES = {
+    'voc_stage1_summary': f"""
+        WITH r AS ({_ROWS.format(table='stage1_data_responses')})
+        SELECT 'total' AS dimension, NULL AS value, COUNT(*) AS row_count FROM r
+        UNION ALL
+        SELECT 'deal_status', json_extract(data, '$.deal_status') AS v, COUNT(*) FROM r
+        WHERE v IS NOT NULL GROUP BY v
+        UNION ALL
+        SELECT 'company', json_extract(data, '$.company') AS v, COUNT(*) FROM r
+        WHERE v IS NOT NULL GROUP BY v
+    """,
+    'voc_stage2_criteria_summary': f"""
+        WITH l AS (
+            SELECT json_extract(data, '$.quote_id') AS quote_id, json_extract(data, '$.criterion') AS criterion,
+                CAST(json_extract(data, '$.relevance_score') AS REAL) AS score
+            FROM ({_ROWS.format(table='stage2_response_labeling')})
+        ), r AS (
+            SELECT json_extract(data, '$.response_id') AS response_id, json_extract(data, '$.company') AS company,
+                json_extract(data, '$.deal_status') AS deal_status
+            FROM ({_ROWS.format(table='stage1_data_responses')})
+        ), labeled AS (
+            SELECT l.quote_id, l.criterion, l.score, r.company, r.deal_status
+            FROM l LEFT JOIN r ON r.response_id = l.quote_id
+        )
+        SELECT 'total' AS level, NULL AS criterion, NULL AS deal_status, COUNT(*) AS mention_count,
+            COUNT(DISTINCT quote_id) AS quote_count, COUNT(DISTINCT company) AS company_count,
+            COALESCE(SUM(score >= 4), 0) AS critical_mentions, AVG(score) AS avg_score,
+            MIN(score) AS min_score, MAX(score) AS max_score
+        FROM labeled
+        UNION ALL
+        SELECT 'criterion', criterion, NULL, COUNT(*), COUNT(DISTINCT quote_id), COUNT(DISTINCT company),
+            COALESCE(SUM(score >= 4), 0), AVG(score), MIN(score), MAX(score)
+        FROM labeled GROUP BY criterion
+        UNION ALL
+        SELECT 'criterion_deal', criterion, deal_status, COUNT(*), NULL, NULL, NULL, NULL, NULL, NULL
+        FROM labeled WHERE deal_status IS NOT NULL GROUP BY criterion, deal_status
+    """,
+    'voc_stage2_sample_explanations': f"""
+        SELECT criterion, relevance_explanation FROM (
+            SELECT json_extract(data, '$.criterion') AS criterion,
+                json_extract(data, '$.relevance_explanation') AS relevance_explanation,
+                ROW_NUMBER() OVER (PARTITION BY json_extract(data, '$.criterion')
+                                   ORDER BY json_extract(data, '$.id')) AS rn
+            FROM ({_ROWS.format(table='stage2_response_labeling')})
+        )
+        WHERE rn <= :per_criterion
+        ORDER BY criterion, rn
+    """,
+    'voc_stage3_findings_summary': f"""
+        WITH f AS (
+            SELECT json_extract(data, '$.criterion') AS criterion,
+                json_extract(data, '$.finding_type') AS finding_type,
+                json_extract(data, '$.priority_level') AS priority_level,
+                CASE WHEN json_type(data, '$.enhanced_confidence') IN ('integer', 'real')
+                     THEN json_extract(data, '$.enhanced_confidence') END AS confidence,
+                CASE WHEN json_type(data, '$.criteria_met') IN ('integer', 'real')
+                     THEN json_extract(data, '$.criteria_met') END AS criteria_met,
+                CASE WHEN lower(coalesce(json_extract(data, '$.priority_level'), '')) LIKE '%priority%' THEN 'priority'
+                     WHEN lower(coalesce(json_extract(data, '$.priority_level'), '')) LIKE '%standard%' THEN 'standard'
+                     ELSE 'low' END AS tier
+            FROM ({_ROWS.format(table='stage3_findings')})
+        )
+        SELECT 'total' AS dimension, NULL AS value, COUNT(*) AS row_count,
+            COALESCE(SUM(tier = 'priority'), 0) AS priority_count, AVG(confidence) AS avg_confidence,
+            AVG(criteria_met) AS avg_criteria_met
+        FROM f
+        UNION ALL
+        SELECT 'tier', tier, COUNT(*), NULL, NULL, NULL FROM f GROUP BY tier
+        UNION ALL
+        SELECT 'finding_type', finding_type, COUNT(*), NULL, NULL, NULL
+        FROM f WHERE finding_type IS NOT NULL GROUP BY finding_type
+        UNION ALL
+        SELECT 'priority_level', priority_level, COUNT(*), NULL, NULL, NULL
+        FROM f WHERE priority_level IS NOT NULL GROUP BY priority_level
+        UNION ALL
+        SELECT 'criterion', criterion, COUNT(*), COALESCE(SUM(tier = 'priority'), 0), AVG(confidence), NULL
+        FROM f WHERE criterion IS NOT NULL GROUP BY criterion
+    """,
+    'voc_stage2_pending': f"""
+        WITH r AS (
+            SELECT json_extract(data, '$.id') AS id, json_extract(data, '$.response_id') AS response_id
+            FROM ({_ROWS.format(table='stage1_data_responses')})
+        ), l AS (
+            SELECT json_extract(data, '$.quote_id') AS quote_id FROM ({_ROWS.format(table='stage2_response_labeling')})
+        )
+        SELECT id, response_id FROM r
+        WHERE id > :after_id AND NOT EXISTS (SELECT 1 FROM l WHERE l.quote_id = r.response_id)
+        ORDER BY id LIMIT :limit
+    """,
+}
+
+# Snapshot tables each aggregate reads (synced before it runs)
+AGGREGATE_TABLES = {
+    'voc_stage1_summary': ('stage1_data_responses',),
+    'voc_stage2_criteria_summary': ('stage2_response_labeling', 'stage1_data_responses'),
+    'voc_stage2_sample_explanations': ('stage2_response_labeling',),
+    'voc_stage3_findings_summary': ('stage3_findings',),
+    'voc_stage2_pending': ('stage1_data_responses', 'stage2_response_labeling'),
+}
+
+
+def _number(value: Any) -> Any:
+    """Whole floats back to int (Postgres AVG/MIN over integer columns come back as floats)"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def build_summary_statistics(stage1_rows: List[Dict[str, Any]], criteria_rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """get_summary_statistics() result from voc_stage1_summary and voc_stage2_criteria_summary rows"""
+    total_quotes = next((r['row_count'] for r in stage1_rows if r['dimension'] == 'total'), 0)
+    if not total_quotes:
+        return {
+            "total_quotes": 0,
+            "quotes_with_scores": 0,
+            "coverage_percentage": 0,
+            "criteria_performance": {},
+            "deal_outcome_distribution": {},
+            "company_distribution": {}
+        }
+    quotes_with_scores = next((r['quote_count'] or 0 for r in criteria_rows if r['level'] == 'total'), 0)
+    criteria_performance = {}
+    for row in criteria_rows:
+        if row['level'] != 'criterion' or row['criterion'] is None:
+            continue
+        criteria_performance[row['criterion']] = {
+            "mention_count": row['mention_count'],
+            "average_score": round(row['avg_score'], 2) if row['avg_score'] is not None else None,
+            "score_range": [_number(row['min_score']), _number(row['max_score'])],
+            "coverage_percentage": round((row['mention_count'] / total_quotes) * 100, 1)
+        }
+    distribution = lambda dimension: {r['value']: r['row_count'] for r in sorted(
+        (r for r in stage1_rows if r['dimension'] == dimension), key=lambda r: -r['row_count'])}
+    return {
+        "total_quotes": total_quotes,
+        "quotes_with_scores": quotes_with_scores,
+        "coverage_percentage": round((quotes_with_scores / total_quotes) * 100, 1),
+        "criteria_performance": criteria_performance,
+        "deal_outcome_distribution": distribution('deal_status'),
+        "company_distribution": distribution('company')
+    }
+
+
+def build_findings_summary(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """get_stage3_findings_summary() result from voc_stage3_findings_summary rows"""
+    total = next((r for r in rows if r['dimension'] == 'total'), None) or {}
+    tiers = {r['value']: r['row_count'] for r in rows if r['dimension'] == 'tier'}
+    by = lambda dimension: {r['value']: r['row_count'] for r in sorted(
+        (r for r in rows if r['dimension'] == dimension), key=lambda r: -r['row_count'])}
+    criteria = [r for r in rows if r['dimension'] == 'criterion']
+    return {
+        'total_findings': total.get('row_count') or 0,
+        'priority_findings': tiers.get('priority', 0),
+        'standard_findings': tiers.get('standard', 0),
+        'low_findings': tiers.get('low', 0),
+        'criteria_covered': len(criteria),
+        'average_confidence': total.get('avg_confidence') or 0.0,
+        'average_criteria_met': total.get('avg_criteria_met') or 0.0,
+        'finding_type_distribution': by('finding_type'),
+        'priority_level_distribution': by('priority_level'),
+        'criteria_performance': {
+            str(r['value']): {
+                'findings_count': r['row_count'],
+                'average_confidence': r['avg_confidence'] if r['avg_confidence'] is not None else 0.0,
+                'priority_findings': r['priority_count'] or 0
+            } for r in criteria
+        }
+    }
+
+
+def build_scorecard_inputs(criteria_rows: List[Dict[str, Any]],
+                           sample_rows: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Per-criterion metrics for generate_criteria_scorecard(): avg_score, total_mentions,
+    companies_affected, critical_mentions, sample_quotes and deal_impact (deal_status -> mentions)
+    """
+    samples: Dict[str, List[Any]] = {}
+    for row in sample_rows or []:
+        samples.setdefault(row['criterion'], []).append(row['relevance_explanation'])
+    deals: Dict[str, Dict[str, int]] = {}
+    for row in criteria_rows:
+        if row['level'] == 'criterion_deal':
+            deals.setdefault(row['criterion'], {})[row['deal_status']] = row['mention_count']
+    inputs = []
+    for row in criteria_rows:
+        if row['level'] != 'criterion' or row['criterion'] is None or not row['mention_count']:
+            continue
+        inputs.append({
+            'criterion': row['criterion'],
+            'avg_score': row['avg_score'] if row['avg_score'] is not None else 0.0,
+            'total_mentions': row['mention_count'],
+            'companies_affected': row['company_count'] or 0,
+            'critical_mentions': row['critical_mentions'] or 0,
+            'sample_quotes': samples.get(row['criterion'], []),
+            'deal_impact': dict(sorted(deals.get(row['criterion'], {}).items(), key=lambda kv: -kv[1])),
+        })
+    return inputs
@@ -5,15 +5,22 @@ Replaces all SQLite functionality with direct Supabase operations
 """
 
 import os
+import time
+import queue
+import threading
 import pandas as pd
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Iterator, Union
 import logging
 from dotenv import load_dotenv
 import json
 import traceback
 import math
 
+from summary_aggregates import build_findings_summary, build_scorecard_inputs, build_summary_statistics
+
 # Supabase imports
 try:
     from supabase import create_client, Client
@@ -26,21 +33,275 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Paged reads: PostgREST caps every response (1000 rows by default), so reads page through
+# tables instead of trusting a single select to return everything
+READ_PAGE_SIZE = int(os.getenv("SUPABASE_READ_PAGE_SIZE", "1000"))
+READ_PARALLEL_SLICES = int(os.getenv("SUPABASE_READ_PARALLEL_SLICES", "1"))
+
+# Optional local read-through snapshot of client tables (see local_snapshot.py)
+SNAPSHOT_PATH = os.getenv("SUPABASE_SNAPSHOT_PATH")
+
+# Storage backend: 'supabase' (default) or 'local' for an embedded SQLite file (see local_backend.py)
+DB_BACKEND = os.getenv("VOC_DB_BACKEND", "supabase").lower()
+
+# Write-behind buffering of per-row saves (see SupabaseDatabase.buffered_writes)
+WRITE_BUFFER_MAX_ROWS = int(os.getenv("SUPABASE_WRITE_BUFFER_MAX_ROWS", "500"))
+WRITE_BUFFER_MAX_SECONDS = float(os.getenv("SUPABASE_WRITE_BUFFER_MAX_SECONDS", "5"))
+WRITE_BUFFER_RETRIES = int(os.getenv("SUPABASE_WRITE_BUFFER_RETRIES", "3"))
+WRITE_BUFFER_UPDATE_WORKERS = 8
+
+# Work discovery: stage -> (anti-join function, id column it returns); see pending_ids()
+PENDING_WORK = {
+    2: ('voc_stage2_pending', 'response_id'),
+}
+# Ids per in_() filter when fetching pending rows (keeps request URLs short)
+PENDING_FETCH_CHUNK = 200
+
+# Unique, indexed column used for keyset paging; tables not listed fall back to offset paging
+TABLE_KEYS = {
+    'stage1_data_responses': 'id',
+    'stage2_response_labeling': 'id',
+    'stage3_findings': 'id',
+    'stage4_themes': 'id',
+    'findings': 'id',
+    'executive_themes': 'id',
+    'criteria_scorecard': 'id',
+    'interview_cluster_evidence': 'id',
+    'research_themes': 'theme_id',
+}
+
+_STAGE1_LABELS = 'id,response_id,interview_id,client_id,company,interviewee_name,deal_status,subject,harmonized_subject,question,sentiment,created_at'
+_STAGE2_LABELS = 'id,quote_id,client_id,criterion,relevance_score,sentiment,priority,confidence,deal_weighted_score,created_at'
+_STAGE3_LABELS = 'id,finding_id,client_id,finding_type,finding_category,criterion,criteria_met,priority_level,impact_score,enhanced_confidence,confidence_score,interview_company,created_at'
+_STAGE4_LABELS = 'id,theme_id,client_id,theme_name,theme_title,theme_strength,theme_category,competitive_flag,curation_status,interview_companies,created_at'
+
+# Named lean read models: pass columns='ids' | 'labels' | 'text' | 'full' to a getter instead of
+# pulling verbatim text and embedding vectors that the caller never renders
+READ_MODELS = {
+    'stage1_data_responses': {
+        'ids': 'id,response_id,interview_id,client_id',
+        'labels': _STAGE1_LABELS,
+        'text': _STAGE1_LABELS + ',verbatim_response',
+    },
+    'stage2_response_labeling': {
+        'ids': 'id,quote_id,client_id',
+        'labels': _STAGE2_LABELS,
+        'text': _STAGE2_LABELS + ',relevance_explanation,context_keywords',
+    },
+    'stage3_findings': {
+        'ids': 'id,finding_id,client_id',
+        'labels': _STAGE3_LABELS,
+        'text': _STAGE3_LABELS + ',finding_statement,selected_quotes,supporting_quotes',
+    },
+    'stage4_themes': {
+        'ids': 'id,theme_id,client_id',
+        'labels': _STAGE4_LABELS,
+        'text': _STAGE4_LABELS + ',theme_statement,theme_description,quotes,supporting_finding_ids',
+    },
+    'interview_metadata': {
+        'ids': 'interview_id,client_id',
+        'labels': 'interview_id,client_id,company,interviewee_name,deal_status,industry,interview_date',
+    },
+}
+
+class WriteBehindBuffer:
+    """
+    Collects rows per (table, mode, conflict target) and writes them in bulk once max_rows are
+    pending or the oldest pending row is max_seconds old, plus on flush()/close().
+
+    mode 'upsert' and 'insert' send one request per batch. mode 'update' rows are coalesced per
+    match (later fields win) and sent concurrently: a partial-column bulk upsert would trip the
+    NOT NULL columns on its insert path. A failing batch is retried with backoff, then split in
+    half until the rows that keep failing are isolated in `failed`. Writers only wait for the
+    pending rows to be swapped out, never for the network; flushes run one at a time, in order.
+    """
+
+    def __init__(self, supabase, max_rows: int = WRITE_BUFFER_MAX_ROWS,
+                 max_seconds: float = WRITE_BUFFER_MAX_SECONDS, retries: int = WRITE_BUFFER_RETRIES,
+                 on_flush=None, sleep=time.sleep):
+        self.supabase = supabase
+        self.max_rows = max(1, max_rows)
+        self.max_seconds = max_seconds
+        self.retries = max(1, retries)
+        self._on_flush = on_flush
+        self._sleep = sleep
+        self._pending: Dict[Tuple[str, str, Any], Any] = {}
+        self._count = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._sending: Dict[Tuple[str, str, Any], Any] = {}
+        self._closed = threading.Event()
+        self.failed: List[Tuple[str, Dict[str, Any], str]] = []
+        self.written: Dict[str, int] = {}
+        self._memo: Dict[Any, Any] = {}
+        self._ticker = None
+        if max_seconds > 0:
+            self._ticker = threading.Thread(target=self._flush_when_old, name="supabase-write-behind", daemon=True)
+            self._ticker.start()
+
+    def add(self, table: str, row: Dict[str, Any], mode: str = 'upsert', on_conflict: Optional[str] = None,
+            match: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            if mode == 'update':
+                bucket = self._pending.setdefault((table, mode, tuple(sorted(match))), {})
+                key = tuple(match[c] for c in sorted(match))
+                if key in bucket:
+                    bucket[key] = (match, {**bucket[key][1], **row})
+                else:
+                    bucket[key] = (match, dict(row))
+                    self._count += 1
+            else:
+                self._pending.setdefault((table, mode, on_conflict), []).append(row)
+                self._count += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = self._count >= self.max_rows
+        if full:
+            self.flush()
+
+    def pending(self, table: str) -> List[Dict[str, Any]]:
+        """Rows queued for table and not yet written (including a flush still in progress)"""
+        with self._lock:
+            rows = []
+            for (name, mode, _), batch in [*self._sending.items(), *self._pending.items()]:
+                if name == table:
+                    rows.extend([r for _, r in batch.values()] if mode == 'update' else batch)
+            return rows
+
+    def memo(self, key: Any, load):
+        """Value cached for the buffer's lifetime (e.g. ids already in a table), loaded once"""
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = load()
+            return self._memo[key]
+
+    def _flush_when_old(self):
+        while not self._closed.wait(self.max_seconds / 2):
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.max_seconds
+            if due:
+                self.flush()
+
+    def flush(self) -> Dict[str, int]:
+        """Write everything pending; returns rows written per table"""
+        with self._flush_lock:
+            # Swap under the row lock, send outside it: add() keeps queueing while this flush writes
+            with self._lock:
+                batches, self._pending, self._count, self._oldest = self._pending, {}, 0, None
+                self._sending = batches
+            try:
+                return self._flush_batches(batches)
+            finally:
+                with self._lock:
+                    self._sending = {}
+
+    def _flush_batches(self, batches: Dict[Tuple[str, str, Any], Any]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for (table, mode, target), batch in batches.items():
+            if mode == 'update':
+                done = self._send_updates(table, list(batch.values()))
+            else:
+                # Rows with different column sets go separately so absent columns keep their DB values
+                groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+                for row in batch:
+                    groups.setdefault(tuple(sorted(row)), []).append(row)
+                done = sum(self._send(table, mode, target, rows[i:i + self.max_rows])
+                           for rows in groups.values() for i in range(0, len(rows), self.max_rows))
+            counts[table] = counts.get(table, 0) + done
+            with self._lock:
+                self.written[table] = self.written.get(table, 0) + done
+            if self._on_flush:
+                self._on_flush(table)
+        if counts:
+            logger.info(f"💾 Flushed buffered writes: {counts}")
+        return counts
+
+    def _execute(self, table: str, mode: str, target: Optional[str], rows: List[Dict[str, Any]]):
+        query = self.supabase.table(table)
+        if mode == 'insert':
+            query = query.insert(rows)
+        elif target:
+            query = query.upsert(rows, on_conflict=target)
+        else:
+            query = query.upsert(rows)
+        query.execute()
+
+    def _send(self, table: str, mode: str, target: Optional[str], rows: List[Dict[str, Any]],
+              attempts: Optional[int] = None) -> int:
+        error = None
+        for attempt in range(attempts or self.retries):
+            try:
+                self._execute(table, mode, target, rows)
+                return len(rows)
+            except Exception as e:
+                error = e
+                if attempt + 1 < (attempts or self.retries):
+                    self._sleep(0.5 * 2 ** attempt)
+        if len(rows) == 1:
+            logger.error(f"❌ Buffered {mode} into {table} failed: {error}")
+            self.failed.append((table, rows[0], str(error)))
+            return 0
+        # Split to isolate the failing rows; halves get a single attempt each
+        mid = len(rows) // 2
+        return (self._send(table, mode, target, rows[:mid], attempts=1)
+                + self._send(table, mode, target, rows[mid:], attempts=1))
+
+    def _send_updates(self, table: str, updates: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> int:
+        def send(item) -> int:
+            match, row = item
+            error = None
+            for attempt in range(self.retries):
+                try:
+                    query = self.supabase.table(table).update(row)
+                    for column, value in match.items():
+                        query = query.eq(column, value)
+                    query.execute()
+                    return 1
+                except Exception as e:
+                    error = e
+                    if attempt + 1 < self.retries:
+                        self._sleep(0.5 * 2 ** attempt)
+            logger.error(f"❌ Buffered update of {table} {match} failed: {error}")
+            self.failed.append((table, {**match, **row}, str(error)))
+            return 0
+
+        with ThreadPoolExecutor(max_workers=WRITE_BUFFER_UPDATE_WORKERS) as pool:
+            return sum(pool.map(send, updates))
+
+    def close(self) -> Dict[str, int]:
+        self._closed.set()
+        return self.flush()
+
+
 class SupabaseDatabase:
     """
     Supabase-only database manager for VOC Pipeline
-    Handles all data operations directly with Supabase
+    Handles all data operations directly with Supabase, or with an embedded SQLite file
+    when backend='local' (VOC_DB_BACKEND=local; see local_backend.py)
     """
     
     def __init__(self, 
                  supabase_url: Optional[str] = None,
-                 supabase_key: Optional[str] = None):
+                 supabase_key: Optional[str] = None,
+                 backend: Optional[str] = None,
+                 local_path: Optional[str] = None):
         
         self.supabase_url = supabase_url or os.getenv("SUPABASE_URL")
         self.supabase_key = supabase_key or os.getenv("SUPABASE_ANON_KEY")
+        self.backend = (backend or DB_BACKEND).lower()
         
         # Initialize Supabase connection
         self.supabase = None
+        self.snapshot = None
+        self._write_buffer = None
+        self._missing_rpcs = set()
+        self._column_support = {}
+        if self.backend == 'local':
+            from local_backend import LocalBackendClient, LOCAL_DB_PATH
+            self.supabase = LocalBackendClient(local_path or LOCAL_DB_PATH)
+            logger.info(f"✅ Using local database {self.supabase.path}")
+            return
         if SUPABASE_AVAILABLE and self.supabase_url and self.supabase_key:
             try:
                 self.supabase = create_client(self.supabase_url, self.supabase_key)
@@ -51,6 +312,106 @@ class SupabaseDatabase:
                 raise Exception(f"Failed to connect to Supabase: {e}")
         else:
             raise Exception("Supabase not configured. Please set SUPABASE_URL and SUPABASE_ANON_KEY in .env file")
+        if SNAPSHOT_PATH:
+            self.use_snapshot(SNAPSHOT_PATH)
+    
+    def use_snapshot(self, path: Optional[str] = None, **kwargs):
+        """Serve client-scoped reads of the Stage 1-4 tables from a local, incrementally synced snapshot"""
+        from local_snapshot import LocalSnapshot, SNAPSHOT_PATH as DEFAULT_SNAPSHOT_PATH
+        self.snapshot = LocalSnapshot(self, path=path or DEFAULT_SNAPSHOT_PATH, **kwargs)
+        logger.info(f"✅ Reading client tables through local snapshot {self.snapshot.path}")
+        return self.snapshot
+
+    @contextmanager
+    def buffered_writes(self, max_rows: int = WRITE_BUFFER_MAX_ROWS, max_seconds: float = WRITE_BUFFER_MAX_SECONDS,
+                        retries: int = WRITE_BUFFER_RETRIES):
+        """
+        Queue save_stage2_response_labeling, update_stage2_analysis, save_enhanced_finding and
+        save_stage4_theme rows inside the block and write them as bulk requests; everything is
+        flushed on exit. Nested blocks share the outer buffer.
+
+            with db.buffered_writes() as buffer:
+                for finding in findings:
+                    db.save_enhanced_finding(finding, client_id)
+            # buffer.written / buffer.failed describe the outcome
+        """
+        if self._write_buffer is not None:
+            yield self._write_buffer
+            return
+        self._write_buffer = WriteBehindBuffer(self.supabase, max_rows, max_seconds, retries,
+                                               on_flush=self._snapshot_written)
+        try:
+            yield self._write_buffer
+        finally:
+            buffer, self._write_buffer = self._write_buffer, None
+            buffer.close()
+            if buffer.failed:
+                logger.error(f"❌ {len(buffer.failed)} buffered rows could not be written")
+
+    def flush(self) -> Dict[str, int]:
+        """Write any rows queued by buffered_writes() now; returns rows written per table"""
+        return self._write_buffer.flush() if self._write_buffer is not None else {}
+
+    def aggregate(self, name: str, client_id: Optional[str] = None, **params) -> Optional[List[Dict[str, Any]]]:
+        """
+        Summary rows from a server-side aggregate (add_summary_aggregate_rpcs_migration.sql), or
+        from its SQLite version when a local snapshot is attached. Returns None when the function
+        is not deployed, so callers can fall back to computing the summary client-side.
+        """
+        if self.snapshot is not None and client_id is not None and self.snapshot.covers_aggregate(name):
+            return self.snapshot.aggregate(name, client_id, **params)
+        if name in self._missing_rpcs:
+            return None
+        args = {f'p_{k}': v for k, v in params.items()}
+        if client_id is not None:
+            args['p_client_id'] = client_id
+        try:
+            return self.supabase.rpc(name, args).execute().data or []
+        except Exception as e:
+            message = str(e)
+            if 'PGRST202' in message or 'Could not find the function' in message or 'does not exist' in message:
+                logger.warning(f"⚠️ Aggregate {name} is not deployed; computing client-side")
+                self._missing_rpcs.add(name)
+            else:
+                logger.warning(f"⚠️ Aggregate {name} failed ({e}); computing client-side")
+            return None
+
+    def pending_ids(self, stage: int, client_id: str, page_size: int = READ_PAGE_SIZE) -> List[str]:
+        """
+        Ids still waiting for a stage, oldest first: response_ids with no Stage 2 labels (stage=2,
+        the only stage that discovers its work incrementally). The anti-join runs in the database
+        (voc_stage2_pending in add_work_discovery_rpcs_migration.sql), paged by id; without it the
+        diff is done here over id-only projections.
+        """
+        if stage not in PENDING_WORK:
+            raise ValueError(f"No pending-work discovery for stage {stage} (supported: {sorted(PENDING_WORK)})")
+        name, id_column = PENDING_WORK[stage]
+        pending, after_id = [], 0
+        while True:
+            page = self.aggregate(name, client_id, after_id=after_id, limit=page_size)
+            if page is None:
+                return self._pending_ids_client_side(stage, client_id)
+            pending.extend(row[id_column] for row in page)
+            if len(page) < page_size:
+                break
+            after_id = page[-1]['id']
+        logger.info(f"🔍 Found {len(pending)} items pending Stage {stage} for client {client_id}")
+        return pending
+
+    def _pending_ids_client_side(self, stage: int, client_id: str) -> List[str]:
+        """pending_ids() fallback when the work-discovery functions are not deployed"""
+        responses = self.read_table('stage1_data_responses', 'id,response_id', {'client_id': client_id})
+        if responses.empty:
+            return []
+        responses = responses.sort_values('id')
+        labeled = self.read_table('stage2_response_labeling', 'id,quote_id', {'client_id': client_id})
+        done = set(labeled['quote_id']) if not labeled.empty else set()
+        return [r for r in responses['response_id'] if r not in done]
+
+    def _snapshot_written(self, table: str, client_id: Optional[str] = None, deleted: bool = False):
+        """Make the next snapshot read of table see this process's own write"""
+        if self.snapshot is not None:
+            self.snapshot.mark_dirty(table, client_id, deleted=deleted)
     
     def verify_connection(self):
         """Verify Supabase connection and table structure"""
@@ -72,6 +433,197 @@ class SupabaseDatabase:
             logger.error(f"❌ Supabase connection test failed: {e}")
             return False
     
+    def has_columns(self, table: str, columns: List[str]) -> bool:
+        """Whether table has all of columns (i.e. an optional migration is deployed); cached per process"""
+        key = (table, tuple(columns))
+        if key not in self._column_support:
+            try:
+                self.supabase.table(table).select(','.join(columns)).limit(1).execute()
+                self._column_support[key] = True
+            except Exception as e:
+                logger.info(f"ℹ️ {table} has no {', '.join(columns)} column(s): {e}")
+                self._column_support[key] = False
+        return self._column_support[key]
+
+    @staticmethod
+    def resolve_columns(table: str, columns: Optional[Union[str, List[str]]] = None) -> str:
+        """Select list for a read model name ('ids', 'labels', 'text', 'full'), column list or raw select string"""
+        if columns is None or columns == 'full':
+            return '*'
+        if isinstance(columns, (list, tuple)):
+            return ','.join(columns)
+        return READ_MODELS.get(table, {}).get(columns, columns)
+
+    def _filtered_query(self, table: str, columns: str, filters: Optional[Dict[str, Any]]):
+        """
+        select(columns) with filters: value -> eq, list/set -> in, None -> is null,
+        (op, arg) -> op (e.g. ('gte', 3.0)), [(op, arg), ...] -> several ops on one column
+        """
+        query = self.supabase.table(table).select(columns)
+        for column, value in (filters or {}).items():
+            if isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], str):
+                query = getattr(query, value[0])(column, value[1])
+            elif isinstance(value, list) and value and all(isinstance(v, tuple) for v in value):
+                for op, arg in value:
+                    query = getattr(query, op)(column, arg)
+            elif isinstance(value, (list, set, frozenset)):
+                query = query.in_(column, list(value))
+            elif value is None:
+                query = query.is_(column, 'null')
+            else:
+                query = query.eq(column, value)
+        return query
+
+    def _iter_key_slice(self, table: str, columns: str, filters: Optional[Dict[str, Any]], key: str,
+                        page_size: int, lower: Any = None, upper: Any = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Keyset pages (key > lower, key < upper) in ascending key order. Paging stops on an empty
+        page rather than a short one, since the server's row cap may be below page_size.
+        """
+        last = lower
+        while True:
+            query = self._filtered_query(table, columns, filters)
+            if last is not None:
+                query = query.gt(key, last)
+            if upper is not None:
+                query = query.lt(key, upper)
+            rows = query.order(key).limit(page_size).execute().data or []
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][key]
+
+    def _iter_offset(self, table: str, columns: str, filters: Optional[Dict[str, Any]],
+                     page_size: int) -> Iterator[List[Dict[str, Any]]]:
+        start = 0
+        while True:
+            rows = self._filtered_query(table, columns, filters).range(start, start + page_size - 1).execute().data or []
+            if not rows:
+                return
+            yield rows
+            start += len(rows)
+
+    def _key_bounds(self, table: str, filters: Optional[Dict[str, Any]], key: str) -> Optional[Tuple[int, int]]:
+        bounds = []
+        for desc in (False, True):
+            rows = self._filtered_query(table, key, filters).order(key, desc=desc).limit(1).execute().data or []
+            if not rows or not isinstance(rows[0].get(key), int):
+                return None
+            bounds.append(rows[0][key])
+        return bounds[0], bounds[1]
+
+    def _iter_parallel(self, table: str, columns: str, filters: Optional[Dict[str, Any]], key: str,
+                       page_size: int, slices: int) -> Iterator[List[Dict[str, Any]]]:
+        """Split an integer key range into slices read concurrently; pages arrive in completion order"""
+        bounds = self._key_bounds(table, filters, key)
+        if bounds is None:
+            yield from self._iter_key_slice(table, columns, filters, key, page_size)
+            return
+        lo, hi = bounds
+        step = max(1, (hi - lo + slices) // slices)
+        edges = list(range(lo, hi + 1, step)) + [hi + 1]
+        # Bounded hand-off keeps at most two pages per slice in memory
+        pages: "queue.Queue" = queue.Queue(maxsize=2 * slices)
+        stop = threading.Event()
+        done = object()
+
+        def offer(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read_slice(start: int, end: int):
+            try:
+                for rows in self._iter_key_slice(table, columns, filters, key, page_size, lower=start - 1, upper=end):
+                    if not offer(rows):
+                        return
+                offer(done)
+            except Exception as e:
+                offer(e)
+
+        threads = [threading.Thread(target=read_slice, args=(a, b), daemon=True) for a, b in zip(edges, edges[1:])]
+        for t in threads:
+            t.start()
+        remaining = len(threads)
+        try:
+            while remaining:
+                item = pages.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stop.set()
+
+    def iter_table(self, table: str, columns: str = '*', filters: Optional[Dict[str, Any]] = None,
+                   key: Optional[str] = '', page_size: int = READ_PAGE_SIZE,
+                   parallel: int = READ_PARALLEL_SLICES, as_frames: bool = False
+                   ) -> Iterator[Union[Dict[str, Any], pd.DataFrame]]:
+        """
+        Lazily read every matching row of a table, one page at a time.
+        Pages are fetched by keyset on `key` (default from TABLE_KEYS; None forces offset paging),
+        so results are complete regardless of the PostgREST row cap. With parallel > 1 an integer
+        key range is read as that many concurrent slices (page order is then not key order).
+        Yields row dicts, or one DataFrame per page when as_frames=True.
+        """
+        key = TABLE_KEYS.get(table) if key == '' else key
+        if key and columns != '*' and key not in [c.strip() for c in columns.split(',')]:
+            columns = f"{columns},{key}"
+        if not key:
+            pages = self._iter_offset(table, columns, filters, page_size)
+        elif parallel > 1:
+            pages = self._iter_parallel(table, columns, filters, key, page_size, parallel)
+        else:
+            pages = self._iter_key_slice(table, columns, filters, key, page_size)
+        for rows in pages:
+            if as_frames:
+                yield pd.DataFrame(rows)
+            else:
+                yield from rows
+
+    def read_table(self, table: str, columns: Optional[Union[str, List[str]]] = None,
+                   filters: Optional[Dict[str, Any]] = None,
+                   order_by: Optional[List[Tuple[str, bool]]] = None, **kwargs) -> pd.DataFrame:
+        """
+        All matching rows as one DataFrame, built page by page via iter_table.
+        columns: read model name, column list or select string (see resolve_columns).
+        order_by: [(column, descending)] applied locally (nulls first when descending, like Postgres).
+        """
+        select = self.resolve_columns(table, columns)
+        if self.snapshot is not None and self.snapshot.covers(table, filters):
+            df = self.snapshot.read(table, filters)
+            if select != '*' and not df.empty:
+                wanted = [c.strip() for c in select.split(',')]
+                df = df[[c for c in df.columns if c in wanted]]
+            return self._sort_frame(df, order_by)
+        try:
+            frames = list(self.iter_table(table, select, filters, as_frames=True, **kwargs))
+        except Exception as e:
+            # A read model may name a column this deployment's schema lacks; project locally instead
+            if select == '*' or 'does not exist' not in str(e):
+                raise
+            logger.warning(f"⚠️ {table}: projection '{select}' failed ({e}); selecting all columns")
+            wanted = [c.strip() for c in select.split(',')]
+            frames = [f[[c for c in f.columns if c in wanted]]
+                      for f in self.iter_table(table, '*', filters, as_frames=True, **kwargs)]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return self._sort_frame(df, order_by)
+
+    @staticmethod
+    def _sort_frame(df: pd.DataFrame, order_by: Optional[List[Tuple[str, bool]]]) -> pd.DataFrame:
+        order_by = [(c, d) for c, d in (order_by or []) if c in df.columns]
+        if order_by and not df.empty:
+            df = df.sort_values([c for c, _ in order_by], ascending=[not d for _, d in order_by],
+                                kind='mergesort', na_position='first' if order_by[0][1] else 'last',
+                                ignore_index=True)
+        return df
+
     def save_core_response(self, response_data: Dict[str, Any]) -> bool:
         """Save a core response to Supabase with optional harmonized subject fields"""
         try:
@@ -119,6 +671,7 @@ class SupabaseDatabase:
             
             # Upsert to Supabase
             result = self.supabase.table('stage1_data_responses').upsert(data).execute()
+            self._snapshot_written('stage1_data_responses')
             
             logger.info(f"✅ Saved core response: {response_data.get('response_id')}")
             return True
@@ -134,7 +687,7 @@ class SupabaseDatabase:
             data = {
                 'quote_id': analysis_data.get('quote_id'),
                 'criterion': analysis_data.get('criterion'),
-                'relevance_score': analysis_data.get('score'),  # Map 'score' to 'relevance_score'
+                'relevance_score': analysis_data.get('score', analysis_data.get('relevance_score')),  # Map 'score' to 'relevance_score'
                 'sentiment': analysis_data.get('sentiment', 'neutral'),
                 'priority': analysis_data.get('priority', 'medium'),
                 'confidence': analysis_data.get('confidence', 'medium'),
@@ -143,14 +696,25 @@ class SupabaseDatabase:
                 'context_keywords': analysis_data.get('context_keywords', ''),
                 'question_relevance': analysis_data.get('question_relevance', 'unrelated'),
                 'client_id': analysis_data.get('client_id', 'default'),
-                'analysis_timestamp': datetime.now().isoformat()
+                'analysis_timestamp': datetime.now().isoformat(),
+                # Inputs the label was computed from (see stage2_input_hashes.py)
+                'content_hash': analysis_data.get('content_hash'),
+                'criteria_hash': analysis_data.get('criteria_hash'),
+                'prompt_hash': analysis_data.get('prompt_hash'),
+                # Cascade tier that decided the label (see quote_prescore.py)
+                'decided_by': analysis_data.get('decided_by')
             }
             
             # Remove None values
             data = {k: v for k, v in data.items() if v is not None}
             
+            if self._write_buffer is not None:
+                self._write_buffer.add('stage2_response_labeling', data)
+                return True
+            
             # Upsert to Supabase
             result = self.supabase.table('stage2_response_labeling').upsert(data).execute()
+            self._snapshot_written('stage2_response_labeling')
             
             logger.info(f"✅ Saved quote analysis: {analysis_data.get('quote_id')} - {analysis_data.get('criterion')}")
             return True
@@ -173,8 +737,14 @@ class SupabaseDatabase:
                 'stage2_analysis_timestamp': analysis_data.get('stage2_analysis_timestamp', datetime.now().isoformat())
             }
             
+            if self._write_buffer is not None:
+                self._write_buffer.add('stage1_data_responses', update_data, mode='update',
+                                       match={'response_id': response_id})
+                return True
+            
             # Update the response in stage1_data_responses table
             result = self.supabase.table('stage1_data_responses').update(update_data).eq('response_id', response_id).execute()
+            self._snapshot_written('stage1_data_responses')
             
             if result.data:
                 logger.info(f"✅ Updated Stage 2 analysis for response: {response_id}")
@@ -187,45 +757,36 @@ class SupabaseDatabase:
             logger.error(f"❌ Failed to update Stage 2 analysis: {e}")
             return False
     
-    def get_stage1_data_responses(self, filters: Optional[Dict] = None, client_id: Optional[str] = None) -> pd.DataFrame:
-        """Get core responses from Supabase, filtered by client_id for data siloing"""
+    def get_stage1_data_responses(self, filters: Optional[Dict] = None, client_id: Optional[str] = None,
+                                  columns: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
+        """Get core responses from Supabase, filtered by client_id for data siloing (columns: read model or list)"""
         try:
-            query = self.supabase.table('stage1_data_responses').select('*')
-            
             # Require explicit client_id in production
             if not client_id or client_id == '' or client_id == 'default':
                 logger.error(f"❌ get_stage1_data_responses called with invalid client_id='{client_id}'. You must provide a valid client_id. Returning empty DataFrame. Call stack:\n" + ''.join(traceback.format_stack()))
                 return pd.DataFrame()
             
-            # Always filter by client_id for data siloing
-            query = query.eq('client_id', client_id)
-            
-            # Apply additional filters if provided
-            if filters:
-                for key, value in filters.items():
-                    query = query.eq(key, value)
+            # Always filter by client_id for data siloing, plus any additional filters
+            query_filters = dict(filters or {})
+            query_filters['client_id'] = client_id
             
-            result = query.order('created_at', desc=True).execute()
-            df = pd.DataFrame(result.data)
+            df = self.read_table('stage1_data_responses', columns, filters=query_filters, order_by=[('created_at', True)])
             logger.info(f"📊 Retrieved {len(df)} core responses from Supabase for client {client_id}")
             return df
         except Exception as e:
             logger.error(f"❌ Failed to get Stage 1 data responses: {e}")
             return pd.DataFrame()
     
-    def get_stage2_response_labeling(self, client_id: str, quote_id: Optional[str] = None) -> pd.DataFrame:
+    def get_stage2_response_labeling(self, client_id: str, quote_id: Optional[str] = None,
+                                     columns: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
         """Get quote analysis from Supabase, filtered by client_id for data siloing"""
         try:
-            query = self.supabase.table('stage2_response_labeling').select('*')
-            
             # Always filter by client_id for data siloing
-            query = query.eq('client_id', client_id)
-            
+            query_filters = {'client_id': client_id}
             if quote_id:
-                query = query.eq('quote_id', quote_id)
+                query_filters['quote_id'] = quote_id
             
-            result = query.execute()
-            df = pd.DataFrame(result.data)
+            df = self.read_table('stage2_response_labeling', columns, filters=query_filters)
             
             logger.info(f"📊 Retrieved {len(df)} quote analyses from Supabase for client {client_id}")
             return df
@@ -237,18 +798,18 @@ class SupabaseDatabase:
     def get_unanalyzed_quotes(self, client_id: str) -> pd.DataFrame:
         """Get quotes that haven't been analyzed yet, filtered by client_id"""
         try:
-            # Get all core responses for this client
-            core_df = self.get_stage1_data_responses(client_id=client_id)
-            
-            if core_df.empty:
+            # Only the pending rows cross the wire; the anti-join runs in the database
+            pending = self.pending_ids(2, client_id)
+            if not pending:
+                logger.info(f"🔍 Found 0 unanalyzed quotes for client {client_id}")
                 return pd.DataFrame()
             
-            # Get all analyzed quote IDs for this client
-            analysis_df = self.get_stage2_response_labeling(client_id=client_id)
-            analyzed_ids = set(analysis_df['quote_id'].unique()) if not analysis_df.empty else set()
-            
-            # Filter out already analyzed quotes
-            unanalyzed_df = core_df[~core_df['response_id'].isin(analyzed_ids)]
+            chunks = [self.read_table('stage1_data_responses',
+                                      filters={'client_id': client_id, 'response_id': pending[i:i + PENDING_FETCH_CHUNK]})
+                      for i in range(0, len(pending), PENDING_FETCH_CHUNK)]
+            chunks = [c for c in chunks if not c.empty]
+            unanalyzed_df = self._sort_frame(pd.concat(chunks, ignore_index=True),
+                                             [('created_at', True)]) if chunks else pd.DataFrame()
             
             logger.info(f"🔍 Found {len(unanalyzed_df)} unanalyzed quotes for client {client_id}")
             return unanalyzed_df
@@ -260,8 +821,13 @@ class SupabaseDatabase:
     def get_summary_statistics(self, client_id: str) -> Dict[str, Any]:
         """Get summary statistics from Supabase, filtered by client_id for data siloing"""
         try:
+            stage1_rows = self.aggregate('voc_stage1_summary', client_id)
+            criteria_rows = self.aggregate('voc_stage2_criteria_summary', client_id) if stage1_rows is not None else None
+            if criteria_rows is not None:
+                return build_summary_statistics(stage1_rows, criteria_rows)
+            
             # Get core responses
-            core_df = self.get_stage1_data_responses(client_id=client_id)
+            core_df = self.get_stage1_data_responses(client_id=client_id, columns=['response_id', 'deal_status', 'company'])
             
             if core_df.empty:
                 return {
@@ -274,7 +840,7 @@ class SupabaseDatabase:
                 }
             
             # Get quote analysis
-            analysis_df = self.get_stage2_response_labeling(client_id=client_id)
+            analysis_df = self.get_stage2_response_labeling(client_id=client_id, columns=['quote_id', 'criterion', 'relevance_score'])
             
             # Calculate statistics
             total_quotes = len(core_df)
@@ -338,14 +904,30 @@ class SupabaseDatabase:
             logger.error(f"❌ Failed to save processing metadata: {e}")
             return False
     
+    def delete_stage2_response_labeling(self, client_id: str, quote_ids: List[str]) -> bool:
+        """Delete the Stage 2 labels of the given quotes (before they are re-scored)"""
+        try:
+            for i in range(0, len(quote_ids), PENDING_FETCH_CHUNK):
+                self.supabase.table('stage2_response_labeling').delete().eq('client_id', client_id) \
+                    .in_('quote_id', quote_ids[i:i + PENDING_FETCH_CHUNK]).execute()
+            self._snapshot_written('stage2_response_labeling', client_id, deleted=True)
+            logger.info(f"🗑️ Deleted Stage 2 labels of {len(quote_ids)} quotes for client {client_id}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to delete Stage 2 labels: {e}")
+            return False
+    
     def delete_core_response(self, response_id: str) -> bool:
         """Delete a core response and its associated analyses"""
         try:
             # Delete associated quote analyses first
             self.supabase.table('stage2_response_labeling').delete().eq('quote_id', response_id).execute()
+            self._snapshot_written('stage2_response_labeling', deleted=True)
             
             # Delete core response
             self.supabase.table('stage1_data_responses').delete().eq('response_id', response_id).execute()
+            self._snapshot_written('stage1_data_responses', deleted=True)
             
             logger.info(f"✅ Deleted core response: {response_id}")
             return True
@@ -448,8 +1030,21 @@ class SupabaseDatabase:
     def save_enhanced_finding(self, finding_data: Dict[str, Any], client_id: str) -> bool:
         """Save an enhanced finding to Supabase with Buried Wins v4.0 framework"""
         try:
-            # Generate unique finding ID if not provided
+            buffer = self._write_buffer
             finding_id = finding_data.get('finding_id')
+            if buffer is not None:
+                # Buffered: the client's existing ids are read once, then queued findings count as existing
+                known = buffer.memo(('stage3_findings', client_id), lambda: {
+                    r.get('finding_id') for r in self.iter_table('stage3_findings', 'finding_id', {'client_id': client_id})})
+                if not finding_id:
+                    nums = [int(f[1:]) for f in known if f and f.startswith('F') and f[1:].isdigit()]
+                    finding_id = f"F{max(nums, default=0) + 1}"
+                if finding_id in known:
+                    logger.info(f"⚠️ Finding {finding_id} already exists for client {client_id}, skipping...")
+                    return True
+                known.add(finding_id)
+            
+            # Generate unique finding ID if not provided
             if not finding_id:
                 # Get the next available finding ID for this specific client
                 result = self.supabase.table('stage3_findings').select('finding_id').eq('client_id', client_id).order('finding_id', desc=True).limit(1).execute()
@@ -461,11 +1056,12 @@ class SupabaseDatabase:
                     finding_id = "F1"
             
             # Check if this finding_id already exists for this client
-            existing = self.supabase.table('stage3_findings').select('finding_id').eq('client_id', client_id).eq('finding_id', finding_id).execute()
-            if existing.data:
-                # If finding already exists, skip it to avoid duplicates
-                logger.info(f"⚠️ Finding {finding_id} already exists for client {client_id}, skipping...")
-                return True
+            if buffer is None:
+                existing = self.supabase.table('stage3_findings').select('finding_id').eq('client_id', client_id).eq('finding_id', finding_id).execute()
+                if existing.data:
+                    # If finding already exists, skip it to avoid duplicates
+                    logger.info(f"⚠️ Finding {finding_id} already exists for client {client_id}, skipping...")
+                    return True
             
             # Prepare data for Supabase matching CSV structure exactly
             data = {
@@ -517,9 +1113,15 @@ class SupabaseDatabase:
                     else:
                         clean_data[k] = v
             
+            if buffer is not None:
+                # Bulk equivalent of insert-then-update-on-duplicate below
+                buffer.add('stage3_findings', clean_data, on_conflict='client_id,finding_id')
+                return True
+            
             # Insert to Supabase (not upsert to avoid conflicts)
             try:
                 result = self.supabase.table('stage3_findings').insert(clean_data).execute()
+                self._snapshot_written('stage3_findings')
                 logger.info(f"✅ Saved enhanced finding: {finding_id} - {finding_data.get('title', '')[:50]}... (Confidence: {finding_data.get('enhanced_confidence', 0):.1f})")
                 return True
             except Exception as insert_error:
@@ -529,6 +1131,7 @@ class SupabaseDatabase:
                     try:
                         # Update existing finding
                         result = self.supabase.table('stage3_findings').update(clean_data).eq('client_id', client_id).eq('finding_id', finding_id).execute()
+                        self._snapshot_written('stage3_findings')
                         logger.info(f"✅ Updated enhanced finding: {finding_id}")
                         return True
                     except Exception as update_error:
@@ -545,19 +1148,15 @@ class SupabaseDatabase:
     def get_findings(self, criterion: Optional[str] = None, finding_type: Optional[str] = None) -> pd.DataFrame:
         """Get findings from Supabase"""
         try:
-            query = self.supabase.table('findings').select('*')
-            
+            query_filters = {}
             if criterion:
-                query = query.eq('criterion', criterion)
-            
+                query_filters['criterion'] = criterion
             if finding_type:
-                query = query.eq('finding_type', finding_type)
+                query_filters['finding_type'] = finding_type
             
             # Order by impact_score desc, then by created_at desc
-            query = query.order('impact_score', desc=True).order('created_at', desc=True)
-            
-            result = query.execute()
-            df = pd.DataFrame(result.data)
+            df = self.read_table('findings', filters=query_filters,
+                                 order_by=[('impact_score', True), ('created_at', True)])
             
             # Parse JSON columns
             if not df.empty:
@@ -573,27 +1172,23 @@ class SupabaseDatabase:
             logger.error(f"❌ Failed to get findings: {e}")
             return pd.DataFrame()
     
-    def get_stage3_findings(self, client_id: str, criterion: Optional[str] = None, finding_type: Optional[str] = None, priority_level: Optional[str] = None) -> pd.DataFrame:
+    def get_stage3_findings(self, client_id: str, criterion: Optional[str] = None, finding_type: Optional[str] = None, priority_level: Optional[str] = None,
+                            columns: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
         """Get Stage 3 findings from Supabase, filtered by client_id for data siloing"""
         try:
-            query = self.supabase.table('stage3_findings').select('*')
-            
             # Always filter by client_id for data siloing
-            query = query.eq('client_id', client_id)
+            query_filters = {'client_id': client_id}
             
             # Apply additional filters
             if criterion:
-                query = query.eq('criteria_met', criterion)
+                query_filters['criteria_met'] = criterion
             if finding_type:
-                query = query.eq('finding_category', finding_type)
+                query_filters['finding_category'] = finding_type
             if priority_level:
-                query = query.eq('priority_level', priority_level)
+                query_filters['priority_level'] = priority_level
             
             # Order by enhanced_confidence desc
-            query = query.order('enhanced_confidence', desc=True)
-            
-            result = query.execute()
-            df = pd.DataFrame(result.data)
+            df = self.read_table('stage3_findings', columns, filters=query_filters, order_by=[('enhanced_confidence', True)])
             
             logger.info(f"📊 Retrieved {len(df)} enhanced findings from Supabase for client {client_id}")
             return df
@@ -622,6 +1217,7 @@ class SupabaseDatabase:
         """Delete all Stage 4 themes for a specific client"""
         try:
             response = self.supabase.table('stage4_themes').delete().eq('client_id', client_id).execute()
+            self._snapshot_written('stage4_themes', deleted=True)
             deleted_count = len(response.data) if response.data else 0
             logger.info(f"🗑️ Deleted {deleted_count} existing themes for client {client_id}")
             return True
@@ -633,6 +1229,7 @@ class SupabaseDatabase:
         """Delete all Stage 3 findings for a specific client"""
         try:
             response = self.supabase.table('stage3_findings').delete().eq('client_id', client_id).execute()
+            self._snapshot_written('stage3_findings', deleted=True)
             deleted_count = len(response.data) if response.data else 0
             logger.info(f"🗑️ Deleted {deleted_count} existing findings for client {client_id}")
             return True
@@ -688,8 +1285,13 @@ class SupabaseDatabase:
                     'alert_company_ids': theme_data.get('alert_company_ids', '')
                 })
             
+            if self._write_buffer is not None:
+                self._write_buffer.add('stage4_themes', record, mode='insert')
+                return True
+            
             # Insert record
             response = self.supabase.table('stage4_themes').insert(record).execute()
+            self._snapshot_written('stage4_themes')
             
             if response.data and len(response.data) > 0:
                 logger.info(f"✅ Saved Stage 4 {theme_type}: {theme_data.get('theme_id', 'Unknown')}")
@@ -714,6 +1316,7 @@ class SupabaseDatabase:
             
             # Update the finding in the database
             result = self.supabase.table('stage3_findings').update(update_data).eq('finding_id', finding_id).eq('client_id', client_id).execute()
+            self._snapshot_written('stage3_findings')
             
             if result.data:
                 logger.info(f"✅ Updated classification for finding {finding_id}: {classification}")
@@ -729,6 +1332,10 @@ class SupabaseDatabase:
     def get_stage3_findings_summary(self, client_id: str) -> Dict:
         """Get enhanced findings summary statistics, filtered by client_id"""
         try:
+            summary_rows = self.aggregate('voc_stage3_findings_summary', client_id)
+            if summary_rows is not None:
+                return build_findings_summary(summary_rows)
+            
             df = self.get_stage3_findings(client_id=client_id)
             if df.empty:
                 return {
@@ -838,8 +1445,7 @@ class SupabaseDatabase:
     def get_high_confidence_findings(self, min_confidence: float = 3.0) -> pd.DataFrame:
         """Get findings with high confidence scores for theme generation"""
         try:
-            response = self.supabase.table('findings').select('*').gte('confidence_score', min_confidence).execute()
-            return pd.DataFrame(response.data)
+            return self.read_table('findings', filters={'confidence_score': ('gte', min_confidence)})
         except Exception as e:
             logger.error(f"Error getting high confidence findings: {e}")
             return pd.DataFrame()
@@ -851,19 +1457,17 @@ class SupabaseDatabase:
             if 'client_id' not in theme_data or not theme_data['client_id']:
                 theme_data['client_id'] = client_id
             response = self.supabase.table('stage4_themes').insert(theme_data).execute()
+            self._snapshot_written('stage4_themes')
             return len(response.data) > 0
         except Exception as e:
             logger.error(f"Error saving theme: {e}")
             return False
 
-    def get_themes(self, client_id: str) -> pd.DataFrame:
+    def get_themes(self, client_id: str, columns: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
         """Get all themes from the stage4_themes table, filtered by client_id"""
         try:
-            query = self.supabase.table('stage4_themes').select('*')
-            if client_id is not None:
-                query = query.eq('client_id', client_id)
-            response = query.order('created_at', desc=True).execute()
-            df = pd.DataFrame(response.data)
+            query_filters = {'client_id': client_id} if client_id is not None else {}
+            df = self.read_table('stage4_themes', columns, filters=query_filters, order_by=[('created_at', True)])
             
             # Parse JSON columns safely
             if not df.empty:
@@ -906,6 +1510,7 @@ class SupabaseDatabase:
         """Delete a theme from the stage4_themes table"""
         try:
             response = self.supabase.table('stage4_themes').delete().eq('id', theme_id).eq('client_id', client_id).execute()
+            self._snapshot_written('stage4_themes', deleted=True)
             return len(response.data) > 0
         except Exception as e:
             logger.error(f"Error deleting theme: {e}")
@@ -928,8 +1533,7 @@ class SupabaseDatabase:
                 }
             
             # Get themes data filtered by client_id
-            themes_data = self.supabase.table('stage4_themes').select('*').eq('client_id', client_id).execute()
-            df = pd.DataFrame(themes_data.data)
+            df = self.read_table('stage4_themes', 'labels', filters={'client_id': client_id})
             
             # Calculate statistics
             high_strength = len(df[df['theme_strength'] == 'High'])
@@ -974,20 +1578,11 @@ class SupabaseDatabase:
         """Get findings with related quote data for theme analysis"""
         try:
             # Get findings with confidence >= 3.0
-            findings_response = self.supabase.table('findings').select('*').gte('confidence_score', 3.0).execute()
-            findings_df = pd.DataFrame(findings_response.data)
+            findings_df = self.read_table('findings', filters={'confidence_score': ('gte', 3.0)})
             
             if findings_df.empty:
                 return pd.DataFrame()
             
-            # Get related quote analysis data for context
-            stage2_response_labeling_response = self.supabase.table('stage2_response_labeling').select('*').execute()
-            quote_df = pd.DataFrame(stage2_response_labeling_response.data)
-            
-            # Get core responses for additional context
-            stage1_data_responses_response = self.supabase.table('stage1_data_responses').select('*').execute()
-            core_df = pd.DataFrame(stage1_data_responses_response.data)
-            
             return findings_df
             
         except Exception as e:
@@ -999,20 +1594,11 @@ class SupabaseDatabase:
         """Get themes ready for executive synthesis from stage4_themes"""
         try:
             # Get themes with high/medium strength
-            response = self.supabase.table('stage4_themes').select('*').in_('theme_strength', ['High', 'Medium']).execute()
-            df = pd.DataFrame(response.data)
+            df = self.read_table('stage4_themes', filters={'theme_strength': ['High', 'Medium']})
             
             if df.empty:
                 return pd.DataFrame()
             
-            # Get related findings data for context
-            findings_response = self.supabase.table('findings').select('*').execute()
-            findings_df = pd.DataFrame(findings_response.data)
-            
-            # Get quote analysis data for additional context
-            stage2_response_labeling_response = self.supabase.table('stage2_response_labeling').select('*').execute()
-            quote_df = pd.DataFrame(stage2_response_labeling_response.data)
-            
             logger.info(f"📊 Loaded {len(df)} stage4_themes for executive synthesis")
             return df
             
@@ -1023,63 +1609,36 @@ class SupabaseDatabase:
     def generate_criteria_scorecard(self, client_id: str) -> Dict:
         """Generate executive criteria scorecard from Stage 2 data, filtered by client_id"""
         try:
-            # Get quote analysis data filtered by client_id
-            stage2_response_labeling_response = self.supabase.table('stage2_response_labeling').select('*').eq('client_id', client_id).execute()
-            quote_df = pd.DataFrame(stage2_response_labeling_response.data)
+            criteria_rows = self.aggregate('voc_stage2_criteria_summary', client_id)
+            if criteria_rows is not None:
+                samples = self.aggregate('voc_stage2_sample_explanations', client_id, per_criterion=3) or []
+                metrics = build_scorecard_inputs(criteria_rows, samples)
+            else:
+                metrics = self._scorecard_metrics_from_tables(client_id)
             
-            if quote_df.empty:
+            if not metrics:
                 return {}
             
-            # Get core responses for company information filtered by client_id
-            stage1_data_responses_response = self.supabase.table('stage1_data_responses').select('*').eq('client_id', client_id).execute()
-            core_df = pd.DataFrame(stage1_data_responses_response.data)
-            
-            # Merge data for analysis
-            merged_df = quote_df.merge(core_df, left_on='quote_id', right_on='response_id', how='left')
-            
-            # Group by criterion and calculate metrics
             scorecard_data = []
-            
-            for criterion in merged_df['criterion'].unique():
-                criterion_data = merged_df[merged_df['criterion'] == criterion]
-                
-                if len(criterion_data) == 0:
-                    continue
-                
-                # Calculate metrics
-                avg_score = criterion_data['relevance_score'].mean()
-                total_mentions = len(criterion_data)
-                companies_affected = criterion_data['company'].nunique()
-                critical_mentions = len(criterion_data[criterion_data['relevance_score'] >= 4])
-                
-                # Calculate performance rating
-                performance_rating = self._calculate_performance_rating(avg_score, total_mentions, critical_mentions)
-                
-                # Calculate executive priority
-                executive_priority = self._determine_executive_priority(avg_score, companies_affected, critical_mentions)
-                
-                # Calculate action urgency
-                action_urgency = self._calculate_action_urgency(avg_score, critical_mentions, companies_affected)
-                
-                # Get sample quotes
-                sample_quotes = criterion_data['relevance_explanation'].head(3).tolist()
-                
-                # Analyze deal impact
-                deal_impact = criterion_data['deal_status'].value_counts().to_dict()
+            for m in metrics:
+                avg_score = m['avg_score']
+                total_mentions = m['total_mentions']
+                companies_affected = m['companies_affected']
+                critical_mentions = m['critical_mentions']
                 
                 scorecard_entry = {
-                    'criterion': criterion,
-                    'performance_rating': performance_rating,
+                    'criterion': m['criterion'],
+                    'performance_rating': self._calculate_performance_rating(avg_score, total_mentions, critical_mentions),
                     'avg_score': round(avg_score, 2),
                     'total_mentions': total_mentions,
                     'companies_affected': companies_affected,
                     'critical_mentions': critical_mentions,
-                    'executive_priority': executive_priority,
-                    'action_urgency': action_urgency,
+                    'executive_priority': self._determine_executive_priority(avg_score, companies_affected, critical_mentions),
+                    'action_urgency': self._calculate_action_urgency(avg_score, critical_mentions, companies_affected),
                     'trend_direction': 'STABLE',  # Placeholder - could be enhanced with historical data
-                    'key_insights': self._generate_key_insights(criterion, avg_score, total_mentions, companies_affected),
-                    'sample_quotes': sample_quotes,
-                    'deal_impact_analysis': deal_impact
+                    'key_insights': self._generate_key_insights(m['criterion'], avg_score, total_mentions, companies_affected),
+                    'sample_quotes': m['sample_quotes'],
+                    'deal_impact_analysis': m['deal_impact']
                 }
                 
                 scorecard_data.append(scorecard_entry)
@@ -1091,13 +1650,46 @@ class SupabaseDatabase:
             return {
                 'overall_performance': self._calculate_overall_performance(scorecard_data),
                 'criteria_details': scorecard_data,
-                'deal_impact_analysis': self._analyze_deal_impact(merged_df)
+                'deal_impact_analysis': self._classify_deal_impact({m['criterion']: m['deal_impact'] for m in metrics})
             }
             
         except Exception as e:
             logger.error(f"Error generating criteria scorecard: {e}")
             return {}
 
+    def _scorecard_metrics_from_tables(self, client_id: str) -> List[Dict[str, Any]]:
+        """Client-side equivalent of build_scorecard_inputs for deployments without the aggregate RPCs"""
+        # Get quote analysis data filtered by client_id
+        quote_df = self.read_table('stage2_response_labeling', 'quote_id,criterion,relevance_score,relevance_explanation',
+                                   filters={'client_id': client_id})
+        
+        if quote_df.empty:
+            return []
+        
+        # Get core responses for company information filtered by client_id
+        core_df = self.read_table('stage1_data_responses', 'response_id,company,deal_status', filters={'client_id': client_id})
+        
+        # Merge data for analysis
+        merged_df = quote_df.merge(core_df, left_on='quote_id', right_on='response_id', how='left')
+        
+        metrics = []
+        for criterion in merged_df['criterion'].unique():
+            criterion_data = merged_df[merged_df['criterion'] == criterion]
+            
+            if len(criterion_data) == 0:
+                continue
+            
+            metrics.append({
+                'criterion': criterion,
+                'avg_score': criterion_data['relevance_score'].mean(),
+                'total_mentions': len(criterion_data),
+                'companies_affected': criterion_data['company'].nunique(),
+                'critical_mentions': len(criterion_data[criterion_data['relevance_score'] >= 4]),
+                'sample_quotes': criterion_data['relevance_explanation'].head(3).tolist(),
+                'deal_impact': criterion_data['deal_status'].value_counts().to_dict()
+            })
+        return metrics
+
     def _calculate_performance_rating(self, avg_score: float, mentions: int, critical_mentions: int) -> str:
         """Calculate performance rating based on scores and mentions"""
         critical_ratio = critical_mentions / mentions if mentions > 0 else 0
@@ -1189,6 +1781,13 @@ class SupabaseDatabase:
             deal_counts = criterion_data['deal_status'].value_counts().to_dict()
             deal_impact[criterion] = deal_counts
         
+        return self._classify_deal_impact(deal_impact)
+
+    def _classify_deal_impact(self, deal_impact: Dict[str, Dict[str, int]]) -> Dict:
+        """Split criteria by whether they show up more in lost or won deals"""
+        if not deal_impact:
+            return {}
+        
         # Identify criteria affecting lost deals
         criteria_affecting_lost = []
         criteria_winning_deals = []
@@ -1234,8 +1833,8 @@ class SupabaseDatabase:
     def get_executive_themes(self, client_id: str) -> pd.DataFrame:
         """Get all executive themes filtered by client_id"""
         try:
-            response = self.supabase.table('executive_themes').select('*').eq('client_id', client_id).order('priority_score', desc=True).execute()
-            return pd.DataFrame(response.data)
+            return self.read_table('executive_themes', filters={'client_id': client_id},
+                                   order_by=[('priority_score', True)])
         except Exception as e:
             logger.error(f"Error getting executive themes: {e}")
             return pd.DataFrame()
@@ -1270,8 +1869,8 @@ class SupabaseDatabase:
                 }
             
             # Get themes data for detailed stats filtered by client_id
-            themes_data = self.supabase.table('executive_themes').select('*').eq('client_id', client_id).execute()
-            df = pd.DataFrame(themes_data.data)
+            df = self.read_table('executive_themes', 'id,business_impact_level,executive_readiness,theme_category',
+                                 filters={'client_id': client_id})
             
             high_impact = len(df[df['business_impact_level'] == 'High'])
             presentation_ready = len(df[df['executive_readiness'] == 'Presentation'])
@@ -1295,14 +1894,10 @@ class SupabaseDatabase:
                 'criteria_analyzed': 0
             }
 
-    def get_all_stage1_data_responses(self) -> pd.DataFrame:
+    def get_all_stage1_data_responses(self, columns: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
         """Get ALL core responses from Supabase without client_id filtering (for debugging)"""
         try:
-            query = self.supabase.table('stage1_data_responses').select('*')
-            query = query.order('created_at', desc=True)
-            
-            result = query.execute()
-            df = pd.DataFrame(result.data)
+            df = self.read_table('stage1_data_responses', columns, order_by=[('created_at', True)])
             
             logger.info(f"📊 Retrieved {len(df)} total core responses from Supabase (all clients)")
             return df
@@ -1314,7 +1909,13 @@ class SupabaseDatabase:
     def get_client_summary(self) -> Dict[str, int]:
         """Get summary of data by client_id"""
         try:
-            df = self.get_all_stage1_data_responses()
+            rows = self.aggregate('voc_client_counts')
+            if rows is not None:
+                client_counts = {r['client_id']: r['row_count'] for r in sorted(rows, key=lambda r: -r['row_count'])}
+                logger.info(f"📊 Client data summary: {client_counts}")
+                return client_counts
+            
+            df = self.get_all_stage1_data_responses(columns='client_id')
             if df.empty:
                 return {}
             
@@ -1326,11 +1927,10 @@ class SupabaseDatabase:
             logger.error(f"❌ Failed to get client summary: {e}")
             return {}
 
-    def get_interview_metadata(self, client_id: str) -> pd.DataFrame:
+    def get_interview_metadata(self, client_id: str, columns: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
         """Get interview metadata with deal outcomes for competitive intelligence analysis"""
         try:
-            response = self.supabase.table('interview_metadata').select('*').eq('client_id', client_id).execute()
-            df = pd.DataFrame(response.data)
+            df = self.read_table('interview_metadata', columns, filters={'client_id': client_id})
             
             if not df.empty:
                 logger.info(f"📊 Retrieved {len(df)} interview metadata records for client {client_id}")
@@ -1432,11 +2032,13 @@ class SupabaseDatabase:
             result = self.supabase.table('stage1_data_responses').update(
                 {'client_id': to_client_id}
             ).eq('client_id', from_client_id).execute()
+            self._snapshot_written('stage1_data_responses', deleted=True)
             
             # Update stage2_response_labeling
             result2 = self.supabase.table('stage2_response_labeling').update(
                 {'client_id': to_client_id}
             ).eq('client_id', from_client_id).execute()
+            self._snapshot_written('stage2_response_labeling', deleted=True)
             
             logger.info(f"✅ Merged data from {from_client_id} to {to_client_id}")
             return True
@@ -1460,8 +2062,7 @@ class SupabaseDatabase:
                 return pd.DataFrame()
             
             # Get the findings
-            findings_response = self.supabase.table('stage3_findings').select('*').in_('id', supporting_finding_ids).eq('client_id', client_id).execute()
-            findings_df = pd.DataFrame(findings_response.data)
+            findings_df = self.read_table('stage3_findings', filters={'id': supporting_finding_ids, 'client_id': client_id})
             
             if findings_df.empty:
                 return pd.DataFrame()
@@ -1492,7 +2093,7 @@ class SupabaseDatabase:
                             })
             
             # Get interviewee names for quotes
-            core_df = self.get_stage1_data_responses(client_id=client_id)
+            core_df = self.get_stage1_data_responses(client_id=client_id, columns='text')
             quotes_with_attribution = []
             
             for quote_data in all_quotes:
@@ -1521,8 +2122,7 @@ class SupabaseDatabase:
     def get_themes_for_curation(self, client_id: str) -> pd.DataFrame:
         """Get themes that need human curation."""
         try:
-            response = self.supabase.table('stage4_themes').select('*').eq('client_id', client_id).execute()
-            return pd.DataFrame(response.data)
+            return self.read_table('stage4_themes', filters={'client_id': client_id})
         except Exception as e:
             logger.error(f"Error getting themes for curation: {e}")
             return pd.DataFrame()
@@ -1537,6 +2137,7 @@ class SupabaseDatabase:
                 'curator_notes': notes
             }
             response = self.supabase.table('stage4_themes').update(update_data).eq('id', theme_id).execute()
+            self._snapshot_written('stage4_themes')
             return len(response.data) > 0
         except Exception as e:
             logger.error(f"Error saving theme curation: {e}")
@@ -1568,8 +2169,7 @@ class SupabaseDatabase:
     def get_approved_themes_for_export(self, client_id: str) -> pd.DataFrame:
         """Get approved themes for export."""
         try:
-            response = self.supabase.table('stage4_themes').select('*').eq('client_id', client_id).eq('curation_status', 'approved').execute()
-            return pd.DataFrame(response.data)
+            return self.read_table('stage4_themes', filters={'client_id': client_id, 'curation_status': 'approved'})
         except Exception as e:
             logger.error(f"Error getting approved themes: {e}")
             return pd.DataFrame()
@@ -1577,8 +2177,7 @@ class SupabaseDatabase:
     def get_approved_quotes_for_export(self, theme_ids: list) -> pd.DataFrame:
         """Get approved quotes for specific themes."""
         try:
-            response = self.supabase.table('quote_analysis').select('*').in_('theme_id', theme_ids).eq('curation_label', 'approve').execute()
-            return pd.DataFrame(response.data)
+            return self.read_table('quote_analysis', filters={'theme_id': list(theme_ids), 'curation_label': 'approve'})
         except Exception as e:
             logger.error(f"Error getting approved quotes: {e}")
             return pd.DataFrame()
@@ -1611,6 +2210,7 @@ class SupabaseDatabase:
             
             # Upsert to Supabase
             result = self.supabase.table('stage3_findings').upsert(data).execute()
+            self._snapshot_written('stage3_findings')
             
             logger.info(f"✅ Saved JSON finding: {finding_data.get('finding_id')}")
             return True
@@ -1622,30 +2222,28 @@ class SupabaseDatabase:
     def get_json_findings(self, client_id: str, filters: Optional[Dict] = None) -> List[Dict[str, Any]]:
         """Get findings with JSON data structure from Supabase"""
         try:
-            query = self.supabase.table('stage3_findings').select('*')
+            query_filters = {}
             
             # Apply filters if provided
             if filters and isinstance(filters, dict):
                 for key, value in filters.items():
                     if key in ['finding_category', 'interview_company', 'finding_id']:
-                        query = query.eq(key, value)
+                        query_filters[key] = value
                     elif key == 'date_from':
-                        query = query.gte('interview_date', value)
+                        query_filters.setdefault('interview_date', []).append(('gte', value))
                     elif key == 'date_to':
-                        query = query.lte('interview_date', value)
+                        query_filters.setdefault('interview_date', []).append(('lte', value))
                     elif key == 'min_impact':
-                        query = query.gte('impact_score', value)
+                        query_filters['impact_score'] = ('gte', value)
                     elif key == 'min_confidence':
-                        query = query.gte('confidence_score', value)
+                        query_filters['confidence_score'] = ('gte', value)
             
             # Order by created_at desc
-            query = query.order('created_at', desc=True)
-            
-            result = query.execute()
+            df = self.read_table('stage3_findings', filters=query_filters, order_by=[('created_at', True)])
             
             # Parse JSON data
             findings = []
-            for row in result.data:
+            for row in df.astype(object).where(df.notna(), None).to_dict('records'):
                 finding = {
                     'finding_id': row.get('finding_id'),
                     'finding_statement': row.get('finding_statement'),
@@ -1702,6 +2300,7 @@ class SupabaseDatabase:
             
             # Upsert to Supabase
             result = self.supabase.table('stage4_themes').upsert(data).execute()
+            self._snapshot_written('stage4_themes')
             
             logger.info(f"✅ Saved JSON theme: {theme_data.get('theme_id')}")
             return True
@@ -1713,26 +2312,24 @@ class SupabaseDatabase:
     def get_json_themes(self, client_id: str, filters: Optional[Dict] = None) -> List[Dict[str, Any]]:
         """Get themes with JSON data structure from Supabase"""
         try:
-            query = self.supabase.table('stage4_themes').select('*')
+            query_filters = {}
             
             # Apply filters if provided
             if filters and isinstance(filters, dict):
                 for key, value in filters.items():
                     if key in ['theme_id', 'alert_id', 'strategic_importance', 'alert_priority']:
-                        query = query.eq(key, value)
+                        query_filters[key] = value
                     elif key == 'date_from':
-                        query = query.gte('analysis_date', value)
+                        query_filters.setdefault('analysis_date', []).append(('gte', value))
                     elif key == 'date_to':
-                        query = query.lte('analysis_date', value)
+                        query_filters.setdefault('analysis_date', []).append(('lte', value))
             
             # Order by created_at desc
-            query = query.order('created_at', desc=True)
-            
-            result = query.execute()
+            df = self.read_table('stage4_themes', filters=query_filters, order_by=[('created_at', True)])
             
             # Parse JSON data
             themes = []
-            for row in result.data:
+            for row in df.astype(object).where(df.notna(), None).to_dict('records'):
                 theme = {
                     'theme_id': row.get('theme_id'),
                     'theme_name': row.get('theme_name'),
@@ -1880,10 +2477,10 @@ class SupabaseDatabase:
             logger.error(f"❌ Failed upsert_research_themes_return: {e}")
             return []
 
-    def fetch_stage1_responses(self, client_id: str) -> pd.DataFrame:
+    def fetch_stage1_responses(self, client_id: str, columns: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
         """Wrapper: return Stage 1 responses for client (alias for get_stage1_data_responses)."""
         try:
-            return self.get_stage1_data_responses(client_id=client_id)
+            return self.get_stage1_data_responses(client_id=client_id, columns=columns)
         except Exception:
             return pd.DataFrame()
 
@@ -1941,8 +2538,7 @@ class SupabaseDatabase:
         """Fetch full transcripts from interview_transcripts; if table missing, try interview_metadata.full_transcript."""
         try:
             try:
-                res = self.supabase.table('interview_transcripts').select('*').eq('client_id', client_id).execute()
-                df = pd.DataFrame(res.data or [])
+                df = self.read_table('interview_transcripts', filters={'client_id': client_id})
                 if not df.empty:
                     return df
             except Exception:
@@ -1950,8 +2546,8 @@ class SupabaseDatabase:
             # Fallback
             try:
                 # Select raw_transcripts and alias it as full_transcript for consumers
-                res2 = self.supabase.table('interview_metadata').select('client_id,interview_id,company,interviewee_name,raw_transcripts').eq('client_id', client_id).execute()
-                df2 = pd.DataFrame(res2.data or [])
+                df2 = self.read_table('interview_metadata', columns='client_id,interview_id,company,interviewee_name,raw_transcripts',
+                                      filters={'client_id': client_id})
                 if not df2.empty and 'raw_transcripts' in df2.columns:
                     df2 = df2.rename(columns={'raw_transcripts': 'full_transcript'})
                 return df2
@@ -1989,8 +2585,7 @@ class SupabaseDatabase:
     def fetch_interview_level_themes(self, client_id: str) -> pd.DataFrame:
         """Fetch per-interview themes if present."""
         try:
-            res = self.supabase.table('interview_level_themes').select('*').eq('client_id', client_id).execute()
-            return pd.DataFrame(res.data or [])
+            return self.read_table('interview_level_themes', filters={'client_id': client_id})
         except Exception:
             return pd.DataFrame()
 
@@ -2023,24 +2618,21 @@ class SupabaseDatabase:
     def fetch_interview_cluster_evidence(self, client_id: str) -> pd.DataFrame:
         """Fetch existing evidence decisions for a client."""
         try:
-            res = self.supabase.table('interview_cluster_evidence').select('*').eq('client_id', client_id).execute()
-            return pd.DataFrame(res.data or [])
+            return self.read_table('interview_cluster_evidence', filters={'client_id': client_id})
         except Exception:
             return pd.DataFrame()
 
     def fetch_research_themes_all(self, client_id: str) -> pd.DataFrame:
         """Fetch research_themes for a client (both research and discovered)."""
         try:
-            res = self.supabase.table('research_themes').select('*').eq('client_id', client_id).execute()
-            return pd.DataFrame(res.data or [])
+            return self.read_table('research_themes', filters={'client_id': client_id})
         except Exception:
             return pd.DataFrame()
 
     def fetch_interview_level_themes(self, client_id: str) -> pd.DataFrame:
         """Fetch interview_level_themes."""
         try:
-            res = self.supabase.table('interview_level_themes').select('*').eq('client_id', client_id).execute()
-            return pd.DataFrame(res.data or [])
+            return self.read_table('interview_level_themes', filters={'client_id': client_id})
         except Exception:
             return pd.DataFrame()
 
@@ -2070,8 +2662,8 @@ class SupabaseDatabase:
             return self._fetch_llm_theme_similarity(client_id, min_score)
         else:
             try:
-                res = self.supabase.table('theme_similarity').select('*').eq('client_id', client_id).gte('score', min_score).order('score', desc=True).execute()
-                return pd.DataFrame(res.data or [])
+                return self.read_table('theme_similarity', filters={'client_id': client_id, 'score': ('gte', min_score)},
+                                       order_by=[('score', True)])
             except Exception:
                 return pd.DataFrame()
 
@@ -2262,8 +2854,8 @@ Return only valid JSON."""
     def _fetch_rule_based_similarity(self, client_id: str, min_score: float = 0.7) -> pd.DataFrame:
         """Fallback to rule-based similarity when LLM is not available."""
         try:
-            res = self.supabase.table('theme_similarity').select('*').eq('client_id', client_id).gte('score', min_score).order('score', desc=True).execute()
-            return pd.DataFrame(res.data or [])
+            return self.read_table('theme_similarity', filters={'client_id': client_id, 'score': ('gte', min_score)},
+                                   order_by=[('score', True)])
         except Exception:
             return pd.DataFrame()
 
@@ -2283,6 +2875,29 @@ Return only valid JSON."""
             logger.warning(f"⚠️ upsert_theme_link failed: {e}")
             return False
 
+    def get_embedding_namespace(self, client_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Active/target embedding namespace row for a client (None if the client was never migrated).
+        A failed lookup raises: treating it as "never migrated" would send a switched client to the legacy namespace.
+        """
+        try:
+            res = self.supabase.table('embedding_namespaces').select('*').eq('client_id', client_id).limit(1).execute()
+        except Exception as e:
+            logger.error(f"❌ get_embedding_namespace failed: {e}")
+            raise
+        return res.data[0] if res.data else None
+
+    def upsert_embedding_namespace(self, row: Dict[str, Any]) -> bool:
+        """Upsert one embedding_namespaces row; a single-row write, so switching the active namespace is atomic."""
+        try:
+            data = dict(row)
+            data['updated_at'] = datetime.now().isoformat()
+            self.supabase.table('embedding_namespaces').upsert(data, on_conflict='client_id').execute()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ upsert_embedding_namespace failed: {e}")
+            return False
+
 def create_supabase_database() -> SupabaseDatabase:
     """Factory function to create Supabase database instance"""
     return SupabaseDatabase() 
\ No newline at end of file
@@ -12,6 +12,7 @@ import argparse
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any
+import numpy as np
 import pandas as pd
 import re
 from openpyxl import Workbook, load_workbook
@@ -22,6 +23,7 @@ from openpyxl.worksheet.datavalidation import DataValidation
 from guiding_story_analyzer import build_guiding_story_payload, to_overview_table  # NEW
 from interview_theme_rollup import rollup_interview_themes  # NEW for aggregated interview themes
 from embedding_utils import EmbeddingManager  # use manager API
+from embedding_quantization import QuantizedMatrix
 
 
 # Add project root to path
@@ -51,6 +53,8 @@ class SupioHarmonizedWorkbookGenerator:
     _COMPETITOR_LEXICON = {
         'competitor','competitors','alternative','alternatives','other provider','other providers','switch','switching','vs','versus','compare','comparison','compared','against','rival','rivals'
     }
+    # Quotes shortlisted per theme centroid before the exact rerank and the impact/sentiment blend
+    _QUOTE_CANDIDATES = 48
 
     def __init__(self, client_id: str):
         self.client_id = client_id
@@ -196,19 +200,13 @@ class SupioHarmonizedWorkbookGenerator:
 
             # Get basic stats
             try:
-                # Get total quotes
-                quotes_response = self.db.supabase.table('stage1_data_responses').select('count').eq('client_id', self.client_id).execute()
-                total_quotes = quotes_response.count if hasattr(quotes_response, 'count') else 0
-
-                # Get unique companies
-                companies_response = self.db.supabase.table('stage1_data_responses').select('company').eq('client_id', self.client_id).execute()
-                companies = set(item.get('company', '') for item in companies_response.data if item.get('company'))
-                total_companies = len(companies)
-
-                # Get unique interviewees
-                interviewees_response = self.db.supabase.table('stage1_data_responses').select('interviewee_name').eq('client_id', self.client_id).execute()
-                interviewees = set(item.get('interviewee_name', '') for item in interviewees_response.data if item.get('interviewee_name'))
-                total_interviewees = len(interviewees)
+                # One paged two-column read covers quote, company and interviewee counts
+                stats_df = self.db.read_table('stage1_data_responses', ['company', 'interviewee_name'],
+                                              filters={'client_id': self.client_id})
+                total_quotes = len(stats_df)
+                distinct = lambda col: len(set(stats_df[col].dropna()) - {''}) if col in stats_df.columns else 0
+                total_companies = distinct('company')
+                total_interviewees = distinct('interviewee_name')
 
             except Exception as e:
                 logger.warning(f"⚠️ Could not fetch stats: {e}")
@@ -249,10 +247,9 @@ class SupioHarmonizedWorkbookGenerator:
 
     def _fetch_quotes_df(self) -> pd.DataFrame:
         """Fetch Stage 1 responses for quote lookups."""
-        quotes_response = self.db.supabase.table('stage1_data_responses').select(
-            'response_id,company,interviewee_name,verbatim_response,sentiment,deal_status'
-        ).eq('client_id', self.client_id).execute()
-        return pd.DataFrame(quotes_response.data or [])
+        return self.db.read_table(
+            'stage1_data_responses', 'response_id,company,interviewee_name,verbatim_response,sentiment,deal_status',
+            filters={'client_id': self.client_id})
 
     def _add_grouped_themes_tab(self):
         """Add a non-destructive grouped view: parents = harmonized_subject; children = original themes."""
@@ -504,7 +501,7 @@ class SupioHarmonizedWorkbookGenerator:
             if not quotes_df.empty:
                 mgr = EmbeddingManager()
                 quote_texts = quotes_df.get('verbatim_response', pd.Series(dtype=str)).fillna('').astype(str).tolist()
-                quote_embs = mgr.get_embeddings_batch(quote_texts, batch_size=100)
+                quote_index = self._quote_index(mgr, quote_texts)
                 # Prepare impact/sent features for ranking
                 quotes_df['impact_score'] = pd.to_numeric(quotes_df.get('impact_score', 0), errors='coerce').fillna(0)
                 sent_map = {'very_positive': 1.0, 'positive': 0.8, 'neutral': 0.4, 'negative': 0.8, 'very_negative': 1.0}
@@ -533,9 +530,9 @@ class SupioHarmonizedWorkbookGenerator:
                             centroid = [sum(vals) / len(valid) for vals in zip(*valid)]
                     if centroid is None:
                         centroid = mgr.get_embeddings_batch([str(canonical)], batch_size=1)[0]
-                    sims = [mgr.calculate_cosine_similarity(e, centroid) if e is not None else 0.0 for e in quote_embs]
-                    qbase = quotes_df.copy()
-                    qbase['similarity'] = sims
+                    rows, sims = self._nearest_quotes(mgr, quote_index, quote_texts, centroid)
+                    qbase = quotes_df.iloc[rows].copy()
+                    qbase['similarity'] = sims.astype(float)
                     qbase['len_val'] = qbase['verbatim_response'].astype(str).apply(lambda t: len(str(t)))
                     theme_kw = {w for w in theme_tokens if ' ' in w or len(w) > 3}
                     def _overlap_score(t: str) -> float:
@@ -1730,7 +1727,7 @@ class SupioHarmonizedWorkbookGenerator:
             # Precompute quote embeddings once
             mgr = EmbeddingManager()
             quote_texts = quotes_df.get('verbatim_response', pd.Series(dtype=str)).fillna('').astype(str).tolist()
-            quote_embs = mgr.get_embeddings_batch(quote_texts, batch_size=100)
+            quote_index = self._quote_index(mgr, quote_texts)
             # Impact and sentiment strength for tie-breaking
             quotes_df['impact_score'] = pd.to_numeric(quotes_df.get('impact_score', 0), errors='coerce').fillna(0)
             sent_map = {'very_positive': 1.0, 'positive': 0.8, 'neutral': 0.4, 'negative': 0.8, 'very_negative': 1.0}
@@ -1776,14 +1773,9 @@ class SupioHarmonizedWorkbookGenerator:
                     centroid = mgr.get_embeddings_batch([str(theme)], batch_size=1)[0]
 
                 # Rank quotes by cosine similarity to centroid; tie-break by impact/sent
-                sims = []
-                for e in quote_embs:
-                    if e is None or centroid is None:
-                        sims.append(0.0)
-                    else:
-                        sims.append(mgr.calculate_cosine_similarity(e, centroid))
-                qsub = quotes_df.copy()
-                qsub['similarity'] = sims
+                rows, sims = self._nearest_quotes(mgr, quote_index, quote_texts, centroid)
+                qsub = quotes_df.iloc[rows].copy()
+                qsub['similarity'] = sims.astype(float)
                 qsub['rank_score'] = 0.8 * qsub['similarity'] + 0.2 * (0.7 * qsub['impact_norm'] + 0.3 * qsub['sent_strength'])
                 qsub = qsub.sort_values(by='rank_score', ascending=False)
                 picks = []
@@ -1813,6 +1805,27 @@ class SupioHarmonizedWorkbookGenerator:
         except Exception as e:
             logger.warning(f"⚠️ Interview Cluster Evidence tab failed: {e}")
 
+    def _quote_index(self, mgr, quote_texts: List[str]) -> QuantizedMatrix:
+        """Quantized quote embeddings, built batch by batch so the full-precision vectors are never all held"""
+        return QuantizedMatrix.from_embedding_batches(mgr.iter_embedding_batches(quote_texts, batch_size=100),
+                                                      mgr.dimension, mode=os.getenv('EMBEDDING_QUANTIZATION', 'float16'))
+
+    def _nearest_quotes(self, mgr, quote_index: QuantizedMatrix, quote_texts: List[str], centroid):
+        """
+        (row positions, exact cosine) of the quotes closest to a theme centroid: shortlisted on the
+        quantized index, then re-embedded and re-scored at full precision. A quote whose re-embedding
+        fails keeps its stored vector.
+        """
+        if centroid is None or not len(quote_index):
+            return np.empty(0, dtype=int), np.empty(0, dtype=np.float32)
+
+        def exact(rows):
+            fresh = mgr.get_embeddings_batch([quote_texts[i] for i in rows], batch_size=100)
+            stored = quote_index.decode(rows)
+            return np.stack([stored[k] if e is None else np.asarray(e, dtype=np.float32) for k, e in enumerate(fresh)])
+
+        return quote_index.search(centroid, top_k=min(self._QUOTE_CANDIDATES, len(quote_index)), rerank=2, exact=exact)
+
     def _normalize_for_match(self, text: str) -> str:
         if not text:
             return ''
@@ -0,0 +1,111 @@
+import operator
+from types import SimpleNamespace
+
+import pytest
+
+from supabase_database import SupabaseDatabase
+
+
+class _FakeIndex:
+	def __init__(self):
+		self.vectors = {}
+		self.namespaces = {"": self.vectors}
+		self.upserts = 0
+
+	def fetch(self, ids, namespace=""):
+		stored = self.namespaces.get(namespace, {})
+		return {"vectors": {i: {"metadata": stored[i][1]} for i in ids if i in stored}}
+
+	def list(self, prefix, namespace=""):
+		yield [i for i in self.namespaces.get(namespace, {}) if i.startswith(prefix)]
+
+	def upsert(self, vectors, namespace=""):
+		self.upserts += 1
+		for vid, emb, meta in vectors:
+			self.namespaces.setdefault(namespace, {})[vid] = (emb, meta)
+
+	def delete(self, ids, namespace=""):
+		for i in ids:
+			self.namespaces.get(namespace, {}).pop(i, None)
+
+
+@pytest.fixture
+def fake_index():
+	"""In-memory stand-in for a Pinecone index, one dict of (values, metadata) per namespace"""
+	return _FakeIndex()
+
+
+class _FakeQuery:
+	def __init__(self, rows, cap):
+		self.rows, self.cap = rows, cap
+		self.preds, self.order_key, self.desc, self.bounds = [], None, False, None
+		self.lim = None
+
+	def select(self, columns):
+		self.columns = None if columns == "*" else [c.strip() for c in columns.split(",")]
+		return self
+
+	def _where(self, column, op, arg):
+		self.preds.append(lambda r: r.get(column) is not None and op(r[column], arg))
+		return self
+
+	def eq(self, c, v): return self._where(c, operator.eq, v)
+	def gt(self, c, v): return self._where(c, operator.gt, v)
+	def lt(self, c, v): return self._where(c, operator.lt, v)
+	def gte(self, c, v): return self._where(c, operator.ge, v)
+
+	def in_(self, c, values):
+		self.preds.append(lambda r: r.get(c) in values)
+		return self
+
+	def order(self, key, desc=False):
+		self.order_key, self.desc = key, desc
+		return self
+
+	def limit(self, n):
+		self.lim = n
+		return self
+
+	def range(self, start, end):
+		self.bounds = (start, end + 1)
+		return self
+
+	def execute(self):
+		rows = [r for r in self.rows if all(p(r) for p in self.preds)]
+		if self.order_key:
+			rows.sort(key=lambda r: r[self.order_key], reverse=self.desc)
+		if self.bounds:
+			rows = rows[self.bounds[0]:self.bounds[1]]
+		rows = rows[:min(self.lim or self.cap, self.cap)]
+		if self.columns:
+			rows = [{c: r.get(c) for c in self.columns} for r in rows]
+		return SimpleNamespace(data=rows)
+
+
+def _fake_db(rows, cap=7):
+	db = object.__new__(SupabaseDatabase)
+	db.supabase = SimpleNamespace(table=lambda name: _FakeQuery(rows[name] if isinstance(rows, dict) else rows, cap))
+	db.snapshot = db._write_buffer = None
+	db._missing_rpcs = set()
+	db._column_support = {}
+	return db
+
+
+def _responses(n):
+	return [{"id": i + 1, "response_id": f"r{i}", "client_id": "acme" if i % 3 else "beta",
+	         "created_at": f"2025-01-{i % 28 + 1:02d}", "verbatim_response": "x" * i} for i in range(n)]
+
+
+@pytest.fixture
+def make_db():
+	"""SupabaseDatabase factory over a fake client capped at `cap` rows per request
+
+	`rows` is one row list served for every table, or a dict of rows per table name
+	"""
+	return _fake_db
+
+
+@pytest.fixture
+def make_responses():
+	"""Factory for n stage1_data_responses rows split between the acme and beta clients"""
+	return _responses
@@ -0,0 +1,57 @@
+import batch_embed_and_upsert as beu
+
+
+def _embed(texts):
+	_embed.calls += 1
+	_embed.texts += len(texts)
+	return [[float(len(t)), 1.0] for t in texts]
+
+
+def _records(*texts):
+	return [{"response_id": f"r{i}", "verbatim_response": t} for i, t in enumerate(texts)]
+
+
+def test_upsert_records_skips_unchanged_and_reports_plan(fake_index):
+	index = fake_index
+	_embed.calls = _embed.texts = 0
+	stats = beu.upsert_records(_records("a", "b", "c"), "response", "acme", index=index, embed_fn=_embed)
+	assert (stats["add"], stats["upserted"], _embed.calls) == (3, 3, 1)
+	assert index.vectors["acme:response:r0"][1]["content_hash"] == beu.content_hash("a")
+
+	# Second run: r1 changed, r2 deleted upstream, r3 new; dry run touches nothing
+	before = dict(index.vectors)
+	plan = beu.upsert_records(_records("a", "B", "") + [{"response_id": "r3", "verbatim_response": "d"}],
+	                          "response", "acme", index=index, embed_fn=_embed, dry_run=True)
+	assert {k: plan[k] for k in ("add", "update", "unchanged", "remove")} == {"add": 1, "update": 1, "unchanged": 1, "remove": 1}
+	assert index.vectors == before
+
+	_embed.texts = 0
+	stats = beu.upsert_records(_records("a", "B", "") + [{"response_id": "r3", "verbatim_response": "d"}],
+	                           "response", "acme", index=index, embed_fn=_embed, prune=True)
+	assert (_embed.texts, stats["upserted"], stats["removed"]) == (2, 2, 1)
+	assert sorted(index.vectors) == ["acme:response:r0", "acme:response:r1", "acme:response:r3"]
+
+
+def test_prune_is_skipped_when_the_source_fetch_fails_or_would_wipe_the_index(fake_index):
+	index = fake_index
+	_embed.calls = _embed.texts = 0
+	beu.upsert_records(_records("a", "b", "c", "d"), "response", "acme", index=index, embed_fn=_embed)
+
+	class _BrokenDb:
+		def get_stage1_data_responses(self, **kwargs):
+			raise ConnectionError("timeout")
+		get_stage3_findings = get_themes = lambda self, *args, **kwargs: beu.pd.DataFrame()
+
+	loaded = dict(beu.load_client_records(_BrokenDb(), "acme"))
+	assert loaded == {"response": None, "finding": [], "theme": []}
+	for records in (loaded["response"], []):
+		stats = beu.upsert_records(records, "response", "acme", index=index, embed_fn=_embed, prune=True)
+		assert stats["removed"] == 0 and stats["prune_blocked"]
+	assert len(index.vectors) == 4
+
+	# Removing 3 of 4 stored vectors exceeds the cap unless forced
+	stats = beu.upsert_records(_records("a"), "response", "acme", index=index, embed_fn=_embed, prune=True)
+	assert (stats["removed"], len(index.vectors)) == (0, 4) and "--force-prune" in stats["prune_blocked"]
+	stats = beu.upsert_records(_records("a"), "response", "acme", index=index, embed_fn=_embed, prune=True,
+	                           force_prune=True)
+	assert (stats["removed"], sorted(index.vectors)) == (3, ["acme:response:r0"])
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from client_bundle import export_bundle, import_bundle, read_manifest
+from supabase_database import SupabaseDatabase
+
+
+def test_bundle_round_trips_a_client_into_another_database(tmp_path):
+	source = SupabaseDatabase(backend="local", local_path=str(tmp_path / "source.sqlite"))
+	rows = [{"response_id": f"r{i}", "client_id": "acme", "harmonized_subject": "Pricing",
+	         "embedding": [0.5, float(i)], "criteria_met": i if i % 2 else str(i)} for i in range(5)]
+	source.supabase.table("stage1_data_responses").insert(rows).execute()
+	source.supabase.table("stage3_findings").insert({"finding_id": "F1", "client_id": "acme"}).execute()
+
+	manifest = export_bundle(source, "acme", str(tmp_path / "bundle"))
+	assert manifest["tables"]["stage1_data_responses"]["rows"] == 5
+	assert manifest["tables"]["stage4_themes"]["rows"] == 0
+
+	target = SupabaseDatabase(backend="local", local_path=str(tmp_path / "target.sqlite"))
+	assert import_bundle(target, str(tmp_path / "bundle"), client_id="copy")["stage1_data_responses"] == 5
+	copied = target.read_table("stage1_data_responses", filters={"client_id": "copy"}, order_by=[("id", False)])
+	assert copied["embedding"].tolist()[4] == [0.5, 4.0]
+	assert copied["criteria_met"].tolist()[:2] == ["0", 1]
+
+	with open(tmp_path / "bundle" / "stage3_findings.parquet", "ab") as f:
+		f.write(b"tampered")
+	with pytest.raises(ValueError):
+		read_manifest(str(tmp_path / "bundle"))
@@ -0,0 +1,101 @@
+import time
+import threading
+
+from embed_micro_batch import MicroBatchQueue
+
+
+class _FakeEmbedding:
+	"""embed_fn/upsert_fn pair recording each flush; fails the first `failures` embed calls"""
+
+	def __init__(self, failures=0):
+		self.failures = failures
+		self.embed_calls, self.upserts = [], []
+		self.flushed = threading.Event()
+
+	def embed(self, texts, namespace):
+		self.embed_calls.append(list(texts))
+		if len(self.embed_calls) <= self.failures:
+			raise RuntimeError("rate limited")
+		return [[float(len(t))] for t in texts]
+
+	def upsert(self, vectors, namespace):
+		self.upserts.append([(v["id"], v["values"][0]) for v in vectors])
+		self.flushed.set()
+
+
+def _queue(fake, **kwargs):
+	return MicroBatchQueue(fake.embed, fake.upsert, retry_backoff=0, **kwargs)
+
+
+def _record(i, text="text"):
+	return {"id": i, "client_id": "acme", "finding_statement": text}
+
+
+def test_flushes_when_the_batch_is_full():
+	fake = _FakeEmbedding()
+	queue = _queue(fake, flush_size=3, flush_window=60)
+	queue.start()
+	for i in range(3):
+		assert queue.put(_record(i), "finding", f"t{i}")
+	assert fake.flushed.wait(5)
+	queue.stop()
+	assert fake.upserts == [[("finding-0", 2.0), ("finding-1", 2.0), ("finding-2", 2.0)]]
+	assert queue.metrics()["flushes"] == 1
+
+
+def test_flushes_a_partial_batch_after_the_window():
+	fake = _FakeEmbedding()
+	queue = _queue(fake, flush_size=100, flush_window=0.05)
+	queue.start()
+	started = time.monotonic()
+	queue.put(_record(1), "finding", "one")
+	assert fake.flushed.wait(5)
+	assert time.monotonic() - started >= 0.05
+	assert fake.upserts == [[("finding-1", 3.0)]]
+	queue.stop()
+
+
+def test_repeated_ids_collapse_into_the_latest_version():
+	fake = _FakeEmbedding()
+	queue = _queue(fake, flush_size=100, flush_window=60)
+	queue.put(_record(1), "finding", "old")
+	queue.put(_record(2), "finding", "other")
+	queue.put(_record(1), "finding", "latest")
+	queue.start()
+	queue.stop()
+	assert fake.embed_calls == [["latest", "other"]]
+	m = queue.metrics()
+	assert (m["events_received"], m["events_deduplicated"], m["vectors_upserted"]) == (3, 1, 2)
+
+
+def test_retries_a_failed_flush_then_gives_up():
+	fake = _FakeEmbedding(failures=1)
+	queue = _queue(fake, max_retries=2)
+	assert queue.flush([(_record(1), "finding", "one", time.monotonic())])
+	assert len(fake.embed_calls) == 2 and len(fake.upserts) == 1
+
+	fake = _FakeEmbedding(failures=5)
+	queue = _queue(fake, max_retries=3)
+	assert not queue.flush([(_record(1), "finding", "one", time.monotonic())])
+	assert len(fake.embed_calls) == 3 and fake.upserts == []
+	m = queue.metrics()
+	assert (m["flush_failures"], m["vectors_failed"], m["vectors_upserted"]) == (1, 1, 0)
+
+
+def test_events_whose_namespace_lookup_fails_are_not_written_anywhere():
+	fake = _FakeEmbedding()
+	lookups = []
+
+	def namespace_fn(client_id):
+		lookups.append(client_id)
+		if client_id == "beta":
+			raise ConnectionError("registry unavailable")
+		return "text-embedding-3-small@4"
+
+	queue = _queue(fake, max_retries=2, namespace_fn=namespace_fn)
+	batch = [(_record(1), "finding", "one", time.monotonic()),
+	         (dict(_record(2), client_id="beta"), "finding", "two", time.monotonic())]
+	assert not queue.flush(batch)
+	assert fake.upserts == [[("finding-1", 3.0)]] and lookups == ["acme", "beta", "beta"]
+	m = queue.metrics()
+	assert (m["vectors_upserted"], m["vectors_failed"]) == (1, 1)
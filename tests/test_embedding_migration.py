@@ -0,0 +1,67 @@
+import pytest
+
+from embedding_migration import RateBudget, ReembedWorker
+from embedding_utils import EmbeddingNamespaceMismatch, NamespaceRegistry, check_namespace_vector
+
+
+class _FakeDB:
+	def __init__(self):
+		self.rows = {}
+		self.down = False
+
+	def get_embedding_namespace(self, client_id):
+		if self.down:
+			raise ConnectionError("timeout")
+		return self.rows.get(client_id)
+
+	def upsert_embedding_namespace(self, row):
+		self.rows.setdefault(row["client_id"], {}).update(row)
+		return True
+
+
+def test_rate_budget_waits_for_refill():
+	now = [0.0]
+	sleeps = []
+	budget = RateBudget(600, clock=lambda: now[0], sleep=lambda s: (sleeps.append(s), now.__setitem__(0, now[0] + s)))
+	assert budget.acquire(600) == 0.0
+	assert budget.acquire(100) == pytest.approx(10.0)
+	assert sum(sleeps) == pytest.approx(10.0)
+
+
+def test_worker_migrates_then_switches_reads(fake_index):
+	db, index = _FakeDB(), fake_index
+	registry = NamespaceRegistry(db, ttl_seconds=0)
+	target = "text-embedding-3-small@4"
+	records = [{"response_id": f"r{i}", "verbatim_response": f"text {i}"} for i in range(5)]
+	calls = []
+
+	def embed(texts):
+		calls.append(len(texts))
+		return [[1.0, 0.0, 0.0, float(len(t))] for t in texts]
+
+	worker = ReembedWorker("acme", target, registry=registry, index=index, embed_fn=embed,
+	                       load_records=lambda cid: [("response", records)], chunk_size=2)
+	assert registry.resolve("acme")["namespace"] == ""
+	assert worker.run() == "active"
+	assert sorted(index.namespaces[target]) == [f"acme:response:r{i}" for i in range(5)]
+	assert registry.resolve("acme") == {"namespace": target, "model": "text-embedding-3-small", "dimension": 4}
+	assert worker.progress()["percent"] == 100.0 and sum(calls) == 5
+
+	# Migrating to the namespace already in use is refused
+	with pytest.raises(ValueError):
+		ReembedWorker("acme", target, registry=registry, index=index, embed_fn=embed,
+		              load_records=lambda cid: []).run()
+	with pytest.raises(EmbeddingNamespaceMismatch):
+		check_namespace_vector(target, [0.0] * 1536)
+
+
+def test_failed_namespace_lookups_raise_and_are_not_cached():
+	db = _FakeDB()
+	db.rows["acme"] = {"client_id": "acme", "active_namespace": "text-embedding-3-small@4"}
+	registry = NamespaceRegistry(db, ttl_seconds=60)
+	db.down = True
+	with pytest.raises(ConnectionError):
+		registry.resolve("acme")
+	db.down = False
+	assert registry.resolve("acme")["namespace"] == "text-embedding-3-small@4"
+	assert registry.resolve("beta")["namespace"] == ""
@@ -0,0 +1,69 @@
+import numpy as np
+
+from embedding_quantization import EmbeddingCache, QuantizedMatrix
+
+
+def _corpus(n=500, dim=64, seed=0):
+	rng = np.random.default_rng(seed)
+	return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_quantized_scores_track_float32_cosine():
+	corpus = _corpus()
+	query = corpus[3] + 0.1
+	exact = QuantizedMatrix.from_matrix(corpus, mode='float32').scores(query)
+	for mode, tol in (('float16', 1e-3), ('int8', 2e-2)):
+		qm = QuantizedMatrix.from_matrix(corpus, mode=mode)
+		assert np.max(np.abs(qm.scores(query) - exact)) < tol
+	assert QuantizedMatrix.from_matrix(corpus, mode='int8').nbytes < corpus.nbytes / 3
+
+
+def test_search_with_exact_rerank_matches_brute_force():
+	corpus = _corpus()
+	query = corpus[10] + 0.2
+	truth, _ = QuantizedMatrix.from_matrix(corpus, mode='float32').search(query, top_k=5)
+	qm = QuantizedMatrix.from_matrix(corpus, mode='int8', pca_dim=48)
+	idx, scores = qm.search(query, top_k=5, rerank=10, exact=corpus)
+	assert list(idx) == list(truth)
+	assert np.all(np.diff(scores) <= 0)
+
+
+def test_save_load_and_cache_roundtrip(tmp_path):
+	corpus = _corpus(n=20)
+	qm = QuantizedMatrix.from_matrix(corpus, mode='int8', pca_dim=8)
+	path = str(tmp_path / 'm.npz')
+	qm.save(path, keys=np.array(['a'] * 20))
+	loaded, extra = QuantizedMatrix.load(path)
+	assert loaded.mode == 'int8' and list(extra['keys']) == ['a'] * 20
+	assert np.allclose(loaded.scores(corpus[0]), qm.scores(corpus[0]))
+
+	cache = EmbeddingCache(str(tmp_path), 'test-model')
+	cache.put_many(['hello', 'world'], [corpus[0].tolist(), None])
+	cache.save()
+	reopened = EmbeddingCache(str(tmp_path), 'test-model')
+	hit, miss = reopened.get_many(['hello', 'world'])
+	assert miss is None
+	assert float(hit @ corpus[0] / np.linalg.norm(corpus[0])) > 0.999
+
+
+def test_batched_build_matches_a_single_build():
+	corpus = _corpus(n=50, dim=16)
+	embeddings = [row.tolist() for row in corpus]
+	embeddings[7] = None
+	for mode in ('float16', 'int8'):
+		whole = QuantizedMatrix.from_embeddings(embeddings, mode=mode)
+		batches = (embeddings[i:i + 16] for i in range(0, len(embeddings), 16))
+		batched = QuantizedMatrix.from_embedding_batches(batches, 16, mode=mode)
+		assert np.array_equal(batched.codes, whole.codes) and np.allclose(batched.decode(), whole.decode())
+		assert np.allclose(batched.decode(np.array([3, 7])), whole.decode()[[3, 7]])
+	assert len(QuantizedMatrix.from_embedding_batches([], 16)) == 0
+
+
+def test_search_reranks_with_vectors_from_a_callable():
+	corpus = _corpus()
+	query = corpus[10] + 0.2
+	truth, truth_scores = QuantizedMatrix.from_matrix(corpus, mode='float32').search(query, top_k=5)
+	qm = QuantizedMatrix.from_matrix(corpus, mode='int8')
+	fetched = []
+	idx, scores = qm.search(query, top_k=5, rerank=4, exact=lambda rows: fetched.append(len(rows)) or corpus[rows])
+	assert list(idx) == list(truth) and np.allclose(scores, truth_scores, atol=1e-5) and fetched == [20]
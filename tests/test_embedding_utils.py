@@ -0,0 +1,41 @@
+import numpy as np
+
+from embedding_utils import embeddings_to_matrix, similarity_pairs_above
+
+
+def _brute_force_pairs(vectors, threshold):
+	pairs = []
+	for i in range(len(vectors)):
+		for j in range(i + 1, len(vectors)):
+			a, b = np.asarray(vectors[i]), np.asarray(vectors[j])
+			cos = float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+			if cos >= threshold:
+				pairs.append((i, j))
+	return pairs
+
+
+def test_embeddings_to_matrix_normalizes_and_zero_fills_missing():
+	m = embeddings_to_matrix([[3.0, 4.0], None, [0.0, 2.0]])
+	assert m.dtype == np.float32
+	assert np.allclose(m[0], [0.6, 0.8])
+	assert np.allclose(m[1], [0.0, 0.0])
+	assert np.allclose(np.linalg.norm(m[2]), 1.0)
+
+
+def test_similarity_pairs_blocked_matches_brute_force():
+	rng = np.random.default_rng(7)
+	base = rng.normal(size=16)
+	vectors = [list(base + rng.normal(scale=0.8, size=16)) for _ in range(37)]
+	m = embeddings_to_matrix(vectors)
+	expected = _brute_force_pairs(vectors, 0.6)
+	for block_size in (1, 5, 64):
+		ii, jj, scores = similarity_pairs_above(m, 0.6, block_size=block_size)
+		assert list(zip(ii.tolist(), jj.tolist())) == expected
+		assert np.all(scores >= 0.6)
+
+
+def test_similarity_pairs_respects_pair_mask():
+	m = embeddings_to_matrix([[1.0, 0.0], [1.0, 0.01], [1.0, 0.02]])
+	groups = np.array(['a', 'a', 'b'])
+	ii, jj, _ = similarity_pairs_above(m, 0.9, pair_mask=lambda r, c: groups[r][:, None] != groups[c][None, :])
+	assert list(zip(ii.tolist(), jj.tolist())) == [(0, 2), (1, 2)]
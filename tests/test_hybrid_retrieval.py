@@ -0,0 +1,44 @@
+import pandas as pd
+
+from hybrid_retrieval import BM25Index, HybridRetriever, doc_key, rank_vector_matches, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_sku_terms_whole_and_split():
+	assert tokenize("Switched from the XPS-200 to ShipStation") == ["switched", "xps-200", "xps", "200", "shipstation"]
+
+
+def test_bm25_exact_term_and_filters():
+	meta = pd.DataFrame({"deal_status": ["won", "lost", "lost"]})
+	bm25 = BM25Index(["a", "b", "c"], ["pricing was fine", "XPS-200 labels jammed", "XPS-200 pricing"], metadata=meta)
+	assert {d for d, _ in bm25.search("xps-200")} == {"b", "c"}
+	assert [d for d, _ in bm25.search("pricing", filters={"deal_status": "lost"})] == ["c"]
+	assert bm25.search("unrelated") == []
+
+
+def test_hybrid_fuses_lexical_and_vector_rankings():
+	bm25 = BM25Index(["a", "b", "c"], ["ShipStation outage", "carrier rates", "rates were high"])
+	vector = lambda query, top_k, filters: [("b", 0.9), ("c", 0.8)]
+	retriever = HybridRetriever(bm25, vector, fusion="rrf")
+	results = [d for d, _ in retriever.search("ShipStation rates", top_k=3)]
+	assert results[0] in ("b", "c") and set(results) == {"a", "b", "c"}
+	assert set(retriever.last_timings) == {"bm25_ms", "vector_ms", "fusion_ms"}
+	assert reciprocal_rank_fusion({"x": [("a", 1)], "y": [("b", 1), ("a", 0)]})[0][0] == "a"
+
+
+def test_vector_and_bm25_hits_for_the_same_row_merge():
+	# BM25 keyed by stage1 id; Pinecone returns the record_id metadata as a float
+	meta = pd.DataFrame({"id": [101, 102], "client_id": ["acme", "acme"], "deal_status": ["lost", "won"]})
+	bm25 = BM25Index([doc_key("response", i) for i in meta["id"]], ["ShipStation outage", "carrier rates"], metadata=meta)
+	matches = [{"score": 0.9, "metadata": {"type": "response", "record_id": 101.0, "client_id": "acme"}},
+	           {"score": 0.5, "metadata": {"type": "finding", "record_id": 7.0, "client_id": "acme"}}]
+	vector_meta = {}
+	vector = lambda query, top_k, filters: rank_vector_matches(matches, bm25, filters, vector_meta)
+
+	results = HybridRetriever(bm25, vector, fusion="rrf").search("ShipStation", top_k=5, filters={"client_id": "acme"})
+
+	keys = [d for d, _ in results]
+	assert keys[0] == "response:101" and keys.count("response:101") == 1
+	assert results[0][1] == reciprocal_rank_fusion({"bm25": [("x", 0)], "vector": [("x", 0)]})[0][1]
+	# Hits outside the BM25 index are filtered on their own metadata instead of being dropped
+	assert "finding:7" in keys and set(vector_meta) == {"response:101", "finding:7"}
+	assert rank_vector_matches(matches, bm25, {"deal_status": "won"}) == []
@@ -0,0 +1,43 @@
+import numpy as np
+
+from interview_theme_rollup import _cluster_by_threshold
+
+
+def _mk_inputs():
+	embs = [
+		[1.0, 0.0, 0.0],
+		[0.95, 0.05, 0.0],
+		None,
+		[0.0, 1.0, 0.0],
+		[0.9, 0.1, 0.0],
+		[0.0, 0.97, 0.05],
+		[0.0, 0.0, 1.0],
+	]
+	toks = [
+		{'api', 'sync'},
+		{'api', 'sync', 'orders'},
+		{'x'},
+		{'price', 'fees'},
+		{'unrelated'},
+		{'price', 'rates'},
+		{'support'},
+	]
+	return embs, toks
+
+
+def test_cluster_by_threshold_greedy_assignments():
+	embs, toks = _mk_inputs()
+	out = _cluster_by_threshold(embs, toks, threshold=0.9, min_token_overlap=0.2)
+	# Item 4 is close to cluster 0 in cosine but fails the token gate, so it opens its own cluster
+	assert out == [0, 0, -1, 1, 2, 1, 3]
+
+
+def test_cluster_by_threshold_minibatch_matches_sequential():
+	rng = np.random.default_rng(3)
+	centers = rng.normal(size=(12, 32))
+	labels = rng.integers(0, 12, size=300)
+	embs = (centers[labels] + rng.normal(scale=0.3, size=(300, 32))).tolist()
+	toks = [{f"t{l}", f"t{l}b", f"n{i % 5}"} for i, l in enumerate(labels)]
+	sequential = _cluster_by_threshold(embs, toks, 0.85, 0.2, batch_size=1)
+	for bs in (7, 64, 1000):
+		assert _cluster_by_threshold(embs, toks, 0.85, 0.2, batch_size=bs) == sequential
@@ -0,0 +1,108 @@
+import numpy as np
+
+from centroid_subject_harmonizer import CentroidHarmonizer
+from llm_subject_harmonizer import LLMSemanticHarmonizer
+from subject_mapping_store import normalize_subject
+
+
+class _FakeLLMHarmonizer(LLMSemanticHarmonizer):
+	def __init__(self, store_path, centroid_harmonizer=None):
+		super().__init__(store_path=store_path, centroid_harmonizer=centroid_harmonizer,
+		                 use_centroid_tier=centroid_harmonizer is not None)
+		self.prompts = []
+
+	def _call_llm_for_mappings(self, subjects):
+		self.prompts.append([s for s, _, _ in subjects])
+		category = {"pricing": "Pricing and Commercial", "support": "Support and Service"}
+		return {i: {"mapped_category": category.get(normalize_subject(s).split()[0]), "confidence": 0.9,
+		            "reasoning": "test"} for i, (s, _, _) in enumerate(subjects, 1)}
+
+
+def test_batch_harmonize_sends_each_unseen_subject_to_the_llm_once(tmp_path):
+	store = str(tmp_path / "mappings.sqlite")
+	items = [{"subject": s, "response_id": f"r{i}"} for i, s in
+	         enumerate(["Pricing", " pricing ", "PRICING.", "Support  quality", "", "support quality"])]
+	harmonizer = _FakeLLMHarmonizer(store)
+	results = harmonizer.batch_harmonize(items, subjects_per_prompt=1, max_workers=2)
+	assert sorted(harmonizer.prompts) == [["Pricing"], ["Support  quality"]]
+	assert [r["harmonized_subject"] for r in results] == ["Pricing and Commercial"] * 3 + \
+		["Support and Service", None, "Support and Service"]
+	assert [r["natural_subject"] for r in results] == [item["subject"] for item in items]
+	assert results[1]["response_id"] == "r1" and results[4]["mapping_method"] == "empty_subject"
+
+	again = _FakeLLMHarmonizer(store)
+	results = again.batch_harmonize(items + [{"subject": "Pricing tiers"}])
+	assert again.prompts == [["Pricing tiers"]]
+	assert results[0]["mapping_source"] == "store" and results[-1]["mapping_source"] == "llm"
+	assert again.batch_stats["store_hits"] == 2
+
+
+def _word_embedder(vocabulary):
+	def embed(texts):
+		matrix = np.array([[float(w in str(t).lower()) for w in vocabulary] for t in texts])
+		norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+		return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+	return embed
+
+
+def test_centroid_tier_assigns_confident_subjects_and_reports_precision(tmp_path):
+	store = str(tmp_path / "mappings.sqlite")
+	categories = {"Pricing and Commercial": {"description": "pricing cost", "examples": ["pricing"]},
+	              "Support and Service": {"description": "support", "examples": ["support"]}}
+	centroid = CentroidHarmonizer(categories, _word_embedder(["pricing", "cost", "support"]), min_margin=0.2)
+	assert [a[0] for a in centroid.assign(["Pricing cost", "pricing support", "weather"])] == \
+		["Pricing and Commercial", None, None]
+
+	_FakeLLMHarmonizer(store).batch_harmonize([{"subject": "Support"}])
+	harmonizer = _FakeLLMHarmonizer(store, centroid_harmonizer=centroid)
+	results = harmonizer.batch_harmonize([{"subject": s} for s in ["Support", "Pricing cost", "pricing support"]],
+	                                     subjects_per_prompt=1)
+	assert harmonizer.prompts == [["pricing support"]]
+	assert [r["mapping_source"] for r in results] == ["store", "centroid", "llm"]
+	assert results[1]["mapping_method"] == "embedding_centroid"
+	report = harmonizer.last_run_report
+	assert (report["centroid_assigned"], report["centroid_coverage"], report["llm_calls_saved"]) == (1, 0.5, 1)
+	assert (report["centroid_checked"], report["centroid_precision"]) == (1, 1.0)
+
+
+def test_centroid_mappings_are_not_reused_once_the_tier_changes(tmp_path):
+	store = str(tmp_path / "mappings.sqlite")
+	categories = {"Pricing and Commercial": {"description": "pricing cost", "examples": ["pricing"]},
+	              "Support and Service": {"description": "support", "examples": ["support"]}}
+	embed = _word_embedder(["pricing", "cost", "support"])
+	items = [{"subject": "Pricing cost"}, {"subject": "Pricing"}]
+
+	first = _FakeLLMHarmonizer(store, centroid_harmonizer=CentroidHarmonizer(categories, embed, min_margin=0.2))
+	assert LLMSemanticHarmonizer(store_path=store).use_centroid_tier is False
+	assert [r["mapping_source"] for r in first.batch_harmonize(items)] == ["centroid", "centroid"]
+	same = _FakeLLMHarmonizer(store, centroid_harmonizer=CentroidHarmonizer(categories, embed, min_margin=0.2))
+	assert [r["mapping_source"] for r in same.batch_harmonize(items)] == ["store", "store"]
+
+	# Tier off, or retuned: the centroid assignments are not served from the store
+	off = _FakeLLMHarmonizer(store)
+	assert off.batch_harmonize(items[:1])[0]["mapping_source"] == "llm" and off.prompts == [["Pricing cost"]]
+	retuned = _FakeLLMHarmonizer(store, centroid_harmonizer=CentroidHarmonizer(categories, embed, min_margin=0.95))
+	assert retuned.batch_harmonize(items[1:])[0]["mapping_source"] == "llm" and retuned.prompts == [["Pricing"]]
+
+
+def test_a_malformed_llm_entry_fails_only_its_own_subject(tmp_path):
+	class _MalformedLLMHarmonizer(_FakeLLMHarmonizer):
+		def _call_llm_for_mappings(self, subjects):
+			mappings = super()._call_llm_for_mappings(subjects)
+			for i, (s, _, _) in enumerate(subjects, 1):
+				if s == "Support":
+					mappings[i]["confidence"] = None
+				elif s == "Pricing tiers":
+					mappings[i]["confidence"] = "high"
+			return mappings
+
+	store = str(tmp_path / "mappings.sqlite")
+	harmonizer = _MalformedLLMHarmonizer(store)
+	results = harmonizer.batch_harmonize([{"subject": s} for s in ["Pricing", "Support", "Pricing tiers"]],
+	                                     subjects_per_prompt=3)
+	assert [r["harmonized_subject"] for r in results] == ["Pricing and Commercial", None, None]
+	assert [r["mapping_method"] for r in results][1:] == ["error", "error"]
+
+	again = _FakeLLMHarmonizer(store)
+	again.batch_harmonize([{"subject": s} for s in ["Pricing", "Support", "Pricing tiers"]], subjects_per_prompt=3)
+	assert again.prompts == [["Support", "Pricing tiers"]]
@@ -0,0 +1,51 @@
+from local_backend import LocalBackendClient
+from supabase_database import SupabaseDatabase
+
+
+def test_local_backend_serves_the_database_interface(tmp_path):
+	db = SupabaseDatabase(backend="local", local_path=str(tmp_path / "voc.sqlite"))
+	for i in range(6):
+		assert db.save_core_response({"response_id": f"r{i}", "verbatim_response": f"quote {i}", "company": f"Co{i % 2}",
+		                              "deal_status": "closed_won" if i % 2 else "closed_lost", "client_id": "acme"})
+	db.save_core_response({"response_id": "x0", "client_id": "other"})
+	for i in range(3):
+		assert db.save_stage2_response_labeling({"quote_id": f"r{i}", "criterion": "pricing", "relevance_score": i + 2,
+		                                         "client_id": "acme"})
+
+	df = db.get_stage1_data_responses(client_id="acme")
+	assert len(df) == 6 and df["id"].is_unique
+	assert list(db.get_unanalyzed_quotes("acme")["response_id"]) == ["r5", "r4", "r3"]
+	assert db.supabase.table("stage1_data_responses").select("id").not_.is_("company", "null") \
+		.ilike("company", "co1").execute().data == [{"id": 2}, {"id": 4}, {"id": 6}]
+
+	stats = db.get_summary_statistics("acme")
+	assert "voc_stage1_summary" not in db._missing_rpcs
+	assert stats["total_quotes"] == 6 and stats["criteria_performance"]["pricing"]["mention_count"] == 3
+
+	db.supabase.table("stage1_data_responses").update({"company": "Renamed"}).eq("response_id", "r0").execute()
+	assert db.supabase.table("stage1_data_responses").select("company").eq("id", 1).execute().data == [{"company": "Renamed"}]
+	assert db.delete_core_response("r1")
+	assert len(db.get_stage1_data_responses(client_id="acme")) == 5
+
+
+def test_local_backend_upserts_through_the_key_index(tmp_path):
+	path = str(tmp_path / "voc.sqlite")
+	client = LocalBackendClient(path)
+	rows = lambda: client.table("stage1_data_responses")
+	rows().insert([{"response_id": f"r{i}", "client_id": "acme", "score": i} for i in range(5)]).execute()
+	rows().upsert({"response_id": "r1", "client_id": "acme", "company": "A"}, on_conflict="response_id,client_id").execute()
+	rows().upsert({"response_id": "r1", "client_id": "other"}, on_conflict="response_id,client_id").execute()
+	assert client.tables() == {"stage1_data_responses": 6}
+	assert rows().select("id,company,score").eq("response_id", "r1").eq("client_id", "acme").execute().data == \
+		[{"id": 2, "company": "A", "score": 1}]
+	# Pushed-down filters keep PostgREST's text coercion
+	assert [r["id"] for r in rows().select("id").eq("score", "3").execute().data] == [4]
+	assert [r["id"] for r in rows().select("id").in_("id", ["1", 5.0]).execute().data] == [1, 5]
+
+	# A deleted row leaves the index; the key is registered again after reopening
+	rows().delete().eq("response_id", "r1").eq("client_id", "acme").execute()
+	client.close()
+	client = LocalBackendClient(path)
+	rows().upsert({"response_id": "r1", "client_id": "other", "company": "B"}, on_conflict="response_id,client_id").execute()
+	assert rows().select("id,company").eq("response_id", "r1").execute().data == \
+		[{"id": 6, "company": "B"}]
@@ -0,0 +1,65 @@
+from local_snapshot import LocalSnapshot
+
+
+def _recording(db):
+	"""Record the (columns, filters) of every iter_table call the snapshot makes"""
+	fetched = []
+	iter_table = db.iter_table
+	db.iter_table = lambda *a, **k: (fetched.append(a[1:3]), iter_table(*a, **k))[1]
+	return fetched
+
+
+def test_snapshot_serves_reads_locally_and_syncs_incrementally(tmp_path, make_db, make_responses):
+	rows = [dict(r, updated_at=r["created_at"]) for r in make_responses(20)]
+	db = make_db(rows)
+	now = [1000.0]
+	fetched = _recording(db)
+	db.use_snapshot(str(tmp_path / "snap.sqlite"), max_age_seconds=60, clock=lambda: now[0])
+
+	df = db.get_stage1_data_responses(client_id="acme", columns="ids")
+	assert len(df) == 13 and "verbatim_response" not in df.columns
+	assert len(db.read_table("stage1_data_responses", filters={"client_id": "acme", "id": ("gte", 10)})) == 7
+	assert len(fetched) == 1
+
+	rows.append({"id": 21, "response_id": "r20", "client_id": "acme", "created_at": "2025-01-30",
+	             "updated_at": "2025-01-30"})
+	assert len(db.get_stage1_data_responses(client_id="acme")) == 13
+	now[0] += 61
+	assert len(db.get_stage1_data_responses(client_id="acme")) == 14
+	assert fetched[-2:] == [("*", {"client_id": "acme", "updated_at": ("gte", "2025-01-20")}),
+	                        ("id", {"client_id": "acme"})]
+
+	# A delete from this process forces a full resync on the next read
+	rows[:] = [r for r in rows if r["id"] != 21]
+	db._snapshot_written("stage1_data_responses", deleted=True)
+	assert len(db.get_stage1_data_responses(client_id="acme")) == 13
+	assert fetched[-1] == ("*", {"client_id": "acme"})
+
+
+def test_changes_from_another_client_show_up_within_max_age(tmp_path, make_db, make_responses):
+	responses = [dict(r, updated_at=r["created_at"]) for r in make_responses(20)]
+	labels = [{"id": i + 1, "quote_id": f"r{i}", "client_id": "acme", "relevance_score": 1,
+	           "created_at": "2025-02-01"} for i in range(6)]
+	db = make_db({"stage1_data_responses": responses, "stage2_response_labeling": labels})
+	now = [1000.0]
+	fetched = _recording(db)
+	db.use_snapshot(str(tmp_path / "snap.sqlite"), max_age_seconds=60, full_refresh_seconds=86400,
+	                clock=lambda: now[0])
+	assert len(db.get_stage1_data_responses(client_id="acme")) == 13
+	assert len(db.read_table("stage2_response_labeling", filters={"client_id": "acme"})) == 6
+
+	# Another process deletes and edits responses, and re-scores Stage 2 (delete, then re-insert)
+	responses[:] = [r for r in responses if r["id"] not in (2, 3)]
+	edited = next(r for r in responses if r["id"] == 5)
+	edited.update(verbatim_response="edited", updated_at="2025-02-15")
+	labels[:] = [dict(l, id=l["id"] + 100, relevance_score=4) for l in labels[:4]]
+	now[0] += 61
+
+	df = db.get_stage1_data_responses(client_id="acme")
+	assert sorted(df["id"]) == [r["id"] for r in responses if r["client_id"] == "acme"]
+	assert df.set_index("id").loc[5, "verbatim_response"] == "edited"
+	assert ("*", {"client_id": "acme", "updated_at": ("gte", "2025-01-20")}) in fetched
+	labeled = db.read_table("stage2_response_labeling", filters={"client_id": "acme"})
+	assert sorted(labeled["id"]) == [101, 102, 103, 104] and set(labeled["relevance_score"]) == {4}
+	assert fetched[-1] == ("*", {"client_id": "acme"})
+	assert db.snapshot.status("acme").set_index("tbl").loc["stage1_data_responses", "row_count"] == len(df)
@@ -0,0 +1,40 @@
+import json
+import re
+from types import SimpleNamespace
+
+from voc_pipeline.modular_processor import ModularProcessor
+
+
+def _fake_labeler(prompts):
+	"""chain_factory: each chain fills its template and answers like the model would"""
+	def answer(template, inputs):
+		text = template.format(**inputs)
+		prompts.append(text)
+		if "BATCH MODE" in text:
+			ids = re.findall(r"--- response_id: (\S+)", text)
+			# The model drops r2 and broken from its batch answer; each is retried on its own
+			return SimpleNamespace(content=json.dumps([{"response_id": i, "labels": {"id": i}} for i in ids
+			                                           if i not in ("r2", "broken")]))
+		if "Response to label:\nbroken" in text:
+			return SimpleNamespace(content="not json")
+		response_id = re.search(r"Response to label:\n(\S+)", text).group(1)
+		return SimpleNamespace(content="```json\n" + json.dumps({"labels": {"id": response_id}}) + "\n```")
+	return lambda template: SimpleNamespace(invoke=lambda inputs: answer(template, inputs))
+
+
+def test_labeling_batches_keeps_order_and_reports_failures():
+	prompts = []
+	processor = ModularProcessor(chain_factory=_fake_labeler(prompts), max_concurrency=3)
+	responses = [{"response_id": f"r{i}", "verbatim_response": f"r{i}", "subject": "Pricing",
+	              "company": "Acme", "interviewee_name": "Sam"} for i in range(7)]
+	responses.append({**responses[0], "response_id": "broken", "verbatim_response": "broken"})
+
+	labeled = processor.stage3_labeling(responses, batch_size=3)
+
+	assert [r["response_id"] for r in labeled] == [r["response_id"] for r in responses]
+	assert [r.get("labels", {}).get("id") for r in labeled] == [f"r{i}" for i in range(7)] + [None]
+	assert [f["response_id"] for f in processor.failures["labeling"]] == ["broken"]
+	# 3 batch prompts, then r2 and broken retried alone
+	assert sum("BATCH MODE" in p for p in prompts) == 3
+	assert len(prompts) == 5
+	processor.close()
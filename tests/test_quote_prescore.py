@@ -0,0 +1,39 @@
+import json
+
+import pandas as pd
+
+from quote_prescore import PreScoreCascade, evaluate_cascade
+
+
+QUOTES = pd.DataFrame({
+	"response_id": ["r1", "r2", "r3", "r4"],
+	"verbatim_response": [
+		"ok",
+		"We went with them mostly because the team seemed nice to work with overall.",
+		"The pricing was 30% higher than the competitor and the ROI on our budget was terrible, "
+		"we saved 10 hours a week with the alternative.",
+		"Their support is honestly excellent, better than the other solution we evaluated for cost reasons.",
+	],
+})
+
+
+def test_cascade_tiers_and_audit_sample():
+	cascade = PreScoreCascade(skip_below=2, audit_rate=0)
+	to_llm, skipped = cascade.split(QUOTES)
+	assert list(skipped["prescore_tier"]) == ["stage1_filter", "heuristic"]
+	assert list(to_llm["response_id"]) == ["r3", "r4"]
+	audited, _ = PreScoreCascade(skip_below=2, audit_rate=1).split(QUOTES)
+	assert len(audited) == 4 and PreScoreCascade(audit_rate=0.5).decide("r2", "ok") == \
+		PreScoreCascade(audit_rate=0.5).decide("r2", "ok")
+
+
+def test_evaluate_cascade_reports_savings_and_agreement():
+	labels = pd.DataFrame([
+		{"quote_id": "r1", "relevance_explanation": json.dumps({"all_relevance_scores": {"pricing": 0}})},
+		{"quote_id": "r2", "relevance_explanation": json.dumps({"all_relevance_scores": {"pricing": 0, "support": 4}})},
+		{"quote_id": "r3", "relevance_score": 5, "relevance_explanation": None},
+		{"quote_id": "r4", "relevance_score": 0, "decided_by": "heuristic"},
+	])
+	report = evaluate_cascade(QUOTES, labels, PreScoreCascade(skip_below=2))
+	assert report == {"sample": 3, "decided_by": {"stage1_filter": 1, "heuristic": 1, "llm": 1},
+	                  "savings": 0.667, "agreement": 0.5, "missed_high_relevance": 1}
@@ -0,0 +1,56 @@
+import threading
+
+from stage2_batch_planner import BatchPlanner
+
+
+def _drain(planner, outcome):
+	seen = []
+	while True:
+		batch = planner.next_batch()
+		if not batch:
+			return seen
+		ok = outcome(batch)
+		planner.record(len(batch), ok)
+		if ok:
+			seen.append(batch)
+		else:
+			planner.requeue(batch)
+		planner.done()
+
+
+def test_batches_pack_by_tokens_and_keep_long_quotes_whole():
+	planner = BatchPlanner(overhead_tokens=100, max_quotes=50, max_input_tokens=1000,
+	                       max_output_tokens=4000, output_tokens_per_quote=400)
+	assert planner.max_quotes == 10
+	planner.add([(i, 2000 if i == 3 else 50) for i in range(30)])
+	batches = _drain(planner, lambda batch: True)
+	assert [3] in batches and sorted(sum(batches, [])) == list(range(30))
+	assert all(len(b) <= 10 for b in batches)
+
+
+def test_parse_failures_shrink_batches_and_retry_every_quote():
+	planner = BatchPlanner(overhead_tokens=0, max_quotes=8, max_input_tokens=10_000,
+	                       max_output_tokens=8000, output_tokens_per_quote=100)
+	planner.add((i, 10) for i in range(20))
+	batches = _drain(planner, lambda batch: len(batch) <= 3)
+	assert planner.failures >= 2 and max(len(b) for b in batches) <= 3
+	assert sorted(sum(batches, [])) == list(range(20))
+
+
+def test_workers_wait_for_requeued_batches():
+	planner = BatchPlanner(overhead_tokens=0, max_quotes=4, max_input_tokens=10_000,
+	                       max_output_tokens=4000, output_tokens_per_quote=100)
+	planner.add((i, 10) for i in range(4))
+	results, lock = [], threading.Lock()
+
+	def worker():
+		for batch in _drain(planner, lambda batch: len(batch) == 1):
+			with lock:
+				results.append(batch)
+
+	threads = [threading.Thread(target=worker) for _ in range(3)]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join(timeout=5)
+	assert sorted(sum(results, [])) == [0, 1, 2, 3]
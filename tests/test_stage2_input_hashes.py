@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from stage2_input_hashes import ANALYSIS_CONFIG_PATH, content_hash, criteria_hash, plan_rescore
+
+
+def test_criteria_hash_ignores_operational_settings(tmp_path):
+	config = tmp_path / "analysis_config.yaml"
+	config.write_text("criteria:\n  pricing: cost\nprocessing:\n  max_workers: 4\n")
+	before = criteria_hash(str(config))
+	config.write_text("# tuned\ncriteria: {pricing: cost}\nprocessing:\n  max_workers: 8\n")
+	assert criteria_hash(str(config)) == before
+	config.write_text("criteria:\n  pricing: cost and ROI\n")
+	assert criteria_hash(str(config)) != before
+
+
+def test_plan_rescore_selects_quotes_whose_inputs_changed():
+	quotes = pd.DataFrame({"response_id": ["r1", "r2", "r3", "r4", "r5", "r6"],
+	                       "verbatim_response": ["a", "b edited", "c", "d", "e", "f"]})
+	label = lambda q, text, criteria="C1", prompt="P1": {"quote_id": q, "content_hash": content_hash(text),
+	                                                       "criteria_hash": criteria, "prompt_hash": prompt}
+	labels = pd.DataFrame([label("r1", "a"), label("r1", "a"), label("r2", "b"), label("r3", "c", criteria="C0"),
+	                       label("r4", "d", prompt="P0"),
+	                       {"quote_id": "r5", "content_hash": None, "criteria_hash": None, "prompt_hash": None}])
+	rescore, summary = plan_rescore(quotes, labels, "C1", "P1")
+	assert rescore == ["r2", "r3", "r4", "r6"]
+	assert summary == {"new": 1, "text_changed": 1, "criteria_changed": 1, "prompt_changed": 1,
+	                   "unhashed": 1, "unchanged": 1}
+	assert plan_rescore(quotes, labels, "C1", "P1", rescore_unhashed=True)[0] == ["r2", "r3", "r4", "r5", "r6"]
+
+
+def test_criteria_hash_uses_the_repo_config_and_refuses_a_missing_one(tmp_path, monkeypatch):
+	monkeypatch.chdir(tmp_path)
+	assert criteria_hash() == criteria_hash(ANALYSIS_CONFIG_PATH)
+	with pytest.raises(FileNotFoundError):
+		criteria_hash(str(tmp_path / "missing.yaml"))
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from stage3_criteria_engine import (
+	EVALUATION_ENGINE, BURIED_WINS_ENGINE, buried_wins_scores, criteria_matrix, evaluation_scores
+)
+
+
+def test_matrix_matches_single_text_scoring():
+	texts = pd.Series([
+		"We were surprised: the competitor cut transcription turnaround by 30% and it saved $400 a month",
+		"It was fine.",
+		"Unusual issue, but our firm would need an API integration within 2 days",
+		None,
+	], index=[10, 11, 12, 13])
+	matrix = criteria_matrix(texts)
+
+	assert list(matrix.index) == [10, 11, 12, 13]
+	for index, text in texts.items():
+		lowered = text.lower() if isinstance(text, str) else ""
+		assert evaluation_scores(matrix.loc[index]) == EVALUATION_ENGINE.score_text(lowered)
+		assert buried_wins_scores(matrix.loc[index]) == BURIED_WINS_ENGINE.score_text(lowered)
+
+	first = matrix.loc[10]
+	# Higher tiers win: 'surprised' (3) and 'competitor' (3), not 'new'/'but' tiers
+	assert (first["novelty"], first["tension_contrast"], first["materiality"]) == (3, 3, 2)
+	assert first["buried_wins_metric_quantification"] == 1
+	assert (matrix.loc[12, "novelty"], matrix.loc[12, "actionability"]) == (2, 2)
+	assert matrix.loc[11, "generic_term"] and not matrix.loc[11, "specific_indicator"]
+	assert matrix["word_count"].tolist() == [16, 3, 13, 0]
+	assert matrix.loc[13, ["criteria_met", "buried_wins_total"]].tolist() == [0, 0]
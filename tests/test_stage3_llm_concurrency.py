@@ -0,0 +1,109 @@
+import re
+import json
+import time
+import threading
+from types import SimpleNamespace
+
+import openai
+
+import stage3_findings_analyzer
+from stage2_input_hashes import ANALYSIS_CONFIG_PATH
+from stage3_findings_analyzer import Stage3FindingsAnalyzer
+
+SCORES = {"novelty": 3, "tension_contrast": 3, "materiality": 0, "actionability": 0, "specificity": 0,
+          "metric_quantification": 0}
+
+
+class _FakeChatClient:
+	"""chat.completions.create stand-in: answers with the quote's id, failing some quotes first"""
+
+	def __init__(self, failures=None, delay=0.0):
+		self.failures = dict(failures or {})
+		self.delay = delay
+		self.calls = 0
+		self._lock = threading.Lock()
+		self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+	def create(self, messages, **kwargs):
+		quote_id = re.search(r"Q-\d+", messages[-1]["content"]).group()
+		with self._lock:
+			self.calls += 1
+			failing = self.failures.get(quote_id, 0) > 0
+			if failing:
+				self.failures[quote_id] -= 1
+		# Earlier quotes answer last, so completion order is the reverse of candidate order
+		time.sleep(self.delay * (10 - int(quote_id[2:])))
+		if failing:
+			raise RuntimeError("rate limited")
+		content = json.dumps({"impact": f"Impact of {quote_id}"})
+		return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _analyzer(monkeypatch, client, **kwargs):
+	monkeypatch.setenv("OPENAI_API_KEY", "test")
+	monkeypatch.setattr(stage3_findings_analyzer, "SupabaseDatabase", lambda: None)
+	monkeypatch.setattr(stage3_findings_analyzer, "STAGE3_LLM_RETRY_BACKOFF", 0)
+	analyzer = Stage3FindingsAnalyzer(ANALYSIS_CONFIG_PATH, **kwargs)
+	analyzer._buried_wins_prompt = "Buried Wins prompt"
+	analyzer._openai_client = client
+	return analyzer
+
+
+def _candidates(n):
+	return [({"response_id": f"r{i}", "company": "Acme", "verbatim_response": f"Q-{i} we chose them over a competitor"},
+	         dict(SCORES)) for i in range(n)]
+
+
+def test_findings_keep_candidate_order_across_workers(monkeypatch):
+	client = _FakeChatClient(delay=0.005)
+	analyzer = _analyzer(monkeypatch, client, llm_max_concurrency=4)
+	findings = analyzer._generate_findings(_candidates(8))
+	assert [f["finding_statement"] for f in findings] == [f"Impact of Q-{i}" for i in range(8)]
+	assert [f["selected_quotes"][0]["response_id"] for f in findings] == [f"r{i}" for i in range(8)]
+
+
+def test_a_failed_call_is_retried_then_succeeds(monkeypatch):
+	client = _FakeChatClient(failures={"Q-1": 1})
+	analyzer = _analyzer(monkeypatch, client, llm_max_retries=2)
+	assert analyzer._call_llm_api("Quote Q-1") == "Impact of Q-1"
+	metrics = analyzer.processing_metrics
+	assert (client.calls, metrics["llm_calls"], metrics["llm_retries"], metrics["llm_failures"]) == (2, 2, 1, 0)
+
+
+def test_exhausted_retries_fall_back_to_the_template(monkeypatch):
+	client = _FakeChatClient(failures={"Q-0": 5})
+	analyzer = _analyzer(monkeypatch, client, llm_max_retries=1)
+	findings = analyzer._generate_findings(_candidates(2))
+	assert findings[0]["finding_statement"] == "Unexpected competitive dynamics reveals new market dynamics for Acme"
+	assert findings[1]["finding_statement"] == "Impact of Q-1"
+	assert (analyzer.processing_metrics["llm_retries"], analyzer.processing_metrics["llm_failures"]) == (1, 1)
+
+
+def test_llm_metrics_add_up_under_concurrency(monkeypatch):
+	client = _FakeChatClient(failures={f"Q-{i}": 1 for i in range(0, 10, 2)}, delay=0.001)
+	analyzer = _analyzer(monkeypatch, client, llm_max_concurrency=8, llm_max_retries=1)
+	assert len(analyzer._generate_findings(_candidates(10))) == 10
+	metrics = analyzer.processing_metrics
+	assert (metrics["llm_calls"], metrics["llm_retries"], metrics["llm_failures"]) == (15, 5, 0)
+	assert client.calls == 15 and metrics["llm_slowest_call_seconds"] > 0
+
+	threads = [threading.Thread(target=lambda: [analyzer._record_llm_metric("llm_calls") for _ in range(500)])
+	           for _ in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert analyzer.processing_metrics["llm_calls"] == 15 + 8 * 500
+
+
+def test_one_openai_client_is_shared_by_every_worker(monkeypatch):
+	created = []
+	monkeypatch.setattr(openai, "OpenAI", lambda **kwargs: created.append(kwargs) or object())
+	analyzer = _analyzer(monkeypatch, None)
+	threads = [threading.Thread(target=analyzer._get_openai_client) for _ in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert len(created) == 1 and created[0]["max_retries"] == 0
+	assert analyzer._get_openai_client() is analyzer._openai_client
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from subject_harmonizer import KeywordAutomaton, SubjectHarmonizer
+
+
+def test_keyword_automaton_reports_overlapping_matches():
+	matches = sorted(KeywordAutomaton(["he", "she", "hers", "his"]).finditer("ushers"))
+	assert matches == [(4, "he"), (4, "she"), (6, "hers")]
+
+
+def test_automaton_scoring_matches_per_category_scoring():
+	harmonizer = SubjectHarmonizer()
+	for subject in ["Pricing and Cost", "customer service response", "Cost Considerations", "go-live", "xcost",
+	                "Pain Points", "Weather", "Vendor Discovery at industry events", ""]:
+		cleaned = harmonizer._clean_subject(subject)
+		expected = [(c, harmonizer._calculate_pattern_match(cleaned, p)) for c, p in harmonizer.patterns.items()]
+		assert harmonizer._score_categories(cleaned) == [m for m in expected if m[1] > 0]
+
+
+def test_harmonize_series_matches_row_by_row():
+	subjects = pd.Series(["Pricing", "Weather", None, "Pricing", "API integration"], index=[10, 11, 12, 13, 14])
+	frame = SubjectHarmonizer().harmonize_series(subjects)
+	single = SubjectHarmonizer()
+	expected = [single.harmonize_subject(s if isinstance(s, str) else "") for s in subjects]
+	assert list(frame.index) == [10, 11, 12, 13, 14]
+	for column in ["harmonized_subject", "confidence", "mapping_method", "is_high_confidence", "requires_review"]:
+		assert frame[column].tolist() == [e[column] for e in expected]
@@ -0,0 +1,44 @@
+import pytest
+
+
+def _tables():
+	stage1 = [{"id": i + 1, "response_id": f"r{i}", "client_id": "acme", "company": f"Co{i % 4}",
+	           "deal_status": "closed_won" if i % 3 else "closed_lost", "created_at": f"2025-01-{i + 1:02d}"}
+	          for i in range(12)]
+	stage2 = [{"id": i + 1, "quote_id": f"r{i % 12}", "client_id": "acme", "criterion": ["pricing", "support", "ux"][i % 3],
+	           "relevance_score": i % 6, "relevance_explanation": f"e{i}", "created_at": "2025-02-01"}
+	          for i in range(20)]
+	stage3 = [{"id": i + 1, "finding_id": f"F{i + 1}", "client_id": "acme", "criterion": ["pricing", "ux"][i % 2],
+	           "finding_type": "barrier" if i % 2 else "strength", "enhanced_confidence": 2.0 + i,
+	           "priority_level": ["Priority Finding", "Standard Finding", None][i % 3], "criteria_met": "Specificity",
+	           "created_at": "2025-03-01"} for i in range(7)]
+	return {"stage1_data_responses": stage1, "stage2_response_labeling": stage2, "stage3_findings": stage3}
+
+
+def test_sqlite_aggregates_match_client_side_summaries(tmp_path, make_db):
+	db = make_db(_tables())
+	expected = (db.get_summary_statistics("acme"), db.get_stage3_findings_summary("acme"),
+	            db.generate_criteria_scorecard("acme"))
+	assert expected[0]["total_quotes"] == 12 and expected[2]["criteria_details"]
+
+	db.use_snapshot(str(tmp_path / "snap.sqlite"))
+	assert db.aggregate("voc_stage1_summary", "acme")[0] == {"dimension": "total", "value": None, "row_count": 12}
+	actual = (db.get_summary_statistics("acme"), db.get_stage3_findings_summary("acme"),
+	          db.generate_criteria_scorecard("acme"))
+	assert actual[0] == expected[0]
+	assert actual[1] == expected[1]
+	assert actual[2] == expected[2]
+
+
+def test_pending_work_matches_between_sqlite_and_client_side(tmp_path, make_db):
+	tables = _tables()
+	tables["stage1_data_responses"] += [{"id": i + 1, "response_id": f"r{i}", "client_id": "acme",
+	                                     "created_at": f"2025-01-{i + 1}"} for i in (12, 13, 14)]
+	db = make_db(tables)
+	assert db.pending_ids(2, "acme") == ["r12", "r13", "r14"]
+	assert sorted(db.get_unanalyzed_quotes("acme")["response_id"]) == ["r12", "r13", "r14"]
+	with pytest.raises(ValueError):
+		db.pending_ids(3, "acme")
+
+	db.use_snapshot(str(tmp_path / "snap.sqlite"))
+	assert db.pending_ids(2, "acme", page_size=2) == ["r12", "r13", "r14"]
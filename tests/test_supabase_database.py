@@ -0,0 +1,95 @@
+import threading
+from types import SimpleNamespace
+
+from supabase_database import SupabaseDatabase, WriteBehindBuffer
+
+
+def test_paged_reads_return_every_row_past_the_row_cap(make_db, make_responses):
+	db = make_db(make_responses(50))
+	df = db.get_stage1_data_responses(client_id="acme")
+	assert len(df) == 33 and df["id"].is_unique
+	assert list(df["created_at"]) == sorted(df["created_at"], reverse=True)
+	assert len(db.read_table("stage1_data_responses", filters={"client_id": "acme"}, parallel=3)) == 33
+	assert len(db.read_table("interview_level_themes", filters={"client_id": "acme"})) == 33
+
+
+def test_iter_table_projects_columns_and_yields_frames_lazily(make_db, make_responses):
+	db = make_db(make_responses(20))
+	pages = db.iter_table("stage1_data_responses", columns="response_id", filters={"id": ("gte", 5)},
+	                      page_size=4, as_frames=True)
+	first = next(pages)
+	assert list(first.columns) == ["response_id", "id"] and len(first) == 4
+	assert sum(len(p) for p in pages) == 12
+
+
+def test_read_models_project_getters(make_db, make_responses):
+	assert SupabaseDatabase.resolve_columns("stage1_data_responses", "ids") == "id,response_id,interview_id,client_id"
+	assert SupabaseDatabase.resolve_columns("stage1_data_responses", ["a", "b"]) == "a,b"
+	assert SupabaseDatabase.resolve_columns("stage1_data_responses", "full") == "*"
+	df = make_db(make_responses(10)).get_stage1_data_responses(client_id="acme", columns="ids")
+	assert len(df) == 6 and "verbatim_response" not in df.columns
+
+
+class _RecordingTable:
+	def __init__(self, calls, name, poison):
+		self.calls, self.name, self.poison = calls, name, poison
+
+	def _record(self, mode, rows, **kwargs):
+		self.mode, self.rows, self.kwargs = mode, rows, kwargs
+		return self
+
+	def upsert(self, rows, **kwargs): return self._record("upsert", rows, **kwargs)
+	def insert(self, rows): return self._record("insert", rows)
+	def update(self, row): return self._record("update", [row], match={})
+
+	def eq(self, column, value):
+		self.kwargs["match"][column] = value
+		return self
+
+	def execute(self):
+		if any(r.get("finding_id") == self.poison for r in self.rows):
+			raise RuntimeError("bad row")
+		self.calls.append((self.name, self.mode, len(self.rows), self.kwargs))
+		return SimpleNamespace(data=self.rows)
+
+
+def test_buffered_writes_flush_in_bulk_and_isolate_failing_rows(make_db):
+	calls = []
+	db = make_db([])
+	db.supabase = SimpleNamespace(table=lambda name: _RecordingTable(calls, name, poison="F3"))
+	with db.buffered_writes(max_rows=100, max_seconds=0, retries=1) as buffer:
+		buffer.memo(("stage3_findings", "acme"), set)
+		for i in range(1, 6):
+			assert db.save_enhanced_finding({"finding_id": f"F{i}", "finding_statement": "s"}, "acme")
+		assert db.save_enhanced_finding({"finding_id": "F2"}, "acme")
+		db.update_stage2_analysis("r1", {"sentiment": "positive"})
+		db.update_stage2_analysis("r1", {"impact_score": 4})
+		assert calls == []
+	upserts = [c for c in calls if c[0] == "stage3_findings"]
+	assert sum(n for _, _, n, _ in upserts) == 4 and upserts[0][3] == {"on_conflict": "client_id,finding_id"}
+	assert [r["finding_id"] for _, r, _ in buffer.failed] == ["F3"]
+	updates = [c for c in calls if c[0] == "stage1_data_responses"]
+	assert len(updates) == 1 and updates[0][3] == {"match": {"response_id": "r1"}}
+
+
+def test_writers_keep_queueing_while_a_flush_is_on_the_network():
+	started, release, calls = threading.Event(), threading.Event(), []
+
+	class _SlowTable(_RecordingTable):
+		def execute(self):
+			started.set()
+			assert release.wait(5)
+			return super().execute()
+
+	supabase = SimpleNamespace(table=lambda name: _SlowTable(calls, name, poison=None))
+	buffer = WriteBehindBuffer(supabase, max_rows=2, max_seconds=0, retries=1)
+	flusher = threading.Thread(target=lambda: [buffer.add("stage3_findings", {"finding_id": f"F{i}"}) for i in (1, 2)])
+	flusher.start()
+	assert started.wait(5)
+	# The first two rows are being written; a third writer is not held up by it and still sees them
+	buffer.add("stage3_findings", {"finding_id": "F3"})
+	assert [r["finding_id"] for r in buffer.pending("stage3_findings")] == ["F1", "F2", "F3"]
+	release.set()
+	flusher.join(5)
+	assert buffer.close() == {"stage3_findings": 1}
+	assert [n for _, _, n, _ in calls] == [2, 1] and buffer.written == {"stage3_findings": 3}
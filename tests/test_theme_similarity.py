@@ -0,0 +1,93 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from embedding_utils import embeddings_to_matrix, iter_similarity_pairs_above
+from scripts.build_theme_similarity import content_tokens, FACET_VOCAB, iter_scored_pairs, stream_similarity_rows
+
+STATEMENTS = [
+	"Shopify api integration keeps failing on order sync",
+	"Shopify api integration sync breaks on large orders",
+	"The api integration with shopify needs webhook sync",
+	"Webhook sync and api mapping for shopify orders",
+	"Shopify api integration keeps failing on order sync",
+	"Pricing fees are higher than the competitor",
+]
+
+
+def _dense_pairs(matrix, min_cos):
+	sims = matrix @ matrix.T
+	return {(i, j) for i, j in itertools.combinations(range(len(matrix)), 2) if sims[i, j] >= min_cos}
+
+
+def test_blocked_pairs_match_the_dense_upper_triangle():
+	rng = np.random.default_rng(3)
+	matrix = embeddings_to_matrix(rng.normal(size=(40, 6)))
+	for block_size in (1, 7, 64):
+		pairs = [(i, j, s) for ii, jj, ss in iter_similarity_pairs_above(matrix, 0.4, block_size=block_size)
+		         for i, j, s in zip(ii, jj, ss)]
+		keys = [(int(i), int(j)) for i, j, _ in pairs]
+		assert set(keys) == _dense_pairs(matrix, 0.4) and len(keys) == len(set(keys))
+		assert all(i < j for i, j in keys) and all(s >= 0.4 for _, _, s in pairs)
+
+
+def _themes():
+	df = pd.DataFrame({"theme_id": ["t0", "t1", "t2", "t3", "t0", "t5"], "theme_statement": STATEMENTS,
+	                   "subject": "Integration", "facet": "Integration"})
+	vocabulary = sorted({w for t in STATEMENTS for w in t.lower().split()})
+	matrix = embeddings_to_matrix([[float(w in t.lower().split()) for w in vocabulary] for t in STATEMENTS])
+	return df, matrix, {t: i for i, t in enumerate(STATEMENTS)}
+
+
+def _dense_scored(df, matrix, min_cos, min_jacc, top_k):
+	"""All-pairs reference for iter_scored_pairs on one subject+facet group"""
+	tokens = [content_tokens(t) for t in df["theme_statement"]]
+	rows = []
+	for a, b in sorted(_dense_pairs(matrix, min_cos)):
+		inter = tokens[a] & tokens[b]
+		jacc = len(inter) / len(tokens[a] | tokens[b])
+		if jacc >= min_jacc and len(inter & FACET_VOCAB) >= 2 and df["theme_id"][a] != df["theme_id"][b]:
+			score = 0.6 * float(matrix[a] @ matrix[b]) + 0.25 * jacc + 0.15
+			rows.append((df["theme_id"][a], df["theme_id"][b], round(score, 6)))
+	rows.sort(key=lambda r: (r[0], -r[2]))
+	kept, per_anchor = [], {}
+	for row in rows:
+		per_anchor[row[0]] = per_anchor.get(row[0], 0) + 1
+		if per_anchor[row[0]] <= top_k:
+			kept.append(row)
+	return kept
+
+
+def test_scored_pairs_match_dense_all_pairs_without_self_or_duplicate_pairs():
+	df, matrix, row_index = _themes()
+	for min_cos in (0.3, 0.6):
+		expected = _dense_scored(df, matrix, min_cos, 0.12, top_k=2)
+		for block_size in (1, 2, 1024):
+			out = pd.concat(list(iter_scored_pairs(df, matrix, row_index, min_cos=min_cos, min_jacc=0.12, top_k=2,
+			                                       block_size=block_size)))
+			got = sorted(zip(out["theme_id_a"], out["theme_id_b"], out["score"].round(6)), key=lambda r: (r[0], -r[2]))
+			assert got == expected
+			assert (out["cosine"] >= min_cos).all() and (out["theme_id_a"] != out["theme_id_b"]).all()
+			assert not out.duplicated(["theme_id_a", "theme_id_b"]).any()
+	assert len(_dense_scored(df, matrix, 0.3, 0.12, top_k=2)) > len(_dense_scored(df, matrix, 0.6, 0.12, top_k=2)) > 0
+
+
+def test_stream_similarity_rows_writes_in_chunks():
+	class _Db:
+		def __init__(self):
+			self.chunks = []
+
+		def upsert_theme_similarity(self, rows):
+			self.chunks.append(rows)
+			return len(rows)
+
+	df, matrix, row_index = _themes()
+	db = _Db()
+	blocks = list(iter_scored_pairs(df, matrix, row_index, min_cos=0.3, min_jacc=0.12, block_size=1))
+	scores = pd.concat(blocks)["score"]
+	assert stream_similarity_rows(db, "acme", blocks, min_score=0.45, chunk=4) == (scores >= 0.45).sum() == 6
+	assert [len(c) for c in db.chunks] == [4, 2]
+	db.chunks = []
+	assert stream_similarity_rows(db, "acme", blocks, min_score=0.5, chunk=4) == (scores >= 0.5).sum() == 2
+	assert {r["client_id"] for c in db.chunks for r in c} == {"acme"}
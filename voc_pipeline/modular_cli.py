@@ -10,11 +10,23 @@ from pathlib import Path
 from typing import Optional
 import logging
 
-from .modular_processor import ModularProcessor
+from .modular_processor import (
+    ModularProcessor, MODULAR_MAX_CONCURRENCY, ENRICHMENT_BATCH_SIZE, LABELING_BATCH_SIZE
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def print_failures(failures, limit: int = 10):
+    """Summarize per-response failures from an enrichment or labeling run"""
+    if not failures:
+        return
+    print(f"Responses failed: {len(failures)} (kept without stage output)")
+    for failure in failures[:limit]:
+        print(f"  {failure['response_id']}: {failure['error'][:100]}")
+    if len(failures) > limit:
+        print(f"  ... and {len(failures) - limit} more")
+
 @click.group()
 def cli():
     """Modular VOC Pipeline CLI - Run individual stages or full pipeline"""
@@ -74,17 +86,20 @@ def extract_core(transcript_path: str, company: str, interviewee: str, deal_stat
 @click.argument('stage1_data_responses_file')
 @click.option('--output', '-o', help='Output JSON file for enriched responses')
 @click.option('--model', '-m', default='gpt-4o-mini', help='LLM model to use')
-def enrich_analysis(stage1_data_responses_file: str, output: Optional[str], model: str):
+@click.option('--batch-size', default=ENRICHMENT_BATCH_SIZE, help='Responses per LLM prompt')
+@click.option('--concurrency', default=MODULAR_MAX_CONCURRENCY, help='LLM calls in flight at once')
+def enrich_analysis(stage1_data_responses_file: str, output: Optional[str], model: str,
+                    batch_size: int, concurrency: int):
     """Stage 2: Add AI-generated analysis to core responses."""
     try:
-        processor = ModularProcessor(model_name=model)
+        processor = ModularProcessor(model_name=model, max_concurrency=concurrency)
         
         # Load core responses
         with open(stage1_data_responses_file, 'r') as f:
             stage1_data_responses = json.load(f)
         
         logger.info(f"Starting analysis enrichment for {len(stage1_data_responses)} responses")
-        enriched_responses = processor.stage2_analysis_enrichment(stage1_data_responses)
+        enriched_responses = processor.stage2_analysis_enrichment(stage1_data_responses, batch_size=batch_size)
         
         logger.info(f"Enriched {len(enriched_responses)} responses")
         
@@ -97,7 +112,8 @@ def enrich_analysis(stage1_data_responses_file: str, output: Optional[str], mode
         # Print summary
         print(f"\n=== Analysis Enrichment Results ===")
         print(f"Input file: {stage1_data_responses_file}")
-        print(f"Responses enriched: {len(enriched_responses)}")
+        print(f"Responses enriched: {len(enriched_responses) - len(processor.failures['enrichment'])}")
+        print_failures(processor.failures['enrichment'])
         
         if enriched_responses:
             print(f"\nSample enriched response:")
@@ -114,17 +130,19 @@ def enrich_analysis(stage1_data_responses_file: str, output: Optional[str], mode
 @click.argument('responses_file')
 @click.option('--output', '-o', help='Output JSON file for labeled responses')
 @click.option('--model', '-m', default='gpt-4o-mini', help='LLM model to use')
-def add_labels(responses_file: str, output: Optional[str], model: str):
+@click.option('--batch-size', default=LABELING_BATCH_SIZE, help='Responses per LLM prompt')
+@click.option('--concurrency', default=MODULAR_MAX_CONCURRENCY, help='LLM calls in flight at once')
+def add_labels(responses_file: str, output: Optional[str], model: str, batch_size: int, concurrency: int):
     """Stage 3: Add structured labels to responses."""
     try:
-        processor = ModularProcessor(model_name=model)
+        processor = ModularProcessor(model_name=model, max_concurrency=concurrency)
         
         # Load responses
         with open(responses_file, 'r') as f:
             responses = json.load(f)
         
         logger.info(f"Starting labeling for {len(responses)} responses")
-        labeled_responses = processor.stage3_labeling(responses)
+        labeled_responses = processor.stage3_labeling(responses, batch_size=batch_size)
         
         logger.info(f"Labeled {len(labeled_responses)} responses")
         
@@ -137,7 +155,8 @@ def add_labels(responses_file: str, output: Optional[str], model: str):
         # Print summary
         print(f"\n=== Labeling Results ===")
         print(f"Input file: {responses_file}")
-        print(f"Responses labeled: {len(labeled_responses)}")
+        print(f"Responses labeled: {len(labeled_responses) - len(processor.failures['labeling'])}")
+        print_failures(processor.failures['labeling'])
         
         if labeled_responses:
             print(f"\nSample labeled response:")
@@ -189,6 +208,10 @@ def run_pipeline(transcript_path: str, company: str, interviewee: str, deal_stat
         print(f"Stage 2 (Analysis): {results['stage2_enriched_count']} responses")
         print(f"Stage 3 (Labels): {results['stage3_labeled_count']} responses")
         print(f"Database saved: {results['database_saved_count']} responses")
+        for stage, failures in processor.failures.items():
+            if failures:
+                print(f"{stage.capitalize()} failures:")
+                print_failures(failures)
         
         if results['responses']:
             print(f"\nSample complete response:")
@@ -10,7 +10,7 @@ import logging
 import json
 import time
 import re
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from difflib import SequenceMatcher
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -20,10 +20,9 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
 from prompts.core_extraction import CORE_EXTRACTION_PROMPT, get_core_extraction_prompt
-from prompts.analysis_enrichment import get_analysis_enrichment_prompt
+from prompts.analysis_enrichment import ANALYSIS_ENRICHMENT_PROMPT, ANALYSIS_ENRICHMENT_BATCH_PROMPT
+from prompts.labeling import LABELING_PROMPT, LABELING_BATCH_PROMPT
 
 # Set up logging
 logging.basicConfig(
@@ -32,6 +31,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Enrichment and labeling: LLM calls in flight at once, and responses sent per prompt
+MODULAR_MAX_CONCURRENCY = int(os.getenv("MODULAR_MAX_CONCURRENCY", "4"))
+ENRICHMENT_BATCH_SIZE = int(os.getenv("MODULAR_ENRICHMENT_BATCH_SIZE", "3"))
+LABELING_BATCH_SIZE = int(os.getenv("MODULAR_LABELING_BATCH_SIZE", "10"))
+
 # ===== TIMESTAMP EXTRACTION FUNCTIONS =====
 def parse_timestamp(ts_str: str) -> Optional[str]:
     """Parse timestamp string to HH:MM:SS format"""
@@ -354,17 +358,33 @@ def map_quotes_to_timestamps(quotes: List[Dict], original_transcript: str) -> Li
 class ModularProcessor:
     """Modular processor for independent pipeline stages."""
     
-    def __init__(self, model_name: str = "gpt-4o-mini", max_tokens: int = 4096, temperature: float = 0.3):
+    def __init__(self, model_name: str = "gpt-4o-mini", max_tokens: int = 4096, temperature: float = 0.3,
+                 max_concurrency: int = MODULAR_MAX_CONCURRENCY, llm=None,
+                 chain_factory: Optional[Callable[[str], Any]] = None):
+        """
+        llm: chat model for the default prompt | llm chains (ChatOpenAI when omitted).
+        chain_factory: template -> object with invoke(inputs) returning the model output,
+        in place of the LangChain chains (tests use it to run without LangChain).
+        """
         self.model_name = model_name
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self.max_concurrency = max(1, max_concurrency)
         
         # Initialize LLM
-        self.llm = ChatOpenAI(
-            model_name=model_name,
-            max_tokens=max_tokens,
-            temperature=temperature
-        )
+        if llm is None and chain_factory is None:
+            from langchain_openai import ChatOpenAI
+            llm = ChatOpenAI(
+                model_name=model_name,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+        self.llm = llm
+        self.chain_factory = chain_factory or self._prompt_chain
+        self._chains = {}
+        self._executor = None
+        # Per-stage failures from the last enrichment / labeling run: [{response_id, error}]
+        self.failures: Dict[str, List[Dict]] = {}
         
         # Initialize database if available
         self.db = None
@@ -483,12 +503,8 @@ class ModularProcessor:
                 # Create unique response ID for this chunk
                 chunk_id = f"{company}_{interviewee}_{i+1}"
                 
-                # Create prompt template (use raw template, not formatted)
-                prompt_template = PromptTemplate(
-                    input_variables=["response_id", "company", "interviewee_name", "deal_status", "date_of_interview", "chunk_text", "start_timestamp", "end_timestamp"],
-                    template=CORE_EXTRACTION_PROMPT
-                )
-                chain = prompt_template | self.llm
+                # Prompt | LLM chain over the raw template
+                chain = self._chain("core_extraction", CORE_EXTRACTION_PROMPT)
                 
                 # Get response
                 result = chain.invoke({
@@ -557,12 +573,8 @@ class ModularProcessor:
                 # Use cleaned text for LLM processing
                 processed_chunk = cleaned_chunk if cleaned_chunk else chunk_text
                 
-                # Create prompt template (use raw template, not formatted)
-                prompt_template = PromptTemplate(
-                    input_variables=["response_id", "company", "interviewee_name", "deal_status", "date_of_interview", "chunk_text", "start_timestamp", "end_timestamp"],
-                    template=CORE_EXTRACTION_PROMPT
-                )
-                chain = prompt_template | self.llm
+                # Prompt | LLM chain over the raw template
+                chain = self._chain("core_extraction", CORE_EXTRACTION_PROMPT)
                 
                 # Get response with timestamps
                 result = chain.invoke({
@@ -703,140 +715,168 @@ class ModularProcessor:
         
         return quality_responses
     
-    def stage2_analysis_enrichment(self, stage1_data_responses: List[Dict]) -> List[Dict]:
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Bounded pool shared by the enrichment and labeling stages (created on first use)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix="modular-llm")
+        return self._executor
+
+    def close(self):
+        """Shut down the shared LLM pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _prompt_chain(self, template: str):
+        from langchain.prompts import PromptTemplate
+        return PromptTemplate.from_template(template) | self.llm
+
+    def _chain(self, name: str, template: str):
+        """Prompt | LLM chain, built once per template and reused across calls and threads"""
+        if name not in self._chains:
+            self._chains[name] = self.chain_factory(template)
+        return self._chains[name]
+
+    @staticmethod
+    def _format_batch_inputs(responses: List[Dict]) -> str:
+        """One block per response for the {responses} slot of a batch prompt"""
+        return "\n\n".join(
+            f"--- response_id: {r.get('response_id', '')}\n"
+            f"Subject: {r.get('subject', '')}\n"
+            f"Company: {r.get('company', '')}\n"
+            f"Interviewee: {r.get('interviewee_name', '')}\n"
+            f"Verbatim response:\n{r.get('verbatim_response', '')}"
+            for r in responses)
+
+    @staticmethod
+    def _parse_json_output(result: Any) -> Any:
+        text = (result.content if hasattr(result, 'content') else str(result)).strip()
+        if text.startswith('```json'):
+            text = text[7:]
+        if text.startswith('```'):
+            text = text[3:]
+        if text.endswith('```'):
+            text = text[:-3]
+        return json.loads(text.strip())
+
+    def _invoke_single(self, stage: str, template: str, response: Dict) -> Dict:
+        output = self._chain(stage, template).invoke({
+            "response_id": response['response_id'],
+            "verbatim_response": response['verbatim_response'],
+            "subject": response['subject'],
+            "company": response['company'],
+            "interviewee_name": response['interviewee_name']
+        })
+        parsed = self._parse_json_output(output)
+        if not isinstance(parsed, dict):
+            raise ValueError(f"expected a JSON object, got {type(parsed).__name__}")
+        return parsed
+
+    def _invoke_batch(self, stage: str, template: str, batch_template: str,
+                      batch: List[Dict]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """
+        Run one batch: ({response_id: output}, {response_id: error}). A batch prompt whose
+        answer cannot be parsed or misses responses falls back to single prompts for those.
+        """
+        outputs, errors = {}, {}
+        if len(batch) > 1:
+            try:
+                parsed = self._parse_json_output(self._chain(f"{stage}_batch", batch_template).invoke({
+                    "response_id": "<that response's response_id>",
+                    "responses": self._format_batch_inputs(batch)
+                }))
+                ids = {str(r.get('response_id')) for r in batch}
+                for item in parsed if isinstance(parsed, list) else [parsed]:
+                    if isinstance(item, dict) and str(item.get('response_id')) in ids:
+                        outputs.setdefault(str(item['response_id']), item)
+            except Exception as e:
+                logger.warning(f"⚠️ {stage} batch of {len(batch)} failed ({e}); retrying responses one by one")
+        for response in batch:
+            response_id = str(response.get('response_id'))
+            if response_id in outputs:
+                continue
+            try:
+                outputs[response_id] = self._invoke_single(stage, template, response)
+            except Exception as e:
+                errors[response_id] = f"{type(e).__name__}: {e}"
+        return outputs, errors
+
+    def _iter_stage(self, stage: str, responses: List[Dict], batch_size: int,
+                    template: str, batch_template: str, merge) -> Iterator[Dict]:
+        """
+        Yield responses in input order as their batches finish, merged with the stage output.
+        Batches run concurrently on the shared pool; a response whose output could not be
+        produced is yielded unchanged and recorded in self.failures[stage].
+        """
+        self.failures[stage] = []
+        batch_size = max(1, batch_size)
+        batches = [responses[i:i + batch_size] for i in range(0, len(responses), batch_size)]
+        results = self.executor.map(lambda b: self._invoke_batch(stage, template, batch_template, b), batches)
+        for batch, (outputs, errors) in zip(batches, results):
+            for response in batch:
+                response_id = str(response.get('response_id'))
+                if response_id in outputs:
+                    yield merge(response, outputs[response_id])
+                    continue
+                error = errors.get(response_id, "no output returned")
+                logger.error(f"❌ {stage} failed for response {response_id}: {error}")
+                self.failures[stage].append({'response_id': response_id, 'error': error})
+                yield response
+
+    def iter_stage2_analysis_enrichment(self, stage1_data_responses: List[Dict],
+                                        batch_size: int = ENRICHMENT_BATCH_SIZE) -> Iterator[Dict]:
+        """Stage 2 as a stream: enriched responses in input order (see _iter_stage)"""
+        return self._iter_stage('enrichment', stage1_data_responses, batch_size,
+                                ANALYSIS_ENRICHMENT_PROMPT, ANALYSIS_ENRICHMENT_BATCH_PROMPT,
+                                lambda response, analysis: {**response, **analysis})
+
+    def stage2_analysis_enrichment(self, stage1_data_responses: List[Dict],
+                                   batch_size: int = ENRICHMENT_BATCH_SIZE) -> List[Dict]:
         """
         Stage 2: Analysis enrichment - add AI-generated insights to core responses.
         
         Args:
             stage1_data_responses: List of dictionaries with core fields
+            batch_size: Responses per LLM prompt (1 sends each response on its own)
             
         Returns:
-            List of dictionaries with core fields + analysis fields
+            List of dictionaries with core fields + analysis fields, in input order.
+            Responses that could not be enriched are kept unchanged and listed in
+            self.failures['enrichment'].
         """
-        logger.info(f"Starting Stage 2: Analysis enrichment for {len(stage1_data_responses)} responses")
-        
-        enriched_responses = []
-        
-        for response in stage1_data_responses:
-            try:
-                # Create analysis prompt
-                prompt_text = get_analysis_enrichment_prompt(
-                    response_id=response['response_id'],
-                    verbatim_response=response['verbatim_response'],
-                    subject=response['subject'],
-                    company=response['company'],
-                    interviewee_name=response['interviewee_name']
-                )
-                
-                # Create chain
-                prompt_template = PromptTemplate(
-                    input_variables=["response_id", "verbatim_response", "subject", "company", "interviewee_name"],
-                    template=prompt_text
-                )
-                chain = prompt_template | self.llm
-                
-                # Get analysis
-                result = chain.invoke({
-                    "response_id": response['response_id'],
-                    "verbatim_response": response['verbatim_response'],
-                    "subject": response['subject'],
-                    "company": response['company'],
-                    "interviewee_name": response['interviewee_name']
-                })
-                
-                # Parse response
-                if hasattr(result, 'content'):
-                    analysis_text = result.content.strip()
-                else:
-                    analysis_text = str(result).strip()
-                
-                # Parse JSON
-                try:
-                    analysis = json.loads(analysis_text)
-                    
-                    # Combine core response with analysis
-                    enriched_response = {**response, **analysis}
-                    enriched_responses.append(enriched_response)
-                    
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse analysis JSON for {response['response_id']}: {e}")
-                    # Keep original response without analysis
-                    enriched_responses.append(response)
-                
-            except Exception as e:
-                logger.error(f"Error enriching response {response['response_id']}: {e}")
-                # Keep original response without analysis
-                enriched_responses.append(response)
-        
-        logger.info(f"Stage 2 complete: enriched {len(enriched_responses)} responses")
+        logger.info(f"Starting Stage 2: Analysis enrichment for {len(stage1_data_responses)} responses "
+                    f"({batch_size} per prompt, {self.max_concurrency} concurrent)")
+        enriched_responses = list(self.iter_stage2_analysis_enrichment(stage1_data_responses, batch_size))
+        failed = len(self.failures['enrichment'])
+        logger.info(f"Stage 2 complete: enriched {len(enriched_responses) - failed} responses, {failed} failed")
         return enriched_responses
-    
-    def stage3_labeling(self, responses: List[Dict]) -> List[Dict]:
+
+    def iter_stage3_labeling(self, responses: List[Dict],
+                             batch_size: int = LABELING_BATCH_SIZE) -> Iterator[Dict]:
+        """Stage 3 as a stream: labeled responses in input order (see _iter_stage)"""
+        return self._iter_stage('labeling', responses, batch_size,
+                                LABELING_PROMPT, LABELING_BATCH_PROMPT,
+                                lambda response, labels_data: {**response, 'labels': labels_data.get('labels', {})})
+
+    def stage3_labeling(self, responses: List[Dict], batch_size: int = LABELING_BATCH_SIZE) -> List[Dict]:
         """
         Stage 3: Labeling - add structured labels to responses.
         
         Args:
             responses: List of dictionaries with core fields (and optionally analysis fields)
+            batch_size: Responses per LLM prompt (1 sends each response on its own)
             
         Returns:
-            List of dictionaries with core fields + labels
+            List of dictionaries with core fields + labels, in input order. Responses that
+            could not be labeled are kept unchanged and listed in self.failures['labeling'].
         """
-        logger.info(f"Starting Stage 3: Labeling for {len(responses)} responses")
-        
-        labeled_responses = []
-        
-        for response in responses:
-            try:
-                # Create labeling prompt
-                prompt_text = get_labeling_prompt(
-                    response_id=response['response_id'],
-                    verbatim_response=response['verbatim_response'],
-                    subject=response['subject'],
-                    company=response['company'],
-                    interviewee_name=response['interviewee_name']
-                )
-                
-                # Create chain
-                prompt_template = PromptTemplate(
-                    input_variables=["response_id", "verbatim_response", "subject", "company", "interviewee_name"],
-                    template=prompt_text
-                )
-                chain = prompt_template | self.llm
-                
-                # Get labels
-                result = chain.invoke({
-                    "response_id": response['response_id'],
-                    "verbatim_response": response['verbatim_response'],
-                    "subject": response['subject'],
-                    "company": response['company'],
-                    "interviewee_name": response['interviewee_name']
-                })
-                
-                # Parse response
-                if hasattr(result, 'content'):
-                    labels_text = result.content.strip()
-                else:
-                    labels_text = str(result).strip()
-                
-                # Parse JSON
-                try:
-                    labels_data = json.loads(labels_text)
-                    
-                    # Combine response with labels
-                    labeled_response = {**response, 'labels': labels_data.get('labels', {})}
-                    labeled_responses.append(labeled_response)
-                    
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse labels JSON for {response['response_id']}: {e}")
-                    # Keep original response without labels
-                    labeled_responses.append(response)
-                
-            except Exception as e:
-                logger.error(f"Error labeling response {response['response_id']}: {e}")
-                # Keep original response without labels
-                labeled_responses.append(response)
-        
-        logger.info(f"Stage 3 complete: labeled {len(labeled_responses)} responses")
+        logger.info(f"Starting Stage 3: Labeling for {len(responses)} responses "
+                    f"({batch_size} per prompt, {self.max_concurrency} concurrent)")
+        labeled_responses = list(self.iter_stage3_labeling(responses, batch_size))
+        failed = len(self.failures['labeling'])
+        logger.info(f"Stage 3 complete: labeled {len(labeled_responses) - failed} responses, {failed} failed")
         return labeled_responses
     
     def save_to_database(self, responses: List[Dict]) -> int: